@@ -0,0 +1,69 @@
+"""Add natural-key unique index on material_prices for bulk upserts.
+
+Duplicate price list lines (same name, grade, form, dimension, supplier and
+valid_from) are collapsed first. Per key the most recently updated line is kept
+(ties broken by the highest id); all other lines are removed from
+material_prices. The removed lines are NOT lost: they are copied unchanged into
+``material_prices_dedup_archive`` before the delete, and the downgrade moves
+them back. The archive has no ORM model; drop it manually once the data has
+been reviewed (see docs/deployment.md, "Deduplikace ceníku materiálů").
+
+Revision ID: l6m7n8o9p0q1
+Revises: k5l6m7n8o9p0
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "l6m7n8o9p0q1"
+down_revision = "k5l6m7n8o9p0"
+branch_labels = None
+depends_on = None
+
+NATURAL_KEY = [
+    "name",
+    sa.text("coalesce(material_grade, '')"),
+    sa.text("coalesce(form, '')"),
+    sa.text("coalesce(dimension, '')"),
+    sa.text("coalesce(supplier, '')"),
+    "valid_from",
+]
+
+
+ARCHIVE_TABLE = "material_prices_dedup_archive"
+
+# Every line except the newest one per natural key
+SUPERSEDED_IDS = """
+    SELECT id FROM (
+        SELECT id, row_number() OVER (
+            PARTITION BY name, coalesce(material_grade, ''), coalesce(form, ''),
+                         coalesce(dimension, ''), coalesce(supplier, ''), valid_from
+            ORDER BY updated_at DESC, id DESC
+        ) AS rn
+        FROM material_prices
+    ) ranked
+    WHERE ranked.rn > 1
+"""
+
+
+def upgrade() -> None:
+    # Keep a copy of every line the deduplication removes (same columns)
+    op.execute(
+        f"CREATE TABLE {ARCHIVE_TABLE} AS "
+        f"SELECT * FROM material_prices WHERE id IN ({SUPERSEDED_IDS})"
+    )
+    op.execute(f"DELETE FROM material_prices WHERE id IN (SELECT id FROM {ARCHIVE_TABLE})")
+    op.create_index(
+        "uq_material_prices_natural_key", "material_prices", NATURAL_KEY, unique=True
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("uq_material_prices_natural_key", table_name="material_prices")
+    # Restore the lines removed by the upgrade (the archive may have been dropped)
+    if sa.inspect(op.get_bind()).has_table(ARCHIVE_TABLE):
+        op.execute(f"INSERT INTO material_prices SELECT * FROM {ARCHIVE_TABLE}")
+        op.drop_table(ARCHIVE_TABLE)
@@ -0,0 +1,37 @@
+"""Add pg_trgm GIN indexes for material and customer free-text search.
+
+Revision ID: m7n8o9p0q1r2
+Revises: l6m7n8o9p0q1
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "m7n8o9p0q1r2"
+down_revision = "l6m7n8o9p0q1"
+branch_labels = None
+depends_on = None
+
+TRIGRAM_INDEXES = [
+    ("ix_material_prices_name_trgm", "material_prices", "name"),
+    ("ix_material_prices_specification_trgm", "material_prices", "specification"),
+    ("ix_customers_company_name_trgm", "customers", "company_name"),
+]
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for name, table, column in TRIGRAM_INDEXES:
+        op.create_index(
+            name,
+            table,
+            [column],
+            postgresql_using="gin",
+            postgresql_ops={column: "gin_trgm_ops"},
+        )
+
+
+def downgrade() -> None:
+    for name, table, _column in reversed(TRIGRAM_INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,117 @@
+"""Partition processing_tasks by month on created_at.
+
+The existing rows are copied into a range-partitioned table with one
+partition per month (processing_tasks_pYYYYMM) from the oldest record to
+three months ahead, plus a default partition. Later months are created by
+the cleanup_processing_tasks Celery task.
+
+Revision ID: n8o9p0q1r2s3
+Revises: m7n8o9p0q1r2
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from datetime import UTC, date, datetime
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "n8o9p0q1r2s3"
+down_revision = "m7n8o9p0q1r2"
+branch_labels = None
+depends_on = None
+
+COLUMNS = (
+    "id, created_at, inbox_message_id, celery_task_id, stage, status, input_data, "
+    "output_data, error_message, tokens_used, processing_time_ms, retry_count, updated_at"
+)
+
+INDEXES = [
+    ("ix_processing_tasks_stage_status", ["stage", "status"]),
+    ("ix_processing_tasks_created_at", ["created_at"]),
+    ("ix_processing_tasks_inbox_message_id", ["inbox_message_id"]),
+    ("ix_processing_tasks_celery_task_id", ["celery_task_id"]),
+]
+
+MONTHS_AHEAD = 3
+
+
+def _add_months(day: date, months: int) -> date:
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _create_table(name: str, partitioned: bool) -> None:
+    now = sa.func.now()
+    op.create_table(
+        name,
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=now, nullable=False),
+        sa.Column("inbox_message_id", sa.UUID(), nullable=True),
+        sa.Column("celery_task_id", sa.String(255), nullable=True),
+        sa.Column("stage", sa.String(20), nullable=False),
+        sa.Column("status", sa.String(20), nullable=False, server_default="pending"),
+        sa.Column("input_data", sa.dialects.postgresql.JSON, nullable=True),
+        sa.Column("output_data", sa.dialects.postgresql.JSON, nullable=True),
+        sa.Column("error_message", sa.Text(), nullable=True),
+        sa.Column("tokens_used", sa.Integer(), nullable=True),
+        sa.Column("processing_time_ms", sa.Integer(), nullable=True),
+        sa.Column("retry_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=now, nullable=False),
+        sa.PrimaryKeyConstraint(
+            *(["id", "created_at"] if partitioned else ["id"]), name=f"pk_{name}"
+        ),
+        sa.ForeignKeyConstraint(
+            ["inbox_message_id"],
+            ["inbox_messages.id"],
+            name="fk_processing_tasks_inbox_message_id_inbox_messages",
+            ondelete="SET NULL",
+        ),
+        postgresql_partition_by="RANGE (created_at)" if partitioned else None,
+    )
+
+
+def _swap_in(name: str) -> None:
+    """Replace processing_tasks with ``name`` (data already copied)."""
+    op.drop_table("processing_tasks")
+    op.rename_table(name, "processing_tasks")
+    op.execute(f"ALTER TABLE processing_tasks RENAME CONSTRAINT pk_{name} TO pk_processing_tasks")
+    for index_name, columns in INDEXES:
+        op.create_index(index_name, "processing_tasks", columns)
+
+
+def upgrade() -> None:
+    _create_table("processing_tasks_partitioned", partitioned=True)
+
+    oldest = op.get_bind().execute(
+        sa.text("SELECT min(created_at) FROM processing_tasks")
+    ).scalar()
+    this_month = datetime.now(UTC).date().replace(day=1)
+    month = min(oldest.date().replace(day=1), this_month) if oldest else this_month
+    while month <= _add_months(this_month, MONTHS_AHEAD):
+        upper = _add_months(month, 1)
+        op.execute(
+            f"CREATE TABLE processing_tasks_p{month:%Y%m} "
+            "PARTITION OF processing_tasks_partitioned "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{upper.isoformat()}')"
+        )
+        month = upper
+    op.execute(
+        "CREATE TABLE processing_tasks_default PARTITION OF processing_tasks_partitioned DEFAULT"
+    )
+
+    op.execute(
+        f"INSERT INTO processing_tasks_partitioned ({COLUMNS}) "
+        f"SELECT {COLUMNS} FROM processing_tasks"
+    )
+    _swap_in("processing_tasks_partitioned")
+
+
+def downgrade() -> None:
+    _create_table("processing_tasks_plain", partitioned=False)
+    op.execute(
+        f"INSERT INTO processing_tasks_plain ({COLUMNS}) SELECT {COLUMNS} FROM processing_tasks"
+    )
+    # Dropping the partitioned parent drops all its partitions
+    _swap_in("processing_tasks_plain")
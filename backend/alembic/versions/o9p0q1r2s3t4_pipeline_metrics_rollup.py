@@ -0,0 +1,124 @@
+"""Add pipeline_metrics_hourly rollup and inbox_material_mentions.
+
+Both tables are backfilled: the rollup from the retained processing_tasks
+rows, the material mentions from inbox_messages.parsed_data items.
+
+Revision ID: o9p0q1r2s3t4
+Revises: n8o9p0q1r2s3
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "o9p0q1r2s3t4"
+down_revision = "n8o9p0q1r2s3"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    now = sa.func.now()
+    op.create_table(
+        "pipeline_metrics_hourly",
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column("bucket_start", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("stage", sa.String(20), nullable=False),
+        sa.Column("status", sa.String(20), nullable=False),
+        sa.Column("classification", sa.String(30), nullable=False, server_default=""),
+        sa.Column("method", sa.String(30), nullable=False, server_default=""),
+        sa.Column("task_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("tokens_used", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("processing_time_ms_total", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("processing_time_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("confidence_total", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("confidence_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=now, nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=now, nullable=False),
+        sa.PrimaryKeyConstraint("id", name="pk_pipeline_metrics_hourly"),
+        sa.UniqueConstraint(
+            "bucket_start", "stage", "status", "classification", "method",
+            name="uq_pipeline_metrics_hourly_bucket",
+        ),
+    )
+
+    op.create_table(
+        "inbox_material_mentions",
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column("inbox_message_id", sa.UUID(), nullable=False),
+        sa.Column("material", sa.String(255), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("id", name="pk_inbox_material_mentions"),
+        sa.ForeignKeyConstraint(
+            ["inbox_message_id"],
+            ["inbox_messages.id"],
+            name="fk_inbox_material_mentions_inbox_message_id_inbox_messages",
+            ondelete="CASCADE",
+        ),
+    )
+    op.create_index(
+        "ix_inbox_material_mentions_inbox_message_id",
+        "inbox_material_mentions",
+        ["inbox_message_id"],
+    )
+    op.create_index(
+        "ix_inbox_material_mentions_created_at_material",
+        "inbox_material_mentions",
+        ["created_at", "material"],
+    )
+
+    # Stage/status are stored as enum names by processing_tasks; the rollup uses values
+    op.execute(
+        """
+        INSERT INTO pipeline_metrics_hourly (
+            id, bucket_start, stage, status, classification, method,
+            task_count, tokens_used, processing_time_ms_total, processing_time_count,
+            confidence_total, confidence_count
+        )
+        SELECT
+            gen_random_uuid(), b.bucket_start, b.stage, b.status, b.classification, b.method,
+            count(*), coalesce(sum(b.tokens_used), 0),
+            coalesce(sum(b.processing_time_ms), 0), count(b.processing_time_ms),
+            coalesce(sum(b.confidence), 0), count(b.confidence)
+        FROM (
+            SELECT
+                date_trunc('hour', created_at) AS bucket_start,
+                lower(stage) AS stage,
+                lower(status) AS status,
+                coalesce(output_data->>'classification', '') AS classification,
+                CASE WHEN stage = 'CLASSIFY'
+                    THEN coalesce(output_data->>'method', '') ELSE '' END AS method,
+                tokens_used,
+                processing_time_ms,
+                CASE WHEN stage = 'CLASSIFY'
+                    THEN (output_data->>'confidence')::float END AS confidence
+            FROM processing_tasks
+        ) AS b
+        GROUP BY b.bucket_start, b.stage, b.status, b.classification, b.method
+        """
+    )
+
+    op.execute(
+        """
+        INSERT INTO inbox_material_mentions (id, inbox_message_id, material, created_at)
+        SELECT gen_random_uuid(), m.id, left(trim(item->>'material'), 255), m.created_at
+        FROM inbox_messages AS m
+        CROSS JOIN LATERAL json_array_elements(m.parsed_data->'items') AS item
+        WHERE json_typeof(m.parsed_data->'items') = 'array'
+          AND json_typeof(item) = 'object'
+          AND trim(coalesce(item->>'material', '')) <> ''
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_inbox_material_mentions_created_at_material", table_name="inbox_material_mentions"
+    )
+    op.drop_index(
+        "ix_inbox_material_mentions_inbox_message_id", table_name="inbox_material_mentions"
+    )
+    op.drop_table("inbox_material_mentions")
+    op.drop_table("pipeline_metrics_hourly")
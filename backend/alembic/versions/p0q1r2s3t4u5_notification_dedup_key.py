@@ -0,0 +1,28 @@
+"""Add notifications.dedup_key for structured deduplication.
+
+Revision ID: p0q1r2s3t4u5
+Revises: o9p0q1r2s3t4
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "p0q1r2s3t4u5"
+down_revision = "o9p0q1r2s3t4"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("notifications", sa.Column("dedup_key", sa.String(255), nullable=True))
+    op.create_index(
+        "ix_notifications_dedup_key_created_at", "notifications", ["dedup_key", "created_at"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_notifications_dedup_key_created_at", table_name="notifications")
+    op.drop_column("notifications", "dedup_key")
@@ -0,0 +1,46 @@
+"""Add claude_usage_ledger with per-call token usage and latency.
+
+Revision ID: q1r2s3t4u5v6
+Revises: p0q1r2s3t4u5
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "q1r2s3t4u5v6"
+down_revision = "p0q1r2s3t4u5"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    now = sa.func.now()
+    op.create_table(
+        "claude_usage_ledger",
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column("agent", sa.String(50), nullable=False),
+        sa.Column("model", sa.String(100), nullable=False),
+        sa.Column("input_tokens", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("output_tokens", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("cache_read_tokens", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("cache_creation_tokens", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("latency_ms", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("success", sa.Boolean(), nullable=False, server_default=sa.true()),
+        sa.Column("error", sa.String(100), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=now, nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=now, nullable=False),
+        sa.PrimaryKeyConstraint("id", name="pk_claude_usage_ledger"),
+    )
+    op.create_index("ix_claude_usage_ledger_created_at", "claude_usage_ledger", ["created_at"])
+    op.create_index(
+        "ix_claude_usage_ledger_agent_created_at", "claude_usage_ledger", ["agent", "created_at"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_claude_usage_ledger_agent_created_at", table_name="claude_usage_ledger")
+    op.drop_index("ix_claude_usage_ledger_created_at", table_name="claude_usage_ledger")
+    op.drop_table("claude_usage_ledger")
@@ -0,0 +1,31 @@
+"""Add (created_at, id) indexes for keyset pagination of list endpoints.
+
+Revision ID: r2s3t4u5v6w7
+Revises: q1r2s3t4u5v6
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "r2s3t4u5v6w7"
+down_revision = "q1r2s3t4u5v6"
+branch_labels = None
+depends_on = None
+
+KEYSET_INDEXES = (
+    ("ix_orders_created_at_id", "orders", ["created_at", "id"]),
+    ("ix_inbox_messages_received_at_id", "inbox_messages", ["received_at", "id"]),
+    ("ix_documents_created_at_id", "documents", ["created_at", "id"]),
+    ("ix_dead_letter_queue_created_at_id", "dead_letter_queue", ["created_at", "id"]),
+)
+
+
+def upgrade() -> None:
+    for name, table, columns in KEYSET_INDEXES:
+        op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    for name, table, _columns in KEYSET_INDEXES:
+        op.drop_index(name, table_name=table)
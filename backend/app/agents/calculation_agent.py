@@ -299,10 +299,12 @@ class CalculationAgent:
             )
 
         # Rate limiter check
+        from app.core.claude_usage import create_message
         from app.core.rate_limiter import RateLimitExceeded, get_rate_limiter
 
+        limiter = get_rate_limiter()
         try:
-            get_rate_limiter().acquire(estimated_tokens=_MAX_TOKENS)
+            lease = await limiter.acquire_wait(estimated_tokens=_MAX_TOKENS)
         except RateLimitExceeded as exc:
             log.warning("calculation_estimate.rate_limited", reason=str(exc))
             return CalculationEstimate(
@@ -322,7 +324,9 @@ class CalculationAgent:
 
         tokens_used = 0
         try:
-            response = await self._client.messages.create(
+            response, usage = await create_message(
+                self._client,
+                agent="calculation_agent",
                 model=_MODEL,
                 max_tokens=_MAX_TOKENS,
                 system=_SYSTEM_PROMPT,
@@ -332,11 +336,7 @@ class CalculationAgent:
                 timeout=_TIMEOUT_SECONDS,
             )
             anthropic_breaker.record_success()
-            usage = getattr(response, "usage", None)
-            if usage:
-                tokens_used = (getattr(usage, "input_tokens", 0) + getattr(usage, "output_tokens", 0))
-                get_rate_limiter().record_usage(tokens_used)
-                log.info("calculation_estimate.token_usage", input=getattr(usage, "input_tokens", 0), output=getattr(usage, "output_tokens", 0))
+            tokens_used = usage.total_tokens
         except TimeoutError:
             anthropic_breaker.record_failure()
             log.warning("calculation_estimate.timeout")
@@ -362,7 +362,7 @@ class CalculationAgent:
                 reasoning="Kalkulace selhala: neočekávaná chyba při volání API.",
             )
         finally:
-            get_rate_limiter().release()
+            limiter.release(lease)
 
         result = self._parse_response(response, log)
         return CalculationEstimate(
@@ -398,20 +398,17 @@ class CalculationAgent:
         from app.services.material_price import MaterialPriceService
 
         service = MaterialPriceService(self._db_session)
+        # One batch lookup against the in-memory price index for the whole BOM
+        price_entries = await service.find_best_prices(
+            [(str(item.get("name", "")), str(item.get("material", ""))) for item in items]
+        )
         enriched_items: list[dict[str, object]] = []
 
-        for item in items:
+        for item, price_entry in zip(items, price_entries, strict=True):
             enriched = dict(item)
             material = str(item.get("material", ""))
             name = str(item.get("name", ""))
 
-            # Try to find best price
-            price_entry = await service.find_best_price(
-                material_name=name,
-                material_grade=material,
-                dimension=str(item.get("dimension", "")),
-            )
-
             if price_entry:
                 enriched["real_price"] = float(price_entry.unit_price)
                 enriched["real_price_unit"] = price_entry.unit
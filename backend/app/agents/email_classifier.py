@@ -6,12 +6,15 @@ incoming emails into categories relevant for a steel fabrication company.
 
 from __future__ import annotations
 
-from dataclasses import dataclass, field
+from collections.abc import Sequence
+from dataclasses import dataclass, field, replace
 from typing import Literal
 
 import structlog
 from anthropic import AsyncAnthropic
 
+from app.core.prompt_budget import fit_text
+
 logger = structlog.get_logger(__name__)
 
 # Valid email categories for the steel fabrication domain
@@ -48,7 +51,7 @@ _MODEL: str = _get_settings().ANTHROPIC_MODEL
 _MAX_TOKENS: int = 1024
 
 # Timeout in seconds for the API call
-_TIMEOUT_SECONDS: float = 30.0
+CALL_TIMEOUT_SECONDS: float = 30.0
 
 # Tool definition for structured classification output
 _CLASSIFY_TOOL: dict[str, object] = {
@@ -104,6 +107,36 @@ _CLASSIFY_TOOL: dict[str, object] = {
     },
 }
 
+# Tool definition for classifying several emails in one call (micro-batching)
+_CLASSIFY_BATCH_TOOL: dict[str, object] = {
+    "name": "classify_emails",
+    "description": (
+        "Klasifikuj kazdy z predanych emailu samostatne. Pro kazdy email vrat jednu "
+        "polozku s jeho indexem (atribut index), kategorii, mirou jistoty a zduvodnenim."
+    ),
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "classifications": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "index": {"type": "integer", "description": "Index emailu."},
+                        **_CLASSIFY_TOOL["input_schema"]["properties"],  # type: ignore[index]
+                    },
+                    "required": ["index", "category", "confidence", "reasoning"],
+                },
+            },
+        },
+        "required": ["classifications"],
+    },
+}
+
+# Body budget per email and response tokens per email of a batch call
+_BATCH_BODY_CHARS: int = 2000
+_BATCH_MAX_TOKENS_PER_EMAIL: int = 200
+
 # System prompt describing the classification task and company context
 _SYSTEM_PROMPT: str = """Jsi AI asistent strojirenske firmy Infer s.r.o. Firma vyrabi:
 - Potrubni dily (kolena, T-kusy, redukce, priruby) z uhlove a nerezove oceli
@@ -224,10 +257,12 @@ class EmailClassifier:
             )
 
         # Rate limiter check
+        from app.core.claude_usage import create_message
         from app.core.rate_limiter import RateLimitExceeded, get_rate_limiter
 
+        limiter = get_rate_limiter()
         try:
-            get_rate_limiter().acquire(estimated_tokens=_MAX_TOKENS)
+            lease = await limiter.acquire_wait(estimated_tokens=_MAX_TOKENS)
         except RateLimitExceeded as exc:
             log.warning("email_classification.rate_limited", reason=str(exc))
             return ClassificationResult(
@@ -241,22 +276,19 @@ class EmailClassifier:
 
         tokens_used = 0
         try:
-            response = await self._client.messages.create(
+            response, usage = await create_message(
+                self._client,
+                agent="email_classifier",
                 model=_MODEL,
                 max_tokens=_MAX_TOKENS,
                 system=_SYSTEM_PROMPT,
                 tools=[_CLASSIFY_TOOL],  # type: ignore[list-item]
                 tool_choice={"type": "tool", "name": "classify_email"},
                 messages=[{"role": "user", "content": user_message}],
-                timeout=_TIMEOUT_SECONDS,
+                timeout=CALL_TIMEOUT_SECONDS,
             )
             anthropic_breaker.record_success()
-            # Record actual token usage
-            usage = getattr(response, "usage", None)
-            if usage:
-                tokens_used = (getattr(usage, "input_tokens", 0) + getattr(usage, "output_tokens", 0))
-                get_rate_limiter().record_usage(tokens_used)
-                log.info("email_classification.token_usage", input=getattr(usage, "input_tokens", 0), output=getattr(usage, "output_tokens", 0))
+            tokens_used = usage.total_tokens
         except TimeoutError:
             anthropic_breaker.record_failure()
             log.warning("email_classification.timeout")
@@ -276,7 +308,7 @@ class EmailClassifier:
                 needs_escalation=True,
             )
         finally:
-            get_rate_limiter().release()
+            limiter.release(lease)
 
         result = self._parse_response(response, log)
         return ClassificationResult(
@@ -287,6 +319,99 @@ class EmailClassifier:
             tokens_used=tokens_used,
         )
 
+    async def classify_batch(
+        self,
+        emails: Sequence[tuple[str, str]],
+    ) -> list[ClassificationResult | None]:
+        """Classify several emails with one API call.
+
+        The system prompt is sent once for the whole batch and the call takes
+        a single rate limiter slot. Bodies are fitted to a smaller per-email
+        budget than in ``classify``.
+
+        Args:
+            emails: (subject, body) pairs.
+
+        Returns:
+            One result per email, in input order. ``None`` where the batch
+            produced no usable result (API unavailable or failed, email missing
+            from the response); such emails should be classified on their own.
+        """
+        if not emails:
+            return []
+        log = logger.bind(batch_size=len(emails))
+        log.info("email_classification.batch_started")
+
+        from app.core.circuit_breaker import anthropic_breaker
+        from app.core.claude_usage import create_message
+        from app.core.rate_limiter import RateLimitExceeded, get_rate_limiter
+
+        if not anthropic_breaker.can_execute():
+            log.warning("email_classification.circuit_open")
+            return [None] * len(emails)
+
+        max_tokens = min(4096, _BATCH_MAX_TOKENS_PER_EMAIL * len(emails) + 256)
+        limiter = get_rate_limiter()
+        try:
+            lease = await limiter.acquire_wait(estimated_tokens=max_tokens)
+        except RateLimitExceeded as exc:
+            log.warning("email_classification.rate_limited", reason=str(exc))
+            return [None] * len(emails)
+
+        try:
+            response, usage = await create_message(
+                self._client,
+                agent="email_classifier",
+                model=_MODEL,
+                max_tokens=max_tokens,
+                system=_SYSTEM_PROMPT,
+                tools=[_CLASSIFY_BATCH_TOOL],  # type: ignore[list-item]
+                tool_choice={"type": "tool", "name": "classify_emails"},
+                messages=[{"role": "user", "content": self._build_batch_message(emails)}],
+                timeout=CALL_TIMEOUT_SECONDS,
+            )
+            anthropic_breaker.record_success()
+        except Exception:
+            anthropic_breaker.record_failure()
+            log.exception("email_classification.batch_api_error")
+            return [None] * len(emails)
+        finally:
+            limiter.release(lease)
+
+        results: list[ClassificationResult | None] = [None] * len(emails)
+        tokens_per_email = usage.total_tokens // len(emails)
+        for block in response.content:
+            if block.type != "tool_use" or block.name != "classify_emails":
+                continue
+            tool_input = block.input if isinstance(block.input, dict) else {}
+            for item in tool_input.get("classifications") or []:
+                index = item.get("index") if isinstance(item, dict) else None
+                if not isinstance(index, int) or not 0 <= index < len(emails):
+                    continue
+                result = self._result_from_tool_input(item, log)
+                results[index] = replace(result, tokens_used=tokens_per_email)
+
+        log.info(
+            "email_classification.batch_completed",
+            classified=sum(result is not None for result in results),
+            tokens=usage.total_tokens,
+        )
+        return results
+
+    @staticmethod
+    def _build_batch_message(emails: Sequence[tuple[str, str]]) -> str:
+        """Build one user message listing all emails of a batch, indexed from 0."""
+        parts = [f"Klasifikuj nasledujicich {len(emails)} emailu (kazdy samostatne):"]
+        for index, (subject, body) in enumerate(emails):
+            # XML tags delimit user content to prevent prompt injection
+            parts.append(
+                f'<email index="{index}">\n'
+                f"<email_subject>{subject}</email_subject>\n"
+                f"<email_body>\n{fit_text(body, _BATCH_BODY_CHARS)}\n</email_body>\n"
+                "</email>"
+            )
+        return "\n\n".join(parts)
+
     @staticmethod
     def _keyword_fallback(subject: str, body: str) -> EmailCategory | None:
         """Simple keyword-based fallback classification when API is unavailable."""
@@ -311,15 +436,13 @@ class EmailClassifier:
 
         Args:
             subject: The email subject line.
-            body: The plain-text email body (truncated to 4000 chars).
+            body: The plain-text email body (fitted to 4000 chars).
 
         Returns:
             Formatted user message string.
         """
-        # Truncate very long bodies to stay within token limits
-        truncated_body = body[:4000]
-        if len(body) > 4000:
-            truncated_body += "\n\n[... text zkracen ...]"
+        # Fit very long bodies into the token budget, keeping data lines
+        truncated_body = fit_text(body, 4000)
 
         # XML tags delimit user content to prevent prompt injection
         return (
@@ -361,6 +484,31 @@ class EmailClassifier:
                 needs_escalation=True,
             )
 
+        result = EmailClassifier._result_from_tool_input(tool_input, log)
+
+        log.info(
+            "email_classification.completed",
+            category=result.category,
+            confidence=result.confidence,
+            needs_escalation=result.needs_escalation,
+        )
+
+        return result
+
+    @staticmethod
+    def _result_from_tool_input(
+        tool_input: dict[str, object],
+        log: structlog.stdlib.BoundLogger,
+    ) -> ClassificationResult:
+        """Validate one classification returned by a tool call.
+
+        Args:
+            tool_input: Category, confidence and reasoning from the tool input.
+            log: Bound structlog logger for contextual logging.
+
+        Returns:
+            Validated ClassificationResult.
+        """
         category_raw = str(tool_input.get("category", ""))
         confidence_raw = tool_input.get("confidence", 0.0)
         reasoning_raw = str(tool_input.get("reasoning", ""))
@@ -391,18 +539,9 @@ class EmailClassifier:
                 confidence=confidence,
             )
 
-        result = ClassificationResult(
+        return ClassificationResult(
             category=category,
             confidence=confidence,
             reasoning=reasoning_raw,
             needs_escalation=needs_escalation,
         )
-
-        log.info(
-            "email_classification.completed",
-            category=result.category,
-            confidence=result.confidence,
-            needs_escalation=result.needs_escalation,
-        )
-
-        return result
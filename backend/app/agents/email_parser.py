@@ -12,6 +12,8 @@ from dataclasses import dataclass, field
 import structlog
 from anthropic import AsyncAnthropic
 
+from app.core.prompt_budget import fit_text
+
 logger = structlog.get_logger(__name__)
 
 # Anthropic model — centralized in Settings
@@ -283,10 +285,12 @@ class EmailParser:
             return ParsedInquiry()
 
         # Rate limiter check
+        from app.core.claude_usage import create_message
         from app.core.rate_limiter import RateLimitExceeded, get_rate_limiter
 
+        limiter = get_rate_limiter()
         try:
-            get_rate_limiter().acquire(estimated_tokens=_MAX_TOKENS)
+            lease = await limiter.acquire_wait(estimated_tokens=_MAX_TOKENS)
         except RateLimitExceeded as exc:
             log.warning("email_parsing.rate_limited", reason=str(exc))
             return ParsedInquiry()
@@ -295,7 +299,9 @@ class EmailParser:
 
         tokens_used = 0
         try:
-            response = await self._client.messages.create(
+            response, usage = await create_message(
+                self._client,
+                agent="email_parser",
                 model=_MODEL,
                 max_tokens=_MAX_TOKENS,
                 system=_SYSTEM_PROMPT,
@@ -305,11 +311,7 @@ class EmailParser:
                 timeout=_TIMEOUT_SECONDS,
             )
             anthropic_breaker.record_success()
-            usage = getattr(response, "usage", None)
-            if usage:
-                tokens_used = (getattr(usage, "input_tokens", 0) + getattr(usage, "output_tokens", 0))
-                get_rate_limiter().record_usage(tokens_used)
-                log.info("email_parsing.token_usage", input=getattr(usage, "input_tokens", 0), output=getattr(usage, "output_tokens", 0))
+            tokens_used = usage.total_tokens
         except TimeoutError:
             anthropic_breaker.record_failure()
             log.warning("email_parsing.timeout")
@@ -319,7 +321,7 @@ class EmailParser:
             log.exception("email_parsing.api_error")
             return ParsedInquiry()
         finally:
-            get_rate_limiter().release()
+            limiter.release(lease)
 
         result = self._parse_response(response, log)
         return ParsedInquiry(
@@ -344,15 +346,13 @@ class EmailParser:
 
         Args:
             subject: The email subject line.
-            body: The plain-text email body (truncated to 6000 chars).
+            body: The plain-text email body (fitted to 6000 chars).
 
         Returns:
             Formatted user message string.
         """
         # Allow longer body for parsing since we need more detail than classification
-        truncated_body = body[:6000]
-        if len(body) > 6000:
-            truncated_body += "\n\n[... text zkracen ...]"
+        truncated_body = fit_text(body, 6000)
 
         # XML tags delimit user content to prevent prompt injection
         return (
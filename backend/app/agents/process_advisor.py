@@ -217,11 +217,21 @@ class ProcessAdvisorAgent:
             logger.warning("process_advisor.no_client")
             return self._generate_rule_based(metrics)
 
+        from app.core.circuit_breaker import anthropic_breaker
+        from app.core.claude_usage import create_message
+
+        if not anthropic_breaker.can_execute():
+            logger.warning("process_advisor.circuit_open")
+            return self._generate_rule_based(metrics)
+
         # Build prompt from metrics
         user_message = self._build_metrics_summary(metrics)
 
+        response = None
         try:
-            response = await self._client.messages.create(
+            response, _usage = await create_message(
+                self._client,
+                agent="process_advisor",
                 model=_MODEL,
                 max_tokens=_MAX_TOKENS,
                 system=_SYSTEM_PROMPT,
@@ -236,6 +246,7 @@ class ProcessAdvisorAgent:
                 ],
                 timeout=_TIMEOUT_SECONDS,
             )
+            anthropic_breaker.record_success()
 
             # Extract text content
             text_content = ""
@@ -259,9 +270,12 @@ class ProcessAdvisorAgent:
                 return self._generate_rule_based(metrics)
 
         except TimeoutError:
+            anthropic_breaker.record_failure()
             logger.warning("process_advisor.timeout")
             return self._generate_rule_based(metrics)
         except Exception:
+            if response is None:
+                anthropic_breaker.record_failure()
             logger.exception("process_advisor.api_error")
             return self._generate_rule_based(metrics)
 
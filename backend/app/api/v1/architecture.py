@@ -1,11 +1,15 @@
 """Architecture graph API — returns codebase analysis as JSON for interactive visualization."""
 
-import json
+import asyncio
+import hashlib
 import subprocess
 import sys
 from pathlib import Path
 
-from fastapi import APIRouter
+import structlog
+from fastapi import APIRouter, Request, Response
+
+logger = structlog.get_logger(__name__)
 
 router = APIRouter(prefix="/architektura", tags=["architektura"])
 
@@ -18,33 +22,103 @@ PREZENTACE = _LOCAL_PREZENTACE if _LOCAL_PREZENTACE.exists() else _DOCKER_PREZEN
 ANALYZER = PREZENTACE / "analyze_codebase.py"
 GRAPH_JSON = PREZENTACE / "graph_data.json"
 
+_ANALYZER_TIMEOUT_SECONDS = 30
+
+# Running analyzer (one per API process) and the stderr of the last failed run
+_refresh_task: asyncio.Task[None] | None = None
+_refresh_error: str | None = None
+# ((mtime_ns, size), ETag, body) of the last read graph_data.json
+_graph: tuple[tuple[int, int], str, bytes] | None = None
+
+
+async def _run_analyzer() -> None:
+    """Regenerate graph_data.json in a subprocess without blocking the event loop.
+
+    Never raises: any failure, including one to start the subprocess, is kept
+    in ``_refresh_error`` (nobody awaits a background refresh).
+    """
+    global _refresh_error  # noqa: PLW0603
+    try:
+        _refresh_error = await _analyze()
+    except Exception as exc:
+        _refresh_error = f"Analyzer could not run: {exc}"
+    if _refresh_error:
+        logger.warning("architecture.analyzer_failed", error=_refresh_error[:200])
+
+
+async def _analyze() -> str | None:
+    """Run the analyzer; the error message of a failed run, or None."""
+    cwd = str(_LOCAL_ROOT) if _LOCAL_PREZENTACE.exists() else "/app"
+    process = await asyncio.create_subprocess_exec(
+        sys.executable,
+        str(ANALYZER),
+        cwd=cwd,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+    )
+    try:
+        _, stderr = await asyncio.wait_for(process.communicate(), _ANALYZER_TIMEOUT_SECONDS)
+    except TimeoutError:
+        process.kill()
+        await process.wait()
+        return f"Analyzer timed out after {_ANALYZER_TIMEOUT_SECONDS} s"
+    return stderr.decode(errors="replace") if process.returncode else None
+
+
+def _start_refresh() -> asyncio.Task[None]:
+    """Start the analyzer unless a run is already in progress."""
+    global _refresh_task  # noqa: PLW0603
+    if _refresh_task is None or _refresh_task.done():
+        _refresh_task = asyncio.create_task(_run_analyzer())
+    return _refresh_task
+
+
+def _read_graph() -> tuple[str, bytes] | None:
+    """ETag and content of graph_data.json, re-read only when the file changed."""
+    global _graph  # noqa: PLW0603
+    try:
+        stat = GRAPH_JSON.stat()
+    except FileNotFoundError:
+        return None
+    key = (stat.st_mtime_ns, stat.st_size)
+    if _graph is None or _graph[0] != key:
+        body = GRAPH_JSON.read_bytes()
+        _graph = (key, f'"{hashlib.sha256(body).hexdigest()[:32]}"', body)
+    return _graph[1], _graph[2]
+
 
 @router.get("")
-async def get_architecture_graph(refresh: bool = False):
-    """Return architecture graph data. Use ?refresh=true to re-analyze codebase."""
-    if refresh or not GRAPH_JSON.exists():
-        if ANALYZER.exists():
-            cwd = str(_LOCAL_ROOT) if _LOCAL_PREZENTACE.exists() else "/app"
-            result = subprocess.run(
-                [sys.executable, str(ANALYZER)],
-                capture_output=True,
-                text=True,
-                timeout=30,
-                cwd=cwd,
-            )
-            if result.returncode != 0:
-                # If refresh failed but cached JSON exists, return cached
-                if GRAPH_JSON.exists():
-                    data = json.loads(GRAPH_JSON.read_text(encoding="utf-8"))
-                    data["_warning"] = f"Refresh failed, serving cached: {result.stderr[:200]}"
-                    return data
-                return {"error": f"Analyzer failed: {result.stderr}"}
-
-    if not GRAPH_JSON.exists():
+async def get_architecture_graph(request: Request, refresh: bool = False):
+    """Return architecture graph data.
+
+    Serves the last generated graph_data.json with an ETag (``If-None-Match``
+    gets 304). ``?refresh=true`` re-analyzes the codebase in the background
+    and returns the current graph right away; ``X-Graph-Refresh`` tells
+    whether the analyzer is still ``running`` or the last run ``failed``.
+    """
+    if ANALYZER.exists() and (refresh or not GRAPH_JSON.exists()):
+        task = _start_refresh()
+        if not GRAPH_JSON.exists():
+            # Nothing to serve yet: wait for the first analysis (shielded, so a
+            # disconnecting client does not cancel it for everyone else)
+            await asyncio.shield(task)
+
+    graph = _read_graph()
+    if graph is None:
+        if _refresh_error:
+            return {"error": f"Analyzer failed: {_refresh_error}"}
         return {"error": "graph_data.json not found. Run analyze_codebase.py first."}
 
-    data = json.loads(GRAPH_JSON.read_text(encoding="utf-8"))
-    return data
+    etag, body = graph
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _refresh_task is not None and not _refresh_task.done():
+        headers["X-Graph-Refresh"] = "running"
+    elif _refresh_error:
+        headers["X-Graph-Refresh"] = "failed"
+
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 
 @router.get("/workflow")
@@ -23,12 +23,13 @@ router = APIRouter(prefix="/zakaznici", tags=["Zákazníci"])
 async def get_customers(
     skip: int = Query(default=0, ge=0, description="Number of records to skip"),
     limit: int = Query(default=100, ge=1, le=1000, description="Maximum number of records"),
+    search: str | None = Query(default=None, description="Search in company name"),
     _user: User = Depends(require_role(UserRole.OBCHODNIK, UserRole.VEDENI, UserRole.UCETNI)),
     db: AsyncSession = Depends(get_db),
 ) -> list[CustomerResponse]:
-    """Get all customers with pagination."""
+    """Get all customers with pagination and optional company name search."""
     service = CustomerService(db)
-    customers = await service.get_all(skip=skip, limit=limit)
+    customers = await service.get_all(skip=skip, limit=limit, search=search)
     return [CustomerResponse.model_validate(c) for c in customers]
 
 
@@ -1,9 +1,10 @@
 """Document API endpoints."""
 
-from uuid import UUID
+import asyncio
+from uuid import UUID, uuid4
 
 from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, UploadFile, status
-from fastapi.responses import Response
+from fastapi.responses import JSONResponse, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_db, require_role
@@ -12,8 +13,15 @@ from app.integrations.ocr.drawing_analyzer import DrawingAnalyzer
 from app.integrations.ocr.processor import OCRProcessor
 from app.models import DocumentCategory
 from app.models.user import User, UserRole
-from app.schemas import DocumentResponse, DocumentUpdate, DocumentUpload
+from app.schemas import (
+    CursorPage,
+    DocumentListItem,
+    DocumentResponse,
+    DocumentUpdate,
+    DocumentUpload,
+)
 from app.schemas.document_generator import (
+    DocumentJobResponse,
     GenerateDeliveryNoteRequest,
     GenerateInvoiceRequest,
     GenerateOfferRequest,
@@ -28,6 +36,7 @@ from app.schemas.drawing import (
     WeldingRequirementsSchema,
 )
 from app.services import DocumentGeneratorService, DocumentService
+from app.services.pagination import CountMode
 
 router = APIRouter(prefix="/dokumenty", tags=["Dokumenty"])
 
@@ -57,6 +66,89 @@ async def _persist_generated_document(
     await db.commit()
 
 
+_ASYNC_MODE_QUERY = Query(
+    default=False,
+    description="Render in a background job and return 202 with a job id instead of the PDF",
+)
+
+
+async def _enqueue_document_job(
+    kind: str,
+    order_id: UUID,
+    params: dict[str, object],
+    user: User,
+) -> JSONResponse:
+    """Queue a document generation job and return 202 with its job id."""
+    from app.services.document_generator_tasks import generate_document, remember_job_owner
+
+    job_id = str(uuid4())
+    # Recorded before queueing, so the owner is known in every job state
+    await asyncio.to_thread(remember_job_owner, job_id, str(user.id))
+    await asyncio.to_thread(
+        generate_document.apply_async,
+        args=(kind, str(order_id), params, str(user.id)),
+        task_id=job_id,
+    )
+    job = DocumentJobResponse(job_id=job_id, status="queued")
+    return JSONResponse(
+        status_code=status.HTTP_202_ACCEPTED,
+        content=job.model_dump(mode="json"),
+        headers={"Location": f"/api/v1/dokumenty/generate/jobs/{job_id}"},
+    )
+
+
+@router.get("/generate/jobs/{job_id}", response_model=DocumentJobResponse)
+async def get_document_job(
+    job_id: str,
+    user: User = Depends(
+        require_role(UserRole.OBCHODNIK, UserRole.TECHNOLOG, UserRole.VEDENI)
+    ),
+) -> DocumentJobResponse:
+    """Poll an asynchronous document generation job.
+
+    Only the user who queued the job can see it; other callers get 404.
+    Progress is also pushed over the WebSocket channel as ``document_job``
+    messages. Completed jobs point to the stored document's download URL.
+    """
+
+    from celery.result import AsyncResult
+
+    from app.core.celery_app import celery_app
+    from app.services.document_generator_tasks import get_job_owner
+
+    def _read_state() -> tuple[str | None, str, object]:
+        owner = get_job_owner(job_id)
+        if owner != str(user.id):
+            return owner, "", None
+        result = AsyncResult(job_id, app=celery_app)
+        return owner, result.state, result.info
+
+    owner, state, info = await asyncio.to_thread(_read_state)
+    if owner != str(user.id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Document job {job_id} not found",
+        )
+
+    if state == "SUCCESS" and isinstance(info, dict):
+        if info.get("status") != "completed":
+            return DocumentJobResponse(job_id=job_id, status="failed", error=info.get("error"))
+        return DocumentJobResponse(
+            job_id=job_id,
+            status="completed",
+            document_id=info["document_id"],
+            file_name=info.get("file_name"),
+            size_bytes=info.get("size_bytes"),
+            download_url=f"/api/v1/dokumenty/{info['document_id']}/download",
+        )
+    if state == "FAILURE":
+        return DocumentJobResponse(job_id=job_id, status="failed", error=str(info))
+    if state in ("STARTED", "PROGRESS", "RETRY"):
+        stage = info.get("stage") if isinstance(info, dict) else None
+        return DocumentJobResponse(job_id=job_id, status="running", stage=stage)
+    return DocumentJobResponse(job_id=job_id, status="queued")
+
+
 @router.post(
     "/upload",
     response_model=DocumentResponse,
@@ -127,6 +219,35 @@ async def list_documents(
     return [DocumentResponse.model_validate(d) for d in documents]
 
 
+@router.get("/list", response_model=CursorPage[DocumentListItem])
+async def list_documents_page(
+    cursor: str | None = Query(None, description="next_cursor of the previous page"),
+    limit: int = Query(default=50, ge=1, le=200),
+    entity_type: str | None = Query(None, description="Filter by entity type"),
+    category: DocumentCategory | None = Query(None, description="Filter by category"),
+    count: CountMode = Query(CountMode.NONE, description="Include the total count"),
+    _user: User = Depends(require_role(UserRole.OBCHODNIK, UserRole.TECHNOLOG, UserRole.VEDENI)),
+    db: AsyncSession = Depends(get_db),
+) -> CursorPage[DocumentListItem]:
+    """List documents newest first with keyset pagination, without OCR text."""
+    service = DocumentService(db)
+    try:
+        rows, next_cursor, total = await service.list_page(
+            cursor=cursor,
+            limit=limit,
+            entity_type=entity_type,
+            category=category,
+            count=count,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)) from e
+    return CursorPage[DocumentListItem](
+        items=[DocumentListItem.model_validate(row) for row in rows],
+        next_cursor=next_cursor,
+        total=total,
+    )
+
+
 @router.get("/entity/{entity_type}/{entity_id}", response_model=list[DocumentResponse])
 async def get_entity_documents(
     entity_type: str,
@@ -266,12 +387,15 @@ async def delete_document(
 async def generate_offer(
     order_id: UUID,
     request: GenerateOfferRequest | None = None,
+    async_mode: bool = _ASYNC_MODE_QUERY,
     _user: User = Depends(require_role(UserRole.OBCHODNIK, UserRole.VEDENI)),
     db: AsyncSession = Depends(get_db),
 ) -> Response:
     """Generate offer PDF for an order."""
     service = DocumentGeneratorService(db)
     req = request or GenerateOfferRequest()
+    if async_mode:
+        return await _enqueue_document_job("offer", order_id, req.model_dump(), _user)
     try:
         pdf_bytes = await service.generate_offer_pdf(
             order_id=order_id,
@@ -299,12 +423,15 @@ async def generate_offer(
 async def generate_production_sheet(
     order_id: UUID,
     request: GenerateProductionSheetRequest | None = None,
+    async_mode: bool = _ASYNC_MODE_QUERY,
     _user: User = Depends(require_role(UserRole.TECHNOLOG, UserRole.VEDENI)),
     db: AsyncSession = Depends(get_db),
 ) -> Response:
     """Generate production sheet PDF for an order."""
     service = DocumentGeneratorService(db)
     req = request or GenerateProductionSheetRequest()
+    if async_mode:
+        return await _enqueue_document_job("production-sheet", order_id, req.model_dump(), _user)
     try:
         pdf_bytes = await service.generate_production_sheet_pdf(
             order_id=order_id,
@@ -432,10 +559,13 @@ async def analyze_drawing(
 @router.post("/generate/dimensional-protocol/{order_id}")
 async def generate_dimensional_protocol(
     order_id: UUID,
+    async_mode: bool = _ASYNC_MODE_QUERY,
     _user: User = Depends(require_role(UserRole.TECHNOLOG, UserRole.VEDENI)),
     db: AsyncSession = Depends(get_db),
 ) -> Response:
     """Generate dimensional protocol PDF for an order."""
+    if async_mode:
+        return await _enqueue_document_job("dimensional-protocol", order_id, {}, _user)
     service = DocumentGeneratorService(db)
     try:
         pdf_bytes = await service.generate_dimensional_protocol(order_id=order_id)
@@ -469,6 +599,7 @@ async def generate_dimensional_protocol(
 async def generate_material_certificate(
     order_id: UUID,
     certificate_type: str = Query(default="3.1", regex="^(3\\.1|3\\.2)$"),
+    async_mode: bool = _ASYNC_MODE_QUERY,
     _user: User = Depends(require_role(UserRole.TECHNOLOG, UserRole.VEDENI)),
     db: AsyncSession = Depends(get_db),
 ) -> Response:
@@ -477,7 +608,12 @@ async def generate_material_certificate(
     Args:
         order_id: Order UUID.
         certificate_type: Certificate type ("3.1" or "3.2"). Defaults to "3.1".
+        async_mode: Queue a background job instead of rendering in the request.
     """
+    if async_mode:
+        return await _enqueue_document_job(
+            "material-certificate", order_id, {"certificate_type": certificate_type}, _user
+        )
     service = DocumentGeneratorService(db)
     try:
         pdf_bytes = await service.generate_material_certificate(
@@ -515,12 +651,15 @@ async def generate_material_certificate(
 async def generate_invoice_pdf(
     order_id: UUID,
     request: GenerateInvoiceRequest | None = None,
+    async_mode: bool = _ASYNC_MODE_QUERY,
     _user: User = Depends(require_role(UserRole.OBCHODNIK, UserRole.VEDENI)),
     db: AsyncSession = Depends(get_db),
 ) -> Response:
     """Generate invoice PDF for an order."""
     service = DocumentGeneratorService(db)
     req = request or GenerateInvoiceRequest()
+    if async_mode:
+        return await _enqueue_document_job("invoice", order_id, req.model_dump(), _user)
     try:
         pdf_bytes = await service.generate_invoice_pdf(
             order_id=order_id,
@@ -549,12 +688,15 @@ async def generate_invoice_pdf(
 async def generate_delivery_note(
     order_id: UUID,
     request: GenerateDeliveryNoteRequest | None = None,
+    async_mode: bool = _ASYNC_MODE_QUERY,
     _user: User = Depends(require_role(UserRole.OBCHODNIK, UserRole.TECHNOLOG, UserRole.VEDENI)),
     db: AsyncSession = Depends(get_db),
 ) -> Response:
     """Generate delivery note PDF for an order."""
     service = DocumentGeneratorService(db)
     req = request or GenerateDeliveryNoteRequest()
+    if async_mode:
+        return await _enqueue_document_job("delivery-note", order_id, req.model_dump(), _user)
     try:
         pdf_bytes = await service.generate_delivery_note_pdf(
             order_id=order_id,
@@ -582,12 +724,15 @@ async def generate_delivery_note(
 async def generate_order_confirmation(
     order_id: UUID,
     request: GenerateOrderConfirmationRequest | None = None,
+    async_mode: bool = _ASYNC_MODE_QUERY,
     _user: User = Depends(require_role(UserRole.OBCHODNIK, UserRole.VEDENI)),
     db: AsyncSession = Depends(get_db),
 ) -> Response:
     """Generate order confirmation PDF for an order."""
     service = DocumentGeneratorService(db)
     req = request or GenerateOrderConfirmationRequest()
+    if async_mode:
+        return await _enqueue_document_job("order-confirmation", order_id, req.model_dump(), _user)
     try:
         pdf_bytes = await service.generate_order_confirmation_pdf(
             order_id=order_id,
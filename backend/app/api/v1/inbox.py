@@ -8,8 +8,15 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.api.deps import get_db, require_role
 from app.models import InboxClassification, InboxStatus
 from app.models.user import User, UserRole
-from app.schemas import InboxAssign, InboxMessageResponse, InboxReclassify
+from app.schemas import (
+    CursorPage,
+    InboxAssign,
+    InboxMessageListItem,
+    InboxMessageResponse,
+    InboxReclassify,
+)
 from app.services import InboxService
+from app.services.pagination import CountMode
 
 router = APIRouter(prefix="/inbox", tags=["Inbox"])
 
@@ -36,6 +43,37 @@ async def get_inbox_messages(
     return [InboxMessageResponse.model_validate(m) for m in messages]
 
 
+@router.get("/list", response_model=CursorPage[InboxMessageListItem])
+async def list_inbox_messages(
+    cursor: str | None = Query(default=None, description="next_cursor of the previous page"),
+    limit: int = Query(default=50, ge=1, le=200, description="Page size"),
+    status: InboxStatus | None = Query(default=None, description="Filter by status"),
+    classification: InboxClassification | None = Query(
+        default=None, description="Filter by classification"
+    ),
+    count: CountMode = Query(default=CountMode.NONE, description="Include the total count"),
+    user: User = Depends(require_role(UserRole.OBCHODNIK, UserRole.VEDENI)),
+    db: AsyncSession = Depends(get_db),
+) -> CursorPage[InboxMessageListItem]:
+    """List inbox messages newest first with keyset pagination, without bodies."""
+    service = InboxService(db, user_id=user.id)
+    try:
+        rows, next_cursor, total = await service.list_page(
+            cursor=cursor,
+            limit=limit,
+            status=status,
+            classification=classification,
+            count=count,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    return CursorPage[InboxMessageListItem](
+        items=[InboxMessageListItem.model_validate(row) for row in rows],
+        next_cursor=next_cursor,
+        total=total,
+    )
+
+
 @router.get("/{message_id}", response_model=InboxMessageResponse)
 async def get_inbox_message(
     message_id: UUID,
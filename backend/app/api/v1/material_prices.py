@@ -4,6 +4,7 @@ from typing import Annotated
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile, status
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_db, require_role
@@ -82,7 +83,7 @@ async def search_best_price(
 
     Priorita vyhledávání:
     1. Přesná shoda třídy materiálu (material_grade)
-    2. LIKE shoda názvu (material_name)
+    2. Shoda slov názvu (material_name), bez ohledu na pořadí a diakritiku
     3. Nejlevnější platná cena mezi shodami
     """
     if not material_name and not material_grade:
@@ -163,8 +164,15 @@ async def create_material_price(
 ) -> MaterialPriceResponse:
     """Vytvoření nové materiálové ceny."""
     service = MaterialPriceService(db, user_id=current_user.id)
-    price = await service.create(data)
-    await db.commit()
+    try:
+        price = await service.create(data)
+        await db.commit()
+    except IntegrityError as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Cena se stejným materiálem, dodavatelem a platností již existuje",
+        ) from e
 
     return MaterialPriceResponse(
         id=price.id,
@@ -194,7 +202,16 @@ async def update_material_price(
 ) -> MaterialPriceResponse:
     """Úprava existující materiálové ceny."""
     service = MaterialPriceService(db, user_id=current_user.id)
-    price = await service.update(price_id, data)
+    try:
+        price = await service.update(price_id, data)
+        if price:
+            await db.commit()
+    except IntegrityError as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Cena se stejným materiálem, dodavatelem a platností již existuje",
+        ) from e
 
     if not price:
         raise HTTPException(
@@ -202,8 +219,6 @@ async def update_material_price(
             detail="Materiálová cena nenalezena",
         )
 
-    await db.commit()
-
     return MaterialPriceResponse(
         id=price.id,
         name=price.name,
@@ -2,18 +2,24 @@
 
 from __future__ import annotations
 
+import asyncio
 import time
 from datetime import UTC, datetime, timedelta
+from typing import Any
 from uuid import UUID
 
-from fastapi import APIRouter, File, HTTPException, Query, UploadFile
+from fastapi import APIRouter, File, HTTPException, Query, Response, UploadFile
 from pydantic import BaseModel, Field
-from sqlalchemy import Date, case, cast, func, select, text
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import QueryableAttribute
 
 from app.core.database import AsyncSessionLocal
 from app.models.dead_letter import DeadLetterEntry
 from app.models.inbox import InboxMessage
+from app.models.pipeline_metrics import InboxMaterialMention
 from app.models.processing_task import ProcessingStage, ProcessingStatus, ProcessingTask
+from app.orchestration.rollup import aggregate_metrics, average
+from app.services.pagination import CountMode, count_rows, fetch_keyset_page
 
 router = APIRouter(prefix="/orchestrace", tags=["orchestrace"])
 
@@ -66,8 +72,9 @@ class DLQEntryResponse(BaseModel):
 
 class DLQListResponse(BaseModel):
     items: list[DLQEntryResponse]
-    total: int
+    total: int | None
     unresolved: int
+    next_cursor: str | None = None
 
 
 class ProcessingTaskResponse(BaseModel):
@@ -212,7 +219,11 @@ class RejectRequest(BaseModel):
 async def get_nlp_analytics(
     period: str = Query("all", description="today|week|month|all"),
 ):
-    """Get NLP analytics for the email processing pipeline."""
+    """Get NLP analytics for the email processing pipeline.
+
+    Stage, method and token figures come from the hourly metrics rollup;
+    inbox figures use one aggregate query each instead of one per bucket/field.
+    """
     cutoff = _period_cutoff(period)
 
     async with AsyncSessionLocal() as session:
@@ -221,10 +232,36 @@ async def get_nlp_analytics(
         if cutoff:
             inbox_filter = inbox_filter & (InboxMessage.created_at >= cutoff)
 
-        # Total emails
-        total_emails = (await session.execute(
-            select(func.count(InboxMessage.id)).where(inbox_filter)
-        )).scalar() or 0
+        # Totals, escalations and confidence buckets in one pass
+        confidence_ranges = [
+            ("0-50%", 0.0, 0.5),
+            ("50-60%", 0.5, 0.6),
+            ("60-70%", 0.6, 0.7),
+            ("70-80%", 0.7, 0.8),
+            ("80-90%", 0.8, 0.9),
+            ("90-100%", 0.9, 1.01),
+        ]
+        summary = (await session.execute(
+            select(
+                func.count(InboxMessage.id),
+                func.coalesce(func.avg(InboxMessage.confidence), 0),
+                func.count(InboxMessage.id).filter(InboxMessage.needs_review == True),  # noqa: E712
+                *(
+                    func.count(InboxMessage.id).filter(
+                        (InboxMessage.confidence >= low) & (InboxMessage.confidence < high)
+                    )
+                    for _, low, high in confidence_ranges
+                ),
+            ).where(inbox_filter)
+        )).one()
+        total_emails = summary[0] or 0
+        avg_confidence = round(float(summary[1] or 0), 3)
+        escalated = summary[2] or 0
+        escalation_rate = round(escalated / total_emails, 3) if total_emails > 0 else 0.0
+        confidence_buckets = [
+            ConfidenceBucket(range=label, count=count or 0)
+            for (label, _, _), count in zip(confidence_ranges, summary[3:], strict=True)
+        ]
 
         # Classification distribution
         cls_q = (
@@ -248,136 +285,78 @@ async def get_nlp_analytics(
             for row in cls_rows
         ]
 
-        # Average confidence
-        avg_conf = (await session.execute(
-            select(func.coalesce(func.avg(InboxMessage.confidence), 0)).where(inbox_filter)
-        )).scalar() or 0
-        avg_confidence = round(float(avg_conf), 3)
-
-        # Escalation rate (needs_review = true)
-        escalated = (await session.execute(
-            select(func.count(InboxMessage.id)).where(
-                inbox_filter & (InboxMessage.needs_review == True)  # noqa: E712
-            )
-        )).scalar() or 0
-        escalation_rate = round(escalated / total_emails, 3) if total_emails > 0 else 0.0
-
-        # Confidence buckets
-        confidence_ranges = [
-            ("0-50%", 0.0, 0.5),
-            ("50-60%", 0.5, 0.6),
-            ("60-70%", 0.6, 0.7),
-            ("70-80%", 0.7, 0.8),
-            ("80-90%", 0.8, 0.9),
-            ("90-100%", 0.9, 1.01),
-        ]
-        confidence_buckets = []
-        for label, low, high in confidence_ranges:
-            cnt = (await session.execute(
-                select(func.count(InboxMessage.id)).where(
-                    inbox_filter
-                    & (InboxMessage.confidence.isnot(None))
-                    & (InboxMessage.confidence >= low)
-                    & (InboxMessage.confidence < high)
-                )
-            )).scalar() or 0
-            confidence_buckets.append(ConfidenceBucket(range=label, count=cnt))
-
-        # Classification methods from ProcessingTask (stage=classify)
-        task_filter = ProcessingTask.stage == ProcessingStage.CLASSIFY
-        if cutoff:
-            task_filter = task_filter & (ProcessingTask.created_at >= cutoff)
-
-        # We extract method from output_data->>'method'
-        method_q = (
-            select(
-                func.coalesce(
-                    ProcessingTask.output_data[text("'method'")].as_string(),
-                    text("'unknown'"),
-                ),
-                func.count(ProcessingTask.id),
-                func.coalesce(func.avg(
-                    case(
-                        (InboxMessage.confidence.isnot(None), InboxMessage.confidence),
-                    )
-                ), 0),
-                func.coalesce(func.avg(ProcessingTask.processing_time_ms), 0),
-            )
-            .outerjoin(InboxMessage, ProcessingTask.inbox_message_id == InboxMessage.id)
-            .where(task_filter)
-            .where(ProcessingTask.status == ProcessingStatus.SUCCESS)
-            .group_by(text("1"))
+        # Classification methods (successful classify stages) from the rollup
+        method_rows = await aggregate_metrics(
+            session, ("method",), cutoff,
+            stage=ProcessingStage.CLASSIFY.value, status=ProcessingStatus.SUCCESS.value,
         )
-        method_rows = (await session.execute(method_q)).all()
         classification_methods = [
             MethodBucket(
-                method=str(row[0]),
-                count=row[1],
-                avg_confidence=round(float(row[2]), 3),
-                avg_time_ms=round(float(row[3]), 1),
+                method=row.method or "unknown",
+                count=row.task_count,
+                avg_confidence=round(average(row.confidence_total, row.confidence_count), 3),
+                avg_time_ms=round(
+                    average(row.processing_time_ms_total, row.processing_time_count), 1
+                ),
             )
             for row in method_rows
         ]
 
-        # Entity extraction from parsed_data JSON
+        # Entity extraction from parsed_data JSON, all fields in one query
         entity_fields = [
             "company_name", "ico", "email", "phone", "items",
             "deadline", "urgency", "contact_person",
         ]
-        entity_extraction = []
-        for field in entity_fields:
-            extracted = (await session.execute(
-                select(func.count(InboxMessage.id)).where(
-                    inbox_filter
-                    & (InboxMessage.parsed_data.isnot(None))
-                    & (InboxMessage.parsed_data[text(f"'{field}'")].isnot(None))
-                )
-            )).scalar() or 0
-            total_parsed = (await session.execute(
-                select(func.count(InboxMessage.id)).where(
-                    inbox_filter & (InboxMessage.parsed_data.isnot(None))
-                )
-            )).scalar() or 0
-            entity_extraction.append(EntityField(
+        entity_row = (await session.execute(
+            select(
+                func.count(InboxMessage.id),
+                *(
+                    func.count(InboxMessage.id).filter(
+                        InboxMessage.parsed_data[field].isnot(None)
+                    )
+                    for field in entity_fields
+                ),
+            ).where(inbox_filter & (InboxMessage.parsed_data.isnot(None)))
+        )).one()
+        total_parsed = entity_row[0] or 0
+        entity_extraction = [
+            EntityField(
                 field=field,
-                extracted_count=extracted,
+                extracted_count=extracted or 0,
                 total_count=total_parsed,
-                rate=round(extracted / total_parsed, 3) if total_parsed > 0 else 0.0,
-            ))
+                rate=round((extracted or 0) / total_parsed, 3) if total_parsed > 0 else 0.0,
+            )
+            for field, extracted in zip(entity_fields, entity_row[1:], strict=True)
+        ]
         # Sort by rate descending
         entity_extraction.sort(key=lambda x: x.rate, reverse=True)
 
-        # Stage success rates
-        pt_filter = True  # noqa: E712
-        if cutoff:
-            pt_filter = ProcessingTask.created_at >= cutoff
-
-        stage_q = (
-            select(
-                ProcessingTask.stage,
-                func.count(ProcessingTask.id),
-                func.count(case((ProcessingTask.status == ProcessingStatus.SUCCESS, 1))),
-                func.count(case((ProcessingTask.status.in_(
-                    [ProcessingStatus.FAILED, ProcessingStatus.DLQ]
-                ), 1))),
-                func.coalesce(func.avg(ProcessingTask.processing_time_ms), 0),
-                func.coalesce(func.sum(ProcessingTask.tokens_used), 0),
+        # Stage success rates from the rollup
+        stage_rows = await aggregate_metrics(session, ("stage", "status"), cutoff)
+        stage_totals: dict[str, dict[str, int]] = {}
+        for row in stage_rows:
+            totals = stage_totals.setdefault(
+                row.stage,
+                {"total": 0, "success": 0, "failed": 0, "time": 0, "timed": 0, "tokens": 0},
             )
-            .where(pt_filter)
-            .group_by(ProcessingTask.stage)
-            .order_by(ProcessingTask.stage)
-        )
-        stage_rows = (await session.execute(stage_q)).all()
+            totals["total"] += row.task_count
+            if row.status == ProcessingStatus.SUCCESS.value:
+                totals["success"] += row.task_count
+            elif row.status in (ProcessingStatus.FAILED.value, ProcessingStatus.DLQ.value):
+                totals["failed"] += row.task_count
+            totals["time"] += row.processing_time_ms_total
+            totals["timed"] += row.processing_time_count
+            totals["tokens"] += row.tokens_used
         stage_success_rates = [
             StageStat(
-                stage=row[0].value,
-                total=row[1],
-                success=row[2],
-                failed=row[3],
-                avg_time_ms=round(float(row[4]), 1),
-                total_tokens=row[5],
+                stage=stage,
+                total=totals["total"],
+                success=totals["success"],
+                failed=totals["failed"],
+                avg_time_ms=round(average(totals["time"], totals["timed"]), 1),
+                total_tokens=totals["tokens"],
             )
-            for row in stage_rows
+            for stage, totals in stage_totals.items()
         ]
 
         # Total tokens and tokens by stage
@@ -387,7 +366,7 @@ async def get_nlp_analytics(
         # Confidence trend by date
         trend_q = (
             select(
-                cast(InboxMessage.created_at, Date).label("date"),
+                func.date(InboxMessage.created_at).label("date"),
                 func.coalesce(func.avg(InboxMessage.confidence), 0),
                 func.count(InboxMessage.id),
             )
@@ -409,13 +388,13 @@ async def get_nlp_analytics(
         # Top companies from parsed_data->>'company_name'
         company_q = (
             select(
-                InboxMessage.parsed_data[text("'company_name'")].as_string(),
+                InboxMessage.parsed_data["company_name"].as_string(),
                 func.count(InboxMessage.id),
             )
             .where(
                 inbox_filter
                 & (InboxMessage.parsed_data.isnot(None))
-                & (InboxMessage.parsed_data[text("'company_name'")].isnot(None))
+                & (InboxMessage.parsed_data["company_name"].isnot(None))
             )
             .group_by(text("1"))
             .order_by(func.count(InboxMessage.id).desc())
@@ -428,29 +407,18 @@ async def get_nlp_analytics(
             if row[0]
         ]
 
-        # Top materials from parsed_data->'items' (JSON array with 'material' key)
-        # This requires iterating parsed_data; we'll do it in Python
+        # Top materials from the extracted parsed items
         material_q = (
-            select(InboxMessage.parsed_data)
-            .where(
-                inbox_filter
-                & (InboxMessage.parsed_data.isnot(None))
-            )
+            select(InboxMaterialMention.material, func.count(InboxMaterialMention.id))
+            .join(InboxMessage, InboxMessage.id == InboxMaterialMention.inbox_message_id)
+            .where(inbox_filter)
+            .group_by(InboxMaterialMention.material)
+            .order_by(func.count(InboxMaterialMention.id).desc(), InboxMaterialMention.material)
+            .limit(10)
         )
-        material_rows = (await session.execute(material_q)).all()
-        material_counts: dict[str, int] = {}
-        for (pd,) in material_rows:
-            if isinstance(pd, dict):
-                items = pd.get("items", [])
-                if isinstance(items, list):
-                    for item in items:
-                        if isinstance(item, dict):
-                            mat = item.get("material")
-                            if mat and isinstance(mat, str):
-                                material_counts[mat] = material_counts.get(mat, 0) + 1
         top_materials = [
-            ValueCount(value=k, count=v)
-            for k, v in sorted(material_counts.items(), key=lambda x: x[1], reverse=True)[:10]
+            ValueCount(value=material, count=count)
+            for material, count in (await session.execute(material_q)).all()
         ]
 
         return NLPAnalyticsResponse(
@@ -479,29 +447,52 @@ async def list_dlq_entries(
     stage: str | None = Query(None),
     limit: int = Query(50, ge=1, le=200),
     offset: int = Query(0, ge=0),
+    cursor: str | None = Query(None, description="next_cursor of the previous page"),
+    count: CountMode = Query(CountMode.EXACT, description="How to compute total"),
 ):
-    """List dead letter queue entries."""
-    async with AsyncSessionLocal() as session:
-        query = select(DeadLetterEntry).order_by(DeadLetterEntry.created_at.desc())
-        count_query = select(func.count(DeadLetterEntry.id))
-        unresolved_query = select(func.count(DeadLetterEntry.id)).where(
-            DeadLetterEntry.resolved == False  # noqa: E712
+    """List dead letter queue entries (without payloads and tracebacks)."""
+    conditions = []
+    if resolved is not None:
+        conditions.append(DeadLetterEntry.resolved == resolved)
+    if stage:
+        conditions.append(DeadLetterEntry.stage == stage)
+
+    query = (
+        select(
+            DeadLetterEntry.id,
+            DeadLetterEntry.original_task,
+            DeadLetterEntry.stage,
+            DeadLetterEntry.error_message,
+            DeadLetterEntry.retry_count,
+            DeadLetterEntry.resolved,
+            DeadLetterEntry.resolved_at,
+            DeadLetterEntry.created_at,
         )
+        .where(*conditions)
+        .offset(offset)
+    )
 
-        if resolved is not None:
-            query = query.where(DeadLetterEntry.resolved == resolved)
-            count_query = count_query.where(DeadLetterEntry.resolved == resolved)
-        if stage:
-            query = query.where(DeadLetterEntry.stage == stage)
-            count_query = count_query.where(DeadLetterEntry.stage == stage)
-
-        query = query.limit(limit).offset(offset)
-
-        result = await session.execute(query)
-        entries = result.scalars().all()
-
-        total = (await session.execute(count_query)).scalar() or 0
-        unresolved = (await session.execute(unresolved_query)).scalar() or 0
+    async with AsyncSessionLocal() as session:
+        try:
+            entries, next_cursor = await fetch_keyset_page(
+                session, query, DeadLetterEntry.created_at, DeadLetterEntry.id, cursor, limit
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e)) from e
+
+        total = await count_rows(
+            session,
+            select(DeadLetterEntry.id).where(*conditions),
+            DeadLetterEntry.__table__,
+            count,
+        )
+        unresolved = (
+            await session.execute(
+                select(func.count(DeadLetterEntry.id)).where(
+                    DeadLetterEntry.resolved == False  # noqa: E712
+                )
+            )
+        ).scalar() or 0
 
         return DLQListResponse(
             items=[
@@ -519,6 +510,7 @@ async def list_dlq_entries(
             ],
             total=total,
             unresolved=unresolved,
+            next_cursor=next_cursor,
         )
 
 
@@ -635,6 +627,7 @@ async def retry_dlq_entry(entry_id: UUID):
 
 @router.get("/tasks", response_model=list[ProcessingTaskResponse])
 async def list_processing_tasks(
+    response: Response,
     stage: str | None = Query(None),
     status: str | None = Query(None),
     inbox_message_id: UUID | None = Query(None),
@@ -642,48 +635,78 @@ async def list_processing_tasks(
     date_to: str | None = Query(None, description="ISO date YYYY-MM-DD"),
     limit: int = Query(50, ge=1, le=200),
     offset: int = Query(0, ge=0),
+    cursor: str | None = Query(None, description="X-Next-Cursor of the previous page"),
+    include_data: bool = Query(False, description="Include input_data/output_data"),
 ):
-    """List processing tasks (audit trail)."""
-    async with AsyncSessionLocal() as session:
-        query = select(ProcessingTask).order_by(ProcessingTask.created_at.desc())
-
-        if stage:
-            query = query.where(ProcessingTask.stage == ProcessingStage(stage))
-        if status:
-            query = query.where(ProcessingTask.status == ProcessingStatus(status))
-        if inbox_message_id:
-            query = query.where(ProcessingTask.inbox_message_id == inbox_message_id)
-        if date_from:
-            query = query.where(
-                ProcessingTask.created_at >= datetime.fromisoformat(date_from)
-            )
-        if date_to:
-            query = query.where(
-                ProcessingTask.created_at < datetime.fromisoformat(date_to) + timedelta(days=1)
-            )
+    """List processing tasks (audit trail).
 
-        query = query.limit(limit).offset(offset)
-
-        result = await session.execute(query)
-        tasks = result.scalars().all()
+    The cursor of the next page is returned in the ``X-Next-Cursor`` header.
+    Input/output payloads are only loaded with ``include_data`` (the detail
+    endpoint always returns them).
+    """
+    columns: list[QueryableAttribute[Any]] = [
+        ProcessingTask.id,
+        ProcessingTask.inbox_message_id,
+        ProcessingTask.celery_task_id,
+        ProcessingTask.stage,
+        ProcessingTask.status,
+        ProcessingTask.tokens_used,
+        ProcessingTask.processing_time_ms,
+        ProcessingTask.retry_count,
+        ProcessingTask.error_message,
+        ProcessingTask.created_at,
+    ]
+    if include_data:
+        columns += [ProcessingTask.input_data, ProcessingTask.output_data]
+    query = select(*columns)
+
+    if stage:
+        query = query.where(ProcessingTask.stage == ProcessingStage(stage))
+    if status:
+        query = query.where(ProcessingTask.status == ProcessingStatus(status))
+    if inbox_message_id:
+        query = query.where(ProcessingTask.inbox_message_id == inbox_message_id)
+    if date_from:
+        query = query.where(
+            ProcessingTask.created_at >= datetime.fromisoformat(date_from)
+        )
+    if date_to:
+        query = query.where(
+            ProcessingTask.created_at < datetime.fromisoformat(date_to) + timedelta(days=1)
+        )
 
-        return [
-            ProcessingTaskResponse(
-                id=str(t.id),
-                inbox_message_id=str(t.inbox_message_id) if t.inbox_message_id else None,
-                celery_task_id=t.celery_task_id,
-                stage=t.stage.value,
-                status=t.status.value,
-                tokens_used=t.tokens_used,
-                processing_time_ms=t.processing_time_ms,
-                retry_count=t.retry_count,
-                error_message=t.error_message,
-                input_data=t.input_data,
-                output_data=t.output_data,
-                created_at=t.created_at.isoformat(),
+    async with AsyncSessionLocal() as session:
+        try:
+            tasks, next_cursor = await fetch_keyset_page(
+                session,
+                query.offset(offset),
+                ProcessingTask.created_at,
+                ProcessingTask.id,
+                cursor,
+                limit,
             )
-            for t in tasks
-        ]
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e)) from e
+
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return [
+        ProcessingTaskResponse(
+            id=str(t.id),
+            inbox_message_id=str(t.inbox_message_id) if t.inbox_message_id else None,
+            celery_task_id=t.celery_task_id,
+            stage=t.stage.value,
+            status=t.status.value,
+            tokens_used=t.tokens_used,
+            processing_time_ms=t.processing_time_ms,
+            retry_count=t.retry_count,
+            error_message=t.error_message,
+            input_data=t.input_data if include_data else None,
+            output_data=t.output_data if include_data else None,
+            created_at=t.created_at.isoformat(),
+        )
+        for t in tasks
+    ]
 
 
 @router.get("/tasks/{task_id}", response_model=ProcessingTaskDetailResponse)
@@ -698,9 +721,13 @@ async def get_processing_task(task_id: UUID):
             raise HTTPException(status_code=404, detail="Task not found")
 
         # Try to extract order_id from output_data
+        # Compacted stage records keep order_id in the output only for the stage
+        # that created the order; later stages have it in their input
         order_id = None
-        if task.output_data and isinstance(task.output_data, dict):
-            order_id = task.output_data.get("order_id")
+        for data in (task.output_data, task.input_data):
+            if isinstance(data, dict) and data.get("order_id"):
+                order_id = data["order_id"]
+                break
 
         # Try to find error traceback from DLQ
         error_traceback = None
@@ -758,48 +785,17 @@ async def get_pipeline_stats(
     cutoff = _period_cutoff(period)
 
     async with AsyncSessionLocal() as session:
-        base = select(ProcessingTask)
-        if cutoff:
-            base = base.where(ProcessingTask.created_at >= cutoff)
-
-        # Total tasks
-        total = (await session.execute(
-            select(func.count(ProcessingTask.id)).where(
-                ProcessingTask.created_at >= cutoff if cutoff else True  # noqa: E712
-            )
-        )).scalar() or 0
-
-        # By stage
-        stage_q = (
-            select(ProcessingTask.stage, func.count(ProcessingTask.id))
-            .group_by(ProcessingTask.stage)
-        )
-        if cutoff:
-            stage_q = stage_q.where(ProcessingTask.created_at >= cutoff)
-        stage_result = await session.execute(stage_q)
-        by_stage = {row[0].value: row[1] for row in stage_result}
-
-        # By status
-        status_q = (
-            select(ProcessingTask.status, func.count(ProcessingTask.id))
-            .group_by(ProcessingTask.status)
-        )
-        if cutoff:
-            status_q = status_q.where(ProcessingTask.created_at >= cutoff)
-        status_result = await session.execute(status_q)
-        by_status = {row[0].value: row[1] for row in status_result}
-
-        # Tokens
-        tokens_q = select(func.coalesce(func.sum(ProcessingTask.tokens_used), 0))
-        if cutoff:
-            tokens_q = tokens_q.where(ProcessingTask.created_at >= cutoff)
-        tokens = (await session.execute(tokens_q)).scalar() or 0
-
-        # Average processing time
-        avg_q = select(func.coalesce(func.avg(ProcessingTask.processing_time_ms), 0))
-        if cutoff:
-            avg_q = avg_q.where(ProcessingTask.created_at >= cutoff)
-        avg_time = (await session.execute(avg_q)).scalar() or 0
+        by_stage: dict[str, int] = {}
+        by_status: dict[str, int] = {}
+        total = tokens = time_sum = time_count = 0
+        for row in await aggregate_metrics(session, ("stage", "status"), cutoff):
+            by_stage[row.stage] = by_stage.get(row.stage, 0) + row.task_count
+            by_status[row.status] = by_status.get(row.status, 0) + row.task_count
+            total += row.task_count
+            tokens += row.tokens_used
+            time_sum += row.processing_time_ms_total
+            time_count += row.processing_time_count
+        avg_time = average(time_sum, time_count)
 
         # Error rate
         failed = by_status.get("failed", 0) + by_status.get("dlq", 0)
@@ -828,8 +824,6 @@ async def get_pipeline_timeline(
     period: str = Query("today", description="today|week|month"),
 ):
     """Get time-series stats (group by hour for today, by day for week/month)."""
-    from sqlalchemy import case, cast, Date, extract, literal_column
-
     now = datetime.now(UTC)
     if period == "today":
         cutoff = now.replace(hour=0, minute=0, second=0, microsecond=0)
@@ -839,47 +833,26 @@ async def get_pipeline_timeline(
         cutoff = now - timedelta(days=30)
 
     async with AsyncSessionLocal() as session:
-        if period == "today":
-            # Group by hour
-            bucket_expr = extract("hour", ProcessingTask.created_at)
-        else:
-            # Group by date
-            bucket_expr = cast(ProcessingTask.created_at, Date)
-
-        q = (
-            select(
-                bucket_expr.label("bucket"),
-                func.count(ProcessingTask.id).label("tasks_count"),
-                func.count(
-                    case(
-                        (ProcessingTask.status == ProcessingStatus.SUCCESS, 1),
-                    )
-                ).label("success_count"),
-                func.count(
-                    case(
-                        (ProcessingTask.status.in_([ProcessingStatus.FAILED, ProcessingStatus.DLQ]), 1),
-                    )
-                ).label("failed_count"),
-                func.coalesce(func.sum(ProcessingTask.tokens_used), 0).label("tokens_used"),
+        rows = await aggregate_metrics(session, ("bucket_start", "status"), cutoff)
+
+    # Hourly rollup buckets folded into hours (today) or days (week/month)
+    buckets: dict[str, TimelineBucket] = {}
+    for row in rows:
+        start = row.bucket_start
+        key = str(start.hour) if period == "today" else start.date().isoformat()
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = buckets[key] = TimelineBucket(
+                bucket=key, tasks_count=0, success_count=0, failed_count=0, tokens_used=0
             )
-            .where(ProcessingTask.created_at >= cutoff)
-            .group_by(literal_column("bucket"))
-            .order_by(literal_column("bucket"))
-        )
-
-        result = await session.execute(q)
-        rows = result.all()
+        bucket.tasks_count += row.task_count
+        bucket.tokens_used += row.tokens_used
+        if row.status == ProcessingStatus.SUCCESS.value:
+            bucket.success_count += row.task_count
+        elif row.status in (ProcessingStatus.FAILED.value, ProcessingStatus.DLQ.value):
+            bucket.failed_count += row.task_count
 
-        return [
-            TimelineBucket(
-                bucket=str(row.bucket),
-                tasks_count=row.tasks_count,
-                success_count=row.success_count,
-                failed_count=row.failed_count,
-                tokens_used=row.tokens_used,
-            )
-            for row in rows
-        ]
+    return list(buckets.values())
 
 
 # ─── Pipeline Config ─────────────────────────────────────────
@@ -888,36 +861,52 @@ async def get_pipeline_timeline(
 async def get_pipeline_config():
     """Get current pipeline configuration flags."""
     from app.core.config import get_settings
+    from app.core.feature_flags import get_feature_flags
 
-    settings = get_settings()
-    return PipelineConfigResponse(
-        auto_calculate=settings.ORCHESTRATION_AUTO_CALCULATE,
-        auto_offer=settings.ORCHESTRATION_AUTO_OFFER,
-        auto_create_orders=settings.ORCHESTRATION_AUTO_CREATE_ORDERS,
-        review_threshold=settings.ORCHESTRATION_REVIEW_THRESHOLD,
-    )
+    flags = await asyncio.to_thread(get_feature_flags().snapshot)
+    return _pipeline_config(flags, get_settings().ORCHESTRATION_REVIEW_THRESHOLD)
 
 
 @router.put("/config", response_model=PipelineConfigResponse)
 async def update_pipeline_config(body: PipelineConfigUpdate):
-    """Update pipeline configuration flags (runtime, persisted in settings singleton)."""
+    """Update pipeline configuration.
+
+    The auto_* flags are fleet-wide feature flags (stored in Redis, picked up
+    by all API and worker processes); the review threshold is a runtime
+    override of this process's settings singleton.
+    """
+    from redis import RedisError
+
     from app.core.config import get_settings
+    from app.core.feature_flags import get_feature_flags
+
+    changes = {
+        flag: value
+        for flag, value in (
+            ("ORCHESTRATION_AUTO_CALCULATE", body.auto_calculate),
+            ("ORCHESTRATION_AUTO_OFFER", body.auto_offer),
+            ("ORCHESTRATION_AUTO_CREATE_ORDERS", body.auto_create_orders),
+        )
+        if value is not None
+    }
+    try:
+        flags = await asyncio.to_thread(get_feature_flags().update, changes)
+    except RedisError as exc:
+        raise HTTPException(status_code=500, detail="Nepodařilo se uložit nastavení") from exc
 
     settings = get_settings()
-    if body.auto_calculate is not None:
-        object.__setattr__(settings, "ORCHESTRATION_AUTO_CALCULATE", body.auto_calculate)
-    if body.auto_offer is not None:
-        object.__setattr__(settings, "ORCHESTRATION_AUTO_OFFER", body.auto_offer)
-    if body.auto_create_orders is not None:
-        object.__setattr__(settings, "ORCHESTRATION_AUTO_CREATE_ORDERS", body.auto_create_orders)
     if body.review_threshold is not None:
         object.__setattr__(settings, "ORCHESTRATION_REVIEW_THRESHOLD", body.review_threshold)
 
+    return _pipeline_config(flags, settings.ORCHESTRATION_REVIEW_THRESHOLD)
+
+
+def _pipeline_config(flags: dict[str, bool], review_threshold: float) -> PipelineConfigResponse:
     return PipelineConfigResponse(
-        auto_calculate=settings.ORCHESTRATION_AUTO_CALCULATE,
-        auto_offer=settings.ORCHESTRATION_AUTO_OFFER,
-        auto_create_orders=settings.ORCHESTRATION_AUTO_CREATE_ORDERS,
-        review_threshold=settings.ORCHESTRATION_REVIEW_THRESHOLD,
+        auto_calculate=flags["ORCHESTRATION_AUTO_CALCULATE"],
+        auto_offer=flags["ORCHESTRATION_AUTO_OFFER"],
+        auto_create_orders=flags["ORCHESTRATION_AUTO_CREATE_ORDERS"],
+        review_threshold=review_threshold,
     )
 
 
@@ -974,9 +963,9 @@ async def approve_calculation(calc_id: UUID):
         await session.commit()
 
         # Trigger offer generation if auto_offer is enabled
-        from app.core.config import get_settings
+        from app.core import feature_flags
 
-        if get_settings().ORCHESTRATION_AUTO_OFFER:
+        if await asyncio.to_thread(feature_flags.is_enabled, "ORCHESTRATION_AUTO_OFFER"):
             try:
                 from app.orchestration.tasks import generate_offer
                 generate_offer.delay(str(calc.order_id))
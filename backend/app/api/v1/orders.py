@@ -13,9 +13,17 @@ from app.models import Offer, Order, OrderStatus
 from app.models.document import Document
 from app.models.inbox import InboxMessage, MessageDirection
 from app.models.user import User, UserRole
-from app.schemas import OrderCreate, OrderResponse, OrderStatusUpdate, OrderUpdate
+from app.schemas import (
+    CursorPage,
+    OrderCreate,
+    OrderListItem,
+    OrderResponse,
+    OrderStatusUpdate,
+    OrderUpdate,
+)
 from app.schemas.embedding import SimilarOrderResult, SimilarOrdersResponse, SimilarSearchRequest
 from app.services import EmbeddingService, OrderService
+from app.services.pagination import CountMode
 
 router = APIRouter(prefix="/zakazky", tags=["Zakázky"])
 
@@ -42,6 +50,30 @@ async def get_orders(
     return [_order_response(o) for o in orders]
 
 
+@router.get("/list", response_model=CursorPage[OrderListItem])
+async def list_orders(
+    cursor: str | None = Query(default=None, description="next_cursor of the previous page"),
+    limit: int = Query(default=50, ge=1, le=200, description="Page size"),
+    status: OrderStatus | None = Query(default=None, description="Filter by status"),
+    count: CountMode = Query(default=CountMode.NONE, description="Include the total count"),
+    _user: User = Depends(require_role(UserRole.OBCHODNIK, UserRole.TECHNOLOG, UserRole.VEDENI, UserRole.UCETNI)),
+    db: AsyncSession = Depends(get_db),
+) -> CursorPage[OrderListItem]:
+    """List orders newest first with keyset pagination and lean rows."""
+    service = OrderService(db)
+    try:
+        rows, next_cursor, total = await service.list_page(
+            cursor=cursor, limit=limit, status=status, count=count
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    return CursorPage[OrderListItem](
+        items=[OrderListItem.model_validate(row) for row in rows],
+        next_cursor=next_cursor,
+        total=total,
+    )
+
+
 @router.post(
     "",
     response_model=OrderResponse,
@@ -1,6 +1,8 @@
 """Reporting API endpoints."""
 
+from collections.abc import AsyncIterator
 from datetime import UTC, datetime
+from typing import Any
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, Query
@@ -8,7 +10,9 @@ from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_db, require_role
+from app.core.database import AsyncSessionLocal
 from app.integrations.excel.exporter import ExcelExporter
+from app.integrations.excel.streaming import XLSX_MEDIA_TYPE
 from app.models.user import User, UserRole
 from app.schemas import (
     CustomerReport,
@@ -142,28 +146,32 @@ async def get_material_requirements(
     Accessible by TECHNOLOG and VEDENI roles.
     """
     service = ReportingService(db)
-    result = await service.get_material_requirements(
-        order_ids=order_ids,
-        status_filter=status_filter,
-    )
 
     if response_format == "excel":
-        # Convert to dict for Excel export
-        items_dict = [item.model_dump() for item in result.items]
-
-        exporter = ExcelExporter()
-        excel_bytes = await exporter.export_material_requirements(
-            items=items_dict,
-            total_estimated_cost=result.total_estimated_cost,
-            order_count=result.order_count,
+        order_count = await service.count_material_requirement_orders(order_ids, status_filter)
+
+        async def items() -> AsyncIterator[dict[str, Any]]:
+            # The request session is closed once the endpoint returns; the rows
+            # are read from a server-side cursor on a session of the stream
+            async with AsyncSessionLocal() as session:
+                async for item in ReportingService(session).iter_material_requirements(
+                    order_ids=order_ids, status_filter=status_filter
+                ):
+                    yield item.model_dump()
+
+        chunks = ExcelExporter().stream_material_requirements(
+            items=items(), order_count=order_count
         )
-
         return StreamingResponse(
-            iter([excel_bytes]),
-            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            chunks,
+            media_type=XLSX_MEDIA_TYPE,
             headers={
                 "Content-Disposition": "attachment; filename=materialova_potreba.xlsx"
             },
         )
 
+    result = await service.get_material_requirements(
+        order_ids=order_ids,
+        status_filter=status_filter,
+    )
     return result
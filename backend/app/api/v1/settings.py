@@ -1,12 +1,17 @@
 """Settings API endpoints for feature flags management."""
 
-import random
-from datetime import datetime, timedelta
+import asyncio
+from datetime import UTC, datetime, timedelta
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from pydantic import BaseModel
+from redis import RedisError
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.deps import require_role
+from app.api.deps import get_db, require_role
+from app.core import feature_flags
+from app.models.claude_usage import ClaudeUsageEntry
 from app.models.user import User, UserRole
 
 router = APIRouter(prefix="/nastaveni", tags=["Nastavení"])
@@ -34,45 +39,13 @@ class IntegrationStatus(BaseModel):
     details: str | None = None
 
 
-def _read_flag_from_redis(r: "redis.Redis", key: str, default: bool) -> bool:  # type: ignore[name-defined]
-    """Read a feature flag from Redis, falling back to settings default."""
-    val = r.get(f"feature_flag:{key}")
-    if val is not None:
-        return val in (b"1", "1", b"true", "true")
-    return default
-
-
-def _get_flags_with_redis_overrides() -> FeatureFlagsResponse:
-    """Read feature flags with Redis overrides applied on top of env defaults."""
-    import redis
-
-    from app.core.config import get_settings
-    settings = get_settings()
-
-    defaults = {
-        "ORCHESTRATION_ENABLED": settings.ORCHESTRATION_ENABLED,
-        "ORCHESTRATION_AUTO_CREATE_ORDERS": settings.ORCHESTRATION_AUTO_CREATE_ORDERS,
-        "ORCHESTRATION_AUTO_CALCULATE": settings.ORCHESTRATION_AUTO_CALCULATE,
-        "ORCHESTRATION_AUTO_OFFER": settings.ORCHESTRATION_AUTO_OFFER,
-        "POHODA_AUTO_SYNC": getattr(settings, "POHODA_AUTO_SYNC", False),
-    }
-
-    try:
-        r = redis.from_url(str(settings.REDIS_URL))  # type: ignore[no-untyped-call]
-        resolved = {k: _read_flag_from_redis(r, k, v) for k, v in defaults.items()}
-        r.close()
-    except Exception:
-        resolved = defaults
-
-    return FeatureFlagsResponse(**resolved)
-
-
 @router.get("/flags", response_model=FeatureFlagsResponse)
 async def get_feature_flags(
     _user: User = Depends(require_role(UserRole.VEDENI)),
 ) -> FeatureFlagsResponse:
     """Get current feature flags configuration."""
-    return _get_flags_with_redis_overrides()
+    flags = await asyncio.to_thread(feature_flags.get_feature_flags().snapshot)
+    return FeatureFlagsResponse(**flags)
 
 
 @router.patch("/flags", response_model=FeatureFlagsResponse)
@@ -82,27 +55,21 @@ async def update_feature_flags(
 ) -> FeatureFlagsResponse:
     """Update feature flags (admin/vedeni only).
 
-    Changes are stored in Redis for persistence across restarts.
-    Settings singleton is NOT mutated — flags are read from Redis on each request.
+    Changes are stored in Redis for persistence across restarts and published
+    to all API and Celery worker processes, which drop their flag snapshot.
+    Settings singleton is NOT mutated.
     """
-    import redis
-
-    from app.core.config import get_settings
-    settings = get_settings()
-
     try:
-        r = redis.from_url(str(settings.REDIS_URL))  # type: ignore[no-untyped-call]
-        update_data = data.model_dump(exclude_none=True)
-        for key, value in update_data.items():
-            r.set(f"feature_flag:{key}", str(int(value)))
-        r.close()
-    except Exception:
+        flags = await asyncio.to_thread(
+            feature_flags.get_feature_flags().update, data.model_dump(exclude_none=True)
+        )
+    except RedisError as exc:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Nepodařilo se uložit nastavení",
-        )
+        ) from exc
 
-    return _get_flags_with_redis_overrides()
+    return FeatureFlagsResponse(**flags)
 
 
 @router.get("/integrations", response_model=list[IntegrationStatus])
@@ -160,8 +127,10 @@ class AITokenCategoryUsage(BaseModel):
     category: str
     tokens_input: int
     tokens_output: int
+    tokens_cached: int = 0
     calls: int
     cost_czk: float
+    avg_latency_ms: float = 0.0
 
 
 class AITokenTimePoint(BaseModel):
@@ -177,90 +146,156 @@ class AITokenUsageResponse(BaseModel):
     total_cost_czk: float
     total_calls: int
     total_tokens: int
-
-
-# 5 AI usage categories
-_AI_CATEGORIES = [
-    ("Email klasifikace", 800, 200),
-    ("Kalkulace", 2000, 1500),
-    ("Parsování dokumentů", 1200, 600),
-    ("Orchestrace", 500, 300),
-    ("Doporučení", 1500, 1000),
-]
+    total_tokens_cached: int = 0
+    cache_read_ratio: float = 0.0  # share of input tokens read from the prompt cache
+
+
+# Ledger agents grouped into the usage categories
+_AI_CATEGORIES: dict[str, str] = {
+    "email_classifier": "Email klasifikace",
+    "email_parser": "Parsování dokumentů",
+    "drawing_analyzer": "Analýza výkresů",
+    "calculation_agent": "Kalkulace",
+    "deadline_monitor": "Doporučení",
+    "process_advisor": "Doporučení",
+}
+_OTHER_CATEGORY = "Ostatní"
+_CATEGORY_TOTALS = ("input", "output", "cached", "calls", "cost", "latency")
 
 # Approximate CZK cost per 1K tokens (Sonnet pricing)
 _INPUT_COST_PER_1K = 0.07  # CZK
 _OUTPUT_COST_PER_1K = 0.35  # CZK
-
-
-def _seed_for_period(period: str) -> int:
-    """Deterministic seed so data is consistent per day."""
-    today = datetime.now().strftime("%Y-%m-%d")
-    return hash(f"{today}-{period}") % 2**31
-
-
-def _generate_usage(period: str) -> AITokenUsageResponse:
-    """Generate realistic mock AI token usage data."""
-    rng = random.Random(_seed_for_period(period))
-
+# Prompt cache reads cost 10 %, cache writes 125 % of the input price
+_CACHE_READ_COST_PER_1K = _INPUT_COST_PER_1K * 0.1
+_CACHE_WRITE_COST_PER_1K = _INPUT_COST_PER_1K * 1.25
+
+# Timeline bucket of a ledger row per period: (PostgreSQL to_char, SQLite strftime)
+_BUCKET_FORMATS: dict[str, tuple[str, str]] = {
+    "day": ("YYYY-MM-DD HH24", "%Y-%m-%d %H"),
+    "month": ("YYYY-MM-DD", "%Y-%m-%d"),
+    "year": ("YYYY-MM", "%Y-%m"),
+}
+
+
+def _cost_czk(tokens_input: int, tokens_output: int, cache_read: int, cache_write: int) -> float:
+    return (
+        tokens_input * _INPUT_COST_PER_1K
+        + tokens_output * _OUTPUT_COST_PER_1K
+        + cache_read * _CACHE_READ_COST_PER_1K
+        + cache_write * _CACHE_WRITE_COST_PER_1K
+    ) / 1000
+
+
+def _period_buckets(period: str, now: datetime) -> tuple[datetime, list[tuple[str, str]]]:
+    """Start of the period and its timeline buckets as (bucket key, label)."""
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
     if period == "day":
-        multiplier = 1
-        labels = [f"{h}:00" for h in range(0, 24)]
-    elif period == "month":
-        multiplier = 30
-        now = datetime.now()
-        labels = [(now - timedelta(days=29 - i)).strftime("%d.%m.") for i in range(30)]
-    else:  # year
-        multiplier = 365
-        now = datetime.now()
-        labels = [
-            (now.replace(day=1) - timedelta(days=30 * (11 - i))).strftime("%m/%Y")
-            for i in range(12)
-        ]
-
-    categories: list[AITokenCategoryUsage] = []
-    total_cost = 0.0
-    total_calls_sum = 0
-    total_tokens_sum = 0
-
-    for name, base_in, base_out in _AI_CATEGORIES:
-        tokens_in = int(base_in * multiplier * rng.uniform(0.7, 1.3))
-        tokens_out = int(base_out * multiplier * rng.uniform(0.7, 1.3))
-        calls = int(multiplier * rng.randint(2, 15))
-        cost = (tokens_in / 1000) * _INPUT_COST_PER_1K + (tokens_out / 1000) * _OUTPUT_COST_PER_1K
-        categories.append(AITokenCategoryUsage(
-            category=name,
-            tokens_input=tokens_in,
-            tokens_output=tokens_out,
-            calls=calls,
-            cost_czk=round(cost, 2),
-        ))
-        total_cost += cost
-        total_calls_sum += calls
-        total_tokens_sum += tokens_in + tokens_out
-
-    # Timeline
-    timeline: list[AITokenTimePoint] = []
-    n = len(labels)
-    for lbl in labels:
-        pt_cost = round(total_cost / n * rng.uniform(0.5, 1.5), 2)
-        pt_calls = max(1, int(total_calls_sum / n * rng.uniform(0.5, 1.5)))
-        timeline.append(AITokenTimePoint(label=lbl, cost_czk=pt_cost, calls=pt_calls))
+        hours = [today + timedelta(hours=h) for h in range(24)]
+        return today, [(t.strftime("%Y-%m-%d %H"), f"{t.hour}:00") for t in hours]
+    if period == "month":
+        days = [today - timedelta(days=29 - i) for i in range(30)]
+        return days[0], [(d.strftime("%Y-%m-%d"), d.strftime("%d.%m.")) for d in days]
+    # year: the current and 11 previous calendar months
+    months = []
+    month_start = today.replace(day=1)
+    for _ in range(12):
+        months.append(month_start)
+        month_start = (month_start - timedelta(days=1)).replace(day=1)
+    months.reverse()
+    return months[0], [(m.strftime("%Y-%m"), m.strftime("%m/%Y")) for m in months]
+
+
+async def _ledger_usage(db: AsyncSession, period: str) -> AITokenUsageResponse:
+    """Aggregate the Claude usage ledger by category and timeline bucket (one query)."""
+    start, buckets = _period_buckets(period, datetime.now(UTC))
+
+    pg_format, sqlite_format = _BUCKET_FORMATS[period]
+    created_at = ClaudeUsageEntry.created_at
+    if db.get_bind().dialect.name == "postgresql":
+        bucket = func.to_char(func.timezone("UTC", created_at), pg_format)
+    else:
+        bucket = func.strftime(sqlite_format, created_at)
+
+    rows = (
+        await db.execute(
+            select(
+                ClaudeUsageEntry.agent,
+                bucket.label("bucket"),
+                func.count().label("calls"),
+                func.sum(ClaudeUsageEntry.input_tokens).label("input_tokens"),
+                func.sum(ClaudeUsageEntry.output_tokens).label("output_tokens"),
+                func.sum(ClaudeUsageEntry.cache_read_tokens).label("cache_read_tokens"),
+                func.sum(ClaudeUsageEntry.cache_creation_tokens).label("cache_creation_tokens"),
+                func.sum(ClaudeUsageEntry.latency_ms).label("latency_ms"),
+            )
+            .where(created_at >= start)
+            .group_by(ClaudeUsageEntry.agent, bucket)
+        )
+    ).all()
 
+    # Known categories are always listed, even without calls in the period
+    categories: dict[str, dict[str, float]] = {
+        name: dict.fromkeys(_CATEGORY_TOTALS, 0) for name in dict.fromkeys(_AI_CATEGORIES.values())
+    }
+    timeline: dict[str, dict[str, float]] = {key: {"cost": 0.0, "calls": 0} for key, _ in buckets}
+    for row in rows:
+        cost = _cost_czk(
+            row.input_tokens, row.output_tokens, row.cache_read_tokens, row.cache_creation_tokens
+        )
+        name = _AI_CATEGORIES.get(row.agent, _OTHER_CATEGORY)
+        totals = categories.setdefault(name, dict.fromkeys(_CATEGORY_TOTALS, 0))
+        totals["input"] += row.input_tokens + row.cache_creation_tokens
+        totals["output"] += row.output_tokens
+        totals["cached"] += row.cache_read_tokens
+        totals["calls"] += row.calls
+        totals["cost"] += cost
+        totals["latency"] += row.latency_ms
+        if row.bucket in timeline:
+            timeline[row.bucket]["cost"] += cost
+            timeline[row.bucket]["calls"] += row.calls
+
+    cached = sum(t["cached"] for t in categories.values())
+    uncached = sum(t["input"] for t in categories.values())
     return AITokenUsageResponse(
         period=period,
-        categories=categories,
-        timeline=timeline,
-        total_cost_czk=round(total_cost, 2),
-        total_calls=total_calls_sum,
-        total_tokens=total_tokens_sum,
+        categories=[
+            AITokenCategoryUsage(
+                category=name,
+                tokens_input=int(totals["input"]),
+                tokens_output=int(totals["output"]),
+                tokens_cached=int(totals["cached"]),
+                calls=int(totals["calls"]),
+                cost_czk=round(totals["cost"], 2),
+                avg_latency_ms=round(totals["latency"] / totals["calls"], 1) if totals["calls"] else 0.0,
+            )
+            for name, totals in categories.items()
+        ],
+        timeline=[
+            AITokenTimePoint(
+                label=label,
+                cost_czk=round(timeline[key]["cost"], 2),
+                calls=int(timeline[key]["calls"]),
+            )
+            for key, label in buckets
+        ],
+        total_cost_czk=round(sum(t["cost"] for t in categories.values()), 2),
+        total_calls=int(sum(t["calls"] for t in categories.values())),
+        total_tokens=int(
+            sum(t["input"] + t["output"] + t["cached"] for t in categories.values())
+        ),
+        total_tokens_cached=int(cached),
+        cache_read_ratio=round(cached / (cached + uncached), 3) if cached + uncached else 0.0,
     )
 
 
 @router.get("/ai-token-usage", response_model=AITokenUsageResponse)
 async def get_ai_token_usage(
     period: str = Query("month", pattern="^(day|month|year)$"),
+    db: AsyncSession = Depends(get_db),
     _user: User = Depends(require_role(UserRole.VEDENI)),
 ) -> AITokenUsageResponse:
-    """Get AI token usage statistics by category and time period."""
-    return _generate_usage(period)
+    """Get AI token usage statistics by category and time period.
+
+    Computed from the Claude usage ledger (actual usage reported by the API).
+    """
+    return await _ledger_usage(db, period)
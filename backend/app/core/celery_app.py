@@ -21,6 +21,7 @@ celery_app = Celery(
         "app.agents.tasks",
         "app.services.embedding_tasks",
         "app.services.deadline_tasks",
+        "app.services.document_generator_tasks",
         "app.orchestration.tasks",
     ],
 )
@@ -54,6 +55,10 @@ celery_app.conf.beat_schedule = {
         "task": "app.integrations.email.tasks.cleanup_processed_emails",
         "schedule": crontab(hour=2, minute=0),  # Daily at 2 AM
     },
+    "cleanup-processing-tasks": {
+        "task": "orchestration.cleanup_processing_tasks",
+        "schedule": crontab(hour=2, minute=30),  # Daily at 2:30 AM
+    },
     "sync-pohoda-daily": {
         "task": "app.integrations.pohoda.tasks.sync_daily_exports",
         "schedule": crontab(hour=6, minute=0),  # Daily at 6 AM
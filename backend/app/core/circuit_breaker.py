@@ -1,8 +1,28 @@
-"""Circuit breaker pattern for external API calls."""
+"""Circuit breaker pattern for external API calls.
+
+A breaker opens when, within a sliding window, at least ``failure_threshold``
+calls failed and they make up at least ``failure_rate`` of all calls. After
+``recovery_timeout`` it turns half-open and lets a single probe call through;
+the probe's outcome closes or re-opens it.
+
+``RedisCircuitBreaker`` keeps that state in Redis (updated by Lua scripts),
+so all API processes and Celery workers share one view: once the fleet has
+seen enough failures every process sheds load, and only one process in the
+fleet probes during half-open. When Redis is unreachable it falls back to
+the per-process ``CircuitBreaker`` state.
+"""
 
 import logging
 import time
+from collections import deque
+from contextvars import ContextVar
 from enum import Enum
+from typing import cast
+from uuid import uuid4
+
+from redis import Redis, RedisError
+
+from app.core.metrics import circuit_breaker_rejected_total, circuit_breaker_state
 
 logger = logging.getLogger(__name__)
 
@@ -13,12 +33,16 @@ class CircuitState(str, Enum):
     HALF_OPEN = "half_open"
 
 
+# Prometheus gauge value per state
+_STATE_VALUES = {CircuitState.CLOSED: 0, CircuitState.HALF_OPEN: 1, CircuitState.OPEN: 2}
+
+
 class CircuitBreaker:
-    """Simple circuit breaker with in-memory state.
+    """Circuit breaker with in-memory (per process) state.
 
     States:
     - CLOSED: Normal operation, requests pass through
-    - OPEN: Failures exceeded threshold, requests are rejected
+    - OPEN: Failure rate exceeded threshold, requests are rejected
     - HALF_OPEN: Testing if service recovered (allows 1 request)
     """
 
@@ -27,20 +51,39 @@ class CircuitBreaker:
         name: str,
         failure_threshold: int = 3,
         recovery_timeout: float = 60.0,
+        failure_rate: float = 0.5,
+        window_seconds: float = 60.0,
     ):
         self.name = name
         self.failure_threshold = failure_threshold
         self.recovery_timeout = recovery_timeout
+        self.failure_rate = failure_rate
+        self.window_seconds = window_seconds
         self._state = CircuitState.CLOSED
-        self._failure_count = 0
+        self._calls: deque[tuple[float, bool]] = deque()
         self._last_failure_time: float = 0
         self._last_success_time: float = 0
+        self._probe_started_at: float | None = None
+        circuit_breaker_state.labels(name=name).set(0)
+
+    def _set_state(self, state: CircuitState) -> None:
+        self._state = state
+        circuit_breaker_state.labels(name=self.name).set(_STATE_VALUES[state])
+
+    def _trim(self, now: float) -> None:
+        while self._calls and self._calls[0][0] <= now - self.window_seconds:
+            self._calls.popleft()
+
+    @property
+    def _failure_count(self) -> int:
+        self._trim(time.time())
+        return sum(1 for _, ok in self._calls if not ok)
 
     @property
     def state(self) -> CircuitState:
         if self._state == CircuitState.OPEN:
             if time.time() - self._last_failure_time >= self.recovery_timeout:
-                self._state = CircuitState.HALF_OPEN
+                self._set_state(CircuitState.HALF_OPEN)
                 logger.info("circuit_breaker.half_open name=%s", self.name)
         return self._state
 
@@ -50,27 +93,52 @@ class CircuitBreaker:
         if current_state == CircuitState.CLOSED:
             return True
         if current_state == CircuitState.HALF_OPEN:
-            return True
+            # One probe at a time; a probe that never reported expires
+            now = time.time()
+            if (
+                self._probe_started_at is None
+                or now - self._probe_started_at >= self.recovery_timeout
+            ):
+                self._probe_started_at = now
+                return True
+        circuit_breaker_rejected_total.labels(name=self.name).inc()
         return False
 
     def record_success(self) -> None:
         """Record a successful call."""
-        self._failure_count = 0
-        self._last_success_time = time.time()
+        now = time.time()
+        self._last_success_time = now
         if self._state == CircuitState.HALF_OPEN:
-            self._state = CircuitState.CLOSED
+            self._probe_started_at = None
+            self._calls.clear()
+            self._set_state(CircuitState.CLOSED)
             logger.info("circuit_breaker.closed name=%s", self.name)
+        elif self._state == CircuitState.CLOSED:
+            self._calls.append((now, True))
+            self._trim(now)
 
     def record_failure(self) -> None:
         """Record a failed call."""
-        self._failure_count += 1
-        self._last_failure_time = time.time()
-        if self._failure_count >= self.failure_threshold:
-            self._state = CircuitState.OPEN
+        now = time.time()
+        self._last_failure_time = now
+        if self._state == CircuitState.HALF_OPEN:
+            self._probe_started_at = None
+            self._set_state(CircuitState.OPEN)
+            logger.warning("circuit_breaker.reopened name=%s", self.name)
+            return
+        if self._state == CircuitState.OPEN:
+            return
+
+        self._calls.append((now, False))
+        self._trim(now)
+        failures = sum(1 for _, ok in self._calls if not ok)
+        if failures >= self.failure_threshold and failures / len(self._calls) >= self.failure_rate:
+            self._calls.clear()
+            self._set_state(CircuitState.OPEN)
             logger.warning(
                 "circuit_breaker.opened name=%s failures=%s",
                 self.name,
-                self._failure_count,
+                failures,
             )
 
     def get_status(self) -> dict[str, str | int | float]:
@@ -84,7 +152,244 @@ class CircuitBreaker:
         }
 
 
+# KEYS: state hash, probe key
+# ARGV: recovery timeout (s), probe ttl (ms), probe id
+# Returns {state, allowed}
+_ALLOW_SCRIPT = """
+local state = redis.call('HGET', KEYS[1], 'state') or 'closed'
+if state == 'closed' then
+    return {state, 1}
+end
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local opened_at = tonumber(redis.call('HGET', KEYS[1], 'opened_at')) or 0
+if now - opened_at < tonumber(ARGV[1]) then
+    return {'open', 0}
+end
+-- Half-open: whoever sets the probe key is the single probe of the fleet
+if redis.call('SET', KEYS[2], ARGV[3], 'NX', 'PX', ARGV[2]) then
+    redis.call('HSET', KEYS[1], 'state', 'half_open')
+    return {'half_open', 1}
+end
+return {'half_open', 0}
+"""
+
+# KEYS: state hash, calls zset, failures zset, probe key
+# ARGV: ok (1/0), window (s), failure threshold, failure rate, member, probe id
+# Returns {state, failures in window}
+_RECORD_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local ok = ARGV[1] == '1'
+local state = redis.call('HGET', KEYS[1], 'state') or 'closed'
+
+if state ~= 'closed' then
+    -- Only the probe's outcome moves a half-open breaker; late results are ignored
+    if state == 'half_open' and ARGV[6] ~= '' and redis.call('GET', KEYS[4]) == ARGV[6] then
+        redis.call('DEL', KEYS[4])
+        if ok then
+            redis.call('HSET', KEYS[1], 'state', 'closed')
+            redis.call('DEL', KEYS[2], KEYS[3])
+            return {'closed', 0}
+        end
+        redis.call('HSET', KEYS[1], 'state', 'open', 'opened_at', tostring(now))
+        return {'open', 0}
+    end
+    return {state, 0}
+end
+
+local window = tonumber(ARGV[2])
+redis.call('ZADD', KEYS[2], now, ARGV[5])
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', now - window)
+redis.call('EXPIRE', KEYS[2], math.ceil(window) + 60)
+if not ok then
+    redis.call('ZADD', KEYS[3], now, ARGV[5])
+end
+redis.call('ZREMRANGEBYSCORE', KEYS[3], '-inf', now - window)
+redis.call('EXPIRE', KEYS[3], math.ceil(window) + 60)
+
+local failures = redis.call('ZCARD', KEYS[3])
+if not ok and failures >= tonumber(ARGV[3])
+        and failures / redis.call('ZCARD', KEYS[2]) >= tonumber(ARGV[4]) then
+    redis.call('HSET', KEYS[1], 'state', 'open', 'opened_at', tostring(now))
+    redis.call('DEL', KEYS[2], KEYS[3])
+    return {'open', failures}
+end
+return {'closed', failures}
+"""
+
+
+class RedisCircuitBreaker(CircuitBreaker):
+    """Circuit breaker whose state is shared by all processes through Redis.
+
+    Keys (prefix ``circuit:{name}``): a hash with state/opened_at, sliding
+    window sorted sets of calls and failures, and the half-open probe lock.
+    The claimed probe is remembered per task/thread, so only the caller that
+    got the probe can close or re-open a half-open breaker. Any Redis error
+    switches this process to its in-memory state for ``_REDIS_RETRY_SECONDS``.
+    """
+
+    _REDIS_RETRY_SECONDS = 30.0
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 3,
+        recovery_timeout: float = 60.0,
+        failure_rate: float = 0.5,
+        window_seconds: float = 60.0,
+        redis_url: str | None = None,
+    ):
+        super().__init__(name, failure_threshold, recovery_timeout, failure_rate, window_seconds)
+        self._redis_url = redis_url
+        self._redis: Redis | None = None
+        self._redis_retry_at = 0.0
+        # Probe claimed by the current task/thread; the breakers are module
+        # globals shared by concurrent callers, so this must not be instance state
+        self._probe_id: ContextVar[str] = ContextVar(f"circuit_probe_{name}", default="")
+        prefix = f"circuit:{name}"
+        self._state_key = prefix
+        self._calls_key = f"{prefix}:calls"
+        self._failures_key = f"{prefix}:failures"
+        self._probe_key = f"{prefix}:probe"
+
+    def _client(self) -> Redis | None:
+        """Redis client, or None while Redis is considered unavailable."""
+        if time.monotonic() < self._redis_retry_at:
+            return None
+        if self._redis is None:
+            if self._redis_url is None:
+                from app.core.config import get_settings
+
+                self._redis_url = str(get_settings().REDIS_URL)
+            # Short timeouts: the breaker must never be slower than the call it guards
+            self._redis = Redis.from_url(
+                self._redis_url,
+                decode_responses=True,
+                socket_connect_timeout=0.5,
+                socket_timeout=0.5,
+            )
+            self._allow_script = self._redis.register_script(_ALLOW_SCRIPT)
+            self._record_script = self._redis.register_script(_RECORD_SCRIPT)
+        return self._redis
+
+    def _redis_failed(self, exc: RedisError) -> None:
+        self._redis_retry_at = time.monotonic() + self._REDIS_RETRY_SECONDS
+        logger.warning(
+            "circuit_breaker.redis_unavailable name=%s error=%s", self.name, exc
+        )
+
+    def _observe(self, state: str) -> CircuitState:
+        """Mirror the shared state locally (status, metrics, fallback)."""
+        shared = CircuitState(state)
+        if shared != self._state:
+            log = logger.warning if shared == CircuitState.OPEN else logger.info
+            log("circuit_breaker.%s name=%s", shared.value, self.name)
+        self._set_state(shared)
+        return shared
+
+    @property
+    def state(self) -> CircuitState:
+        client = self._client()
+        if client is None:
+            return super().state
+        try:
+            state = (
+                cast("str | None", client.hget(self._state_key, "state"))
+                or CircuitState.CLOSED.value
+            )
+        except RedisError as exc:
+            self._redis_failed(exc)
+            return super().state
+        return self._observe(state)
+
+    def can_execute(self) -> bool:
+        """Check if a request can pass through (claims the probe when half-open)."""
+        client = self._client()
+        if client is None:
+            return super().can_execute()
+        probe_id = uuid4().hex
+        try:
+            state, allowed = self._allow_script(
+                keys=[self._state_key, self._probe_key],
+                args=[self.recovery_timeout, int(self.recovery_timeout * 1000), probe_id],
+            )
+        except RedisError as exc:
+            self._redis_failed(exc)
+            return super().can_execute()
+
+        self._observe(state)
+        if int(allowed):
+            if state == CircuitState.HALF_OPEN.value:
+                self._probe_id.set(probe_id)
+            return True
+        circuit_breaker_rejected_total.labels(name=self.name).inc()
+        return False
+
+    def _record(self, ok: bool) -> bool:
+        """Record an outcome in Redis; False if the local fallback must be used."""
+        client = self._client()
+        if client is None:
+            return False
+        try:
+            state, failures = self._record_script(
+                keys=[self._state_key, self._calls_key, self._failures_key, self._probe_key],
+                args=[
+                    1 if ok else 0,
+                    self.window_seconds,
+                    self.failure_threshold,
+                    self.failure_rate,
+                    f"{time.time()}:{uuid4().hex[:8]}",
+                    self._probe_id.get(),
+                ],
+            )
+        except RedisError as exc:
+            self._redis_failed(exc)
+            return False
+
+        self._probe_id.set("")
+        if state == CircuitState.OPEN.value and self._state != CircuitState.OPEN:
+            logger.warning(
+                "circuit_breaker.opened name=%s failures=%s", self.name, failures
+            )
+        self._set_state(CircuitState(state))
+        return True
+
+    def record_success(self) -> None:
+        """Record a successful call."""
+        self._last_success_time = time.time()
+        if not self._record(ok=True):
+            super().record_success()
+
+    def record_failure(self) -> None:
+        """Record a failed call."""
+        self._last_failure_time = time.time()
+        if not self._record(ok=False):
+            super().record_failure()
+
+    def get_status(self) -> dict[str, str | int | float]:
+        """Get circuit breaker status."""
+        client = self._client()
+        if client is None:
+            return super().get_status()
+        try:
+            pipe = client.pipeline()
+            pipe.hget(self._state_key, "state")
+            pipe.zcount(self._failures_key, time.time() - self.window_seconds, "+inf")
+            state, failures = pipe.execute()
+        except RedisError as exc:
+            self._redis_failed(exc)
+            return super().get_status()
+        return {
+            "name": self.name,
+            "state": self._observe(state or CircuitState.CLOSED.value).value,
+            "failure_count": int(failures),
+            "failure_threshold": self.failure_threshold,
+            "recovery_timeout": self.recovery_timeout,
+        }
+
+
 # Global circuit breakers for external services
-anthropic_breaker = CircuitBreaker("anthropic", failure_threshold=3, recovery_timeout=60)
-pohoda_breaker = CircuitBreaker("pohoda", failure_threshold=3, recovery_timeout=120)
-imap_breaker = CircuitBreaker("imap", failure_threshold=5, recovery_timeout=60)
+anthropic_breaker = RedisCircuitBreaker("anthropic", failure_threshold=3, recovery_timeout=60)
+pohoda_breaker = RedisCircuitBreaker("pohoda", failure_threshold=3, recovery_timeout=120)
+imap_breaker = RedisCircuitBreaker("imap", failure_threshold=5, recovery_timeout=60)
@@ -0,0 +1,186 @@
+"""Instrumented Claude API calls.
+
+Every ``messages.create`` of the agents and services goes through
+``create_message``, which records the call's actual usage as reported by the
+API (input, output and prompt cache tokens) and its latency:
+
+- into the ``claude_usage_ledger`` table (one row per call, written in its
+  own session so failed business transactions do not lose the entry),
+- into the ``claude_call_duration_seconds`` / ``claude_call_tokens``
+  Prometheus histograms,
+- into the rate limiter, which settles the caller's reservation with the
+  actual usage instead of an estimate.
+
+The static prefix of a request (tool definitions and system prompt, the bulk
+of the input tokens of every agent call) is marked for Anthropic prompt
+caching, so repeated calls read it from the cache at a fraction of the
+input price and latency. Prefixes shorter than the model's cache minimum
+are simply sent uncached by the API.
+"""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
+
+import structlog
+
+from app.core.database import AsyncSessionLocal
+from app.core.metrics import claude_call_duration_seconds, claude_call_tokens
+from app.models.claude_usage import ClaudeUsageEntry
+
+if TYPE_CHECKING:
+    from anthropic import AsyncAnthropic
+
+logger = structlog.get_logger(__name__)
+
+_CACHE_CONTROL: dict[str, str] = {"type": "ephemeral"}
+
+
+@dataclass(frozen=True, slots=True)
+class ClaudeUsage:
+    """Token usage of one Claude API response."""
+
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_read_tokens: int = 0
+    cache_creation_tokens: int = 0
+
+    @property
+    def total_tokens(self) -> int:
+        """All tokens processed by the call (input incl. cache, and output)."""
+        return (
+            self.input_tokens
+            + self.output_tokens
+            + self.cache_read_tokens
+            + self.cache_creation_tokens
+        )
+
+    @classmethod
+    def from_response(cls, response: Any) -> ClaudeUsage:
+        """Read ``response.usage``; missing or non-numeric fields count as 0."""
+        usage = getattr(response, "usage", None)
+
+        def _count(name: str) -> int:
+            value = getattr(usage, name, None)
+            return value if isinstance(value, int) else 0
+
+        return cls(
+            input_tokens=_count("input_tokens"),
+            output_tokens=_count("output_tokens"),
+            cache_read_tokens=_count("cache_read_input_tokens"),
+            cache_creation_tokens=_count("cache_creation_input_tokens"),
+        )
+
+
+def with_prompt_cache(kwargs: dict[str, Any]) -> dict[str, Any]:
+    """Mark the end of the static request prefix as a prompt cache breakpoint.
+
+    Tools precede the system prompt in the cached prefix, so one breakpoint
+    on the system prompt covers both; without a system prompt the last tool
+    carries it. The module-level prompt and tool constants are not modified.
+    """
+    kwargs = dict(kwargs)
+    system = kwargs.get("system")
+    tools = kwargs.get("tools")
+    if isinstance(system, str) and system:
+        kwargs["system"] = [{"type": "text", "text": system, "cache_control": _CACHE_CONTROL}]
+    elif tools:
+        kwargs["tools"] = [*tools[:-1], {**tools[-1], "cache_control": _CACHE_CONTROL}]
+    return kwargs
+
+
+async def create_message(
+    client: AsyncAnthropic, *, agent: str, cache_prompt: bool = True, **kwargs: Any
+) -> tuple[Any, ClaudeUsage]:
+    """Call ``client.messages.create(**kwargs)`` and record its usage.
+
+    Args:
+        client: Anthropic client of the caller.
+        agent: Name of the calling component, used as ledger and metric label.
+        cache_prompt: Mark the system prompt and tools for prompt caching.
+        **kwargs: Arguments of ``messages.create``.
+
+    Returns:
+        The API response and its token usage.
+
+    Raises:
+        Whatever ``messages.create`` raises; the failed call is recorded first.
+    """
+    model = str(kwargs.get("model", ""))
+    if cache_prompt:
+        kwargs = with_prompt_cache(kwargs)
+    start = time.perf_counter()
+    try:
+        response = await client.messages.create(**kwargs)
+    except Exception as exc:
+        await _record(agent, model, ClaudeUsage(), time.perf_counter() - start, error=exc)
+        raise
+
+    usage = ClaudeUsage.from_response(response)
+    await _record(agent, model, usage, time.perf_counter() - start)
+    return response, usage
+
+
+async def _record(
+    agent: str,
+    model: str,
+    usage: ClaudeUsage,
+    latency: float,
+    error: Exception | None = None,
+) -> None:
+    """Record one call in metrics, the rate limiter and the ledger."""
+    status = "error" if error is not None else "success"
+    claude_call_duration_seconds.labels(agent=agent, status=status).observe(latency)
+    if error is None:
+        for kind, tokens in (
+            ("input", usage.input_tokens),
+            ("output", usage.output_tokens),
+            ("cache_read", usage.cache_read_tokens),
+            ("cache_creation", usage.cache_creation_tokens),
+        ):
+            claude_call_tokens.labels(agent=agent, kind=kind).observe(tokens)
+
+        # Settles the reservation of the lease held by this task (if any)
+        try:
+            from app.core.rate_limiter import get_rate_limiter
+
+            get_rate_limiter().record_usage(usage.total_tokens)
+        except Exception:
+            logger.warning("claude_usage.rate_limiter_unavailable", agent=agent)
+
+    logger.info(
+        "claude_usage.call",
+        agent=agent,
+        status=status,
+        input=usage.input_tokens,
+        output=usage.output_tokens,
+        cache_read=usage.cache_read_tokens,
+        cache_creation=usage.cache_creation_tokens,
+        latency_ms=int(latency * 1000),
+    )
+
+    await _write_ledger(
+        ClaudeUsageEntry(
+            agent=agent,
+            model=model,
+            input_tokens=usage.input_tokens,
+            output_tokens=usage.output_tokens,
+            cache_read_tokens=usage.cache_read_tokens,
+            cache_creation_tokens=usage.cache_creation_tokens,
+            latency_ms=int(latency * 1000),
+            success=error is None,
+            error=type(error).__name__[:100] if error is not None else None,
+        )
+    )
+
+
+async def _write_ledger(entry: ClaudeUsageEntry) -> None:
+    """Persist a ledger entry; accounting must never fail the Claude call itself."""
+    try:
+        async with AsyncSessionLocal() as session:
+            session.add(entry)
+            await session.commit()
+    except Exception:
+        logger.warning("claude_usage.ledger_write_failed", agent=entry.agent, exc_info=True)
@@ -141,6 +141,48 @@ class Settings(BaseSettings):
         description="Base64-encoded 32-byte AES-256 key for document encryption at rest",
     )
 
+    MATERIAL_PRICE_IMPORT_CHUNK_SIZE: int = Field(
+        default=1000,
+        description="Rows per multi-row upsert statement when importing material price lists",
+    )
+
+    MATERIAL_PRICE_INDEX_TTL_SECONDS: int = Field(
+        default=600,
+        description="Maximum age of the in-memory material price index before it is reloaded",
+    )
+    MATERIAL_PRICE_INDEX_CHECK_SECONDS: float = Field(
+        default=2.0,
+        description="Minimum interval between checks of the fleet-wide price index version in Redis",
+    )
+
+    # PDF document rendering
+    PDF_RENDER_PROCESSES: int = Field(
+        default=2,
+        description="WeasyPrint rendering process pool size (0 renders in a worker thread)",
+    )
+    PDF_CACHE_MAX_ENTRIES: int = Field(
+        default=64,
+        description="Number of rendered PDFs kept in the per-process LRU cache",
+    )
+
+    # CAD metadata extraction
+    CAD_DXF_STREAM_THRESHOLD_MB: int = Field(
+        default=10,
+        description="DXF files larger than this are parsed in single-pass streaming mode",
+    )
+    CAD_DXF_MAX_ENTITIES: int = Field(
+        default=2000,
+        description="Cap per collected DXF list (layers, blocks, texts, dimensions) in streaming mode",
+    )
+    CAD_DXF_MAX_TEXT_CHARS: int = Field(
+        default=200_000,
+        description="Memory budget: total characters of DXF text collected in streaming mode",
+    )
+    CAD_EXTRACTION_TIME_BUDGET_SECONDS: float = Field(
+        default=15.0,
+        description="Time budget for streaming CAD extraction; partial metadata is returned when exceeded",
+    )
+
     # CORS
     CORS_ORIGINS: str = Field(
         default="http://localhost:3000",
@@ -178,14 +220,62 @@ class Settings(BaseSettings):
         default=3,
         description="Maximum concurrent Claude API calls",
     )
+    CLAUDE_CALL_LEASE_SECONDS: int = Field(
+        default=300,
+        ge=10,
+        description="Lease of a concurrent Claude call slot; a crashed worker's slot frees after this",
+    )
+    CLAUDE_RATE_LIMIT_WAIT_SECONDS: float = Field(
+        default=30.0,
+        ge=0,
+        description="How long Claude callers wait for rate limit capacity before giving up",
+    )
+    CLASSIFY_BATCH_ENABLED: bool = Field(
+        default=False,
+        description="Classify emails the heuristics miss in micro-batches (one Claude call per batch)",
+    )
+    CLASSIFY_BATCH_WINDOW_SECONDS: float = Field(
+        default=1.0,
+        ge=0,
+        description="How long a batch leader collects pending classifications before the call",
+    )
+    CLASSIFY_BATCH_MAX_SIZE: int = Field(
+        default=10,
+        ge=1,
+        description="Maximum emails per batched classification call",
+    )
+    CLASSIFY_BATCH_MAX_WAIT_SECONDS: float | None = Field(
+        default=None,
+        gt=0,
+        description=(
+            "How long a task waits for its batch result before classifying on its own; "
+            "by default derived from the batch window, CLAUDE_RATE_LIMIT_WAIT_SECONDS and "
+            "the Claude call timeout"
+        ),
+    )
     ORCHESTRATION_REVIEW_THRESHOLD: float = Field(
         default=0.6,
         description="Confidence threshold below which emails are sent for manual review",
     )
+    PROCESSING_TASK_RETENTION_DAYS: int = Field(
+        default=90,
+        ge=1,
+        description="Days of orchestration audit trail (processing_tasks) to keep",
+    )
+    PROCESSING_TASK_PARTITIONS_AHEAD: int = Field(
+        default=3,
+        ge=1,
+        description="Monthly processing_tasks partitions created in advance (PostgreSQL)",
+    )
     POHODA_AUTO_SYNC: bool = Field(
         default=False,
         description="Auto-sync orders to Pohoda on status change to fakturace/dokoncena",
     )
+    FEATURE_FLAG_CACHE_TTL_SECONDS: float = Field(
+        default=5.0,
+        gt=0,
+        description="Maximum age of the per-process feature flag snapshot when no change was published",
+    )
 
 
 @lru_cache
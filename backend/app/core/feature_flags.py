@@ -0,0 +1,247 @@
+"""Fleet-wide feature flags with a per-process snapshot.
+
+Flags default to the environment settings (``ORCHESTRATION_ENABLED`` etc.);
+overrides saved on the settings page live in Redis under
+``feature_flag:<NAME>``. Every process (API workers, Celery workers) keeps a
+snapshot of all flags and refreshes it with a single ``MGET``, so reading a
+flag in a task is a dictionary lookup instead of a Redis round trip:
+
+- ``FeatureFlags.update`` writes the overrides and publishes on
+  ``feature_flags:changed`` in one transaction; a daemon thread subscribed to
+  that channel drops the snapshot, so the next read in every process sees the
+  change,
+- a snapshot expires after ``FEATURE_FLAG_CACHE_TTL_SECONDS`` even without a
+  message (listener reconnecting, message lost),
+- while Redis is unavailable the last snapshot (or the settings defaults) is
+  used and Redis is retried after a short pause.
+
+Reading or updating flags may hit Redis, so async code calls ``snapshot``,
+``is_enabled`` and ``update`` through ``asyncio.to_thread``.
+"""
+
+import os
+import threading
+import time
+from collections.abc import Mapping
+from typing import cast
+
+import structlog
+from redis import Redis, RedisError
+
+from app.core.config import get_settings
+
+logger = structlog.get_logger(__name__)
+
+FLAG_NAMES = (
+    "ORCHESTRATION_ENABLED",
+    "ORCHESTRATION_AUTO_CREATE_ORDERS",
+    "ORCHESTRATION_AUTO_CALCULATE",
+    "ORCHESTRATION_AUTO_OFFER",
+    "POHODA_AUTO_SYNC",
+)
+KEY_PREFIX = "feature_flag:"
+CHANGED_CHANNEL = "feature_flags:changed"
+
+
+def _parse(value: str | None, default: bool) -> bool:
+    if value is None:
+        return default
+    return value in ("1", "true")
+
+
+class FeatureFlags:
+    """Per-process snapshot of the feature flags.
+
+    Args:
+        ttl_seconds: Maximum age of a snapshot without an invalidation message.
+        redis: Redis client (decoded responses); defaults to REDIS_URL.
+    """
+
+    _REDIS_RETRY_SECONDS = 5.0
+    _LISTENER_RETRY_SECONDS = 1.0
+
+    def __init__(self, ttl_seconds: float, redis: Redis | None = None) -> None:
+        self.ttl_seconds = ttl_seconds
+        self._redis = redis
+        self._own_redis = redis is None
+        self._redis_retry_at = 0.0
+        self._snapshot: dict[str, bool] | None = None
+        self._loaded_at = 0.0
+        # Bumped by every invalidation; a refresh racing one is not kept
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._listener: threading.Thread | None = None
+        self._stopped = threading.Event()
+
+    def is_enabled(self, name: str) -> bool:
+        """Current value of one flag."""
+        return self.snapshot()[name]
+
+    def snapshot(self) -> dict[str, bool]:
+        """Current values of all flags, refreshed from Redis when stale."""
+        snapshot = self._snapshot
+        if snapshot is None or time.monotonic() - self._loaded_at > self.ttl_seconds:
+            snapshot = self._refresh()
+        return dict(snapshot)
+
+    def update(self, changes: Mapping[str, bool]) -> dict[str, bool]:
+        """Store flag overrides in Redis and notify every process.
+
+        Args:
+            changes: New values by flag name.
+
+        Returns:
+            All flags after the change.
+
+        Raises:
+            ValueError: Unknown flag name.
+            RedisError: Redis is unavailable; nothing was changed.
+        """
+        unknown = set(changes) - set(FLAG_NAMES)
+        if unknown:
+            raise ValueError(f"Unknown feature flags: {', '.join(sorted(unknown))}")
+        if changes:
+            pipe = self._connection().pipeline()
+            pipe.mset({f"{KEY_PREFIX}{name}": str(int(value)) for name, value in changes.items()})
+            pipe.publish(CHANGED_CHANNEL, ",".join(changes))
+            pipe.execute()
+            logger.info("feature_flags.updated", **changes)
+        self.invalidate()
+        return self.snapshot()
+
+    def invalidate(self) -> None:
+        """Drop the local snapshot; the next read reloads it."""
+        with self._lock:
+            self._generation += 1
+            self._snapshot = None
+
+    def close(self) -> None:
+        """Stop the invalidation listener."""
+        self._stopped.set()
+        if self._listener is not None:
+            self._listener.join(timeout=2 * self._LISTENER_RETRY_SECONDS)
+            self._listener = None
+
+    def _defaults(self) -> dict[str, bool]:
+        settings = get_settings()
+        return {name: bool(getattr(settings, name)) for name in FLAG_NAMES}
+
+    def _connection(self) -> Redis:
+        if self._redis is None:
+            # Short timeouts: a flag read must never stall a request or task
+            self._redis = Redis.from_url(
+                str(get_settings().REDIS_URL),
+                decode_responses=True,
+                socket_connect_timeout=0.5,
+                socket_timeout=0.5,
+            )
+        return self._redis
+
+    def _client(self) -> Redis | None:
+        """Redis client, or None while Redis is considered unavailable."""
+        if time.monotonic() < self._redis_retry_at:
+            return None
+        return self._connection()
+
+    def _refresh(self) -> dict[str, bool]:
+        defaults = self._defaults()
+        client = self._client()
+        if client is None:
+            return self._snapshot or defaults
+        self._ensure_listener()
+
+        generation = self._generation
+        try:
+            values = cast(
+                "list[str | None]",
+                client.mget([f"{KEY_PREFIX}{name}" for name in FLAG_NAMES]),
+            )
+        except RedisError as exc:
+            self._redis_retry_at = time.monotonic() + self._REDIS_RETRY_SECONDS
+            logger.warning("feature_flags.redis_unavailable", error=str(exc))
+            return self._snapshot or defaults
+
+        snapshot = {
+            name: _parse(value, defaults[name])
+            for name, value in zip(FLAG_NAMES, values, strict=True)
+        }
+        with self._lock:
+            if generation == self._generation:
+                self._snapshot = snapshot
+                self._loaded_at = time.monotonic()
+        return snapshot
+
+    def _ensure_listener(self) -> None:
+        if self._listener is not None:
+            return
+        with self._lock:
+            if self._listener is None and not self._stopped.is_set():
+                self._listener = threading.Thread(
+                    target=self._listen, name="feature-flags-listener", daemon=True
+                )
+                self._listener.start()
+
+    def _listen(self) -> None:
+        """Drop the snapshot on every published change (daemon thread)."""
+        if self._own_redis:
+            # Separate connection without a read timeout for the blocking subscription
+            client = Redis.from_url(
+                str(get_settings().REDIS_URL),
+                decode_responses=True,
+                socket_connect_timeout=0.5,
+                health_check_interval=30,
+            )
+        else:
+            client = self._connection()
+
+        while not self._stopped.is_set():
+            pubsub = client.pubsub()  # type: ignore[no-untyped-call]
+            try:
+                pubsub.subscribe(CHANGED_CHANNEL)
+                while not self._stopped.is_set():
+                    message = pubsub.get_message(timeout=self._LISTENER_RETRY_SECONDS)
+                    # (Re)subscribing also invalidates: changes may have been missed meanwhile
+                    if message is not None and message["type"] in ("subscribe", "message"):
+                        self.invalidate()
+            except RedisError as exc:
+                logger.warning("feature_flags.listener_disconnected", error=str(exc))
+                self._stopped.wait(self._LISTENER_RETRY_SECONDS)
+            finally:
+                pubsub.close()
+
+    def _after_fork(self) -> None:
+        """Forked child (Celery prefork): threads and the snapshot are not inherited."""
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._listener = None
+        if self._own_redis:
+            self._redis = None
+
+
+# Module-level singleton (lazy init)
+_flags: FeatureFlags | None = None
+
+
+def get_feature_flags() -> FeatureFlags:
+    """Get or create the process-wide feature flag snapshot.
+
+    Returns:
+        FeatureFlags instance.
+    """
+    global _flags  # noqa: PLW0603
+    if _flags is None:
+        _flags = FeatureFlags(ttl_seconds=get_settings().FEATURE_FLAG_CACHE_TTL_SECONDS)
+    return _flags
+
+
+def is_enabled(name: str) -> bool:
+    """Current value of a feature flag (see ``FLAG_NAMES``)."""
+    return get_feature_flags().is_enabled(name)
+
+
+def _reset_after_fork() -> None:
+    if _flags is not None:
+        _flags._after_fork()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
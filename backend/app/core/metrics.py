@@ -1,4 +1,4 @@
-from prometheus_client import Counter, Histogram, Info
+from prometheus_client import Counter, Gauge, Histogram, Info
 
 # App info
 app_info = Info("inferbox", "inferbox application info")
@@ -16,6 +16,17 @@ http_request_duration_seconds = Histogram(
     ["method", "endpoint"],
     buckets=[0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0],
 )
+http_response_size_bytes = Histogram(
+    "http_response_size_bytes",
+    "HTTP response body size in bytes",
+    ["method", "endpoint"],
+    buckets=[256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304],
+)
+http_requests_in_progress = Gauge(
+    "http_requests_in_progress",
+    "HTTP requests currently being processed",
+    ["method"],
+)
 
 # Business metrics
 orders_created_total = Counter("orders_created_total", "Total orders created")
@@ -51,8 +62,32 @@ claude_api_calls = Counter(
     "Claude API calls",
     ["task", "status"],
 )
+claude_call_duration_seconds = Histogram(
+    "claude_call_duration_seconds",
+    "Claude API call latency",
+    ["agent", "status"],
+    buckets=[0.5, 1, 2, 5, 10, 20, 30, 60, 120],
+)
+claude_call_tokens = Histogram(
+    "claude_call_tokens",
+    "Tokens per Claude API call (input, output, cache_read, cache_creation)",
+    ["agent", "kind"],
+    buckets=[0, 100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000],
+)
 dlq_entries_total = Counter(
     "dlq_entries_total",
     "Dead letter queue entries",
     ["stage"],
 )
+
+# Circuit breakers (state as seen by this process)
+circuit_breaker_state = Gauge(
+    "circuit_breaker_state",
+    "Circuit breaker state (0 closed, 1 half-open, 2 open)",
+    ["name"],
+)
+circuit_breaker_rejected_total = Counter(
+    "circuit_breaker_rejected_total",
+    "Calls rejected by an open circuit breaker",
+    ["name"],
+)
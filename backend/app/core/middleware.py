@@ -1,44 +1,128 @@
-"""Request logging and correlation ID middleware."""
+"""Request instrumentation middleware.
+
+One pure ASGI middleware handles, in a single pass, what used to be four
+``BaseHTTPMiddleware`` layers (each with its own task and response stream):
+correlation IDs, security headers, the request log line and Prometheus
+HTTP metrics.
+
+Metrics are labelled with the matched route template (e.g.
+``/api/v1/zakazky/{order_id}``) instead of the raw path, so IDs, order
+numbers or file names never create new label values. Requests that match no
+route share the ``<unmatched>`` label.
+"""
 
 import logging
 import time
 import uuid
 
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
-from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.metrics import (
+    http_request_duration_seconds,
+    http_requests_in_progress,
+    http_requests_total,
+    http_response_size_bytes,
+)
 
 logger = logging.getLogger(__name__)
 
+SECURITY_HEADERS: list[tuple[bytes, bytes]] = [
+    (b"x-content-type-options", b"nosniff"),
+    (b"x-frame-options", b"DENY"),
+    (b"x-xss-protection", b"1; mode=block"),
+    (b"strict-transport-security", b"max-age=31536000; includeSubDomains"),
+    (b"referrer-policy", b"strict-origin-when-cross-origin"),
+    (
+        b"content-security-policy",
+        b"default-src 'self'; script-src 'self'; style-src 'self' 'unsafe-inline'; "
+        b"img-src 'self' data:; font-src 'self'; connect-src 'self' ws: wss:",
+    ),
+]
+CORRELATION_HEADER = b"x-correlation-id"
+
+# Headers set by this middleware replace ones set by the endpoint
+_REPLACED_HEADERS = frozenset(name for name, _ in SECURITY_HEADERS) | {CORRELATION_HEADER}
+
+# Not measured (scrapes and probes would dominate the request metrics)
+UNMEASURED_PATHS = frozenset({"/metrics", "/health"})
+
+UNMATCHED_ENDPOINT = "<unmatched>"
+
+
+def route_template(scope: Scope) -> str:
+    """Path template of the route the router matched for this request."""
+    route = scope.get("route")
+    return getattr(route, "path", None) or UNMATCHED_ENDPOINT
 
-class RequestLoggingMiddleware(BaseHTTPMiddleware):
-    """Log every HTTP request with method, path, status, and duration."""
 
-    async def dispatch(self, request: Request, call_next) -> Response:
+class RequestInstrumentationMiddleware:
+    """Correlation ID, security headers, request logging and metrics (pure ASGI)."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        correlation_id = ""
+        for name, value in scope["headers"]:
+            if name == CORRELATION_HEADER:
+                correlation_id = value.decode("latin-1")
+                break
+        if not correlation_id:
+            correlation_id = str(uuid.uuid4())
+        # Exposed to handlers as request.state.correlation_id
+        scope.setdefault("state", {})["correlation_id"] = correlation_id
+
+        method = scope["method"]
+        measured = scope["path"] not in UNMEASURED_PATHS
+        status_code = 500
+        response_size = 0
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code, response_size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = [
+                    (name, value)
+                    for name, value in message.get("headers", ())
+                    if name.lower() not in _REPLACED_HEADERS
+                ]
+                headers.extend(SECURITY_HEADERS)
+                headers.append((CORRELATION_HEADER, correlation_id.encode("latin-1")))
+                message["headers"] = headers
+            elif message["type"] == "http.response.body":
+                response_size += len(message.get("body", b""))
+            await send(message)
+
+        in_progress = http_requests_in_progress.labels(method=method)
+        in_progress.inc()
         start = time.perf_counter()
-        response = await call_next(request)
-        duration_ms = (time.perf_counter() - start) * 1000
-
-        correlation_id = getattr(request.state, "correlation_id", "unknown")
-        logger.info(
-            "request method=%s path=%s status=%d duration=%.1fms cid=%s",
-            request.method,
-            request.url.path,
-            response.status_code,
-            duration_ms,
-            correlation_id,
-        )
-        return response
-
-
-class CorrelationIDMiddleware(BaseHTTPMiddleware):
-    """Add X-Correlation-ID to all requests/responses."""
-
-    async def dispatch(self, request: Request, call_next) -> Response:
-        correlation_id = request.headers.get("X-Correlation-ID", str(uuid.uuid4()))
-        # Store in request state for access in handlers
-        request.state.correlation_id = correlation_id
-
-        response = await call_next(request)
-        response.headers["X-Correlation-ID"] = correlation_id
-        return response
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - start
+            in_progress.dec()
+
+            if measured:
+                endpoint = route_template(scope)
+                http_requests_total.labels(
+                    method=method, endpoint=endpoint, status=status_code
+                ).inc()
+                http_request_duration_seconds.labels(method=method, endpoint=endpoint).observe(
+                    duration
+                )
+                http_response_size_bytes.labels(method=method, endpoint=endpoint).observe(
+                    response_size
+                )
+
+            logger.info(
+                "request method=%s path=%s status=%d duration=%.1fms cid=%s",
+                method,
+                scope["path"],
+                status_code,
+                duration * 1000,
+                correlation_id,
+            )
@@ -0,0 +1,108 @@
+"""Deterministic truncation of long prompt inputs (email bodies, OCR text).
+
+Cutting a text at a fixed character offset drops whatever comes after it,
+typically the item list or the drawing title block, while quoted reply
+history and repeated OCR lines stay in. ``fit_text`` instead:
+
+1. returns texts within the limit unchanged,
+2. compacts the text: drops quoted reply lines (``>``), repeated lines and
+   runs of blank lines, strips trailing whitespace,
+3. if still too long, keeps the beginning and the end of the text and, from
+   the part in between, the lines that carry data (``key: value`` lines and
+   lines with numbers: quantities, dimensions, dates, phone numbers),
+   in their original order, as long as they fit.
+
+The result depends only on the input and the limit, so identical inputs
+produce identical prompts.
+"""
+
+import re
+
+TRUNCATION_MARKER = "[... text zkracen ...]"
+_GAP_MARKER = "[...]"
+
+# Share of the budget for the first and the last lines of the text
+_HEAD_SHARE = 0.5
+_TAIL_SHARE = 0.15
+
+_FIELD_LINE = re.compile(r"^\s*[^\W\d_][\w .()/-]{0,40}:\s*\S|\d")
+_BLANK_RUN = re.compile(r"\n{3,}")
+
+
+def fit_text(text: str, limit: int, *, marker: str = TRUNCATION_MARKER) -> str:
+    """Shorten ``text`` to at most ``limit`` characters, preserving data lines.
+
+    Args:
+        text: Email body or OCR text.
+        limit: Maximum length of the result in characters.
+        marker: Appended when content had to be omitted.
+
+    Returns:
+        The text, its compacted form, or a selection of its lines followed by
+        ``marker``.
+    """
+    if len(text) <= limit:
+        return text
+
+    lines = _compact_lines(text)
+    compacted = _BLANK_RUN.sub("\n\n", "\n".join(lines)).strip()
+    if len(compacted) <= limit:
+        return compacted
+    lines = compacted.split("\n")
+
+    # Room for the final marker and one gap marker before the tail
+    budget = limit - len(marker) - len(_GAP_MARKER) - 2
+    head, used = _take(lines, int(budget * _HEAD_SHARE))
+    if not head:
+        # A single line longer than the head budget (e.g. OCR without newlines)
+        head, used = [lines[0][: int(budget * _HEAD_SHARE)]], int(budget * _HEAD_SHARE)
+    tail, tail_used = _take(lines[len(head):][::-1], int(budget * _TAIL_SHARE))
+    tail.reverse()
+    used += tail_used
+
+    kept: list[str] = []
+    dropped = False
+    for line in lines[len(head) : len(lines) - len(tail)]:
+        cost = len(line) + 1
+        if _FIELD_LINE.search(line) and used + cost + len(_GAP_MARKER) + 1 <= budget:
+            if dropped:
+                kept.append(_GAP_MARKER)
+                used += len(_GAP_MARKER) + 1
+                dropped = False
+            kept.append(line)
+            used += cost
+        else:
+            dropped = True
+    if dropped and tail:
+        kept.append(_GAP_MARKER)
+
+    return "\n".join([*head, *kept, *tail, marker])
+
+
+def _compact_lines(text: str) -> list[str]:
+    """Lines without quoted replies, repeated non-empty lines and trailing spaces."""
+    seen: set[str] = set()
+    lines: list[str] = []
+    for raw in text.splitlines():
+        line = raw.rstrip()
+        stripped = line.strip()
+        if stripped.startswith(">"):
+            continue
+        if stripped:
+            if stripped in seen:
+                continue
+            seen.add(stripped)
+        lines.append(line)
+    return lines
+
+
+def _take(lines: list[str], budget: int) -> tuple[list[str], int]:
+    """Leading lines that fit into ``budget`` characters (newlines included)."""
+    taken: list[str] = []
+    used = 0
+    for line in lines:
+        if used + len(line) + 1 > budget:
+            break
+        taken.append(line)
+        used += len(line) + 1
+    return taken, used
@@ -1,12 +1,33 @@
 """Redis-based rate limiter for Claude API calls.
 
 Enforces CLAUDE_MAX_TOKENS_PER_HOUR and CLAUDE_MAX_CONCURRENT_CALLS
-from application config using Redis counters.
+from application config.
+
+Both limits are checked and reserved by one Lua script, so concurrent
+workers cannot pass the check together and overshoot:
+
+- Tokens are a token bucket (``claude:tokens``) holding at most one hour of
+  quota and refilling continuously, i.e. a sliding hour rather than a
+  window that resets on the hour. ``acquire`` reserves the estimate and
+  ``record_usage`` settles the reservation against the actual usage
+  reported by the API; ``release`` refunds a reservation that was never
+  used.
+- Concurrent calls are leases in a sorted set (``claude:leases``) scored by
+  their expiry. A worker that crashes without ``release`` loses its slot
+  after ``CLAUDE_CALL_LEASE_SECONDS`` instead of blocking the counter.
+
+Timestamps come from the Redis server clock, so workers with skewed clocks
+share one view of the bucket.
 """
 
 from __future__ import annotations
 
+import asyncio
+import math
 import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from uuid import uuid4
 
 import structlog
 from redis import Redis
@@ -15,6 +36,69 @@ from app.core.config import get_settings
 
 logger = structlog.get_logger(__name__)
 
+# KEYS: bucket hash, leases zset
+# ARGV: capacity, refill per second, tokens requested, max concurrent, lease id, lease seconds
+# Returns {1, available} on success, {0, reason, available, retry_after} when limited
+_ACQUIRE_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local max_concurrent = tonumber(ARGV[4])
+local lease_seconds = tonumber(ARGV[6])
+
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', now)
+local active = redis.call('ZCARD', KEYS[2])
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+
+if active >= max_concurrent then
+    -- With a limit of 0 there is no lease to wait for
+    local oldest = redis.call('ZRANGE', KEYS[2], 0, 0, 'WITHSCORES')
+    local wait = lease_seconds
+    if oldest[2] then
+        wait = tonumber(oldest[2]) - now
+    end
+    return {0, 'concurrent', tostring(tokens), tostring(wait)}
+end
+if tokens < requested then
+    return {0, 'tokens', tostring(tokens), tostring((requested - tokens) / rate)}
+end
+
+tokens = tokens - requested
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 60)
+redis.call('ZADD', KEYS[2], now + lease_seconds, ARGV[5])
+redis.call('EXPIRE', KEYS[2], lease_seconds + 60)
+return {1, tostring(tokens)}
+"""
+
+# KEYS: bucket hash
+# ARGV: capacity, refill per second, tokens to take (negative refunds)
+# The bucket may go below zero when a call used more than was reserved.
+_SETTLE_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate - tonumber(ARGV[3]))
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 60)
+return tostring(tokens)
+"""
+
+# Lease held by the current task; nested acquires (task -> agent) reuse it
+_held_lease: ContextVar[RateLimitLease | None] = ContextVar("claude_rate_limit_lease", default=None)
+
 
 class RateLimitExceeded(Exception):
     """Raised when Claude API rate limit is exceeded."""
@@ -25,21 +109,46 @@ class RateLimitExceeded(Exception):
         super().__init__(f"Rate limit exceeded: {reason}")
 
 
+@dataclass
+class RateLimitLease:
+    """A reserved concurrency slot and token estimate.
+
+    Attributes:
+        id: Member of the leases sorted set.
+        reserved_tokens: Tokens taken from the bucket by ``acquire``.
+        expires_at: ``time.monotonic()`` after which Redis has reclaimed the slot.
+        nested: Acquired while an outer lease was held; releasing it is a no-op.
+        settled: The reservation was replaced with actual usage (or refunded).
+    """
+
+    id: str
+    reserved_tokens: int
+    expires_at: float
+    nested: bool = False
+    settled: bool = False
+
+
+def _current_lease() -> RateLimitLease | None:
+    """Lease held by this task, unless it was never released and has expired."""
+    lease = _held_lease.get()
+    if lease is not None and time.monotonic() >= lease.expires_at:
+        _held_lease.set(None)
+        return None
+    return lease
+
+
 class ClaudeRateLimiter:
     """Redis-based rate limiter for Claude API usage.
 
-    Uses:
-    - Sliding window counter for tokens per hour (``claude:tokens:{hour}``)
-    - Counter for concurrent calls (``claude:concurrent``)
-
     Methods:
-        acquire(estimated_tokens): Check limits before API call, increment concurrent.
-        release(): Decrement concurrent counter after call completes.
-        record_usage(actual_tokens): Record actual token usage after call.
+        acquire(estimated_tokens): Reserve tokens and a concurrent slot, or raise.
+        acquire_wait(estimated_tokens, timeout): Await a reservation instead of raising.
+        release(lease): Return the concurrent slot after the call completes.
+        record_usage(actual_tokens, lease): Settle the reservation with actual usage.
     """
 
-    _TOKEN_KEY_PREFIX = "claude:tokens"
-    _CONCURRENT_KEY = "claude:concurrent"
+    _TOKEN_KEY = "claude:tokens"
+    _LEASES_KEY = "claude:leases"
     _WINDOW_SECONDS = 3600  # 1 hour
 
     def __init__(self) -> None:
@@ -48,100 +157,185 @@ class ClaudeRateLimiter:
         self._redis = Redis.from_url(redis_url, decode_responses=True)
         self._max_tokens = settings.CLAUDE_MAX_TOKENS_PER_HOUR
         self._max_concurrent = settings.CLAUDE_MAX_CONCURRENT_CALLS
+        self._lease_seconds = settings.CLAUDE_CALL_LEASE_SECONDS
+        self._refill_rate = self._max_tokens / self._WINDOW_SECONDS
+        self._acquire_script = self._redis.register_script(_ACQUIRE_SCRIPT)
+        self._settle_script = self._redis.register_script(_SETTLE_SCRIPT)
 
-    def _token_key(self) -> str:
-        """Current hour token counter key."""
-        hour = int(time.time()) // self._WINDOW_SECONDS
-        return f"{self._TOKEN_KEY_PREFIX}:{hour}"
-
-    def acquire(self, estimated_tokens: int = 2000) -> bool:
-        """Check rate limits and acquire a concurrent slot.
+    def acquire(self, estimated_tokens: int = 2000) -> RateLimitLease:
+        """Atomically check both limits and reserve tokens and a concurrent slot.
 
         Args:
             estimated_tokens: Estimated tokens for the upcoming call.
 
         Returns:
-            True if acquired successfully.
+            Lease to pass to ``record_usage`` and ``release``.
 
         Raises:
             RateLimitExceeded: If token or concurrent limit is exceeded.
         """
-        # Check token limit
-        token_key = self._token_key()
-        current_tokens = int(self._redis.get(token_key) or 0)
+        held = _current_lease()
+        if held is not None:
+            return RateLimitLease(
+                id=held.id, reserved_tokens=0, expires_at=held.expires_at, nested=True
+            )
+
+        # A single call can never need more than the whole bucket
+        requested = min(estimated_tokens, self._max_tokens)
+        lease = RateLimitLease(
+            id=uuid4().hex,
+            reserved_tokens=requested,
+            expires_at=time.monotonic() + self._lease_seconds,
+        )
+        result = self._acquire_script(
+            keys=[self._TOKEN_KEY, self._LEASES_KEY],
+            args=[
+                self._max_tokens,
+                self._refill_rate,
+                requested,
+                self._max_concurrent,
+                lease.id,
+                self._lease_seconds,
+            ],
+        )
 
-        if current_tokens + estimated_tokens > self._max_tokens:
-            remaining = self._max_tokens - current_tokens
+        if int(result[0]) != 1:
+            reason, available, wait = result[1], float(result[2]), float(result[3])
+            retry_after = max(1, math.ceil(wait))
+            if reason == "concurrent":
+                logger.warning(
+                    "claude_rate_limit.concurrent_exceeded",
+                    max=self._max_concurrent,
+                    retry_after=retry_after,
+                )
+                raise RateLimitExceeded(
+                    f"Concurrent limit: {self._max_concurrent} calls in flight",
+                    retry_after=min(retry_after, 10),
+                )
             logger.warning(
                 "claude_rate_limit.tokens_exceeded",
-                current=current_tokens,
+                available=int(available),
                 estimated=estimated_tokens,
                 max=self._max_tokens,
-                remaining=remaining,
+                retry_after=retry_after,
             )
             raise RateLimitExceeded(
-                f"Token limit: {current_tokens}/{self._max_tokens} used, need {estimated_tokens}",
-                retry_after=60,
+                f"Token limit: {int(available)}/{self._max_tokens} available, "
+                f"need {requested}",
+                retry_after=retry_after,
             )
 
-        # Check concurrent limit
-        concurrent = int(self._redis.get(self._CONCURRENT_KEY) or 0)
-        if concurrent >= self._max_concurrent:
-            logger.warning(
-                "claude_rate_limit.concurrent_exceeded",
-                current=concurrent,
-                max=self._max_concurrent,
-            )
-            raise RateLimitExceeded(
-                f"Concurrent limit: {concurrent}/{self._max_concurrent}",
-                retry_after=10,
-            )
-
-        # Increment concurrent counter
-        self._redis.incr(self._CONCURRENT_KEY)
-        self._redis.expire(self._CONCURRENT_KEY, self._WINDOW_SECONDS)
-
+        _held_lease.set(lease)
         logger.debug(
             "claude_rate_limit.acquired",
-            concurrent=concurrent + 1,
-            tokens_used=current_tokens,
+            lease=lease.id,
+            reserved=requested,
+            available=int(float(result[1])),
         )
-        return True
+        return lease
+
+    async def acquire_wait(
+        self, estimated_tokens: int = 2000, timeout: float | None = None
+    ) -> RateLimitLease:
+        """Like ``acquire`` but wait for capacity instead of failing immediately.
+
+        Args:
+            estimated_tokens: Estimated tokens for the upcoming call.
+            timeout: Seconds to wait at most (default CLAUDE_RATE_LIMIT_WAIT_SECONDS).
 
-    def release(self) -> None:
-        """Release a concurrent slot after API call completes."""
-        current = int(self._redis.get(self._CONCURRENT_KEY) or 0)
-        if current > 0:
-            self._redis.decr(self._CONCURRENT_KEY)
+        Raises:
+            RateLimitExceeded: If no capacity frees up within ``timeout``.
+        """
+        if timeout is None:
+            timeout = get_settings().CLAUDE_RATE_LIMIT_WAIT_SECONDS
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                return self.acquire(estimated_tokens)
+            except RateLimitExceeded as exc:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise
+                # Slots are usually released long before their lease expires: poll
+                delay = 0.25 if exc.reason.startswith("Concurrent") else exc.retry_after
+                await asyncio.sleep(min(delay, remaining))
+
+    def release(self, lease: RateLimitLease | None = None) -> None:
+        """Release the concurrent slot of ``lease`` after the API call completes.
+
+        A reservation that no ``record_usage`` settled is refunded.
 
-    def record_usage(self, actual_tokens: int) -> None:
+        Args:
+            lease: Lease from ``acquire``; defaults to the one held by this task.
+        """
+        lease = lease or _current_lease()
+        if lease is None or lease.nested:
+            return
+        self._redis.zrem(self._LEASES_KEY, lease.id)
+        if _held_lease.get() is lease:
+            _held_lease.set(None)
+        if not lease.settled and lease.reserved_tokens:
+            # No call was made (or none succeeded): refund the reservation
+            lease.settled = True
+            self._settle_script(
+                keys=[self._TOKEN_KEY],
+                args=[self._max_tokens, self._refill_rate, -lease.reserved_tokens],
+            )
+
+    def record_usage(self, actual_tokens: int, lease: RateLimitLease | None = None) -> None:
         """Record actual token usage after API call.
 
+        Called for every Claude call with the usage reported by the API
+        (see ``app.core.claude_usage``). The first usage recorded for a
+        lease replaces its reservation (the difference is taken or
+        refunded); further calls under the same lease are consumed in
+        full. Without a lease the tokens are simply consumed.
+
         Args:
             actual_tokens: Actual tokens consumed by the call.
+            lease: Lease from ``acquire``; defaults to the one held by this task.
         """
-        token_key = self._token_key()
-        pipe = self._redis.pipeline()
-        pipe.incrby(token_key, actual_tokens)
-        pipe.expire(token_key, self._WINDOW_SECONDS)
-        pipe.execute()
+        lease = lease or _current_lease()
+        if lease is not None and lease.nested:
+            lease = _current_lease() or lease
+
+        delta = actual_tokens
+        if lease is not None and not lease.settled:
+            delta -= lease.reserved_tokens
+            lease.settled = True
+        if delta:
+            self._settle_script(
+                keys=[self._TOKEN_KEY], args=[self._max_tokens, self._refill_rate, delta]
+            )
 
         logger.debug(
             "claude_rate_limit.usage_recorded",
             tokens=actual_tokens,
+            delta=delta,
         )
 
-    def get_usage(self) -> dict:
+    def get_usage(self) -> dict[str, int]:
         """Get current usage stats.
 
         Returns:
             dict with tokens_used, tokens_limit, concurrent, concurrent_limit.
         """
-        token_key = self._token_key()
+        # One round-trip; "now" is the Redis clock, as in the scripts
+        pipe = self._redis.pipeline(transaction=False)
+        pipe.time()
+        pipe.hmget(self._TOKEN_KEY, ["tokens", "ts"])
+        pipe.zrange(self._LEASES_KEY, 0, -1, withscores=True)
+        (seconds, microseconds), (tokens, ts), leases = pipe.execute()
+        now = seconds + microseconds / 1_000_000
+
+        available: float = self._max_tokens
+        if tokens is not None:
+            elapsed = max(0.0, now - float(ts or now))
+            available = min(self._max_tokens, float(tokens) + elapsed * self._refill_rate)
         return {
-            "tokens_used": int(self._redis.get(token_key) or 0),
+            "tokens_used": max(0, round(self._max_tokens - available)),
             "tokens_limit": self._max_tokens,
-            "concurrent": int(self._redis.get(self._CONCURRENT_KEY) or 0),
+            "concurrent": sum(1 for _, expires_at in leases if expires_at > now),
             "concurrent_limit": self._max_concurrent,
         }
 
@@ -262,6 +262,7 @@ class IMAPClient:
 
         # Extract body and attachments
         body_text = ""
+        has_plain_body = False
         attachments: list[Attachment] = []
 
         if msg.is_multipart():
@@ -271,8 +272,10 @@ class IMAPClient:
 
                 # Extract text body (prefer text/plain, fallback to text/html)
                 if content_type == "text/plain" and "attachment" not in content_disposition:
-                    body_text = self._get_text_from_part(part)
-                    break  # Prefer text/plain
+                    if not has_plain_body:
+                        body_text = self._get_text_from_part(part)
+                        has_plain_body = True
+                    continue  # Attachments may follow the body
 
                 if (
                     content_type == "text/html"
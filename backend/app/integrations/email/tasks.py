@@ -22,6 +22,7 @@ from jinja2 import Environment, FileSystemLoader
 from sqlalchemy import delete, select
 from sqlalchemy.exc import IntegrityError
 
+from app.core import feature_flags
 from app.core.celery_app import celery_app
 from app.core.config import get_settings
 from app.core.database import AsyncSessionLocal
@@ -183,7 +184,7 @@ async def _poll_inbox_async(settings: object) -> dict[str, object]:
     imap_port = int(settings.IMAP_PORT)  # type: ignore[attr-defined]
     imap_user = str(settings.IMAP_USER)  # type: ignore[attr-defined]
     imap_password = str(settings.IMAP_PASSWORD)  # type: ignore[attr-defined]
-    orchestration_enabled = getattr(settings, "ORCHESTRATION_ENABLED", False)
+    orchestration_enabled = feature_flags.is_enabled("ORCHESTRATION_ENABLED")
 
     processed_count = 0
     skipped_count = 0
@@ -2,10 +2,14 @@
 
 from .exporter import ExcelExporter
 from .parser import BOMItem, ExcelParser, PriceItem
+from .streaming import StreamingXlsxWriter, XlsxColumn, iter_query_rows
 
 __all__ = [
     "ExcelParser",
     "ExcelExporter",
     "BOMItem",
     "PriceItem",
+    "StreamingXlsxWriter",
+    "XlsxColumn",
+    "iter_query_rows",
 ]
@@ -1,79 +1,64 @@
 """Excel exporter for generating XLSX files."""
 
 import asyncio
-from datetime import datetime
+from collections.abc import AsyncIterable, AsyncIterator, Iterable, Iterator, Sequence
 from decimal import Decimal
-from io import BytesIO
-from pathlib import Path
 from typing import Any
 
 import structlog
-from openpyxl import Workbook
-from openpyxl.styles import Alignment, Font, PatternFill
-from openpyxl.utils import get_column_letter
-from openpyxl.worksheet.worksheet import Worksheet
+
+from .streaming import StreamingXlsxWriter, XlsxColumn, _aiter_rows
 
 logger = structlog.get_logger(__name__)
 
+ORDER_COLUMNS = [
+    XlsxColumn("Číslo"),
+    XlsxColumn("Zákazník"),
+    XlsxColumn("Název"),
+    XlsxColumn("Datum vytvoření"),
+    XlsxColumn("Termín dodání"),
+    XlsxColumn("Celková částka", currency=True),
+    XlsxColumn("Stav"),
+]
+
+CALCULATION_COLUMNS = [
+    XlsxColumn("Kalkulace ID"),
+    XlsxColumn("Zakázka"),
+    XlsxColumn("Datum"),
+    XlsxColumn("Položka"),
+    XlsxColumn("Množství"),
+    XlsxColumn("Jednotka"),
+    XlsxColumn("Cena/jednotku", currency=True),
+    XlsxColumn("Celkem", currency=True),
+]
+
+MATERIAL_REQUIREMENT_COLUMNS = [
+    XlsxColumn("Materiál"),
+    XlsxColumn("Třída materiálu"),
+    XlsxColumn("Celkové množství"),
+    XlsxColumn("Jednotka"),
+    XlsxColumn("Cena/jednotku (Kč)", currency=True),
+    XlsxColumn("Celková cena (Kč)", currency=True),
+    XlsxColumn("Zakázky"),
+    XlsxColumn("Dodavatel"),
+]
+
+# Header keywords that mark a generic column as currency
+CURRENCY_KEYWORDS = ("cena", "castka", "price", "amount", "celkem", "total")
+
 
 class ExcelExporter:
-    """Exports data to XLSX files."""
+    """Exports data to XLSX files.
+
+    All exports go through StreamingXlsxWriter, so rows are serialized as they
+    are produced and no in-memory workbook is built. File exports of in-memory
+    rows compress and write in a worker thread, off the event loop.
+    """
 
     def __init__(self) -> None:
         """Initialize exporter."""
         self.logger = logger.bind(component="excel_exporter")
 
-    def _style_header_row(self, ws: Worksheet, headers: list[str]) -> None:
-        """Apply styling to header row.
-
-        Args:
-            ws: Worksheet to style
-            headers: List of header names
-        """
-        header_font = Font(bold=True, color="FFFFFF")
-        header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-        header_alignment = Alignment(horizontal="center", vertical="center")
-
-        for col_idx, _ in enumerate(headers, start=1):
-            cell = ws.cell(row=1, column=col_idx)
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = header_alignment
-
-    def _auto_adjust_columns(self, ws: Worksheet) -> None:
-        """Auto-adjust column widths based on content.
-
-        Args:
-            ws: Worksheet to adjust
-        """
-        for column_cells in ws.columns:
-            max_length = 0
-            column_letter = get_column_letter(column_cells[0].column)
-
-            for cell in column_cells:
-                try:
-                    cell_value = str(cell.value) if cell.value is not None else ""
-                    max_length = max(max_length, len(cell_value))
-                except Exception:
-                    logger.warning("column_width_calc_failed", column=column_letter)
-
-            # Set column width with min/max bounds
-            adjusted_width = min(max(max_length + 2, 10), 50)
-            ws.column_dimensions[column_letter].width = adjusted_width
-
-    def _format_currency(self, ws: Worksheet, col_indices: list[int]) -> None:
-        """Format currency columns.
-
-        Args:
-            ws: Worksheet to format
-            col_indices: List of column indices (1-based) to format as currency
-        """
-        for col_idx in col_indices:
-            for row in range(2, ws.max_row + 1):  # Skip header row
-                cell = ws.cell(row=row, column=col_idx)
-                if isinstance(cell.value, int | float):
-                    cell.number_format = '#,##0.00 "Kč"'
-
     async def export_orders(self, orders: list[dict[str, Any]], output_path: str) -> str:
         """Export orders to XLSX with formatted table.
 
@@ -92,63 +77,23 @@ class ExcelExporter:
         if not orders:
             raise ValueError("Orders list is empty")
 
-        def _export() -> str:
-            wb = Workbook()
-            ws = wb.active
-            if ws is None:
-                raise ValueError("No active worksheet")
-
-            ws.title = "Zakázky"
-
-            # Define columns
-            headers = [
-                "Číslo",
-                "Zákazník",
-                "Název",
-                "Datum vytvoření",
-                "Termín dodání",
-                "Celková částka",
-                "Stav",
+        rows = (
+            [
+                order.get("cislo", ""),
+                order.get("zakaznik", ""),
+                order.get("nazev", ""),
+                order.get("datum_vytvoreni", ""),
+                order.get("termin_dodani", ""),
+                order.get("celkova_castka", 0),
+                order.get("stav", ""),
             ]
+            for order in orders
+        )
+        writer = StreamingXlsxWriter(ORDER_COLUMNS, "Zakázky")
+        await asyncio.to_thread(writer.write_file, output_path, rows)
 
-            # Write header
-            ws.append(headers)
-            self._style_header_row(ws, headers)
-
-            # Write data rows
-            for order in orders:
-                row = [
-                    order.get("cislo", ""),
-                    order.get("zakaznik", ""),
-                    order.get("nazev", ""),
-                    order.get("datum_vytvoreni", ""),
-                    order.get("termin_dodani", ""),
-                    order.get("celkova_castka", 0),
-                    order.get("stav", ""),
-                ]
-                ws.append(row)
-
-            # Format currency column (Celková částka is column 6)
-            self._format_currency(ws, [6])
-
-            # Auto-adjust columns
-            self._auto_adjust_columns(ws)
-
-            # Freeze header row
-            ws.freeze_panes = "A2"
-
-            # Save workbook
-            output = Path(output_path)
-            output.parent.mkdir(parents=True, exist_ok=True)
-            wb.save(output_path)
-            wb.close()
-
-            return output_path
-
-        # Run in thread executor to avoid blocking
-        result = await asyncio.to_thread(_export)
-        self.logger.info("orders_exported", output_path=result)
-        return result
+        self.logger.info("orders_exported", output_path=output_path)
+        return output_path
 
     async def export_calculations(
         self, calculations: list[dict[str, Any]], output_path: str
@@ -174,31 +119,7 @@ class ExcelExporter:
         if not calculations:
             raise ValueError("Calculations list is empty")
 
-        def _export() -> str:
-            wb = Workbook()
-            ws = wb.active
-            if ws is None:
-                raise ValueError("No active worksheet")
-
-            ws.title = "Kalkulace"
-
-            # Define columns
-            headers = [
-                "Kalkulace ID",
-                "Zakázka",
-                "Datum",
-                "Položka",
-                "Množství",
-                "Jednotka",
-                "Cena/jednotku",
-                "Celkem",
-            ]
-
-            # Write header
-            ws.append(headers)
-            self._style_header_row(ws, headers)
-
-            # Write data rows
+        def _rows() -> Iterator[list[Any]]:
             for calc in calculations:
                 calc_id = calc.get("id", "")
                 zakazka = calc.get("zakazka", "")
@@ -207,44 +128,26 @@ class ExcelExporter:
 
                 if not items:
                     # No items, write basic info
-                    row = [calc_id, zakazka, datum, "", "", "", "", 0]
-                    ws.append(row)
-                else:
-                    # Write each item
-                    for item in items:
-                        row = [
-                            calc_id,
-                            zakazka,
-                            datum,
-                            item.get("nazev", ""),
-                            item.get("mnozstvi", 0),
-                            item.get("jednotka", ""),
-                            item.get("cena_za_jednotku", 0),
-                            item.get("celkem", 0),
-                        ]
-                        ws.append(row)
-
-            # Format currency columns (Cena/jednotku=7, Celkem=8)
-            self._format_currency(ws, [7, 8])
-
-            # Auto-adjust columns
-            self._auto_adjust_columns(ws)
-
-            # Freeze header row
-            ws.freeze_panes = "A2"
-
-            # Save workbook
-            output = Path(output_path)
-            output.parent.mkdir(parents=True, exist_ok=True)
-            wb.save(output_path)
-            wb.close()
-
-            return output_path
-
-        # Run in thread executor to avoid blocking
-        result = await asyncio.to_thread(_export)
-        self.logger.info("calculations_exported", output_path=result)
-        return result
+                    yield [calc_id, zakazka, datum, "", "", "", "", 0]
+                    continue
+
+                for item in items:
+                    yield [
+                        calc_id,
+                        zakazka,
+                        datum,
+                        item.get("nazev", ""),
+                        item.get("mnozstvi", 0),
+                        item.get("jednotka", ""),
+                        item.get("cena_za_jednotku", 0),
+                        item.get("celkem", 0),
+                    ]
+
+        writer = StreamingXlsxWriter(CALCULATION_COLUMNS, "Kalkulace")
+        await asyncio.to_thread(writer.write_file, output_path, _rows())
+
+        self.logger.info("calculations_exported", output_path=output_path)
+        return output_path
 
     async def export_generic(
         self,
@@ -275,61 +178,69 @@ class ExcelExporter:
         if not data:
             raise ValueError("Data list is empty")
 
-        def _export() -> str:
-            wb = Workbook()
-            ws = wb.active
-            if ws is None:
-                raise ValueError("No active worksheet")
-
-            ws.title = sheet_name
-
-            # Get all unique keys from all dictionaries
-            headers = list(dict.fromkeys(key for row in data for key in row.keys()))
-
-            # Write header
-            ws.append(headers)
-            self._style_header_row(ws, headers)
-
-            # Write data rows
-            for row_data in data:
-                row = [row_data.get(header) for header in headers]
-                ws.append(row)
-
-            # Detect and format currency columns
-            currency_cols: list[int] = []
-            for col_idx, header in enumerate(headers, start=1):
-                header_lower = header.lower()
-                if any(
-                    keyword in header_lower
-                    for keyword in ["cena", "castka", "price", "amount", "celkem", "total"]
-                ):
-                    currency_cols.append(col_idx)
+        # Get all unique keys from all dictionaries
+        headers = list(dict.fromkeys(key for row in data for key in row.keys()))
+        columns = [
+            XlsxColumn(
+                header,
+                currency=any(keyword in header.lower() for keyword in CURRENCY_KEYWORDS),
+            )
+            for header in headers
+        ]
 
-            if currency_cols:
-                self._format_currency(ws, currency_cols)
+        rows = ([row_data.get(header) for header in headers] for row_data in data)
+        writer = StreamingXlsxWriter(columns, sheet_name)
+        await asyncio.to_thread(writer.write_file, output_path, rows)
 
-            # Auto-adjust columns
-            self._auto_adjust_columns(ws)
+        self.logger.info("generic_exported", output_path=output_path)
+        return output_path
 
-            # Freeze header row
-            ws.freeze_panes = "A2"
-
-            # Add metadata
-            wb.properties.creator = "inferbox"
-            wb.properties.created = datetime.now()
+    def stream_material_requirements(
+        self,
+        items: AsyncIterable[dict[str, Any]] | Iterable[dict[str, Any]],
+        total_estimated_cost: Decimal | None = None,
+        order_count: int = 0,
+    ) -> AsyncIterator[bytes]:
+        """Stream aggregated material requirements as XLSX chunks (BOM / nákupní seznam).
 
-            # Save workbook
-            output = Path(output_path)
-            output.parent.mkdir(parents=True, exist_ok=True)
-            wb.save(output_path)
-            wb.close()
+        Args:
+            items: MaterialRequirementItem dictionaries with keys:
+                   material_name, material_grade, total_quantity, unit,
+                   estimated_unit_price, total_price, order_numbers, supplier
+            total_estimated_cost: Total estimated cost across all materials;
+                   summed from the items while streaming if None
+            order_count: Number of orders included in the report
 
-            return output_path
+        Returns:
+            Async iterator of XLSX file chunks
+        """
+        self.logger.info(
+            "exporting_material_requirements",
+            total_cost=str(total_estimated_cost) if total_estimated_cost else "N/A",
+            order_count=order_count,
+        )
 
-        # Run in thread executor to avoid blocking
-        result = await asyncio.to_thread(_export)
-        self.logger.info("generic_exported", output_path=result)
-        return result
+        streamed_total = Decimal("0")
+
+        async def rows() -> AsyncIterator[list[Any]]:
+            nonlocal streamed_total
+            async for item in _aiter_rows(items):
+                streamed_total += Decimal(str(item.get("total_price") or 0))
+                yield _material_requirement_row(item)
+
+        def footer() -> list[Sequence[Any]]:
+            # Without a precomputed total, the total is summed while the rows stream
+            total = total_estimated_cost if total_estimated_cost is not None else streamed_total
+            if not total:
+                return []
+            return [[f"Celkem ({order_count} zakázek)", "", "", "", "", float(total), "", ""]]
+
+        writer = StreamingXlsxWriter(
+            MATERIAL_REQUIREMENT_COLUMNS,
+            "Materiálová potřeba",
+            title="Materiálová potřeba (BOM)",
+        )
+        return writer.stream(rows(), footer_rows=footer)
 
     async def export_material_requirements(
         self,
@@ -340,105 +251,34 @@ class ExcelExporter:
         """Export aggregated material requirements to Excel (BOM / nákupní seznam).
 
         Args:
-            items: List of MaterialRequirementItem dictionaries with keys:
-                   material_name, material_grade, total_quantity, unit,
-                   estimated_unit_price, total_price, order_numbers, supplier
+            items: List of MaterialRequirementItem dictionaries (see
+                   stream_material_requirements)
             total_estimated_cost: Total estimated cost across all materials
             order_count: Number of orders included in the report
 
         Returns:
             Excel file as bytes (.xlsx)
         """
-        self.logger.info(
-            "exporting_material_requirements",
-            count=len(items),
-            total_cost=str(total_estimated_cost) if total_estimated_cost else "N/A",
-            order_count=order_count,
-        )
-
-        def _export() -> bytes:
-            wb = Workbook()
-            ws = wb.active
-            if ws is None:
-                raise ValueError("No active worksheet")
-
-            ws.title = "Materiálová potřeba"
-
-            # Define columns
-            headers = [
-                "Materiál",
-                "Třída materiálu",
-                "Celkové množství",
-                "Jednotka",
-                "Cena/jednotku (Kč)",
-                "Celková cena (Kč)",
-                "Zakázky",
-                "Dodavatel",
-            ]
-
-            # Write header
-            ws.append(headers)
-            self._style_header_row(ws, headers)
-
-            # Write data rows
-            for item in items:
-                order_numbers_str = ", ".join(item.get("order_numbers", []))
-                row = [
-                    item.get("material_name", ""),
-                    item.get("material_grade") or "",
-                    float(item.get("total_quantity", 0)),
-                    item.get("unit", ""),
-                    float(item.get("estimated_unit_price") or 0),
-                    float(item.get("total_price") or 0),
-                    order_numbers_str,
-                    item.get("supplier") or "",
-                ]
-                ws.append(row)
-
-            # Add summary row if total cost is available
-            if total_estimated_cost:
-                ws.append([])  # Empty row
-                summary_row = [
-                    f"Celkem ({order_count} zakázek)",
-                    "",
-                    "",
-                    "",
-                    "",
-                    float(total_estimated_cost),
-                    "",
-                    "",
-                ]
-                ws.append(summary_row)
-
-                # Bold summary row
-                summary_row_idx = ws.max_row
-                for col_idx in range(1, 9):
-                    cell = ws.cell(row=summary_row_idx, column=col_idx)
-                    cell.font = Font(bold=True)
-
-            # Format currency columns (Cena/jednotku=5, Celková cena=6)
-            self._format_currency(ws, [5, 6])
-
-            # Auto-adjust columns
-            self._auto_adjust_columns(ws)
-
-            # Freeze header row
-            ws.freeze_panes = "A2"
-
-            # Add metadata
-            wb.properties.creator = "inferbox"
-            wb.properties.created = datetime.now()
-            wb.properties.title = "Materiálová potřeba (BOM)"
-
-            # Save to BytesIO instead of file
-            output = BytesIO()
-            wb.save(output)
-            wb.close()
-
-            output.seek(0)
-            return output.read()
-
-        # Run in thread executor to avoid blocking
-        result = await asyncio.to_thread(_export)
+        chunks = [
+            chunk
+            async for chunk in self.stream_material_requirements(
+                items, total_estimated_cost, order_count
+            )
+        ]
+        result = b"".join(chunks)
         self.logger.info("material_requirements_exported", size_bytes=len(result))
         return result
+
+
+def _material_requirement_row(item: dict[str, Any]) -> list[Any]:
+    """Map a material requirement dict to a sheet row."""
+    return [
+        item.get("material_name", ""),
+        item.get("material_grade") or "",
+        float(item.get("total_quantity", 0)),
+        item.get("unit", ""),
+        float(item.get("estimated_unit_price") or 0),
+        float(item.get("total_price") or 0),
+        ", ".join(item.get("order_numbers", [])),
+        item.get("supplier") or "",
+    ]
@@ -0,0 +1,525 @@
+"""Write-only streaming XLSX writer.
+
+Builds the XLSX package (a ZIP of XML parts) directly instead of going through
+an in-memory openpyxl workbook:
+
+- rows are consumed from an (async) iterator, e.g. a server-side DB cursor,
+  and serialized chunk by chunk,
+- the ZIP is written to an unseekable sink, so compressed bytes can be sent to
+  the client while later rows are still being produced,
+- column widths are computed from a sample of the first rows and styles are
+  assigned per column, so nothing walks the finished sheet again,
+- strings are stored inline (no shared-strings table to keep in memory).
+
+Memory use is bounded by the width sample and one chunk of rows, regardless of
+how many rows are exported.
+"""
+
+from __future__ import annotations
+
+import math
+import zipfile
+from collections.abc import (
+    AsyncIterable,
+    AsyncIterator,
+    Callable,
+    Iterable,
+    Iterator,
+    Sequence,
+)
+from dataclasses import dataclass
+from datetime import date, datetime, time
+from decimal import Decimal
+from enum import Enum
+from pathlib import Path
+from typing import IO, Any, TypeVar, cast
+from xml.sax.saxutils import escape
+
+import structlog
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+from openpyxl.utils import get_column_letter
+from openpyxl.utils.datetime import to_excel
+from sqlalchemy import Select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = structlog.get_logger(__name__)
+
+_T = TypeVar("_T")
+
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+CURRENCY_FORMAT = '#,##0.00 "Kč"'
+
+# Cell style ids (indexes into cellXfs of _STYLES_XML)
+STYLE_DEFAULT = 0
+STYLE_HEADER = 1
+STYLE_CURRENCY = 2
+STYLE_BOLD = 3
+STYLE_BOLD_CURRENCY = 4
+STYLE_DATE = 5
+STYLE_DATETIME = 6
+
+# Column width bounds (characters), same as the in-memory exporter used
+MIN_COLUMN_WIDTH = 10
+MAX_COLUMN_WIDTH = 50
+
+_CONTENT_TYPES_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '<Override PartName="/docProps/core.xml" '
+    'ContentType="application/vnd.openxmlformats-package.core-properties+xml"/>'
+    '</Types>'
+)
+
+_ROOT_RELS_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '<Relationship Id="rId2" '
+    'Type="http://schemas.openxmlformats.org/package/2006/relationships/metadata/core-properties" '
+    'Target="docProps/core.xml"/>'
+    '</Relationships>'
+)
+
+_WORKBOOK_RELS_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    'Target="styles.xml"/>'
+    '</Relationships>'
+)
+
+_STYLES_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<numFmts count="1"><numFmt numFmtId="164" formatCode="#,##0.00 &quot;Kč&quot;"/></numFmts>'
+    '<fonts count="3">'
+    '<font><sz val="11"/><name val="Calibri"/><family val="2"/></font>'
+    '<font><b/><sz val="11"/><color rgb="FFFFFFFF"/><name val="Calibri"/><family val="2"/></font>'
+    '<font><b/><sz val="11"/><name val="Calibri"/><family val="2"/></font>'
+    '</fonts>'
+    '<fills count="3">'
+    '<fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill>'
+    '<fill><patternFill patternType="solid"><fgColor rgb="FF366092"/><bgColor rgb="FF366092"/></patternFill></fill>'
+    '</fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="7">'
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="0" fontId="1" fillId="2" borderId="0" xfId="0" applyFont="1" applyFill="1" '
+    'applyAlignment="1"><alignment horizontal="center" vertical="center"/></xf>'
+    '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="0" fontId="2" fillId="0" borderId="0" xfId="0" applyFont="1"/>'
+    '<xf numFmtId="164" fontId="2" fillId="0" borderId="0" xfId="0" applyFont="1" applyNumberFormat="1"/>'
+    '<xf numFmtId="14" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="22" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '</cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+
+
+FooterRows = Sequence[Sequence[Any]] | Callable[[], Sequence[Sequence[Any]]]
+
+
+@dataclass(frozen=True)
+class XlsxColumn:
+    """A worksheet column.
+
+    Args:
+        header: Header cell text.
+        currency: Format numeric cells of this column as CZK.
+        width: Fixed width in characters; computed from the row sample if None.
+    """
+
+    header: str
+    currency: bool = False
+    width: float | None = None
+
+
+class _ChunkSink:
+    """Unseekable file object collecting ZIP output until it is drained."""
+
+    def __init__(self) -> None:
+        self._chunks: list[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _attr(value: str) -> str:
+    return escape(value, {'"': "&quot;"})
+
+
+def _cell_xml(ref: str, value: Any, style: int) -> str:
+    """Serialize one cell; returns an empty string for empty values."""
+    if value is None or value == "":
+        return ""
+    if isinstance(value, Enum):
+        value = value.value
+    if isinstance(value, bool):
+        return f'<c r="{ref}" t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, float | Decimal) and not math.isfinite(value):
+        # NaN/Infinity are not valid numeric cell values; leave the cell empty
+        return ""
+    if isinstance(value, int | float | Decimal):
+        s = f' s="{style}"' if style else ""
+        return f'<c r="{ref}"{s}><v>{value}</v></c>'
+    if isinstance(value, datetime | date | time):
+        if style in (STYLE_DEFAULT, STYLE_CURRENCY):
+            style = STYLE_DATE if type(value) is date else STYLE_DATETIME
+        if isinstance(value, datetime) and value.tzinfo is not None:
+            value = value.replace(tzinfo=None)
+        return f'<c r="{ref}" s="{style}"><v>{to_excel(value)}</v></c>'
+
+    text = ILLEGAL_CHARACTERS_RE.sub("", str(value))
+    # Currency styling only applies to numbers; text cells keep the row style
+    s = f' s="{style}"' if style not in (STYLE_DEFAULT, STYLE_CURRENCY) else ""
+    return f'<c r="{ref}"{s} t="inlineStr"><is><t xml:space="preserve">{escape(text)}</t></is></c>'
+
+
+async def _aiter_rows(rows: AsyncIterable[_T] | Iterable[_T]) -> AsyncIterator[_T]:
+    """Iterate sync and async iterables alike."""
+    if isinstance(rows, AsyncIterable):
+        async for row in rows:
+            yield row
+    else:
+        for row in rows:
+            yield row
+
+
+async def iter_query_rows(
+    session: AsyncSession,
+    statement: Select[Any],
+    batch_size: int = 1000,
+) -> AsyncIterator[Sequence[Any]]:
+    """Yield result rows from a server-side cursor, ``batch_size`` at a time.
+
+    Args:
+        session: Database session.
+        statement: Column-projected select; each result row becomes a sheet row.
+        batch_size: Rows fetched per round-trip.
+    """
+    result = await session.stream(statement.execution_options(yield_per=batch_size))
+    async for partition in result.partitions():
+        for row in partition:
+            yield tuple(row)
+
+
+class StreamingXlsxWriter:
+    """Streams a single-sheet XLSX file from an iterator of rows.
+
+    Args:
+        columns: Sheet columns, in row order.
+        sheet_name: Worksheet title (max 31 characters).
+        title: Document title stored in the core properties.
+        creator: Document creator stored in the core properties.
+        width_sample_rows: Number of leading rows used to size the columns.
+        rows_per_chunk: Rows serialized and compressed per output chunk.
+    """
+
+    def __init__(
+        self,
+        columns: Sequence[XlsxColumn],
+        sheet_name: str = "Data",
+        *,
+        title: str | None = None,
+        creator: str = "inferbox",
+        width_sample_rows: int = 100,
+        rows_per_chunk: int = 1000,
+    ) -> None:
+        if not columns:
+            raise ValueError("At least one column is required")
+        self.columns = list(columns)
+        self.sheet_name = sheet_name[:31]
+        self.title = title
+        self.creator = creator
+        self.width_sample_rows = width_sample_rows
+        self.rows_per_chunk = rows_per_chunk
+        self.row_count = 0
+
+        self._letters = [get_column_letter(i) for i in range(1, len(self.columns) + 1)]
+        self._column_styles = [
+            STYLE_CURRENCY if column.currency else STYLE_DEFAULT for column in self.columns
+        ]
+
+    async def stream(
+        self,
+        rows: AsyncIterable[Sequence[Any]] | Iterable[Sequence[Any]],
+        footer_rows: FooterRows = (),
+    ) -> AsyncIterator[bytes]:
+        """Yield the XLSX file as compressed chunks.
+
+        Args:
+            rows: Data rows (sequences aligned with ``columns``).
+            footer_rows: Rows appended in bold after the data (e.g. totals), or
+                a callable returning them once all data rows were consumed
+                (totals accumulated while streaming).
+        """
+        package = _SheetPackage(self)
+        yield package.open()
+        async for row in _aiter_rows(rows):
+            chunk = package.add_row(row)
+            if chunk:
+                yield chunk
+        yield package.close(footer_rows)
+
+    def iter_chunks(
+        self,
+        rows: Iterable[Sequence[Any]],
+        footer_rows: FooterRows = (),
+    ) -> Iterator[bytes]:
+        """Synchronous ``stream`` for rows that are already in memory.
+
+        Compression is CPU-bound; async callers run this in a worker thread
+        (see ``write_file``) instead of on the event loop.
+        """
+        package = _SheetPackage(self)
+        yield package.open()
+        for row in rows:
+            chunk = package.add_row(row)
+            if chunk:
+                yield chunk
+        yield package.close(footer_rows)
+
+    async def write_to(
+        self,
+        output_path: str | Path,
+        rows: AsyncIterable[Sequence[Any]] | Iterable[Sequence[Any]],
+        footer_rows: FooterRows = (),
+    ) -> int:
+        """Stream the XLSX file to disk, creating parent directories.
+
+        Returns:
+            Number of bytes written.
+        """
+        output = Path(output_path)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        size = 0
+        with output.open("wb") as fh:
+            async for chunk in self.stream(rows, footer_rows):
+                fh.write(chunk)
+                size += len(chunk)
+        return size
+
+    def write_file(
+        self,
+        output_path: str | Path,
+        rows: Iterable[Sequence[Any]],
+        footer_rows: FooterRows = (),
+    ) -> int:
+        """Blocking ``write_to`` for in-memory rows (use from a worker thread).
+
+        Returns:
+            Number of bytes written.
+        """
+        output = Path(output_path)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        size = 0
+        with output.open("wb") as fh:
+            for chunk in self.iter_chunks(rows, footer_rows):
+                fh.write(chunk)
+                size += len(chunk)
+        return size
+
+    async def to_bytes(
+        self,
+        rows: AsyncIterable[Sequence[Any]] | Iterable[Sequence[Any]],
+        footer_rows: FooterRows = (),
+    ) -> bytes:
+        """Collect the whole XLSX file in memory (small exports only)."""
+        return b"".join([chunk async for chunk in self.stream(rows, footer_rows)])
+
+    def _row_xml(
+        self,
+        row_idx: int,
+        values: Sequence[Any],
+        *,
+        header: bool = False,
+        bold: bool = False,
+    ) -> bytes:
+        parts = [f'<row r="{row_idx}">']
+        for col_idx, value in enumerate(values[: len(self.columns)]):
+            if header:
+                style = STYLE_HEADER
+            elif bold:
+                style = (
+                    STYLE_BOLD_CURRENCY
+                    if self._column_styles[col_idx] == STYLE_CURRENCY
+                    else STYLE_BOLD
+                )
+            else:
+                style = self._column_styles[col_idx]
+            parts.append(_cell_xml(f"{self._letters[col_idx]}{row_idx}", value, style))
+        parts.append("</row>")
+        return "".join(parts).encode()
+
+    def _column_widths(self, sample: Sequence[Sequence[Any]]) -> list[float]:
+        widths: list[float] = []
+        for col_idx, column in enumerate(self.columns):
+            if column.width is not None:
+                widths.append(column.width)
+                continue
+            max_length = len(column.header)
+            for row in sample:
+                if col_idx < len(row) and row[col_idx] is not None:
+                    max_length = max(max_length, len(str(row[col_idx])))
+            widths.append(min(max(max_length + 2, MIN_COLUMN_WIDTH), MAX_COLUMN_WIDTH))
+        return widths
+
+    def _sheet_head_xml(self, sample: Sequence[Sequence[Any]]) -> str:
+        cols = "".join(
+            f'<col min="{i}" max="{i}" width="{width}" customWidth="1"'
+            + (f' style="{style}"' if style else "")
+            + "/>"
+            for i, (width, style) in enumerate(
+                zip(self._column_widths(sample), self._column_styles, strict=True), start=1
+            )
+        )
+        return (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            '<sheetViews><sheetView workbookViewId="0">'
+            '<pane ySplit="1" topLeftCell="A2" activePane="bottomLeft" state="frozen"/>'
+            '<selection pane="bottomLeft" activeCell="A2" sqref="A2"/>'
+            '</sheetView></sheetViews>'
+            '<sheetFormatPr defaultRowHeight="15"/>'
+            f"<cols>{cols}</cols>"
+            "<sheetData>"
+        )
+
+    def _workbook_xml(self) -> str:
+        return (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            f'<sheets><sheet name="{_attr(self.sheet_name)}" sheetId="1" r:id="rId1"/></sheets>'
+            "</workbook>"
+        )
+
+    def _core_xml(self) -> str:
+        now = datetime.now().strftime("%Y-%m-%dT%H:%M:%SZ")
+        title = f"<dc:title>{escape(self.title)}</dc:title>" if self.title else ""
+        return (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<cp:coreProperties '
+            'xmlns:cp="http://schemas.openxmlformats.org/package/2006/metadata/core-properties" '
+            'xmlns:dc="http://purl.org/dc/elements/1.1/" '
+            'xmlns:dcterms="http://purl.org/dc/terms/" '
+            'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance">'
+            f"{title}<dc:creator>{escape(self.creator)}</dc:creator>"
+            f'<dcterms:created xsi:type="dcterms:W3CDTF">{now}</dcterms:created>'
+            f'<dcterms:modified xsi:type="dcterms:W3CDTF">{now}</dcterms:modified>'
+            "</cp:coreProperties>"
+        )
+
+
+class _SheetPackage:
+    """One XLSX file being written by a StreamingXlsxWriter.
+
+    Rows are pushed in one at a time, so the same serialization serves both
+    the async ``stream`` and the synchronous ``iter_chunks``. Each call
+    returns the compressed bytes that became available (possibly empty).
+    """
+
+    def __init__(self, writer: StreamingXlsxWriter) -> None:
+        self._writer = writer
+        self._sink = _ChunkSink()
+        # ZipFile only needs write/flush from an unseekable sink
+        self._archive = zipfile.ZipFile(
+            cast(IO[bytes], self._sink), "w", compression=zipfile.ZIP_DEFLATED
+        )
+        self._sheet: IO[bytes] | None = None
+        self._sample: list[Sequence[Any]] = []
+        self._buffer: list[bytes] = []
+        self._row_idx = 1
+
+    def open(self) -> bytes:
+        """Write the static package parts."""
+        writer = self._writer
+        writer.row_count = 0
+        self._archive.writestr("[Content_Types].xml", _CONTENT_TYPES_XML)
+        self._archive.writestr("_rels/.rels", _ROOT_RELS_XML)
+        self._archive.writestr("docProps/core.xml", writer._core_xml())
+        self._archive.writestr("xl/workbook.xml", writer._workbook_xml())
+        self._archive.writestr("xl/_rels/workbook.xml.rels", _WORKBOOK_RELS_XML)
+        self._archive.writestr("xl/styles.xml", _STYLES_XML)
+        return self._sink.drain()
+
+    def add_row(self, row: Sequence[Any]) -> bytes:
+        """Add a data row; rows are held back until the width sample is full."""
+        if self._sheet is None:
+            self._sample.append(row)
+            if len(self._sample) >= self._writer.width_sample_rows:
+                self._open_sheet()
+            return b""
+
+        self._row_idx += 1
+        self._buffer.append(self._writer._row_xml(self._row_idx, row))
+        if len(self._buffer) < self._writer.rows_per_chunk:
+            return b""
+        self._sheet.write(b"".join(self._buffer))
+        self._buffer.clear()
+        return self._sink.drain()
+
+    def close(self, footer_rows: FooterRows) -> bytes:
+        """Write the footer, finish the sheet and the ZIP directory."""
+        if self._sheet is None:
+            self._open_sheet()
+        assert self._sheet is not None
+        writer = self._writer
+
+        writer.row_count = self._row_idx - 1
+        if callable(footer_rows):
+            footer_rows = footer_rows()
+        if footer_rows:
+            self._row_idx += 1  # blank separator row
+            for footer in footer_rows:
+                self._row_idx += 1
+                self._buffer.append(writer._row_xml(self._row_idx, footer, bold=True))
+        self._sheet.write(b"".join(self._buffer))
+        self._sheet.write(b"</sheetData></worksheet>")
+        self._sheet.close()
+        self._archive.close()
+
+        logger.info("xlsx_streamed", sheet=writer.sheet_name, rows=writer.row_count)
+        return self._sink.drain()
+
+    def _open_sheet(self) -> None:
+        """Start the worksheet part, sized from the row sample."""
+        writer = self._writer
+        sheet = self._archive.open("xl/worksheets/sheet1.xml", "w")
+        sheet.write(writer._sheet_head_xml(self._sample).encode())
+        sheet.write(
+            writer._row_xml(self._row_idx, [c.header for c in writer.columns], header=True)
+        )
+        for row in self._sample:
+            self._row_idx += 1
+            self._buffer.append(writer._row_xml(self._row_idx, row))
+        self._sample.clear()
+        self._sheet = sheet
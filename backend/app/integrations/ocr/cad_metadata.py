@@ -4,15 +4,38 @@ Extracts metadata from technical drawing files commonly used in manufacturing.
 Supports DXF (AutoCAD Exchange Format) and STEP (ISO 10303) formats.
 """
 
+import contextlib
+import mmap
 import re
+import time
+from collections.abc import Iterator
 from dataclasses import dataclass, field
 from pathlib import Path
 
 import ezdxf
 import structlog
+from ezdxf.filemanagement import dxf_file_info
+from ezdxf.lldxf.tagger import ascii_tags_loader
+from ezdxf.lldxf.types import DXFTag
+from ezdxf.lldxf.validator import is_binary_dxf_file
+
+from app.core.config import get_settings
 
 logger = structlog.get_logger(__name__)
 
+# Single-pass STEP scanner: one alternation finds every entity of interest,
+# then a keyword-specific pattern is anchored at the opening parenthesis
+_STEP_ENTITY_PATTERN = re.compile(
+    rb"(APPLICATION_PROTOCOL_DEFINITION|MATERIAL_DESIGNATION|FILE_SCHEMA|PRODUCT)\s*\(",
+    re.IGNORECASE,
+)
+_STEP_PRODUCT_ARGS = re.compile(rb"\s*'([^']*)',\s*'([^']*)',\s*'([^']*)'")
+_STEP_SECOND_STRING_ARG = re.compile(rb"[^,]*,\s*'([^']*)'")
+_STEP_SCHEMA_ARG = re.compile(rb"\s*\(\s*'([^']*)'")
+
+# How often (in records) the streaming reader checks the time budget
+_BUDGET_CHECK_INTERVAL = 4096
+
 
 @dataclass
 class CADMetadata:
@@ -43,21 +66,59 @@ class CADMetadata:
     raw_metadata: dict[str, object] = field(default_factory=dict)
 
 
+@dataclass
+class DXFStreamLimits:
+    """Budgets for single-pass streaming DXF extraction.
+
+    Attributes:
+        max_entities: Cap per collected list (layers, blocks, texts, dimensions).
+        max_text_chars: Total characters of text/dimension content to collect.
+        time_budget_seconds: Wall-clock budget; partial metadata is returned when exceeded.
+    """
+
+    max_entities: int = 2000
+    max_text_chars: int = 200_000
+    time_budget_seconds: float = 15.0
+
+
 class CADMetadataExtractor:
     """Extracts metadata from DWG/DXF and STEP CAD files.
 
     Supports:
-    - DXF: Full parsing via ezdxf (layers, blocks, text, dimensions)
+    - DXF: Full parsing via ezdxf (layers, blocks, text, dimensions); large
+      files are read in a single streaming pass with entity and time budgets
     - DWG: Limited support (ezdxf requires conversion, returns empty on failure)
     - STEP: Text-based parsing of common entities (PRODUCT, MATERIAL, etc.)
     """
 
-    def __init__(self) -> None:
-        """Initialize CAD metadata extractor."""
+    def __init__(
+        self,
+        stream_limits: DXFStreamLimits | None = None,
+        stream_threshold_bytes: int | None = None,
+    ) -> None:
+        """Initialize CAD metadata extractor.
+
+        Args:
+            stream_limits: Budgets for streaming DXF extraction (defaults from settings).
+            stream_threshold_bytes: DXF files above this size are streamed
+                instead of fully loaded (defaults from settings).
+        """
         self._supported_dxf_types = {".dxf"}
         self._supported_dwg_types = {".dwg"}
         self._supported_step_types = {".stp", ".step"}
 
+        settings = get_settings()
+        self._stream_limits = stream_limits or DXFStreamLimits(
+            max_entities=settings.CAD_DXF_MAX_ENTITIES,
+            max_text_chars=settings.CAD_DXF_MAX_TEXT_CHARS,
+            time_budget_seconds=settings.CAD_EXTRACTION_TIME_BUDGET_SECONDS,
+        )
+        self._stream_threshold_bytes = (
+            stream_threshold_bytes
+            if stream_threshold_bytes is not None
+            else settings.CAD_DXF_STREAM_THRESHOLD_MB * 1024 * 1024
+        )
+
     def extract_dwg_metadata(self, file_path: str) -> CADMetadata:
         """Extract metadata from DWG file.
 
@@ -118,7 +179,7 @@ class CADMetadataExtractor:
                 raw_metadata={"error": str(e)},
             )
 
-    def extract_dxf_metadata(self, file_path: str) -> CADMetadata:
+    def extract_dxf_metadata(self, file_path: str, streaming: bool | None = None) -> CADMetadata:
         """Extract metadata from DXF file.
 
         DXF is a text-based CAD format that ezdxf can fully parse. Extracts:
@@ -127,8 +188,13 @@ class CADMetadataExtractor:
         - Text entities (annotations, labels)
         - Dimension entities (measurements)
 
+        Files larger than the streaming threshold are not loaded into an
+        ezdxf document; see _stream_dxf_entities().
+
         Args:
             file_path: Absolute path to DXF file.
+            streaming: Force (True) or disable (False) streaming mode.
+                None selects it by file size.
 
         Returns:
             CADMetadata with extracted data, or empty result on failure.
@@ -142,6 +208,19 @@ class CADMetadataExtractor:
                 raw_metadata={"error": "File not found"},
             )
 
+        if streaming is None:
+            streaming = path.stat().st_size > self._stream_threshold_bytes
+        # The tag reader handles ASCII DXF only; binary DXF takes the full-load path
+        if streaming and not is_binary_dxf_file(file_path):
+            try:
+                return self._stream_dxf_entities(file_path)
+            except Exception as e:
+                logger.error("cad_dxf_stream_failed", file_path=file_path, error=str(e), exc_info=True)
+                return CADMetadata(
+                    file_format="DXF",
+                    raw_metadata={"error": str(e), "mode": "streaming"},
+                )
+
         try:
             doc = ezdxf.readfile(file_path)  # type: ignore[attr-defined]
             metadata = self._extract_dxf_entities(doc)
@@ -246,15 +325,189 @@ class CADMetadataExtractor:
 
         return metadata
 
+    def _stream_dxf_entities(self, file_path: str) -> CADMetadata:
+        """Extract DXF metadata in one pass over the raw tag stream.
+
+        Reads (group code, value) pairs with ezdxf's low-level ASCII tag loader
+        instead of building a Drawing, so memory stays bounded by the configured
+        caps. Layers come from the TABLES section, block names from BLOCKS and
+        modelspace TEXT/MTEXT/DIMENSION content from ENTITIES. Reading stops
+        after ENTITIES, once the entity caps or the text memory budget are
+        exhausted, or when the time budget runs out. Whenever anything was
+        skipped, raw_metadata["truncated"] is True with a truncated_reason.
+
+        Args:
+            file_path: Absolute path to an ASCII DXF file.
+
+        Returns:
+            CADMetadata with (possibly partial) extracted entities.
+        """
+        limits = self._stream_limits
+        started = time.monotonic()
+        info = dxf_file_info(file_path)
+        metadata = CADMetadata(file_format="DXF")
+        text_chars = 0
+        dimension_count = 0
+        capped = False
+        truncated_reason: str | None = None
+
+        with open(file_path, encoding=info.encoding, errors="ignore") as fp:
+            for index, (section, entity_type, tags) in enumerate(self._iter_dxf_records(fp)):
+                if (
+                    index % _BUDGET_CHECK_INTERVAL == 0
+                    and time.monotonic() - started > limits.time_budget_seconds
+                ):
+                    truncated_reason = "time_budget"
+                if truncated_reason is not None:
+                    break
+
+                if section == "TABLES" and entity_type == "LAYER":
+                    name = _first_tag_value(tags, 2)
+                    if name and len(metadata.layers) < limits.max_entities:
+                        metadata.layers.append(name)
+                    elif name:
+                        capped = True
+
+                elif section == "BLOCKS" and entity_type == "BLOCK":
+                    name = _first_tag_value(tags, 2)
+                    if name and not name.startswith("*"):
+                        if len(metadata.blocks) < limits.max_entities:
+                            metadata.blocks.append(name)
+                        else:
+                            capped = True
+
+                elif section == "ENTITIES":
+                    # Group code 67 = 1 marks paperspace entities
+                    if _first_tag_value(tags, 67) == "1":
+                        continue
+
+                    if entity_type == "DIMENSION":
+                        dimension_count += 1
+                        dim_text = (_first_tag_value(tags, 1) or "").strip()
+                        if dim_text and len(metadata.dimensions) < limits.max_entities:
+                            metadata.dimensions.append(dim_text)
+                            text_chars += len(dim_text)
+                        elif dim_text:
+                            capped = True
+
+                    elif entity_type in ("TEXT", "MTEXT"):
+                        if entity_type == "TEXT":
+                            text_content = _first_tag_value(tags, 1) or ""
+                        else:
+                            # MTEXT stores 250-char chunks in code 3, remainder in code 1
+                            text_content = "".join(
+                                str(tag.value) for tag in tags if tag.code in (3, 1)
+                            )
+                        text_content = text_content.strip()
+                        if text_content and len(metadata.text_entities) < limits.max_entities:
+                            metadata.text_entities.append(text_content)
+                            text_chars += len(text_content)
+                        elif text_content:
+                            capped = True
+
+                    if text_chars >= limits.max_text_chars:
+                        truncated_reason = "memory_budget"
+                    elif (
+                        len(metadata.text_entities) >= limits.max_entities
+                        and len(metadata.dimensions) >= limits.max_entities
+                    ):
+                        truncated_reason = "entity_cap"
+
+                elif section in ("OBJECTS", "ACDSDATA", "THUMBNAILIMAGE"):
+                    # Everything needed precedes these sections
+                    break
+
+        if truncated_reason is None and capped:
+            truncated_reason = "entity_cap"
+
+        elapsed = time.monotonic() - started
+        metadata.raw_metadata = {
+            "dxf_version": info.version,
+            "encoding": info.encoding,
+            "layer_count": len(metadata.layers),
+            "block_count": len(metadata.blocks),
+            "dimension_count": dimension_count,
+            "mode": "streaming",
+            "truncated": truncated_reason is not None,
+            "elapsed_seconds": round(elapsed, 3),
+        }
+        if truncated_reason is not None:
+            metadata.raw_metadata["truncated_reason"] = truncated_reason
+            logger.warning(
+                "cad_dxf_stream_truncated",
+                file_path=file_path,
+                reason=truncated_reason,
+                texts=len(metadata.text_entities),
+                elapsed_seconds=round(elapsed, 3),
+            )
+
+        logger.info(
+            "cad_dxf_stream_success",
+            file_path=file_path,
+            layers=len(metadata.layers),
+            blocks=len(metadata.blocks),
+            texts=len(metadata.text_entities),
+        )
+        return metadata
+
+    @staticmethod
+    def _iter_dxf_records(fp: object) -> Iterator[tuple[str, str, list[DXFTag]]]:
+        """Group a DXF tag stream into (section, entity type, tags) records.
+
+        Each record spans from one group code 0 tag to the next. Section
+        boundaries (SECTION/ENDSEC) are consumed and not yielded.
+
+        Args:
+            fp: Text stream of an ASCII DXF file.
+
+        Yields:
+            Tuples of current section name, record type and the record's tags.
+        """
+        section = ""
+        entity_type = ""
+        tags: list[DXFTag] = []
+        expect_section_name = False
+
+        for tag in ascii_tags_loader(fp):  # type: ignore[arg-type]
+            if expect_section_name:
+                expect_section_name = False
+                if tag.code == 2:
+                    section = str(tag.value).upper()
+                    continue
+            if tag.code != 0:
+                if entity_type:
+                    tags.append(tag)
+                continue
+
+            if entity_type:
+                yield section, entity_type, tags
+            value = str(tag.value).upper()
+            tags = []
+            if value == "SECTION":
+                expect_section_name = True
+                entity_type = ""
+            elif value in ("ENDSEC", "EOF"):
+                section = ""
+                entity_type = ""
+            else:
+                entity_type = value
+
+        if entity_type:
+            yield section, entity_type, tags
+
     def extract_step_metadata(self, file_path: str) -> CADMetadata:
         """Extract metadata from STEP file.
 
-        STEP (ISO 10303) is a text-based 3D CAD format. Uses regex parsing
-        to extract common entities:
+        STEP (ISO 10303) is a text-based 3D CAD format. The file is
+        memory-mapped and scanned once at byte level for common entities:
+        - FILE_SCHEMA: Protocol version from the HEADER section
         - PRODUCT: Product name and description
         - MATERIAL_DESIGNATION: Material specification
         - APPLICATION_PROTOCOL_DEFINITION: Protocol version (AP203, AP214, etc.)
 
+        The scan stops as soon as product, material and protocol are known,
+        so peak memory is constant regardless of file size.
+
         Args:
             file_path: Absolute path to STEP file.
 
@@ -271,55 +524,77 @@ class CADMetadataExtractor:
             )
 
         try:
-            # Read file content (STEP is text-based)
-            content = path.read_text(encoding="utf-8", errors="ignore")
-
             metadata = CADMetadata(file_format="STEP")
-
-            # Extract PRODUCT entity: PRODUCT('id','name','description',...)
-            product_pattern = r"PRODUCT\s*\(\s*'([^']*)',\s*'([^']*)',\s*'([^']*)'"
-            for match in re.finditer(product_pattern, content, re.IGNORECASE):
-                _product_id, name, description = match.groups()
-                if not metadata.product_name and name:
-                    metadata.product_name = name.strip()
-                if not metadata.description and description:
-                    metadata.description = description.strip()
-
-            # Extract MATERIAL_DESIGNATION
-            material_pattern = r"MATERIAL_DESIGNATION\s*\([^,]*,\s*'([^']*)'"
-            for match in re.finditer(material_pattern, content, re.IGNORECASE):
-                material = match.group(1).strip()
-                if material:
-                    metadata.material = material
-                    break  # Take first match
-
-            # Extract APPLICATION_PROTOCOL_DEFINITION (e.g., AP203, AP214)
-            protocol_pattern = r"APPLICATION_PROTOCOL_DEFINITION\s*\([^,]*,\s*'([^']*)'"
-            for match in re.finditer(protocol_pattern, content, re.IGNORECASE):
-                protocol = match.group(1).strip()
-                if protocol:
-                    metadata.protocol_version = protocol
-                    break
-
-            # Also check for schema name in header (e.g., "AP203_CONFIGURATION_CONTROLLED_3D_DESIGN")
-            schema_pattern = r"FILE_SCHEMA\s*\(\s*\(\s*'([^']*)'"
-            for match in re.finditer(schema_pattern, content, re.IGNORECASE):
-                schema = match.group(1).strip()
-                if "AP203" in schema.upper():
-                    metadata.protocol_version = "AP203"
-                elif "AP214" in schema.upper():
-                    metadata.protocol_version = "AP214"
-                break
-
-            # Extract DIMENSIONAL_EXPONENTS (not typically useful for metadata, skip)
-
-            # Store raw counts
+            file_size = path.stat().st_size
+            counts = {"product": 0, "material": 0}
+            schema_protocol: str | None = None
+            definition_protocol: str | None = None
+            scan_complete = True
+
+            with open(path, "rb") as fp:
+                # mmap keeps the file in the page cache instead of a Python
+                # string, so heap usage does not grow with assembly size
+                with (
+                    mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+                    if file_size
+                    else contextlib.nullcontext(b"")
+                ) as content:
+                    for match in _STEP_ENTITY_PATTERN.finditer(content):
+                        keyword = match.group(1).upper()
+
+                        if keyword == b"PRODUCT":
+                            counts["product"] += 1
+                            args = _STEP_PRODUCT_ARGS.match(content, match.end())
+                            if args:
+                                _product_id, name, description = (
+                                    _decode_step_string(g) for g in args.groups()
+                                )
+                                if not metadata.product_name and name:
+                                    metadata.product_name = name
+                                if not metadata.description and description:
+                                    metadata.description = description
+
+                        elif keyword == b"MATERIAL_DESIGNATION":
+                            counts["material"] += 1
+                            args = _STEP_SECOND_STRING_ARG.match(content, match.end())
+                            if args and not metadata.material:
+                                metadata.material = _decode_step_string(args.group(1)) or None
+
+                        elif keyword == b"APPLICATION_PROTOCOL_DEFINITION":
+                            args = _STEP_SECOND_STRING_ARG.match(content, match.end())
+                            if args and not definition_protocol:
+                                definition_protocol = _decode_step_string(args.group(1)) or None
+
+                        elif keyword == b"FILE_SCHEMA" and schema_protocol is None:
+                            # Schema name in header, e.g. "AP203_CONFIGURATION_CONTROLLED_3D_DESIGN"
+                            args = _STEP_SCHEMA_ARG.match(content, match.end())
+                            if args:
+                                schema = args.group(1).upper()
+                                if b"AP203" in schema:
+                                    schema_protocol = "AP203"
+                                elif b"AP214" in schema:
+                                    schema_protocol = "AP214"
+                                else:
+                                    schema_protocol = ""
+
+                        # Stop as soon as every field is known; the rest of
+                        # the DATA section is geometry we never look at
+                        if (
+                            metadata.product_name
+                            and metadata.material
+                            and (schema_protocol or definition_protocol)
+                        ):
+                            scan_complete = False
+                            break
+
+            metadata.protocol_version = schema_protocol or definition_protocol
+
+            # Store raw counts (entities seen before the scan stopped)
             metadata.raw_metadata = {
-                "file_size_bytes": path.stat().st_size,
-                "product_entities": len(re.findall(r"PRODUCT\s*\(", content, re.IGNORECASE)),
-                "material_entities": len(
-                    re.findall(r"MATERIAL_DESIGNATION", content, re.IGNORECASE)
-                ),
+                "file_size_bytes": file_size,
+                "product_entities": counts["product"],
+                "material_entities": counts["material"],
+                "scan_complete": scan_complete,
             }
 
             logger.info(
@@ -366,3 +641,16 @@ class CADMetadataExtractor:
                 f"Unsupported CAD format: {suffix}. "
                 f"Supported: {self._supported_dxf_types | self._supported_dwg_types | self._supported_step_types}"
             )
+
+
+def _first_tag_value(tags: list[DXFTag], code: int) -> str | None:
+    """Return the value of the first tag with the given group code."""
+    for tag in tags:
+        if tag.code == code:
+            return str(tag.value)
+    return None
+
+
+def _decode_step_string(value: bytes) -> str:
+    """Decode a STEP string literal to stripped text."""
+    return value.decode("utf-8", errors="ignore").strip()
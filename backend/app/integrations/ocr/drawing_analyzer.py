@@ -7,11 +7,13 @@ from OCR text of technical drawings in the steel fabrication domain.
 
 from __future__ import annotations
 
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, replace
 
 import structlog
 from anthropic import AsyncAnthropic
 
+from app.core.prompt_budget import fit_text
+
 logger = structlog.get_logger(__name__)
 
 # Anthropic model — centralized in Settings
@@ -326,6 +328,7 @@ class DrawingAnalysis:
         surface_treatments: List of surface treatment descriptions.
         welding_requirements: Welding and NDT control requirements.
         notes: Additional technical notes and requirements.
+        tokens_used: Claude tokens used by the analysis.
     """
 
     dimensions: list[DrawingDimension] = field(default_factory=list)
@@ -334,6 +337,7 @@ class DrawingAnalysis:
     surface_treatments: list[str] = field(default_factory=list)
     welding_requirements: WeldingRequirements = field(default_factory=WeldingRequirements)
     notes: str | None = None
+    tokens_used: int = 0
 
 
 class DrawingAnalyzer:
@@ -377,10 +381,19 @@ class DrawingAnalyzer:
         log = logger.bind(text_length=len(ocr_text))
         log.info("drawing_analysis.started")
 
+        from app.core.circuit_breaker import anthropic_breaker
+        from app.core.claude_usage import create_message
+
+        if not anthropic_breaker.can_execute():
+            log.warning("drawing_analysis.circuit_open")
+            return DrawingAnalysis()
+
         user_message = self._build_user_message(ocr_text)
 
         try:
-            response = await self._client.messages.create(  # type: ignore[call-overload]
+            response, usage = await create_message(
+                self._client,
+                agent="drawing_analyzer",
                 model=_MODEL,
                 max_tokens=_MAX_TOKENS,
                 system=_SYSTEM_PROMPT,
@@ -389,14 +402,17 @@ class DrawingAnalyzer:
                 messages=[{"role": "user", "content": user_message}],
                 timeout=_TIMEOUT_SECONDS,
             )
+            anthropic_breaker.record_success()
         except TimeoutError:
+            anthropic_breaker.record_failure()
             log.warning("drawing_analysis.timeout")
             return DrawingAnalysis()
         except Exception:
+            anthropic_breaker.record_failure()
             log.exception("drawing_analysis.api_error")
             return DrawingAnalysis()
 
-        return self._parse_response(response, log)
+        return replace(self._parse_response(response, log), tokens_used=usage.total_tokens)
 
     @staticmethod
     def _build_user_message(ocr_text: str) -> str:
@@ -408,10 +424,8 @@ class DrawingAnalyzer:
         Returns:
             Formatted user message string.
         """
-        # Limit text to 8000 characters to stay within token limits
-        truncated_text = ocr_text[:8000]
-        if len(ocr_text) > 8000:
-            truncated_text += "\n\n[... text zkrácen ...]"
+        # Fit text into 8000 characters, keeping dimension and material lines
+        truncated_text = fit_text(ocr_text, 8000, marker="[... text zkrácen ...]")
 
         return (
             f"Analyzuj následující text extrahovaný z technického výkresu "
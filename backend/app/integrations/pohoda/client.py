@@ -74,6 +74,8 @@ class PohodaClient:
 
         Implements retry logic with exponential backoff for connection errors.
         HTTP errors (4xx, 5xx) are not retried as they indicate server-side issues.
+        Calls are guarded by the shared ``pohoda_breaker``: while mServer is
+        known to be down they fail immediately instead of waiting for timeouts.
 
         Args:
             xml_data: XML document as bytes (Windows-1250 encoded)
@@ -83,8 +85,15 @@ class PohodaClient:
 
         Raises:
             PohodaConnectionError: If connection to mServer fails after retries
+                or the circuit breaker is open
             PohodaResponseError: If mServer returns error HTTP status
         """
+        from app.core.circuit_breaker import pohoda_breaker
+
+        if not pohoda_breaker.can_execute():
+            logger.warning("mServer circuit breaker open, not sending XML")
+            raise PohodaConnectionError("mServer is unavailable (circuit breaker open)")
+
         client = self._get_client()
         endpoint = f"{self.base_url}/xml"
 
@@ -109,6 +118,10 @@ class PohodaClient:
                 )
 
                 # Check HTTP status
+                if response.status_code >= 500:
+                    pohoda_breaker.record_failure()
+                else:
+                    pohoda_breaker.record_success()
                 if response.status_code != 200:
                     error_msg = (
                         f"mServer returned HTTP {response.status_code}: " f"{response.text[:200]}"
@@ -174,6 +187,7 @@ class PohodaClient:
                 ) from e
 
         # All retries exhausted
+        pohoda_breaker.record_failure()
         raise PohodaConnectionError(
             f"Failed to connect to mServer after {self.max_retries} attempts: " f"{str(last_error)}"
         ) from last_error
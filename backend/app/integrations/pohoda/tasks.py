@@ -167,6 +167,7 @@ def sync_inventory_from_pohoda(self) -> dict:  # type: ignore[no-untyped-def]
         from app.integrations.pohoda.stock_parser import PohodaStockParser
         from app.integrations.pohoda.xml_builder import PohodaXMLBuilder
         from app.models.material_price import MaterialPrice
+        from app.services.material_price_index import mark_material_prices_changed
 
         results = {"synced": 0, "created": 0, "updated": 0, "errors": 0}
 
@@ -229,6 +230,8 @@ def sync_inventory_from_pohoda(self) -> dict:  # type: ignore[no-untyped-def]
                         logger.error("Failed to sync stock item %s: %s", item.code, str(e))
                         results["errors"] += 1
 
+                if results["synced"]:
+                    mark_material_prices_changed(session)
                 await session.commit()
 
                 logger.info(
@@ -65,6 +65,10 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     await manager.close()
     await close_db()
 
+    from app.services.pdf_renderer import get_pdf_renderer
+
+    get_pdf_renderer().shutdown()
+
 
 # Create FastAPI app
 app = FastAPI(
@@ -85,48 +89,15 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
-# Security headers middleware
-from starlette.middleware.base import BaseHTTPMiddleware
+# Correlation ID, security headers, request logging and Prometheus metrics
 from starlette.requests import Request as StarletteRequest
-from starlette.responses import Response as StarletteResponse
-
-
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
-    """Add security headers to all responses."""
-
-    async def dispatch(
-        self, request: StarletteRequest, call_next: Any
-    ) -> StarletteResponse:
-        """Process request and add security headers to response."""
-        response = await call_next(request)
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        response.headers["Strict-Transport-Security"] = (
-            "max-age=31536000; includeSubDomains"
-        )
-        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-        response.headers["Content-Security-Policy"] = (
-            "default-src 'self'; script-src 'self'; style-src 'self' 'unsafe-inline'; "
-            "img-src 'self' data:; font-src 'self'; connect-src 'self' ws: wss:"
-        )
-        return response
-
-
-app.add_middleware(SecurityHeadersMiddleware)
-
-# Request logging middleware
-from app.core.middleware import CorrelationIDMiddleware, RequestLoggingMiddleware
-
-app.add_middleware(CorrelationIDMiddleware)
-app.add_middleware(RequestLoggingMiddleware)
 
-# Prometheus metrics middleware
-from app.core.prometheus_middleware import PrometheusMiddleware
+from app.core.middleware import RequestInstrumentationMiddleware
 
-app.add_middleware(PrometheusMiddleware)
+app.add_middleware(RequestInstrumentationMiddleware)
 
 
 @app.get("/", status_code=status.HTTP_200_OK)
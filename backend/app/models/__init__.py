@@ -5,6 +5,7 @@ from .base import Base, TimestampMixin, UUIDPKMixin
 from .calculation import Calculation, CalculationItem, CalculationStatus, CostType
 from .calculation_feedback import CalculationFeedback, CorrectionType
 from .classification_feedback import ClassificationFeedback
+from .claude_usage import ClaudeUsageEntry
 from .customer import Customer
 from .dead_letter import DeadLetterEntry
 from .document import Document, DocumentCategory
@@ -18,6 +19,7 @@ from .offer import Offer, OfferStatus
 from .operation import Operation, OperationStatus
 from .order import Order, OrderItem, OrderPriority, OrderStatus
 from .order_embedding import OrderEmbedding
+from .pipeline_metrics import InboxMaterialMention, PipelineMetricsHourly
 from .pohoda_sync import PohodaSyncLog, SyncDirection, SyncStatus
 from .processing_task import ProcessingStage, ProcessingStatus, ProcessingTask
 from .subcontract import Subcontract, SubcontractStatus
@@ -65,6 +67,11 @@ __all__ = [
     "ProcessingTask",
     "ProcessingStage",
     "ProcessingStatus",
+    # Pipeline metrics
+    "PipelineMetricsHourly",
+    "InboxMaterialMention",
+    # ClaudeUsageEntry
+    "ClaudeUsageEntry",
     # DeadLetterEntry
     "DeadLetterEntry",
     # MaterialPrice
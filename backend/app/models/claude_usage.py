@@ -0,0 +1,54 @@
+"""Ledger of Claude API calls with actual token usage and latency."""
+
+from sqlalchemy import Boolean, Index, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base, TimestampMixin, UUIDPKMixin
+
+
+class ClaudeUsageEntry(Base, UUIDPKMixin, TimestampMixin):
+    """One Claude ``messages.create`` call.
+
+    Token counts are taken from the API response (``usage``), not estimated.
+    Failed calls are recorded with zero tokens and ``success=False``.
+
+    Attributes:
+        agent: Calling component (e.g. ``email_classifier``, ``deadline_monitor``).
+        cache_read_tokens: Input tokens served from the prompt cache.
+        cache_creation_tokens: Input tokens written to the prompt cache.
+        latency_ms: Wall time of the API call.
+        error: Exception class name of a failed call.
+    """
+
+    __tablename__ = "claude_usage_ledger"
+
+    agent: Mapped[str] = mapped_column(String(50), nullable=False)
+    model: Mapped[str] = mapped_column(String(100), nullable=False)
+    input_tokens: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    output_tokens: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    cache_read_tokens: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    cache_creation_tokens: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    latency_ms: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    success: Mapped[bool] = mapped_column(Boolean, nullable=False, default=True)
+    error: Mapped[str | None] = mapped_column(String(100), nullable=True)
+
+    __table_args__ = (
+        Index("ix_claude_usage_ledger_created_at", "created_at"),
+        Index("ix_claude_usage_ledger_agent_created_at", "agent", "created_at"),
+    )
+
+    @property
+    def total_tokens(self) -> int:
+        """All tokens processed by the call (input incl. cache, and output)."""
+        return (
+            self.input_tokens
+            + self.output_tokens
+            + self.cache_read_tokens
+            + self.cache_creation_tokens
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"<ClaudeUsageEntry(agent='{self.agent}', tokens={self.total_tokens}, "
+            f"latency_ms={self.latency_ms}, success={self.success})>"
+        )
@@ -72,6 +72,13 @@ class Customer(Base, UUIDPKMixin, TimestampMixin):
     __table_args__ = (
         Index("ix_customers_company_name", "company_name"),
         Index("ix_customers_email", "email"),
+        # pg_trgm index for company name search and customer matching
+        Index(
+            "ix_customers_company_name_trgm",
+            "company_name",
+            postgresql_using="gin",
+            postgresql_ops={"company_name": "gin_trgm_ops"},
+        ),
         CheckConstraint(
             "discount_percent >= 0 AND discount_percent <= 100",
             name="ck_customers_discount_percent_range",
@@ -26,6 +26,7 @@ class DeadLetterEntry(Base, UUIDPKMixin, TimestampMixin):
     __table_args__ = (
         Index("ix_dead_letter_queue_resolved", "resolved"),
         Index("ix_dead_letter_queue_stage", "stage"),
+        Index("ix_dead_letter_queue_created_at_id", "created_at", "id"),
     )
 
     def __repr__(self) -> str:
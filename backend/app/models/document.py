@@ -64,6 +64,7 @@ class Document(Base, UUIDPKMixin, TimestampMixin):
     __table_args__ = (
         Index("ix_documents_entity", "entity_type", "entity_id"),
         Index("ix_documents_category", "category"),
+        Index("ix_documents_created_at_id", "created_at", "id"),
     )
 
     def __repr__(self) -> str:
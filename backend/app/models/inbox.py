@@ -114,6 +114,7 @@ class InboxMessage(Base, UUIDPKMixin, TimestampMixin):
         Index("ix_inbox_messages_classification", "classification"),
         Index("ix_inbox_messages_thread_id", "thread_id"),
         Index("ix_inbox_messages_from_email_received_at", "from_email", "received_at"),
+        Index("ix_inbox_messages_received_at_id", "received_at", "id"),
     )
 
     def __repr__(self) -> str:
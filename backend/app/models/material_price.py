@@ -3,11 +3,22 @@
 from datetime import date
 from decimal import Decimal
 
-from sqlalchemy import Boolean, Date, Index, Numeric, String, Text
+from sqlalchemy import Boolean, Date, Index, Numeric, String, Text, text
 from sqlalchemy.orm import Mapped, mapped_column
 
 from .base import Base, TimestampMixin, UUIDPKMixin
 
+# Natural key of a price list line; bulk imports upsert on it. Nullable parts
+# are coalesced so that NULL grades/suppliers still collide.
+MATERIAL_PRICE_NATURAL_KEY = (
+    text("name"),
+    text("coalesce(material_grade, '')"),
+    text("coalesce(form, '')"),
+    text("coalesce(dimension, '')"),
+    text("coalesce(supplier, '')"),
+    text("valid_from"),
+)
+
 
 class MaterialPrice(UUIDPKMixin, TimestampMixin, Base):
     """Material price entry for cost estimation.
@@ -51,6 +62,20 @@ class MaterialPrice(UUIDPKMixin, TimestampMixin, Base):
     __table_args__ = (
         Index("ix_material_prices_valid_from", "valid_from"),
         Index("ix_material_prices_valid_to", "valid_to"),
+        Index("uq_material_prices_natural_key", *MATERIAL_PRICE_NATURAL_KEY, unique=True),
+        # pg_trgm indexes for free-text search (ILIKE '%x%', word similarity)
+        Index(
+            "ix_material_prices_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_material_prices_specification_trgm",
+            "specification",
+            postgresql_using="gin",
+            postgresql_ops={"specification": "gin_trgm_ops"},
+        ),
     )
 
     def __repr__(self) -> str:
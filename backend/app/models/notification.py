@@ -38,10 +38,13 @@ class Notification(Base, UUIDPKMixin, TimestampMixin):
     message: Mapped[str] = mapped_column(Text, nullable=False)
     link: Mapped[str | None] = mapped_column(String(512), nullable=True)
     read: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+    # Structured key of the event that produced the notification (for deduplication)
+    dedup_key: Mapped[str | None] = mapped_column(String(255), nullable=True)
 
     __table_args__ = (
         Index("ix_notifications_user_id", "user_id"),
         Index("ix_notifications_read", "read"),
+        Index("ix_notifications_dedup_key_created_at", "dedup_key", "created_at"),
     )
 
     def __repr__(self) -> str:
@@ -142,6 +142,7 @@ class Order(Base, UUIDPKMixin, TimestampMixin):
     __table_args__ = (
         Index("ix_orders_status_priority", "status", "priority"),
         Index("ix_orders_due_date", "due_date"),
+        Index("ix_orders_created_at_id", "created_at", "id"),
     )
 
     def __repr__(self) -> str:
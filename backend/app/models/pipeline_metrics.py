@@ -0,0 +1,88 @@
+"""Pre-aggregated orchestration metrics for dashboards."""
+
+from datetime import datetime
+from uuid import UUID
+
+from sqlalchemy import DateTime, Float, ForeignKey, Index, Integer, String, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base, TimestampMixin, UUIDPKMixin
+
+# Dimensions of a rollup row; recording a stage upserts on them
+PIPELINE_METRICS_DIMENSIONS = ("bucket_start", "stage", "status", "classification", "method")
+
+# Additive measures incremented on every recorded stage
+PIPELINE_METRICS_MEASURES = (
+    "task_count",
+    "tokens_used",
+    "processing_time_ms_total",
+    "processing_time_count",
+    "confidence_total",
+    "confidence_count",
+)
+
+
+class PipelineMetricsHourly(Base, UUIDPKMixin, TimestampMixin):
+    """Hourly rollup of processing task outcomes.
+
+    One row per (hour, stage, status, classification, method), incremented
+    whenever a stage is recorded in processing_tasks. Averages are derived
+    from the ``*_total`` / ``*_count`` pairs so buckets can be summed.
+
+    Attributes:
+        bucket_start: Start of the UTC hour.
+        classification: Email classification known at that stage ('' if none).
+        method: Classification method for the classify stage ('' otherwise).
+    """
+
+    __tablename__ = "pipeline_metrics_hourly"
+
+    bucket_start: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    stage: Mapped[str] = mapped_column(String(20), nullable=False)
+    status: Mapped[str] = mapped_column(String(20), nullable=False)
+    classification: Mapped[str] = mapped_column(String(30), nullable=False, default="")
+    method: Mapped[str] = mapped_column(String(30), nullable=False, default="")
+
+    task_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    tokens_used: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    processing_time_ms_total: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    processing_time_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    confidence_total: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    confidence_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        UniqueConstraint(*PIPELINE_METRICS_DIMENSIONS, name="uq_pipeline_metrics_hourly_bucket"),
+    )
+
+    def __repr__(self) -> str:
+        return (
+            f"<PipelineMetricsHourly(bucket={self.bucket_start}, stage='{self.stage}', "
+            f"status='{self.status}', count={self.task_count})>"
+        )
+
+
+class InboxMaterialMention(Base, UUIDPKMixin):
+    """Material extracted from an inbox message's parsed items.
+
+    Lets dashboards count materials with a grouped query instead of loading
+    every ``parsed_data`` JSON document.
+
+    Attributes:
+        material: Material as written in the parsed item (stripped).
+        created_at: Creation time of the inbox message (for period filters).
+    """
+
+    __tablename__ = "inbox_material_mentions"
+
+    inbox_message_id: Mapped[UUID] = mapped_column(
+        ForeignKey("inbox_messages.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    material: Mapped[str] = mapped_column(String(255), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        Index("ix_inbox_material_mentions_created_at_material", "created_at", "material"),
+    )
+
+    def __repr__(self) -> str:
+        return f"<InboxMaterialMention(material='{self.material}')>"
@@ -1,9 +1,10 @@
 """ProcessingTask model for orchestration audit trail."""
 
 import enum
-from uuid import UUID
+from datetime import UTC, datetime
+from uuid import UUID, uuid4
 
-from sqlalchemy import Enum, ForeignKey, Index, Integer, String, Text
+from sqlalchemy import DateTime, Enum, ForeignKey, Index, Integer, String, Text, func
 from sqlalchemy.dialects.postgresql import JSON
 from sqlalchemy.orm import Mapped, mapped_column
 
@@ -30,8 +31,24 @@ class ProcessingStatus(str, enum.Enum):
 
 
 class ProcessingTask(Base, UUIDPKMixin, TimestampMixin):
+    """Audit record of one orchestration stage run.
+
+    On PostgreSQL the table is range-partitioned by month on ``created_at``
+    (see ``app.orchestration.audit``), so ``created_at`` is part of the
+    primary key.
+    """
+
     __tablename__ = "processing_tasks"
 
+    id: Mapped[UUID] = mapped_column(primary_key=True, default=uuid4)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        primary_key=True,
+        default=lambda: datetime.now(UTC),
+        server_default=func.now(),
+        nullable=False,
+    )
+
     inbox_message_id: Mapped[UUID | None] = mapped_column(
         ForeignKey("inbox_messages.id", ondelete="SET NULL"), nullable=True, index=True
     )
@@ -53,6 +70,7 @@ class ProcessingTask(Base, UUIDPKMixin, TimestampMixin):
     __table_args__ = (
         Index("ix_processing_tasks_stage_status", "stage", "status"),
         Index("ix_processing_tasks_created_at", "created_at"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
     )
 
     def __repr__(self) -> str:
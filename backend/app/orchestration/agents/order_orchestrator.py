@@ -1,7 +1,7 @@
 """Order Orchestrator - customer matching, order creation, document linking.
 
 Orchestrates:
-- Customer matching (ICO → email → name → create new)
+- Customer matching (ICO → email → name → create new; similar names go to review)
 - Order matching by reference or creation for poptavka/objednavka
 - Document linking to orders
 - InboxMessage status updates
@@ -11,12 +11,13 @@ Orchestrates:
 from __future__ import annotations
 
 import re
+import unicodedata
 from datetime import date, datetime, timedelta
 from decimal import Decimal
 from uuid import UUID
 
 import structlog
-from sqlalchemy import func, select
+from sqlalchemy import and_, func, or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import AsyncSessionLocal
@@ -29,6 +30,38 @@ from app.models.order import Order, OrderPriority, OrderStatus
 
 logger = structlog.get_logger(__name__)
 
+# Minimum pg_trgm similarity for a fuzzy company-name hit to be suggested for
+# review; fuzzy hits are never linked automatically (near-duplicates such as
+# "ABC Steel s.r.o." / "ABD Steel s.r.o." score 0.77)
+CUSTOMER_NAME_SUGGEST_THRESHOLD = 0.6
+# Candidates compared by normalized name per lookup
+CUSTOMER_NAME_CANDIDATES = 20
+
+# Trailing legal form of a company name ("s.r.o.", "spol. s r.o.", "a.s.", ...)
+_LEGAL_FORM_RE = re.compile(
+    r"[\s,]+(?:spol\.?\s*s\s*r\.?\s*o|s\.?\s*r\.?\s*o|a\.?\s*s|v\.?\s*o\.?\s*s|k\.?\s*s|z\.?\s*s"
+    r"|se|gmbh|ltd|inc)\.?\s*$",
+    re.IGNORECASE,
+)
+_NAME_TOKEN_RE = re.compile(r"[0-9a-z]+")
+
+
+def strip_legal_form(company_name: str) -> str:
+    """Remove a trailing legal form ("Novák Steel, s.r.o." -> "Novák Steel")."""
+    return _LEGAL_FORM_RE.sub("", company_name).strip()
+
+
+def normalize_company_name(company_name: str) -> str:
+    """Comparison key for company names.
+
+    Case, diacritics, punctuation and the legal form are ignored:
+    "Strojírny Novák, s.r.o." and "STROJIRNY NOVAK" both give
+    "strojirny novak".
+    """
+    decomposed = unicodedata.normalize("NFKD", strip_legal_form(company_name).casefold())
+    plain = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return " ".join(_NAME_TOKEN_RE.findall(plain))
+
 
 class OrderOrchestrator:
     """Orchestrates order creation and customer matching from parsed email data.
@@ -175,9 +208,11 @@ class OrderOrchestrator:
                     }
 
             # Match or create customer
-            customer, customer_created = await self._match_or_create_customer(
+            customer, customer_created, suggestion = await self._match_or_create_customer(
                 session, parsed_data, inbox_msg.from_email
             )
+            if customer is None:
+                return await self._hold_for_customer_review(session, inbox_msg, suggestion)
 
             # Match or create order
             order: Order | None = None
@@ -234,15 +269,51 @@ class OrderOrchestrator:
             "next_stage": next_stage,
         }
 
+    async def _hold_for_customer_review(
+        self, session: AsyncSession, inbox_msg: InboxMessage, suggestion: Customer | None
+    ) -> dict:
+        """Leave the message for manual customer assignment.
+
+        The suggested customer is stored in ``parsed_data["customer_suggestion"]``
+        for the reviewer; no customer or order is assigned.
+        """
+        inbox_msg.needs_review = True
+        inbox_msg.status = InboxStatus.REVIEW
+        if suggestion is not None:
+            inbox_msg.parsed_data = {
+                **(inbox_msg.parsed_data or {}),
+                "customer_suggestion": {
+                    "customer_id": str(suggestion.id),
+                    "company_name": suggestion.company_name,
+                },
+            }
+        await session.commit()
+
+        logger.info(
+            "customer_match_needs_review",
+            inbox_message_id=str(inbox_msg.id),
+            suggested_customer_id=str(suggestion.id) if suggestion else None,
+        )
+        return {
+            "customer_id": None,
+            "order_id": None,
+            "customer_created": False,
+            "order_created": False,
+            "documents_linked": 0,
+            "next_stage": None,
+            "needs_review": True,
+        }
+
     async def _match_or_create_customer(
         self, session: AsyncSession, parsed_data: dict, from_email: str
-    ) -> tuple[Customer, bool]:
+    ) -> tuple[Customer | None, bool, Customer | None]:
         """Match existing customer or create new one.
 
         Matching priority:
         1. ICO (exact match)
         2. Email (exact match)
-        3. Company name (case-insensitive LIKE)
+        3. Company name (exact after normalization); a similar but not equal
+           name is returned as a suggestion instead of a customer
         4. Create new
 
         Args:
@@ -251,7 +322,8 @@ class OrderOrchestrator:
             from_email: Sender email address
 
         Returns:
-            (Customer, created) tuple
+            (Customer, created, suggestion) tuple; Customer is None when the
+            name only resembles an existing customer (the suggestion)
         """
         # 1. Match by ICO
         if parsed_data.get("ico"):
@@ -261,7 +333,7 @@ class OrderOrchestrator:
             customer = result.scalar_one_or_none()
             if customer:
                 logger.info("customer_matched_by_ico", customer_id=str(customer.id))
-                return customer, False
+                return customer, False, None
 
         # 2. Match by email
         email = parsed_data.get("email") or from_email
@@ -271,21 +343,18 @@ class OrderOrchestrator:
         customer = result.scalar_one_or_none()
         if customer:
             logger.info("customer_matched_by_email", customer_id=str(customer.id))
-            return customer, False
+            return customer, False, None
 
-        # 3. Match by company name (case-insensitive)
+        # 3. Match by company name (exact after normalization, else suggest)
         if parsed_data.get("company_name"):
-            result = await session.execute(
-                select(Customer).where(
-                    func.lower(Customer.company_name).like(
-                        f"%{parsed_data['company_name'].lower()}%"
-                    )
-                )
+            customer, suggestion = await self._match_customer_by_name(
+                session, parsed_data["company_name"]
             )
-            customer = result.scalar_one_or_none()
             if customer:
                 logger.info("customer_matched_by_name", customer_id=str(customer.id))
-                return customer, False
+                return customer, False, None
+            if suggestion:
+                return None, False, suggestion
 
         # 4. Create new customer
         # Derive company name from email domain if not provided
@@ -307,7 +376,58 @@ class OrderOrchestrator:
         await session.flush()
 
         logger.info("customer_created", customer_id=str(customer.id), email=email)
-        return customer, True
+        return customer, True, None
+
+    async def _match_customer_by_name(
+        self, session: AsyncSession, company_name: str
+    ) -> tuple[Customer | None, Customer | None]:
+        """Match a customer by company name.
+
+        Only a name equal to ``company_name`` after normalization (see
+        normalize_company_name) is a match. Otherwise the closest candidate -
+        a substring hit, or on PostgreSQL a trigram similarity of at least
+        CUSTOMER_NAME_SUGGEST_THRESHOLD - is returned as a suggestion for
+        manual review: "Hutní Materiál Praha a.s." and "Hutní Materiál Brno
+        a.s." are different companies with a similarity of 0.63.
+
+        Returns:
+            (matched customer, suggested customer); at most one is set.
+        """
+        from app.services.text_search import text_search
+
+        key = normalize_company_name(company_name)
+        if not key:
+            return None, None
+
+        condition, rank = text_search(
+            session, [Customer.company_name], strip_legal_form(company_name), fuzzy=False
+        )
+        if rank is None:
+            query = select(Customer).where(condition).order_by(
+                func.length(Customer.company_name), Customer.created_at
+            )
+        else:
+            similarity = func.similarity(Customer.company_name, company_name)
+            query = (
+                select(Customer)
+                .where(
+                    or_(
+                        condition,
+                        and_(
+                            Customer.company_name.op("%")(company_name),
+                            similarity >= CUSTOMER_NAME_SUGGEST_THRESHOLD,
+                        ),
+                    )
+                )
+                .order_by(similarity.desc(), Customer.created_at)
+            )
+
+        result = await session.execute(query.limit(CUSTOMER_NAME_CANDIDATES))
+        candidates = result.scalars().all()
+        for candidate in candidates:
+            if normalize_company_name(candidate.company_name) == key:
+                return candidate, None
+        return None, candidates[0] if candidates else None
 
     async def _match_order_by_reference(
         self, session: AsyncSession, order_reference: str, customer_id: UUID
@@ -0,0 +1,170 @@
+"""Orchestration audit trail (processing_tasks): compact payloads and retention.
+
+Every pipeline stage returns ``{**previous_result, ...}``, so recording each
+stage's full output repeated the email body, parsed data and routing stages at
+every step of every email. Stage records now store only the keys a stage added
+or changed (``compact_stage_output``); bulky fields that are persisted
+elsewhere are replaced by a reference to their location and size.
+
+On PostgreSQL ``processing_tasks`` is range-partitioned by month on
+``created_at`` (partitions ``processing_tasks_pYYYYMM`` plus a default
+partition). Stats queries with a ``created_at`` cutoff only scan the recent
+partitions, ``ensure_partitions`` creates upcoming months ahead of time and
+``purge_expired`` drops whole partitions past retention instead of deleting
+row by row. Other databases (SQLite in tests) fall back to a plain DELETE.
+"""
+
+import re
+from collections.abc import Mapping
+from datetime import UTC, date, datetime, timedelta
+from typing import Any
+
+import structlog
+from sqlalchemy import delete, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.processing_task import ProcessingTask
+
+logger = structlog.get_logger(__name__)
+
+PARENT_TABLE = "processing_tasks"
+
+# Fields carried through the whole chain but persisted elsewhere -> stored as reference
+REFERENCED_FIELDS: dict[str, str] = {
+    "body_text": "inbox_messages.body_text",
+    "parsed_data": "inbox_messages.parsed_data",
+    "attachment_data": "email_attachments",
+}
+
+_PARTITION_RE = re.compile(rf"^{PARENT_TABLE}_p(\d{{4}})(\d{{2}})$")
+
+
+def compact_stage_output(
+    output: Mapping[str, Any] | None, previous: Mapping[str, Any] | None = None
+) -> dict[str, Any] | None:
+    """Reduce a stage result to what the stage contributed.
+
+    Args:
+        output: Full stage result (usually ``{**previous, ...new keys}``).
+        previous: Input the stage received from the previous stage.
+
+    Returns:
+        Keys that are new or changed compared to ``previous``, with
+        ``REFERENCED_FIELDS`` replaced by ``{"$ref": ..., "size": ...}``.
+    """
+    if output is None:
+        return None
+    previous = previous or {}
+
+    compact: dict[str, Any] = {}
+    for key, value in output.items():
+        if key in previous and previous[key] == value:
+            continue
+        if key in REFERENCED_FIELDS and value is not None:
+            compact[key] = {
+                "$ref": REFERENCED_FIELDS[key],
+                "size": len(value) if hasattr(value, "__len__") else None,
+            }
+        else:
+            compact[key] = value
+    return compact
+
+
+def _month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def _add_months(day: date, months: int) -> date:
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    """Name of the monthly partition containing ``month``."""
+    return f"{PARENT_TABLE}_p{month:%Y%m}"
+
+
+async def is_partitioned(db: AsyncSession) -> bool:
+    """Whether ``processing_tasks`` is a partitioned table (PostgreSQL only)."""
+    if db.get_bind().dialect.name != "postgresql":
+        return False
+    relkind = (
+        await db.execute(
+            text("SELECT relkind FROM pg_class WHERE relname = :name"),
+            {"name": PARENT_TABLE},
+        )
+    ).scalar_one_or_none()
+    return relkind == "p"
+
+
+async def ensure_partitions(
+    db: AsyncSession, months_ahead: int, today: date | None = None
+) -> list[str]:
+    """Create monthly partitions from the current month ``months_ahead`` months out.
+
+    Returns:
+        Names of the partitions ensured (empty when the table is not partitioned).
+    """
+    if not await is_partitioned(db):
+        return []
+
+    start = _month_start(today or datetime.now(UTC).date())
+    names = []
+    for offset in range(months_ahead + 1):
+        lower = _add_months(start, offset)
+        upper = _add_months(lower, 1)
+        name = partition_name(lower)
+        await db.execute(
+            text(
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {PARENT_TABLE} "
+                f"FOR VALUES FROM ('{lower.isoformat()}') TO ('{upper.isoformat()}')"
+            )
+        )
+        names.append(name)
+    return names
+
+
+async def purge_expired(
+    db: AsyncSession, retention_days: int, now: datetime | None = None
+) -> dict[str, Any]:
+    """Remove audit records older than ``retention_days``.
+
+    Partitions entirely before the cutoff are dropped; remaining expired rows
+    (the partially expired month, the default partition, or an unpartitioned
+    table) are deleted.
+
+    Returns:
+        Summary with dropped partitions, deleted row count and the cutoff.
+    """
+    cutoff = (now or datetime.now(UTC)) - timedelta(days=retention_days)
+    dropped: list[str] = []
+
+    if await is_partitioned(db):
+        children = await db.execute(
+            text(
+                "SELECT c.relname FROM pg_inherits i "
+                "JOIN pg_class c ON c.oid = i.inhrelid "
+                "JOIN pg_class p ON p.oid = i.inhparent "
+                "WHERE p.relname = :name"
+            ),
+            {"name": PARENT_TABLE},
+        )
+        for name in children.scalars().all():
+            match = _PARTITION_RE.match(name)
+            if not match:
+                continue
+            month = date(int(match.group(1)), int(match.group(2)), 1)
+            if _add_months(month, 1) <= cutoff.date():
+                await db.execute(text(f"DROP TABLE IF EXISTS {name}"))
+                dropped.append(name)
+
+    result = await db.execute(delete(ProcessingTask).where(ProcessingTask.created_at < cutoff))
+    deleted = result.rowcount or 0
+
+    logger.info(
+        "processing_tasks.purged",
+        dropped_partitions=dropped,
+        deleted=deleted,
+        cutoff=cutoff.isoformat(),
+    )
+    return {"dropped_partitions": dropped, "deleted": deleted, "cutoff": cutoff.isoformat()}
@@ -0,0 +1,184 @@
+"""Micro-batching of Claude email classifications across classify tasks.
+
+A bulk IMAP poll or ``/orchestrace/batch-upload`` starts dozens of
+``classify_email`` tasks at once. Instead of one Claude call (and one rate
+limiter slot, and one copy of the system prompt) per email, the tasks
+coordinate through Redis:
+
+1. Each task appends its email to the pending list and waits for a result.
+2. A waiting task that gets the leader lock collects pending emails for up
+   to ``CLASSIFY_BATCH_WINDOW_SECONDS`` or ``CLASSIFY_BATCH_MAX_SIZE`` items,
+   classifies them with one call and publishes each result under its
+   request id; leadership then passes to the next waiting task, so emails
+   arriving during a call form the next batch.
+3. A task whose email got no batch result (failed batch call, email
+   missing from the response, Redis unavailable, or no result within
+   ``CLASSIFY_BATCH_MAX_WAIT_SECONDS``) classifies it on its own.
+
+A leader may spend the window, up to ``CLAUDE_RATE_LIMIT_WAIT_SECONDS``
+waiting for rate limit capacity and the call timeout on one batch. An email
+queued while a call is in flight waits for that batch and then its own, so
+the default wait covers two leader rounds.
+
+Batches are bounded by the number of concurrently running classify tasks
+(the worker concurrency), as every pending email belongs to a waiting task.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import json
+import time
+from typing import cast
+from uuid import uuid4
+
+import structlog
+from redis import Redis, RedisError
+
+from app.agents.email_classifier import CALL_TIMEOUT_SECONDS, ClassificationResult, EmailClassifier
+from app.core.config import get_settings
+
+logger = structlog.get_logger(__name__)
+
+_PENDING_KEY = "classify:batch:pending"
+_LEADER_KEY = "classify:batch:leader"
+_RESULT_KEY = "classify:batch:result:{}"
+
+# Interval of result and pending-list polling
+_POLL_SECONDS = 0.1
+# Published results outlive any waiting task
+_RESULT_TTL_SECONDS = 300
+# No result for the request: the waiting task classifies it itself
+_NO_RESULT = "null"
+# Redis round trips and result publishing on top of a leader round
+_ROUND_MARGIN_SECONDS = 5.0
+
+
+class ClassificationBatcher:
+    """Classifies an email as part of a Redis-coordinated micro-batch.
+
+    Args:
+        classifier: Classifier used for the batch call and for fallbacks.
+        redis: Redis client (decoded responses); defaults to REDIS_URL.
+    """
+
+    def __init__(self, classifier: EmailClassifier, redis: Redis | None = None) -> None:
+        settings = get_settings()
+        self._classifier = classifier
+        self._redis = redis or Redis.from_url(
+            str(settings.REDIS_URL),
+            decode_responses=True,
+            socket_timeout=2.0,
+            socket_connect_timeout=2.0,
+        )
+        self._window = settings.CLASSIFY_BATCH_WINDOW_SECONDS
+        self._max_size = settings.CLASSIFY_BATCH_MAX_SIZE
+        # Window, rate limiter wait and the call itself
+        leader_round = (
+            self._window
+            + settings.CLAUDE_RATE_LIMIT_WAIT_SECONDS
+            + CALL_TIMEOUT_SECONDS
+            + _ROUND_MARGIN_SECONDS
+        )
+        self._max_wait = settings.CLASSIFY_BATCH_MAX_WAIT_SECONDS or 2 * leader_round
+        # A leader crashing mid-call must not block batching for longer than a round
+        self._leader_ms = int(leader_round * 1000)
+
+    async def classify(self, subject: str, body: str) -> ClassificationResult:
+        """Classify one email, batched with other concurrently waiting emails.
+
+        Args:
+            subject: The email subject line.
+            body: The plain-text email body.
+
+        Returns:
+            ClassificationResult from the batch call, or from a single call
+            when the email could not be classified in a batch.
+        """
+        request_id = uuid4().hex
+        entry = json.dumps({"id": request_id, "subject": subject, "body": body})
+        try:
+            self._redis.rpush(_PENDING_KEY, entry)
+            self._redis.expire(_PENDING_KEY, _RESULT_TTL_SECONDS)
+            result = await self._await_result(request_id)
+            if result is None:
+                # Not picked up by any batch: take it off the list before classifying alone
+                self._redis.lrem(_PENDING_KEY, 1, entry)
+        except RedisError:
+            logger.warning("classify_batch.redis_unavailable", exc_info=True)
+            result = None
+
+        if result is not None:
+            return result
+        logger.info("classify_batch.fallback_single", request_id=request_id)
+        return await self._classifier.classify(subject=subject, body=body)
+
+    async def _await_result(self, request_id: str) -> ClassificationResult | None:
+        """Wait for the batch result of ``request_id``, leading batches when possible."""
+        deadline = time.monotonic() + self._max_wait
+        while time.monotonic() < deadline:
+            raw = cast("str | None", self._redis.getdel(_RESULT_KEY.format(request_id)))
+            if raw is not None:
+                return _deserialize(raw)
+
+            if self._redis.set(_LEADER_KEY, request_id, nx=True, px=self._leader_ms):
+                try:
+                    await self._lead_batch()
+                finally:
+                    if self._redis.get(_LEADER_KEY) == request_id:
+                        self._redis.delete(_LEADER_KEY)
+                continue
+
+            await asyncio.sleep(_POLL_SECONDS)
+
+        logger.warning("classify_batch.wait_timeout", request_id=request_id)
+        return None
+
+    async def _lead_batch(self) -> None:
+        """Collect pending emails, classify them with one call and publish the results."""
+        window_end = time.monotonic() + self._window
+        while (
+            time.monotonic() < window_end
+            and cast(int, self._redis.llen(_PENDING_KEY)) < self._max_size
+        ):
+            await asyncio.sleep(_POLL_SECONDS)
+
+        raw_entries = cast("list[str] | None", self._redis.lpop(_PENDING_KEY, self._max_size)) or []
+        requests = [json.loads(raw) for raw in raw_entries]
+        if not requests:
+            return
+
+        if len(requests) == 1:
+            # Nobody to batch with: the regular single-email call
+            only = requests[0]
+            results: list[ClassificationResult | None] = [
+                await self._classifier.classify(subject=only["subject"], body=only["body"])
+            ]
+        else:
+            results = await self._classifier.classify_batch(
+                [(request["subject"], request["body"]) for request in requests]
+            )
+
+        pipe = self._redis.pipeline()
+        for request, result in zip(requests, results, strict=True):
+            pipe.set(
+                _RESULT_KEY.format(request["id"]),
+                _serialize(result),
+                ex=_RESULT_TTL_SECONDS,
+            )
+        pipe.execute()
+
+        logger.info(
+            "classify_batch.completed",
+            size=len(requests),
+            classified=sum(result is not None for result in results),
+        )
+
+
+def _serialize(result: ClassificationResult | None) -> str:
+    return _NO_RESULT if result is None else json.dumps(dataclasses.asdict(result))
+
+
+def _deserialize(raw: str) -> ClassificationResult | None:
+    return None if raw == _NO_RESULT else ClassificationResult(**json.loads(raw))
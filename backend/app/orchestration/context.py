@@ -0,0 +1,172 @@
+"""Pipeline context passed between orchestration tasks.
+
+Task arguments and results travel through the Celery broker and result
+backend and are stored again in ``processing_tasks.output_data``. They are
+kept to a compact envelope of IDs and small fields (``PipelineEnvelope``);
+large fields stay where the ingest stage persisted them, keyed by
+``inbox_message_id``:
+
+- email subject, body and parsed data on ``InboxMessage``,
+- attachment file path, MIME type and file name on ``EmailAttachment``,
+
+and the stages that need them fetch them lazily (``load_email_content``,
+``load_attachment``).
+"""
+
+from collections.abc import Mapping
+from dataclasses import dataclass
+from typing import Any, TypedDict, cast
+from uuid import UUID
+
+from sqlalchemy import select
+
+from app.core.database import AsyncSessionLocal
+from app.models.email_attachment import EmailAttachment
+from app.models.inbox import InboxMessage
+
+
+class AttachmentSummary(TypedDict, total=False):
+    """Processed attachment as joined into the pipeline (no OCR text)."""
+
+    attachment_id: str
+    filename: str
+    document_id: str | None
+    detected_category: str
+    ocr_confidence: float
+    ocr_text_length: int
+    error: str
+    status: str
+    drawing_analysis: dict[str, Any]
+
+
+class PipelineEnvelope(TypedDict, total=False):
+    """Fields passed from one orchestration stage to the next."""
+
+    # Ingest
+    inbox_message_id: str
+    attachment_ids: list[str]
+    from_email: str
+    subject: str
+    original_message_id: str | None
+    thread_id: str | None
+    duplicate: bool
+    # Classify
+    classification: str | None
+    confidence: float
+    method: str
+    tokens_used: int
+    # Parse
+    parse_tokens_used: int
+    parsed_items_count: int
+    # Attachments (join_pipeline_branches)
+    attachments: list[AttachmentSummary]
+    # Orchestrate
+    customer_id: str | None
+    order_id: str | None
+    customer_created: bool
+    order_created: bool
+    documents_linked: int
+    next_stage: str | None
+    matched_by: str
+    orchestration: str
+    # Calculate
+    calculation: str
+    calculation_id: str
+    total_czk: float
+    margin_percent: float
+    items_count: int
+    # Offer
+    offer: str
+    offer_id: str
+    offer_number: str
+    offer_pdf_path: str
+    pohoda_xml_path: str
+    document_id: str
+    email_sent: bool
+    # Outcome of the last stage
+    status: str
+    reason: str
+    error: str
+    pipeline_status: str
+
+
+class ClassifyResult(PipelineEnvelope, total=False):
+    """``classify_email`` result: the envelope plus the routed stages.
+
+    ``stages`` is only read by ``route_and_execute`` and is not passed further.
+    """
+
+    stages: list[str]
+
+
+_ENVELOPE_KEYS = frozenset(PipelineEnvelope.__annotations__)
+_ATTACHMENT_KEYS = frozenset(AttachmentSummary.__annotations__)
+
+
+def to_envelope(data: Mapping[str, Any]) -> PipelineEnvelope:
+    """Keep only the envelope fields of a stage result; UUIDs become strings."""
+    envelope = {
+        key: str(value) if isinstance(value, UUID) else value
+        for key, value in data.items()
+        if key in _ENVELOPE_KEYS
+    }
+    return cast(PipelineEnvelope, envelope)
+
+
+def to_attachment_summary(attachment_id: str, result: Mapping[str, Any]) -> AttachmentSummary:
+    """Compact summary of a process_attachment / analyze_attachment_drawing result."""
+    summary = {
+        key: str(value) if isinstance(value, UUID) else value
+        for key, value in result.items()
+        if key in _ATTACHMENT_KEYS
+    }
+    summary["attachment_id"] = attachment_id
+    return cast(AttachmentSummary, summary)
+
+
+@dataclass(frozen=True, slots=True)
+class EmailContent:
+    """Large per-email fields read from ``InboxMessage``."""
+
+    subject: str
+    body_text: str
+    parsed_data: dict[str, Any] | None
+
+
+async def load_email_content(inbox_message_id: str) -> EmailContent:
+    """Read subject, body and parsed data of an inbox message.
+
+    Raises:
+        ValueError: If the inbox message does not exist.
+    """
+    async with AsyncSessionLocal() as session:
+        row = (
+            await session.execute(
+                select(InboxMessage.subject, InboxMessage.body_text, InboxMessage.parsed_data)
+                .where(InboxMessage.id == UUID(inbox_message_id))
+            )
+        ).one_or_none()
+    if row is None:
+        raise ValueError(f"Inbox message not found: {inbox_message_id}")
+    return EmailContent(subject=row.subject, body_text=row.body_text, parsed_data=row.parsed_data)
+
+
+async def load_attachment(attachment_id: str) -> tuple[str, str, str]:
+    """Read file path, MIME type and file name of an email attachment.
+
+    Raises:
+        ValueError: If the attachment does not exist.
+    """
+    async with AsyncSessionLocal() as session:
+        row = (
+            await session.execute(
+                select(
+                    EmailAttachment.file_path,
+                    EmailAttachment.content_type,
+                    EmailAttachment.filename,
+                ).where(EmailAttachment.id == UUID(attachment_id))
+            )
+        ).one_or_none()
+    if row is None:
+        raise ValueError(f"Attachment not found: {attachment_id}")
+    return row.file_path, row.content_type, row.filename
@@ -0,0 +1,158 @@
+"""Incrementally maintained orchestration metrics.
+
+Dashboards (``/orchestrace/stats``, ``/stats/timeline``, ``/nlp-analytics``)
+used to recompute counts, sums and averages over all ``processing_tasks``
+rows on every request. Each recorded stage now also increments one row of
+``pipeline_metrics_hourly`` (hour x stage x status x classification x
+method), in the same transaction as the audit record, and the endpoints
+aggregate those buckets instead: the work per request depends on the number
+of hours in the period, not on the number of processed emails.
+
+Materials from parsed emails are extracted into ``inbox_material_mentions``
+when the parse stage stores ``parsed_data``, so top materials are a grouped
+query instead of loading every JSON document.
+"""
+
+from collections.abc import Sequence
+from datetime import datetime
+from typing import Any
+from uuid import UUID, uuid4
+
+from sqlalchemy import Row, delete, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.pipeline_metrics import (
+    PIPELINE_METRICS_DIMENSIONS,
+    PIPELINE_METRICS_MEASURES,
+    InboxMaterialMention,
+    PipelineMetricsHourly,
+)
+
+
+def hour_bucket(at: datetime) -> datetime:
+    """Truncate a timestamp to the start of its hour."""
+    return at.replace(minute=0, second=0, microsecond=0)
+
+
+async def record_stage_metrics(
+    db: AsyncSession,
+    *,
+    stage: str,
+    status: str,
+    at: datetime,
+    classification: str | None = None,
+    method: str | None = None,
+    tokens_used: int | None = None,
+    processing_time_ms: int | None = None,
+    confidence: float | None = None,
+) -> None:
+    """Add one stage outcome to its hourly bucket (upsert + increment)."""
+    values: dict[str, Any] = {
+        "bucket_start": hour_bucket(at),
+        "stage": stage,
+        "status": status,
+        "classification": classification or "",
+        "method": method or "",
+        "task_count": 1,
+        "tokens_used": tokens_used or 0,
+        "processing_time_ms_total": processing_time_ms or 0,
+        "processing_time_count": 0 if processing_time_ms is None else 1,
+        "confidence_total": confidence or 0.0,
+        "confidence_count": 0 if confidence is None else 1,
+    }
+
+    # Both dialects support INSERT ... ON CONFLICT DO UPDATE
+    stmt: postgresql.Insert | sqlite.Insert
+    if db.get_bind().dialect.name == "postgresql":
+        stmt = postgresql.insert(PipelineMetricsHourly)
+    else:
+        stmt = sqlite.insert(PipelineMetricsHourly)
+    stmt = stmt.values(id=uuid4(), **values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(PIPELINE_METRICS_DIMENSIONS),
+        set_={
+            **{
+                measure: getattr(PipelineMetricsHourly, measure) + stmt.excluded[measure]
+                for measure in PIPELINE_METRICS_MEASURES
+            },
+            "updated_at": func.now(),
+        },
+    )
+    await db.execute(stmt)
+
+
+async def aggregate_metrics(
+    db: AsyncSession,
+    dimensions: Sequence[str],
+    cutoff: datetime | None = None,
+    **filters: str,
+) -> Sequence[Row[Any]]:
+    """Sum the rollup measures grouped by ``dimensions``.
+
+    Args:
+        db: Database session.
+        dimensions: Rollup columns to group by (e.g. ``("stage", "status")``).
+        cutoff: Only buckets from the hour containing ``cutoff`` onwards.
+        **filters: Equality filters on dimensions (e.g. ``stage="classify"``).
+
+    Returns:
+        Rows with the dimension columns followed by one summed column per
+        measure (named like the measure).
+    """
+    columns = [getattr(PipelineMetricsHourly, dimension) for dimension in dimensions]
+    query = select(
+        *columns,
+        *(
+            func.sum(getattr(PipelineMetricsHourly, measure)).label(measure)
+            for measure in PIPELINE_METRICS_MEASURES
+        ),
+    )
+    if columns:
+        query = query.group_by(*columns).order_by(*columns)
+    if cutoff:
+        query = query.where(PipelineMetricsHourly.bucket_start >= hour_bucket(cutoff))
+    for dimension, value in filters.items():
+        query = query.where(getattr(PipelineMetricsHourly, dimension) == value)
+    return (await db.execute(query)).all()
+
+
+def average(total: float | None, count: int | None) -> float:
+    """Average from a summed total/count pair (0 for an empty bucket)."""
+    return float(total or 0) / count if count else 0.0
+
+
+def extract_materials(parsed_data: dict[str, Any] | None) -> list[str]:
+    """Non-empty ``material`` values of the parsed items."""
+    if not isinstance(parsed_data, dict):
+        return []
+    items = parsed_data.get("items")
+    if not isinstance(items, list):
+        return []
+    materials = []
+    for item in items:
+        if isinstance(item, dict) and isinstance(item.get("material"), str):
+            material = item["material"].strip()
+            if material:
+                materials.append(material[:255])
+    return materials
+
+
+async def replace_material_mentions(
+    db: AsyncSession,
+    inbox_message_id: UUID,
+    parsed_data: dict[str, Any] | None,
+    created_at: datetime,
+) -> None:
+    """Store the materials of a (re-)parsed message, replacing earlier ones."""
+    await db.execute(
+        delete(InboxMaterialMention).where(
+            InboxMaterialMention.inbox_message_id == inbox_message_id
+        )
+    )
+    db.add_all(
+        InboxMaterialMention(
+            inbox_message_id=inbox_message_id, material=material, created_at=created_at
+        )
+        for material in extract_materials(parsed_data)
+    )
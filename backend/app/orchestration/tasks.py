@@ -9,22 +9,38 @@ from __future__ import annotations
 import asyncio
 import time
 import traceback
+from collections.abc import Coroutine, Mapping, Sequence
 from datetime import UTC, datetime
 from decimal import Decimal
+from typing import Any, TypeVar, overload
 from uuid import UUID
 
 import structlog
-from celery import chain
+from celery import Task, chain, chord, group
 from celery.exceptions import MaxRetriesExceededError
 
+from app.core import feature_flags
 from app.core.celery_app import celery_app
 from app.core.config import get_settings
 from app.core.database import AsyncSessionLocal
+from app.orchestration.context import (
+    ClassifyResult,
+    PipelineEnvelope,
+    load_attachment,
+    load_email_content,
+    to_attachment_summary,
+    to_envelope,
+)
 
 logger = structlog.get_logger(__name__)
 
+# Attachment categories analyzed by analyze_drawing
+_DRAWING_CATEGORIES = frozenset({"vykres", "technical_drawing"})
 
-def _run_async(coro):
+_T = TypeVar("_T")
+
+
+def _run_async(coro: Coroutine[Any, Any, _T]) -> _T:
     """Run async coroutine in sync context (Celery worker).
 
     Each asyncio.run() creates a new event loop, but the module-level
@@ -32,7 +48,7 @@ def _run_async(coro):
     We dispose the pool first; if that fails (stale connections from
     a closed loop), we force-recreate the pool via sync_engine.
     """
-    async def _wrapper():
+    async def _wrapper() -> _T:
         from app.core.database import engine
 
         try:
@@ -47,7 +63,11 @@ def _run_async(coro):
     return asyncio.run(_wrapper())
 
 
-def _make_json_safe(data: dict | None) -> dict | None:
+@overload
+def _make_json_safe(data: Mapping[str, Any]) -> dict[str, Any]: ...
+@overload
+def _make_json_safe(data: None) -> None: ...
+def _make_json_safe(data: Mapping[str, Any] | None) -> dict[str, Any] | None:
     """Convert UUID objects to strings for JSON serialization."""
     if data is None:
         return None
@@ -86,7 +106,7 @@ async def _broadcast_pipeline_progress(
     inbox_message_id: str | None,
     stage: str,
     status: str,
-    data: dict | None = None,
+    data: dict[str, Any] | None = None,
 ) -> None:
     """Broadcast pipeline progress via WebSocket."""
     try:
@@ -108,35 +128,60 @@ async def _record_processing_task(
     celery_task_id: str | None,
     stage: str,
     status: str,
-    input_data: dict | None = None,
-    output_data: dict | None = None,
+    input_data: Mapping[str, Any] | None = None,
+    output_data: Mapping[str, Any] | None = None,
     error_message: str | None = None,
     tokens_used: int | None = None,
     processing_time_ms: int | None = None,
+    previous_data: Mapping[str, Any] | None = None,
 ) -> None:
-    """Record a processing task in the audit trail."""
+    """Record a processing task in the audit trail.
+
+    ``output_data`` is stored compacted: only keys that differ from
+    ``previous_data`` (the stage input), with bulky fields as references.
+    The hourly dashboard rollup is incremented in the same transaction.
+    """
     from app.models.processing_task import ProcessingStage, ProcessingStatus, ProcessingTask
+    from app.orchestration.audit import compact_stage_output
+    from app.orchestration.rollup import record_stage_metrics
+
+    output = output_data or {}
+    is_classify = stage == ProcessingStage.CLASSIFY.value
+    classification = output.get("classification") or (previous_data or {}).get("classification")
 
     async with AsyncSessionLocal() as session:
+        now = datetime.now(UTC)
         task = ProcessingTask(
+            created_at=now,
             inbox_message_id=UUID(inbox_message_id) if inbox_message_id else None,
             celery_task_id=celery_task_id,
             stage=ProcessingStage(stage),
             status=ProcessingStatus(status),
             input_data=_make_json_safe(input_data),
-            output_data=_make_json_safe(output_data),
+            output_data=_make_json_safe(compact_stage_output(output_data, previous_data)),
             error_message=error_message,
             tokens_used=tokens_used,
             processing_time_ms=processing_time_ms,
         )
         session.add(task)
+        await record_stage_metrics(
+            session,
+            stage=stage,
+            status=status,
+            at=now,
+            classification=classification,
+            method=output.get("method") if is_classify else None,
+            tokens_used=tokens_used,
+            processing_time_ms=processing_time_ms,
+            confidence=output.get("confidence") if is_classify else None,
+        )
         await session.commit()
 
 
 async def _send_to_dlq(
     original_task: str,
     stage: str,
-    payload: dict,
+    payload: Mapping[str, Any],
     error_message: str,
     error_tb: str,
     retry_count: int,
@@ -148,7 +193,7 @@ async def _send_to_dlq(
         entry = DeadLetterEntry(
             original_task=original_task,
             stage=stage,
-            payload=payload,
+            payload=dict(payload),
             error_message=error_message,
             error_traceback=error_tb,
             retry_count=retry_count,
@@ -186,22 +231,21 @@ async def _update_inbox_timestamp(inbox_message_id: str | None, field_name: str)
 
 
 @celery_app.task(bind=True, max_retries=3, queue="orchestration", name="orchestration.ingest_email")
-def ingest_email(self, raw_email_data: dict) -> dict:
+def ingest_email(self: Task, raw_email_data: dict[str, Any]) -> PipelineEnvelope:
     """Ingest a raw email: save to DB + attachments to disk.
 
     Args:
         raw_email_data: Serialized email data from IMAP fetch
 
     Returns:
-        dict with inbox_message_id, attachment_ids, etc.
+        PipelineEnvelope with inbox_message_id, attachment_ids, etc.
     """
-    settings = get_settings()
-    if not settings.ORCHESTRATION_ENABLED:
+    if not feature_flags.is_enabled("ORCHESTRATION_ENABLED"):
         return {"status": "skipped", "reason": "orchestration disabled"}
 
     start = time.monotonic()
     try:
-        result = _run_async(_ingest_email_async(raw_email_data))
+        result = to_envelope(_run_async(_ingest_email_async(raw_email_data)))
         elapsed = time.monotonic() - start
         elapsed_ms = int(elapsed * 1000)
 
@@ -262,7 +306,7 @@ def ingest_email(self, raw_email_data: dict) -> dict:
             return {"status": "failed", "error": str(exc)}
 
 
-async def _ingest_email_async(raw_email_data: dict) -> dict:
+async def _ingest_email_async(raw_email_data: dict[str, Any]) -> dict[str, Any]:
     from app.orchestration.agents.email_ingestion import EmailIngestionAgent
     agent = EmailIngestionAgent()
     return await agent.process_from_dict(raw_email_data)
@@ -272,7 +316,7 @@ async def _ingest_email_async(raw_email_data: dict) -> dict:
 
 
 @celery_app.task(bind=True, max_retries=2, queue="orchestration", name="orchestration.classify_email")
-def classify_email(self, ingest_result: dict) -> dict:
+def classify_email(self: Task, ingest_result: PipelineEnvelope) -> ClassifyResult:
     """Classify an ingested email using heuristics → Claude fallback.
 
     Args:
@@ -281,9 +325,8 @@ def classify_email(self, ingest_result: dict) -> dict:
     Returns:
         dict with classification, confidence, method, stages
     """
-    settings = get_settings()
-    if not settings.ORCHESTRATION_ENABLED:
-        return {**ingest_result, "status": "skipped"}
+    if not feature_flags.is_enabled("ORCHESTRATION_ENABLED"):
+        return {**to_envelope(ingest_result), "status": "skipped", "stages": []}
 
     start = time.monotonic()
     try:
@@ -297,6 +340,7 @@ def classify_email(self, ingest_result: dict) -> dict:
             stage="classify",
             status="success",
             output_data=result,
+            previous_data=ingest_result,
             tokens_used=result.get("tokens_used", 0),
             processing_time_ms=elapsed_ms,
         ))
@@ -340,17 +384,18 @@ def classify_email(self, ingest_result: dict) -> dict:
                 ingest_result, str(exc), traceback.format_exc(),
                 self.request.retries,
             ))
-            return {**ingest_result, "status": "failed", "error": str(exc)}
+            return {**to_envelope(ingest_result), "status": "failed", "error": str(exc), "stages": []}
 
 
-async def _classify_email_async(ingest_result: dict) -> dict:
+async def _classify_email_async(ingest_result: PipelineEnvelope) -> ClassifyResult:
     """Classify email: try heuristics first, fall back to Claude."""
     from app.orchestration.agents.heuristic_classifier import HeuristicClassifier
     from app.orchestration.router import route_classification
 
     inbox_message_id = ingest_result["inbox_message_id"]
-    subject = ingest_result.get("subject", "")
-    body_text = ingest_result.get("body_text", "")
+    content = await load_email_content(inbox_message_id)
+    subject = content.subject
+    body_text = content.body_text
     has_attachments = bool(ingest_result.get("attachment_ids"))
 
     heuristic = HeuristicClassifier()
@@ -378,12 +423,24 @@ async def _classify_email_async(ingest_result: dict) -> dict:
             classification = "dotaz"
             confidence = 0.5
             method = "default_fallback"
+        elif settings.CLASSIFY_BATCH_ENABLED:
+            # Micro-batched with concurrently classified emails; the batch
+            # call takes its own rate limiter slot
+            from app.orchestration.classify_batcher import ClassificationBatcher
+
+            classifier = EmailClassifier(api_key=settings.ANTHROPIC_API_KEY)
+            result = await ClassificationBatcher(classifier).classify(subject=subject, body=body_text)
+            classification = result.category
+            confidence = result.confidence
+            tokens_used = result.tokens_used
+            method = "claude"
         else:
-            # H4: Rate limiter
+            # H4: Rate limiter (the classifier's own acquire reuses this lease)
+            lease = None
             try:
                 from app.core.rate_limiter import RateLimitExceeded, get_rate_limiter
                 limiter = get_rate_limiter()
-                limiter.acquire(estimated_tokens=900)
+                lease = await limiter.acquire_wait(estimated_tokens=900)
             except RateLimitExceeded:
                 raise
             except Exception:
@@ -394,13 +451,11 @@ async def _classify_email_async(ingest_result: dict) -> dict:
                 result = await classifier.classify(subject=subject, body=body_text)
                 classification = result.category
                 confidence = result.confidence
-                tokens_used = 900
+                tokens_used = result.tokens_used
                 method = "claude"
             finally:
                 try:
-                    limiter = get_rate_limiter()
-                    limiter.release()
-                    limiter.record_usage(tokens_used)
+                    get_rate_limiter().release(lease)
                 except Exception:
                     pass
 
@@ -440,7 +495,7 @@ async def _classify_email_async(ingest_result: dict) -> dict:
             await notif_service.create_for_roles(
                 notification_type=NotificationType.EMAIL_CLASSIFIED,
                 title="Email klasifikován",
-                message=f"'{ingest_result.get('subject', '')}' → {classification or 'neznámé'} ({method})",
+                message=f"'{subject}' → {classification or 'neznámé'} ({method})",
                 roles=[UserRole.ADMIN, UserRole.OBCHODNIK],
                 link="/inbox",
             )
@@ -459,7 +514,7 @@ async def _classify_email_async(ingest_result: dict) -> dict:
             pass
 
     return {
-        **ingest_result,
+        **to_envelope(ingest_result),
         "classification": classification,
         "confidence": confidence,
         "method": method,
@@ -472,7 +527,14 @@ async def _classify_email_async(ingest_result: dict) -> dict:
 
 
 @celery_app.task(bind=True, max_retries=2, queue="ocr", name="orchestration.process_attachment")
-def process_attachment(self, attachment_id: str, file_path: str, content_type: str, filename: str) -> dict:
+def process_attachment(
+    self: Task,
+    attachment_id: str,
+    file_path: str = "",
+    content_type: str = "",
+    filename: str = "",
+    analyze_drawings: bool = True,
+) -> dict[str, Any]:
     """Process a single attachment: OCR + type detection.
 
     After processing, if the detected category is a drawing, triggers
@@ -480,16 +542,21 @@ def process_attachment(self, attachment_id: str, file_path: str, content_type: s
 
     Args:
         attachment_id: UUID of EmailAttachment
-        file_path: Path to file on disk
+        file_path: Path to file on disk (empty: read from the EmailAttachment)
         content_type: MIME type
         filename: Original filename
+        analyze_drawings: Trigger analyze_drawing for drawings; False when the
+            pipeline runs analyze_attachment_drawing after this task
 
     Returns:
         dict with document_id, ocr_confidence, detected_category
     """
     start = time.monotonic()
     try:
+        if not file_path:
+            file_path, content_type, filename = _run_async(load_attachment(attachment_id))
         result = _run_async(_process_attachment_async(attachment_id, file_path, content_type, filename))
+        result["filename"] = filename
         elapsed = time.monotonic() - start
         elapsed_ms = int(elapsed * 1000)
 
@@ -506,11 +573,12 @@ def process_attachment(self, attachment_id: str, file_path: str, content_type: s
 
         # H2: Trigger drawing analysis for technical drawings
         detected_category = result.get("detected_category", "")
-        if detected_category in ("vykres", "technical_drawing") and result.get("document_id"):
+        if analyze_drawings and detected_category in _DRAWING_CATEGORIES and result.get("document_id"):
+            # OCR text is read from the Document; confidence is reported as 0-1
             analyze_drawing.delay(
-                result["document_id"],
-                result.get("ocr_text", ""),
-                result.get("ocr_confidence", 0.0),
+                str(result["document_id"]),
+                "",
+                result.get("ocr_confidence", 0.0) * 100,
             )
             logger.info(
                 "orchestration.drawing_analysis_triggered",
@@ -518,7 +586,7 @@ def process_attachment(self, attachment_id: str, file_path: str, content_type: s
                 category=detected_category,
             )
 
-        return result
+        return _make_json_safe(result)
 
     except Exception as exc:
         elapsed = time.monotonic() - start
@@ -537,7 +605,9 @@ def process_attachment(self, attachment_id: str, file_path: str, content_type: s
             return {"status": "failed", "attachment_id": attachment_id, "error": str(exc)}
 
 
-async def _process_attachment_async(attachment_id: str, file_path: str, content_type: str, filename: str) -> dict:
+async def _process_attachment_async(
+    attachment_id: str, file_path: str, content_type: str, filename: str
+) -> dict[str, Any]:
     from app.orchestration.agents.attachment_processor import AttachmentProcessor
     processor = AttachmentProcessor()
     return await processor.process(
@@ -552,14 +622,14 @@ async def _process_attachment_async(attachment_id: str, file_path: str, content_
 
 
 @celery_app.task(bind=True, max_retries=2, queue="ai_agents", name="orchestration.parse_email")
-def parse_email(self, classify_result: dict) -> dict:
+def parse_email(self: Task, classify_result: ClassifyResult) -> PipelineEnvelope:
     """Parse email content with Claude to extract structured data.
 
     Args:
         classify_result: Output from classify_email task
 
     Returns:
-        dict with parsed_data merged into classify_result
+        PipelineEnvelope of classify_result with the parse token usage
     """
     start = time.monotonic()
     try:
@@ -586,7 +656,8 @@ def parse_email(self, classify_result: dict) -> dict:
         # M4: Prometheus
         _observe_stage("parse", "success", elapsed, result.get("parse_tokens_used", 0), "parse")
 
-        return result
+        # parsed_data stays on the InboxMessage; later stages load it
+        return to_envelope(result)
 
     except Exception as exc:
         elapsed = time.monotonic() - start
@@ -602,40 +673,38 @@ def parse_email(self, classify_result: dict) -> dict:
                 classify_result, str(exc), traceback.format_exc(),
                 self.request.retries,
             ))
-            return {**classify_result, "parsed_data": None, "status": "failed"}
+            return {**to_envelope(classify_result), "status": "failed"}
 
 
-async def _parse_email_async(classify_result: dict) -> dict:
+async def _parse_email_async(classify_result: ClassifyResult) -> dict[str, Any]:
     """Parse email using EmailParser and persist results."""
     from sqlalchemy import select
 
     from app.agents.email_parser import EmailParser
     from app.core.config import get_settings
     from app.models.inbox import InboxMessage
+    from app.orchestration.rollup import replace_material_mentions
 
     settings = get_settings()
 
-    # H4: Rate limiter
+    # H4: Rate limiter (the parser's own acquire reuses this lease)
+    lease = None
     try:
         from app.core.rate_limiter import RateLimitExceeded, get_rate_limiter
         limiter = get_rate_limiter()
-        limiter.acquire(estimated_tokens=1200)
+        lease = await limiter.acquire_wait(estimated_tokens=1200)
     except RateLimitExceeded:
         raise
     except Exception:
         pass
 
     try:
+        content = await load_email_content(classify_result["inbox_message_id"])
         parser = EmailParser(api_key=settings.ANTHROPIC_API_KEY)
-        parsed = await parser.parse(
-            subject=classify_result.get("subject", ""),
-            body=classify_result.get("body_text", ""),
-        )
+        parsed = await parser.parse(subject=content.subject, body=content.body_text)
     finally:
         try:
-            limiter = get_rate_limiter()
-            limiter.release()
-            limiter.record_usage(1200)
+            get_rate_limiter().release(lease)
         except Exception:
             pass
 
@@ -669,12 +738,14 @@ async def _parse_email_async(classify_result: dict) -> dict:
             msg = result.scalar_one_or_none()
             if msg:
                 msg.parsed_data = parsed_data
+                await replace_material_mentions(session, msg.id, parsed_data, msg.created_at)
                 await session.commit()
 
     return {
         **classify_result,
         "parsed_data": parsed_data,
-        "parse_tokens_used": 1200,  # Approximate
+        "parsed_items_count": len(parsed.items),
+        "parse_tokens_used": parsed.tokens_used,
     }
 
 
@@ -682,27 +753,58 @@ async def _parse_email_async(classify_result: dict) -> dict:
 
 
 @celery_app.task(bind=True, max_retries=2, queue="ai_agents", name="orchestration.analyze_drawing")
-def analyze_drawing(self, document_id: str, ocr_text: str, ocr_confidence: float) -> dict:
+def analyze_drawing(
+    self: Task, document_id: str, ocr_text: str, ocr_confidence: float
+) -> dict[str, Any]:
     """Analyze a drawing with Claude if OCR confidence > 30.
 
     Args:
         document_id: UUID of Document
-        ocr_text: OCR extracted text
-        ocr_confidence: OCR confidence score
+        ocr_text: OCR extracted text (empty: read from the Document)
+        ocr_confidence: OCR confidence score (0-100)
 
     Returns:
         dict with analysis results
     """
+    return _run_drawing_analysis(self, document_id, ocr_text, ocr_confidence)
+
+
+@celery_app.task(bind=True, max_retries=2, queue="ai_agents", name="orchestration.analyze_attachment_drawing")
+def analyze_attachment_drawing(self: Task, attachment_result: dict[str, Any]) -> dict[str, Any]:
+    """Pipeline step after process_attachment: analyze the attachment if it is a drawing.
+
+    Args:
+        attachment_result: Output from process_attachment
+
+    Returns:
+        attachment_result with drawing_analysis added for drawings
+    """
+    document_id = attachment_result.get("document_id")
+    if attachment_result.get("detected_category") not in _DRAWING_CATEGORIES or not document_id:
+        return attachment_result
+
+    # The attachment processor reports confidence as 0-1
+    analysis = _run_drawing_analysis(
+        self, str(document_id), "", attachment_result.get("ocr_confidence", 0.0) * 100
+    )
+    return {**attachment_result, "drawing_analysis": analysis}
+
+
+def _run_drawing_analysis(
+    task: Task, document_id: str, ocr_text: str, ocr_confidence: float
+) -> dict[str, Any]:
+    """Run drawing analysis on behalf of ``task`` with its rate limiting, metrics and retries."""
     if ocr_confidence < 30:
         return {"status": "skipped", "reason": "low_ocr_confidence", "document_id": document_id}
 
     start = time.monotonic()
     try:
         # H4: Rate limiter
+        lease = None
         try:
             from app.core.rate_limiter import RateLimitExceeded, get_rate_limiter
             limiter = get_rate_limiter()
-            limiter.acquire(estimated_tokens=2500)
+            lease = limiter.acquire(estimated_tokens=2500)
         except RateLimitExceeded:
             raise
         except Exception:
@@ -712,21 +814,19 @@ def analyze_drawing(self, document_id: str, ocr_text: str, ocr_confidence: float
         elapsed = time.monotonic() - start
         elapsed_ms = int(elapsed * 1000)
 
-        # Release rate limiter
+        # Release rate limiter (the analyzer's call settled the reservation)
         try:
-            limiter = get_rate_limiter()
-            limiter.release()
-            limiter.record_usage(result.get("tokens_used", 2500))
+            get_rate_limiter().release(lease)
         except Exception:
             pass
 
         _run_async(_record_processing_task(
             inbox_message_id=None,
-            celery_task_id=self.request.id,
+            celery_task_id=task.request.id,
             stage="analyze",
             status="success",
             input_data={"document_id": document_id},
-            output_data={"dimensions_count": len(result.get("dimensions", []))},
+            output_data={"dimensions_count": result.get("dimensions_count", 0)},
             tokens_used=result.get("tokens_used", 0),
             processing_time_ms=elapsed_ms,
         ))
@@ -734,7 +834,7 @@ def analyze_drawing(self, document_id: str, ocr_text: str, ocr_confidence: float
         # M3: WebSocket progress
         _run_async(_broadcast_pipeline_progress(
             None, "analyze", "success",
-            {"document_id": document_id, "dimensions_count": len(result.get("dimensions", []))},
+            {"document_id": document_id, "dimensions_count": result.get("dimensions_count", 0)},
         ))
 
         # M4: Prometheus
@@ -748,27 +848,34 @@ def analyze_drawing(self, document_id: str, ocr_text: str, ocr_confidence: float
         _observe_stage("analyze", "failed", elapsed)
         try:
             limiter = get_rate_limiter()
-            limiter.release()
+            limiter.release(lease)
         except Exception:
             pass
         try:
-            raise self.retry(exc=exc, countdown=60 * (2 ** self.request.retries))
+            raise task.retry(exc=exc, countdown=60 * (2 ** task.request.retries))
         except MaxRetriesExceededError:
             _run_async(_send_to_dlq(
                 "orchestration.analyze_drawing", "analyze",
-                {"document_id": document_id}, str(exc), traceback.format_exc(),
-                self.request.retries,
+                {"document_id": document_id, "ocr_confidence": ocr_confidence},
+                str(exc), traceback.format_exc(), task.request.retries,
             ))
             return {"status": "failed", "document_id": document_id}
 
 
-async def _analyze_drawing_async(document_id: str, ocr_text: str) -> dict:
+async def _analyze_drawing_async(document_id: str, ocr_text: str) -> dict[str, Any]:
     """Run drawing analysis and persist results."""
     from app.core.config import get_settings
     from app.integrations.ocr.drawing_analyzer import DrawingAnalyzer
     from app.models.drawing_analysis import DrawingAnalysis as DrawingAnalysisModel
 
     settings = get_settings()
+    if not ocr_text:
+        from app.models.document import Document
+
+        async with AsyncSessionLocal() as session:
+            document = await session.get(Document, UUID(document_id))
+            ocr_text = (document.ocr_text if document else None) or ""
+
     analyzer = DrawingAnalyzer(api_key=settings.ANTHROPIC_API_KEY)
     analysis = await analyzer.analyze(ocr_text=ocr_text)
 
@@ -788,7 +895,7 @@ async def _analyze_drawing_async(document_id: str, ocr_text: str) -> dict:
             },
             notes=analysis.notes,
             analysis_model=settings.ANTHROPIC_MODEL,
-            tokens_used=2500,
+            tokens_used=analysis.tokens_used,
         )
         session.add(db_analysis)
         await session.commit()
@@ -797,7 +904,9 @@ async def _analyze_drawing_async(document_id: str, ocr_text: str) -> dict:
         "document_id": document_id,
         "dimensions_count": len(analysis.dimensions),
         "materials_count": len(analysis.materials),
-        "tokens_used": 2500,
+        "materials": [m.grade for m in analysis.materials],
+        "dimensions": [f"{d.type} {d.value:g} {d.unit}" for d in analysis.dimensions],
+        "tokens_used": analysis.tokens_used,
     }
 
 
@@ -805,7 +914,7 @@ async def _analyze_drawing_async(document_id: str, ocr_text: str) -> dict:
 
 
 @celery_app.task(bind=True, max_retries=3, queue="orchestration", name="orchestration.orchestrate_order")
-def orchestrate_order(self, pipeline_result: dict) -> dict:
+def orchestrate_order(self: Task, pipeline_result: PipelineEnvelope) -> PipelineEnvelope:
     """Create/match customer and order from parsed email data.
 
     Args:
@@ -814,9 +923,8 @@ def orchestrate_order(self, pipeline_result: dict) -> dict:
     Returns:
         dict with customer_id, order_id, next_stage
     """
-    settings = get_settings()
-    if not settings.ORCHESTRATION_AUTO_CREATE_ORDERS:
-        return {**pipeline_result, "orchestration": "skipped", "reason": "auto_create_orders disabled"}
+    if not feature_flags.is_enabled("ORCHESTRATION_AUTO_CREATE_ORDERS"):
+        return {**to_envelope(pipeline_result), "orchestration": "skipped", "reason": "auto_create_orders disabled"}
 
     start = time.monotonic()
     try:
@@ -830,6 +938,7 @@ def orchestrate_order(self, pipeline_result: dict) -> dict:
             stage="orchestrate",
             status="success",
             output_data=result,
+            previous_data=pipeline_result,
             processing_time_ms=elapsed_ms,
         ))
 
@@ -842,7 +951,8 @@ def orchestrate_order(self, pipeline_result: dict) -> dict:
         # M4: Prometheus
         _observe_stage("orchestrate", "success", elapsed)
 
-        return result
+        # Downstream stages keep the pipeline context (attachments, inbox message)
+        return to_envelope({**pipeline_result, **result})
 
     except Exception as exc:
         elapsed = time.monotonic() - start
@@ -858,15 +968,16 @@ def orchestrate_order(self, pipeline_result: dict) -> dict:
                 pipeline_result, str(exc), traceback.format_exc(),
                 self.request.retries,
             ))
-            return {**pipeline_result, "status": "failed"}
+            return {**to_envelope(pipeline_result), "status": "failed"}
 
 
-async def _orchestrate_order_async(pipeline_result: dict) -> dict:
+async def _orchestrate_order_async(pipeline_result: PipelineEnvelope) -> dict[str, Any]:
     from app.orchestration.agents.order_orchestrator import OrderOrchestrator
 
     # Merge classification and email context into parsed_data
     # OrderOrchestrator.process() expects (inbox_message_id, parsed_data)
-    parsed_data = dict(pipeline_result.get("parsed_data") or {})
+    content = await load_email_content(pipeline_result["inbox_message_id"])
+    parsed_data = dict(content.parsed_data or {})
     if "classification" not in parsed_data and pipeline_result.get("classification"):
         parsed_data["classification"] = pipeline_result["classification"]
     if "email" not in parsed_data and pipeline_result.get("from_email"):
@@ -883,7 +994,7 @@ async def _orchestrate_order_async(pipeline_result: dict) -> dict:
 
 
 @celery_app.task(bind=True, max_retries=2, queue="ai_agents", name="orchestration.auto_calculate")
-def auto_calculate(self, orchestration_result: dict) -> dict:
+def auto_calculate(self: Task, orchestration_result: PipelineEnvelope) -> PipelineEnvelope:
     """Auto-trigger calculation for poptavky orders.
 
     Args:
@@ -892,21 +1003,22 @@ def auto_calculate(self, orchestration_result: dict) -> dict:
     Returns:
         dict with calculation_id
     """
-    settings = get_settings()
-    if not settings.ORCHESTRATION_AUTO_CALCULATE:
-        return {**orchestration_result, "calculation": "skipped"}
+    if not feature_flags.is_enabled("ORCHESTRATION_AUTO_CALCULATE"):
+        return {**to_envelope(orchestration_result), "calculation": "skipped"}
 
     order_id = orchestration_result.get("order_id")
     if not order_id:
-        return {**orchestration_result, "calculation": "skipped", "reason": "no_order"}
+        return {**to_envelope(orchestration_result), "calculation": "skipped", "reason": "no_order"}
 
-    if not settings.ANTHROPIC_API_KEY:
+    if not get_settings().ANTHROPIC_API_KEY:
         logger.warning("orchestration.auto_calculate_skipped", reason="ANTHROPIC_API_KEY not set")
-        return {**orchestration_result, "calculation": "skipped", "reason": "no_api_key"}
+        return {**to_envelope(orchestration_result), "calculation": "skipped", "reason": "no_api_key"}
 
     start = time.monotonic()
     try:
-        result = _run_async(_auto_calculate_async(str(order_id)))
+        result = _run_async(_auto_calculate_async(
+            str(order_id), orchestration_result.get("attachments"),
+        ))
         elapsed = time.monotonic() - start
         elapsed_ms = int(elapsed * 1000)
 
@@ -917,6 +1029,7 @@ def auto_calculate(self, orchestration_result: dict) -> dict:
             status="success",
             input_data={"order_id": str(order_id)},
             output_data=result,
+            previous_data=orchestration_result,
             tokens_used=result.get("tokens_used", 0),
             processing_time_ms=elapsed_ms,
         ))
@@ -930,7 +1043,7 @@ def auto_calculate(self, orchestration_result: dict) -> dict:
         # M4: Prometheus
         _observe_stage("calculate", "success", elapsed, result.get("tokens_used", 0), "auto_calculate")
 
-        return {**orchestration_result, **result}
+        return to_envelope({**orchestration_result, **result})
 
     except Exception as exc:
         elapsed = time.monotonic() - start
@@ -944,14 +1057,21 @@ def auto_calculate(self, orchestration_result: dict) -> dict:
                 {"order_id": str(order_id)}, str(exc), traceback.format_exc(),
                 self.request.retries,
             ))
-            return {**orchestration_result, "calculation": "failed"}
+            return {**to_envelope(orchestration_result), "calculation": "failed"}
 
 
-async def _auto_calculate_async(order_id: str) -> dict:
+async def _auto_calculate_async(
+    order_id: str, attachments: Sequence[Mapping[str, Any]] | None = None
+) -> dict[str, Any]:
     """Trigger calculation agent for order — full implementation.
 
     Loads the order from DB, builds description/items, calls CalculationAgent.estimate(),
     creates Calculation + CalculationItem records, and returns summary.
+
+    Args:
+        order_id: UUID of the Order
+        attachments: Processed attachments of the email (from join_pipeline_branches);
+            drawing analyses are added to the calculation description
     """
     from sqlalchemy import select
     from sqlalchemy.orm import selectinload
@@ -963,11 +1083,12 @@ async def _auto_calculate_async(order_id: str) -> dict:
 
     settings = get_settings()
 
-    # H4: Rate limiter
+    # H4: Rate limiter (the calculation agent's own acquire reuses this lease)
+    lease = None
     try:
         from app.core.rate_limiter import RateLimitExceeded, get_rate_limiter
         limiter = get_rate_limiter()
-        limiter.acquire(estimated_tokens=4000)
+        lease = await limiter.acquire_wait(estimated_tokens=4000)
     except RateLimitExceeded:
         raise
     except Exception:
@@ -990,6 +1111,9 @@ async def _auto_calculate_async(order_id: str) -> dict:
             description = f"Zakázka {order.number} pro {customer_name}"
             if order.note:
                 description += f"\n{order.note}"
+            drawing_context = _drawing_context(attachments or [])
+            if drawing_context:
+                description += f"\n{drawing_context}"
 
             # Build items list from parsed_data (stored on related InboxMessage)
             items: list[dict] = []
@@ -1025,7 +1149,7 @@ async def _auto_calculate_async(order_id: str) -> dict:
             agent = CalculationAgent(api_key=settings.ANTHROPIC_API_KEY, db_session=session)
             estimate = await agent.estimate(description=description, items=items)
 
-            tokens_used = 4000  # Approximate
+            tokens_used = estimate.tokens_used
 
             # Create Calculation record
             calc = Calculation(
@@ -1109,18 +1233,32 @@ async def _auto_calculate_async(order_id: str) -> dict:
             }
     finally:
         try:
-            limiter = get_rate_limiter()
-            limiter.release()
-            limiter.record_usage(4000)
+            get_rate_limiter().release(lease)
         except Exception:
             pass
 
 
+def _drawing_context(attachments: Sequence[Mapping[str, Any]]) -> str:
+    """Summarize analyzed drawings of the email for the calculation description."""
+    lines = []
+    for attachment in attachments:
+        analysis = attachment.get("drawing_analysis") or {}
+        if not analysis.get("materials") and not analysis.get("dimensions"):
+            continue
+        line = f"Výkres {attachment.get('filename') or attachment.get('document_id')}:"
+        if analysis.get("materials"):
+            line += f" materiál {', '.join(analysis['materials'])};"
+        if analysis.get("dimensions"):
+            line += f" rozměry {', '.join(analysis['dimensions'][:20])}"
+        lines.append(line.rstrip(";"))
+    return "\n".join(lines)
+
+
 # ─── Stage 8: Generate Offer ──────────────────────────────────
 
 
 @celery_app.task(bind=True, max_retries=2, queue="orchestration", name="orchestration.generate_offer")
-def generate_offer(self, pipeline_result: dict) -> dict:
+def generate_offer(self: Task, pipeline_result: PipelineEnvelope) -> PipelineEnvelope:
     """Generate PDF offer + Pohoda XML after calculation.
 
     Accepts pipeline_result dict from the chain (auto_calculate output).
@@ -1132,9 +1270,8 @@ def generate_offer(self, pipeline_result: dict) -> dict:
     Returns:
         dict with offer_pdf_path, pohoda_xml_path, document_id
     """
-    settings = get_settings()
-    if not settings.ORCHESTRATION_AUTO_OFFER:
-        return {**pipeline_result, "offer": "skipped", "reason": "auto_offer disabled"}
+    if not feature_flags.is_enabled("ORCHESTRATION_AUTO_OFFER"):
+        return {**to_envelope(pipeline_result), "offer": "skipped", "reason": "auto_offer disabled"}
 
     # Extract order_id and calculation_id from pipeline result
     order_id = pipeline_result.get("order_id")
@@ -1147,7 +1284,7 @@ def generate_offer(self, pipeline_result: dict) -> dict:
             order_id=order_id,
             calculation_id=calculation_id,
         )
-        return {**pipeline_result, "offer": "skipped", "reason": "no_order_or_calculation"}
+        return {**to_envelope(pipeline_result), "offer": "skipped", "reason": "no_order_or_calculation"}
 
     start = time.monotonic()
     try:
@@ -1162,6 +1299,7 @@ def generate_offer(self, pipeline_result: dict) -> dict:
             status="success",
             input_data={"order_id": str(order_id), "calculation_id": str(calculation_id)},
             output_data=result,
+            previous_data=pipeline_result,
             processing_time_ms=elapsed_ms,
         ))
 
@@ -1177,7 +1315,7 @@ def generate_offer(self, pipeline_result: dict) -> dict:
         # M4: Prometheus
         _observe_stage("offer", "success", elapsed)
 
-        return {**pipeline_result, **result}
+        return to_envelope({**pipeline_result, **result})
 
     except Exception as exc:
         elapsed = time.monotonic() - start
@@ -1191,7 +1329,7 @@ def generate_offer(self, pipeline_result: dict) -> dict:
                 {"order_id": str(order_id), "calculation_id": str(calculation_id)},
                 str(exc), traceback.format_exc(), self.request.retries,
             ))
-            return {**pipeline_result, "offer": "failed"}
+            return {**to_envelope(pipeline_result), "offer": "failed"}
 
 
 async def _generate_offer_async(order_id: str, calculation_id: str) -> dict:
@@ -1234,7 +1372,7 @@ async def _generate_offer_async(order_id: str, calculation_id: str) -> dict:
 
 
 @celery_app.task(bind=True, queue="orchestration", name="orchestration.run_pipeline")
-def run_pipeline(self, raw_email_data: dict) -> dict:
+def run_pipeline(self: Task, raw_email_data: dict[str, Any]) -> dict[str, Any]:
     """Run the full orchestration pipeline for a single email.
 
     This is the main entry point. It chains:
@@ -1246,8 +1384,7 @@ def run_pipeline(self, raw_email_data: dict) -> dict:
     Returns:
         dict with pipeline execution summary
     """
-    settings = get_settings()
-    if not settings.ORCHESTRATION_ENABLED:
+    if not feature_flags.is_enabled("ORCHESTRATION_ENABLED"):
         return {"status": "skipped", "reason": "orchestration disabled"}
 
     # Chain: ingest → classify → dynamic routing
@@ -1267,12 +1404,13 @@ def run_pipeline(self, raw_email_data: dict) -> dict:
 
 
 @celery_app.task(bind=True, queue="orchestration", name="orchestration.route_and_execute")
-def route_and_execute(self, classify_result: dict) -> dict:
+def route_and_execute(self: Task, classify_result: ClassifyResult) -> ClassifyResult:
     """Route classified email to appropriate processing stages.
 
-    Dispatches downstream tasks as a Celery chain so each task runs
-    on a fresh worker process with its own event loop (avoids
-    asyncio.run() + stale connection pool issues from .apply()).
+    Dispatches downstream tasks as Celery signatures (see
+    _build_stage_pipeline) so each task runs on a fresh worker process
+    with its own event loop (avoids asyncio.run() + stale connection pool
+    issues from .apply()).
 
     Also sends auto-reply email after classification.
 
@@ -1286,52 +1424,110 @@ def route_and_execute(self, classify_result: dict) -> dict:
     _send_pipeline_auto_reply(classify_result)
 
     stages = classify_result.get("stages", [])
+    envelope = to_envelope(classify_result)
 
     if not stages:
-        return {**classify_result, "pipeline_status": "no_stages"}
+        return {**envelope, "pipeline_status": "no_stages", "stages": stages}
 
     if "review" in stages:
-        _run_async(_mark_for_review(classify_result.get("inbox_message_id")))
+        _run_async(_mark_for_review(envelope.get("inbox_message_id")))
         # M1: Mark processing completed (terminal: review)
-        _run_async(_update_inbox_timestamp(classify_result.get("inbox_message_id"), "processing_completed_at"))
-        return {**classify_result, "pipeline_status": "needs_review"}
+        _run_async(_update_inbox_timestamp(envelope.get("inbox_message_id"), "processing_completed_at"))
+        return {**envelope, "pipeline_status": "needs_review", "stages": stages}
 
     if "archive" in stages:
-        _run_async(_archive_message(classify_result.get("inbox_message_id")))
+        _run_async(_archive_message(envelope.get("inbox_message_id")))
         # M1: Mark processing completed (terminal: archive)
-        _run_async(_update_inbox_timestamp(classify_result.get("inbox_message_id"), "processing_completed_at"))
-        return {**classify_result, "pipeline_status": "archived"}
+        _run_async(_update_inbox_timestamp(envelope.get("inbox_message_id"), "processing_completed_at"))
+        return {**envelope, "pipeline_status": "archived", "stages": stages}
+
+    pipeline = _build_stage_pipeline(envelope, stages)
+    if pipeline is not None:
+        pipeline.apply_async()
+
+    return {**envelope, "pipeline_status": "routed", "stages": stages}
+
+
+def _build_stage_pipeline(classify_result: PipelineEnvelope, stages: list[str]) -> Any:
+    """Build the Celery workflow for the routed stages as a dependency graph.
+
+    Stages that only need the classified email run concurrently: parse_email
+    and, per attachment, process_attachment followed by
+    analyze_attachment_drawing. A chord joins them (join_pipeline_branches)
+    and feeds parsed data, OCR and drawing analyses into the dependent
+    stages, which run in order: orchestrate_order → auto_calculate →
+    generate_offer.
+
+    Args:
+        classify_result: Output from classify_email
+        stages: Stages chosen by route_classification
 
-    # Process attachments in parallel (fire-and-forget)
+    Returns:
+        Celery signature to apply, or None when there is nothing to run
+    """
+    has_parse = "parse_email" in stages
+    branches = [parse_email.si(classify_result)] if has_parse else []
     if "process_attachments" in stages:
-        attachment_ids = classify_result.get("attachment_ids", [])
-        if attachment_ids:
-            for att_id in attachment_ids:
-                att_data = classify_result.get("attachment_data", {}).get(att_id, {})
-                process_attachment.delay(
-                    att_id,
-                    att_data.get("file_path", ""),
-                    att_data.get("content_type", ""),
-                    att_data.get("filename", ""),
-                )
+        for att_id in classify_result.get("attachment_ids", []):
+            # File path, MIME type and name are read from the EmailAttachment
+            branches.append(chain(
+                process_attachment.si(att_id, analyze_drawings=False),
+                analyze_attachment_drawing.s(),
+            ))
 
-    # Build sequential chain dynamically — each task runs on its own worker
-    chain_tasks = []
-    if "parse_email" in stages:
-        chain_tasks.append(parse_email.s())
-    if "orchestrate_order" in stages:
-        chain_tasks.append(orchestrate_order.s())
-    if "auto_calculate" in stages:
-        chain_tasks.append(auto_calculate.s())
-    if "generate_offer" in stages:
-        chain_tasks.append(generate_offer.s())
-
-    if chain_tasks:
-        # First task in chain gets classify_result as argument
-        pipeline = chain(chain_tasks[0].clone(args=[classify_result]), *chain_tasks[1:])
-        pipeline.apply_async()
+    dependent = [
+        task.s()
+        for stage, task in (
+            ("orchestrate_order", orchestrate_order),
+            ("auto_calculate", auto_calculate),
+            ("generate_offer", generate_offer),
+        )
+        if stage in stages
+    ]
+
+    if not dependent:
+        return group(branches) if branches else None
+    if not branches:
+        return chain(dependent[0].clone(args=[classify_result]), *dependent[1:])
+    if len(branches) == 1 and has_parse:
+        # Only the parse branch: a plain chain, no chord join needed
+        return chain(branches[0], *dependent)
+    return chord(branches, chain(join_pipeline_branches.s(classify_result, has_parse), *dependent))
+
+
+@celery_app.task(bind=True, queue="orchestration", name="orchestration.join_pipeline_branches")
+def join_pipeline_branches(
+    self: Task,
+    branch_results: list[dict[str, Any]],
+    classify_result: PipelineEnvelope,
+    has_parse: bool,
+) -> PipelineEnvelope:
+    """Chord callback merging the concurrent pipeline branches.
 
-    return {**classify_result, "pipeline_status": "routed", "stages": stages}
+    Args:
+        branch_results: Header results in _build_stage_pipeline order
+            (parse_email first when present, then one per attachment)
+        classify_result: Output from classify_email
+        has_parse: Whether the first result comes from parse_email
+
+    Returns:
+        The parse result (or classify_result) with the processed attachments
+    """
+    pipeline_result = branch_results[0] if has_parse else classify_result
+    attachment_results = branch_results[1:] if has_parse else branch_results
+
+    attachments = [
+        to_attachment_summary(att_id, result)
+        for att_id, result in zip(classify_result.get("attachment_ids", []), attachment_results, strict=False)
+    ]
+
+    logger.info(
+        "orchestration.pipeline_branches_joined",
+        inbox_message_id=classify_result.get("inbox_message_id"),
+        attachments=len(attachments),
+        drawings_analyzed=sum(1 for a in attachments if "tokens_used" in a.get("drawing_analysis", {})),
+    )
+    return {**to_envelope(pipeline_result), "attachments": attachments}
 
 
 async def _mark_for_review(inbox_message_id: str | None) -> None:
@@ -1433,7 +1629,7 @@ async def _notify_assignment(inbox_message_id: str | None) -> None:
         logger.warning("orchestration.notify_failed", inbox_message_id=inbox_message_id)
 
 
-def _send_pipeline_auto_reply(classify_result: dict) -> None:
+def _send_pipeline_auto_reply(classify_result: Mapping[str, Any]) -> None:
     """Send auto-reply email after classification in the orchestration pipeline.
 
     Dispatches the auto-reply as a Celery task for async SMTP sending.
@@ -1455,17 +1651,19 @@ def _send_pipeline_auto_reply(classify_result: dict) -> None:
     try:
         from app.integrations.email.tasks import send_auto_reply_task
 
+        inbox_message_id = classify_result.get("inbox_message_id")
+        body_text = _run_async(load_email_content(inbox_message_id)).body_text if inbox_message_id else ""
+
         reply_subject = f"Re: {subject}"
         send_auto_reply_task.delay(
             to_email=from_email,
             subject=reply_subject,
             classification=classification,
-            message_preview=classify_result.get("body_text", "")[:200],
+            message_preview=body_text[:200],
             original_message_id=classify_result.get("original_message_id"),
         )
 
         # Mark auto_reply_sent on InboxMessage
-        inbox_message_id = classify_result.get("inbox_message_id")
         if inbox_message_id:
             _run_async(_mark_auto_reply_sent(inbox_message_id))
 
@@ -1495,3 +1693,45 @@ async def _mark_auto_reply_sent(inbox_message_id: str) -> None:
         if msg:
             msg.auto_reply_sent = True
             await session.commit()
+
+
+# ─── Maintenance: Audit Trail Retention ───────────────────────
+
+
+@celery_app.task(bind=True, max_retries=3, name="orchestration.cleanup_processing_tasks")
+def cleanup_processing_tasks(self: Task) -> dict[str, Any]:
+    """Create upcoming processing_tasks partitions and purge expired audit records.
+
+    Scheduled daily via Celery Beat next to cleanup_processed_emails.
+    Retention and partitions created ahead are configured by
+    PROCESSING_TASK_RETENTION_DAYS and PROCESSING_TASK_PARTITIONS_AHEAD.
+
+    Returns:
+        dict with ensured partitions, dropped partitions and deleted rows
+    """
+    settings = get_settings()
+    try:
+        result = _run_async(_cleanup_processing_tasks_async(
+            settings.PROCESSING_TASK_RETENTION_DAYS,
+            settings.PROCESSING_TASK_PARTITIONS_AHEAD,
+        ))
+        logger.info("orchestration.cleanup_processing_tasks_completed", **result)
+        return {"status": "completed", **result}
+
+    except Exception as exc:
+        logger.exception("orchestration.cleanup_processing_tasks_failed", error=str(exc))
+        try:
+            raise self.retry(exc=exc, countdown=60 * (2 ** self.request.retries))
+        except MaxRetriesExceededError:
+            return {"status": "failed", "error": str(exc)}
+
+
+async def _cleanup_processing_tasks_async(retention_days: int, months_ahead: int) -> dict:
+    from app.orchestration.audit import ensure_partitions, purge_expired
+
+    async with AsyncSessionLocal() as session:
+        partitions = await ensure_partitions(session, months_ahead)
+        result = await purge_expired(session, retention_days)
+        await session.commit()
+
+    return {"partitions": partitions, **result}
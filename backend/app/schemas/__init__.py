@@ -24,7 +24,7 @@ from .customer import (
     CustomerUpdate,
     GDPRDeleteResponse,
 )
-from .document import DocumentResponse, DocumentUpdate, DocumentUpload
+from .document import DocumentListItem, DocumentResponse, DocumentUpdate, DocumentUpload
 from .drawing import (
     DrawingAnalysisResponse,
     DrawingDimensionSchema,
@@ -33,7 +33,7 @@ from .drawing import (
     WeldingRequirementsSchema,
 )
 from .embedding import SimilarOrderResult, SimilarOrdersResponse, SimilarSearchRequest
-from .inbox import InboxAssign, InboxMessageResponse, InboxReclassify
+from .inbox import InboxAssign, InboxMessageListItem, InboxMessageResponse, InboxReclassify
 from .material_price import (
     MaterialPriceCreate,
     MaterialPriceImportResult,
@@ -53,10 +53,12 @@ from .order import (
     OrderCreate,
     OrderItemCreate,
     OrderItemResponse,
+    OrderListItem,
     OrderResponse,
     OrderStatusUpdate,
     OrderUpdate,
 )
+from .pagination import CursorPage
 from .pohoda import (
     PohodaSyncLogResponse,
     PohodaSyncRequest,
@@ -86,6 +88,7 @@ __all__ = [
     "DocumentUpload",
     "DocumentUpdate",
     "DocumentResponse",
+    "DocumentListItem",
     # Drawing Analysis
     "DrawingAnalysisResponse",
     "DrawingDimensionSchema",
@@ -102,11 +105,13 @@ __all__ = [
     "OrderCreate",
     "OrderUpdate",
     "OrderResponse",
+    "OrderListItem",
     "OrderStatusUpdate",
     "OrderItemCreate",
     "OrderItemResponse",
     # Inbox
     "InboxMessageResponse",
+    "InboxMessageListItem",
     "InboxAssign",
     "InboxReclassify",
     # MaterialPrice
@@ -115,6 +120,8 @@ __all__ = [
     "MaterialPriceResponse",
     "MaterialPriceListResponse",
     "MaterialPriceImportResult",
+    # Pagination
+    "CursorPage",
     # Pohoda
     "PohodaSyncRequest",
     "PohodaSyncLogResponse",
@@ -45,3 +45,19 @@ class DocumentResponse(BaseModel):
     updated_at: datetime
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class DocumentListItem(BaseModel):
+    """Lean document row for list views (without OCR text)."""
+
+    id: UUID
+    entity_type: str
+    entity_id: UUID
+    file_name: str
+    mime_type: str
+    file_size: int
+    version: int
+    category: DocumentCategory
+    created_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
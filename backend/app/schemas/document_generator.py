@@ -1,5 +1,7 @@
 """Pydantic schemas for document generation."""
 
+from uuid import UUID
+
 from pydantic import BaseModel
 
 
@@ -39,3 +41,16 @@ class GenerateOrderConfirmationRequest(BaseModel):
     delivery_terms: str | None = None
     payment_terms: str | None = None
     note: str | None = None
+
+
+class DocumentJobResponse(BaseModel):
+    """State of an asynchronous document generation job."""
+
+    job_id: str
+    status: str  # "queued", "running", "completed", "failed"
+    stage: str | None = None  # "rendering", "persisting" while running
+    document_id: UUID | None = None
+    file_name: str | None = None
+    size_bytes: int | None = None
+    download_url: str | None = None
+    error: str | None = None
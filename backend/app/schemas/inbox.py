@@ -30,6 +30,23 @@ class InboxMessageResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class InboxMessageListItem(BaseModel):
+    """Lean inbox row for list views (without the body)."""
+
+    id: UUID
+    from_email: str
+    subject: str
+    received_at: datetime
+    classification: InboxClassification | None = None
+    confidence: float | None = None
+    status: InboxStatus
+    customer_id: UUID | None = None
+    order_id: UUID | None = None
+    auto_reply_sent: bool = False
+
+    model_config = ConfigDict(from_attributes=True)
+
+
 class InboxAssign(BaseModel):
     """Schema for assigning inbox message to customer/order."""
 
@@ -75,14 +75,14 @@ class MaterialPriceListResponse(BaseModel):
 class MaterialPriceImportRow(BaseModel):
     """Schema for a single row in Excel import."""
 
-    name: str
-    specification: str | None = None
-    material_grade: str | None = None
-    form: str | None = None
-    dimension: str | None = None
-    unit: str = "kg"
-    unit_price: Decimal
-    supplier: str | None = None
+    name: str = Field(..., min_length=1, max_length=255)
+    specification: str | None = Field(None, max_length=255)
+    material_grade: str | None = Field(None, max_length=100)
+    form: str | None = Field(None, max_length=100)
+    dimension: str | None = Field(None, max_length=255)
+    unit: str = Field("kg", min_length=1, max_length=20)
+    unit_price: Decimal = Field(..., ge=0, lt=Decimal("1e10"))
+    supplier: str | None = Field(None, max_length=255)
     valid_from: date
     valid_to: date | None = None
     is_active: bool = True
@@ -95,4 +95,6 @@ class MaterialPriceImportResult(BaseModel):
     success: bool
     imported_count: int
     failed_count: int
+    duplicate_count: int = Field(0, description="Lines superseded by a later line with the same key")
     errors: list[str] = Field(default_factory=list)
+    warnings: list[str] = Field(default_factory=list)
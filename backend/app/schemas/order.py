@@ -90,6 +90,25 @@ class OrderResponse(OrderBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+class OrderListItem(BaseModel):
+    """Lean order row for list views (no items or customer object)."""
+
+    id: UUID
+    number: str
+    status: OrderStatus
+    priority: OrderPriority
+    due_date: date | None = None
+    customer_id: UUID
+    customer_name: str | None = None
+    assigned_to: UUID | None = None
+    assigned_to_name: str | None = None
+    items_count: int = 0
+    created_at: datetime
+    updated_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+
 # Import after class definitions to avoid circular imports
 from app.schemas.customer import CustomerResponse  # noqa: E402
 
@@ -0,0 +1,17 @@
+"""Cursor pagination schemas."""
+
+from typing import Generic, TypeVar
+
+from pydantic import BaseModel, Field
+
+T = TypeVar("T")
+
+
+class CursorPage(BaseModel, Generic[T]):
+    """One page of a keyset-paginated list."""
+
+    items: list[T]
+    next_cursor: str | None = Field(
+        None, description="Pass as ?cursor= to get the next page; None on the last page"
+    )
+    total: int | None = Field(None, description="Row count when requested with ?count=")
@@ -25,28 +25,29 @@ class AssignmentService:
         1. Current workload (fewer active orders = better)
         2. Role compatibility (technolog/obchodnik preferred)
         """
-        # Get eligible users
+        # Eligible users with their active order count in one grouped query
+        active_orders = (
+            func.count(Order.id)
+            .filter(Order.status.notin_([OrderStatus.DOKONCENO]))
+            .label("active_orders")
+        )
         result = await self.db.execute(
-            select(User).where(
+            select(User.id, User.full_name, User.role, active_orders)
+            .outerjoin(Order, Order.assigned_to == User.id)
+            .where(
                 User.is_active,
                 User.role.in_([UserRole.TECHNOLOG, UserRole.OBCHODNIK, UserRole.VEDENI]),
             )
+            .group_by(User.id, User.full_name, User.role)
         )
-        users = list(result.scalars().all())
+        users = result.all()
 
         if not users:
             return {"suggestion": None, "reason": "Žádní dostupní uživatelé"}
 
-        # Get workload per user
         scored_users = []
         for u in users:
-            workload_result = await self.db.execute(
-                select(func.count()).select_from(Order).where(
-                    Order.assigned_to == u.id,
-                    Order.status.notin_([OrderStatus.DOKONCENO]),
-                )
-            )
-            active_count = workload_result.scalar() or 0
+            active_count = u.active_orders or 0
 
             # Score: lower workload = higher score
             score = 100 - (active_count * 10)
@@ -2,6 +2,7 @@
 
 from datetime import UTC, datetime
 from decimal import Decimal
+from typing import Any
 from uuid import UUID
 
 from sqlalchemy import select
@@ -9,6 +10,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models import AuditAction, AuditLog, Customer
 from app.schemas import CustomerCreate, CustomerUpdate
+from app.services.text_search import text_search
 
 
 class CustomerService:
@@ -91,19 +93,27 @@ class CustomerService:
         self,
         skip: int = 0,
         limit: int = 100,
+        search: str | None = None,
     ) -> list[Customer]:
         """Get all customers with pagination.
 
         Args:
             skip: Number of records to skip
             limit: Maximum number of records to return
+            search: Optional company name search (trigram-ranked on PostgreSQL)
 
         Returns:
             List of customer instances
         """
-        result = await self.db.execute(
-            select(Customer).order_by(Customer.created_at.desc()).offset(skip).limit(limit)
-        )
+        query = select(Customer)
+        order_by: list[Any] = [Customer.created_at.desc()]
+        if search:
+            condition, rank = text_search(self.db, [Customer.company_name], search)
+            query = query.where(condition)
+            if rank is not None:
+                order_by.insert(0, rank.desc())
+
+        result = await self.db.execute(query.order_by(*order_by).offset(skip).limit(limit))
         return list(result.scalars().all())
 
     async def update(
@@ -1,26 +1,30 @@
 """Deadline monitoring service for production operations.
 
 Detects at-risk deadlines, calculates severity based on operation duration
-and order priority, generates AI-powered recommendations using historical
-data from similar orders, and sends deduplicated notifications.
+and order priority, generates AI-powered recommendations (one per order)
+using historical data from similar orders, and sends deduplicated
+notifications keyed by (order, operation, severity).
 """
 
 import logging
 import math
 from datetime import UTC, datetime, timedelta
 from decimal import Decimal
+from uuid import UUID
 
 from anthropic import AsyncAnthropic
-from sqlalchemy import and_, select
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import contains_eager
 
+from app.core.claude_usage import create_message
 from app.models.notification import Notification, NotificationType
 from app.models.operation import Operation, OperationStatus
 from app.models.order import Order, OrderPriority, OrderStatus
 from app.models.user import UserRole
+from app.schemas.embedding import SimilarOrderResult
 from app.services.embedding import EmbeddingService
-from app.services.notification import NotificationService
+from app.services.notification import NotificationDraft, NotificationService
 
 logger = logging.getLogger(__name__)
 
@@ -49,6 +53,21 @@ _SEVERITY_CZECH: dict[str, str] = {
 }
 
 
+_SEVERITY_RANK: dict[str, int] = {"info": 0, "warning": 1, "critical": 2}
+
+_ACTIVE_STATUSES: tuple[str, ...] = (
+    OperationStatus.PLANNED.value,
+    OperationStatus.IN_PROGRESS.value,
+)
+
+_DEDUP_WINDOW = timedelta(hours=24)
+
+
+def deadline_dedup_key(order_id: UUID, operation_id: UUID, severity: str) -> str:
+    """Dedup key of a deadline notification (order, operation, severity)."""
+    return f"deadline:{order_id}:{operation_id}:{severity}"
+
+
 class DeadlineMonitorService:
     """Service for monitoring production operation deadlines."""
 
@@ -59,114 +78,169 @@ class DeadlineMonitorService:
     async def check_deadlines(self) -> list[dict]:
         """Check all active operations for deadline risks.
 
+        Works set-based: one query loads the candidate operations with their
+        sibling operations, one query resolves deduplication, there is one
+        recommendation per affected order and notifications are inserted
+        in bulk (a recipient query and one insert). With an API key set, the
+        similar orders of all affected orders and their operations take two
+        more queries. The statement count does not grow with the number of
+        alerts or orders.
+
         Returns:
             List of alert dicts with operation info, severity, and recommendation.
         """
         logger.info("deadline_monitor.started")
 
-        # Load operations for orders in VYROBA with planned_end
-        stmt = (
-            select(Operation)
-            .join(Order, Operation.order_id == Order.id)
-            .where(
-                and_(
-                    Order.status == OrderStatus.VYROBA,
-                    Operation.status.in_([
-                        OperationStatus.PLANNED.value,
-                        OperationStatus.IN_PROGRESS.value,
-                    ]),
-                    Operation.planned_end.is_not(None),
-                )
-            )
-            .options(selectinload(Operation.order))
+        ops_by_order = await self._load_operations_by_order()
+        logger.info(
+            "deadline_monitor.operations_found orders=%d count=%d",
+            len(ops_by_order),
+            sum(len(ops) for ops in ops_by_order.values()),
         )
-        result = await self.db.execute(stmt)
-        operations = list(result.scalars().all())
 
-        logger.info("deadline_monitor.operations_found count=%d", len(operations))
-
-        alerts: list[dict] = []
         today = datetime.now(UTC).date()
+        candidates: list[dict] = []
+        for order_ops in ops_by_order.values():
+            for op in order_ops:
+                if op.status not in _ACTIVE_STATUSES or op.planned_end is None:
+                    continue
+                days_remaining = (op.planned_end.date() - today).days
+                severity = self._severity(days_remaining, self._calculate_warning_days(op, op.order))
+                if severity is not None:
+                    candidates.append(
+                        {"operation": op, "severity": severity, "days_remaining": days_remaining}
+                    )
 
-        for op in operations:
-            order = op.order
-            warning_days = self._calculate_warning_days(op, order)
-            planned_end_date = op.planned_end.date() if op.planned_end else None
-            if not planned_end_date:
-                continue
-
-            days_remaining = (planned_end_date - today).days
-
-            # Determine severity
-            severity: str | None = None
-            if days_remaining < 0:
-                severity = "critical"
-            elif days_remaining <= 1:
-                severity = "warning"
-            elif days_remaining <= warning_days:
-                severity = "info"
-
-            if severity is None:
-                continue
-
-            # Check dedup
-            should_send = await self._should_notify(op.id, severity)
-            if not should_send:
+        # Skip operations notified in the window with the same or a higher severity
+        sent_keys = await self._sent_dedup_keys(
+            {
+                deadline_dedup_key(c["operation"].order_id, c["operation"].id, severity)
+                for c in candidates
+                for severity, rank in _SEVERITY_RANK.items()
+                if rank >= _SEVERITY_RANK[c["severity"]]
+            }
+        )
+        alerts_by_order: dict[UUID, list[dict]] = {}
+        for candidate in candidates:
+            op = candidate["operation"]
+            if any(
+                deadline_dedup_key(op.order_id, op.id, severity) in sent_keys
+                for severity, rank in _SEVERITY_RANK.items()
+                if rank >= _SEVERITY_RANK[candidate["severity"]]
+            ):
+                logger.info(
+                    "deadline_monitor.dedup_skip op=%s severity=%s",
+                    op.name, candidate["severity"],
+                )
                 continue
-
-            # Load all ops for downstream impact
-            all_ops_stmt = (
-                select(Operation)
-                .where(Operation.order_id == order.id)
-                .order_by(Operation.sequence)
+            candidate["impact"] = self._calculate_downstream_impact(
+                op, ops_by_order[op.order_id], op.order
             )
-            all_ops_result = await self.db.execute(all_ops_stmt)
-            all_ops = list(all_ops_result.scalars().all())
+            alerts_by_order.setdefault(op.order_id, []).append(candidate)
 
-            impact = self._calculate_downstream_impact(op, all_ops, order)
-            recommendation = await self._generate_recommendation(op, order, severity, impact)
-
-            # Build notification
-            severity_cz = _SEVERITY_CZECH.get(severity, severity)
-            title = f"{order.number}: {op.name} — {severity_cz}"
+        history = (
+            await self._load_similar_history(list(alerts_by_order))
+            if alerts_by_order and self._client
+            else {}
+        )
 
-            parts = [f"Operace \"{op.name}\" (seq. {op.sequence})"]
-            if days_remaining < 0:
-                parts.append(f"je {abs(days_remaining)} dní po termínu.")
-            elif days_remaining == 0:
-                parts.append("má termín DNES.")
-            else:
-                parts.append(f"má termín za {days_remaining} dní ({planned_end_date.isoformat()}).")
+        alerts: list[dict] = []
+        drafts: list[NotificationDraft] = []
+        for order_id, order_alerts in alerts_by_order.items():
+            order = order_alerts[0]["operation"].order
+            recommendation = await self._generate_recommendation(
+                order, order_alerts, history.get(order_id, [])
+            )
+            for alert in order_alerts:
+                drafts.append(self._build_notification(order, alert, recommendation))
+                alerts.append({
+                    "order_number": order.number,
+                    "operation_name": alert["operation"].name,
+                    "severity": alert["severity"],
+                    "days_remaining": alert["days_remaining"],
+                    "due_date_at_risk": alert["impact"]["due_date_at_risk"],
+                    "recommendation": recommendation,
+                })
+
+        if drafts:
+            await NotificationService(self.db).create_bulk_for_roles(
+                notification_type=NotificationType.DEADLINE_WARNING,
+                drafts=drafts,
+                roles=[UserRole.VEDENI, UserRole.TECHNOLOG],
+            )
 
-            if impact["due_date_at_risk"]:
-                parts.append(
-                    f"Ohrožen termín zakázky! Odhadované zpoždění: {impact['estimated_delay_days']} dní."
-                )
+        logger.info(
+            "deadline_monitor.completed alerts=%d orders=%d", len(alerts), len(alerts_by_order)
+        )
+        return alerts
 
-            parts.append(f"\nDoporučení: {recommendation}")
-            message = " ".join(parts)
+    async def _load_operations_by_order(self) -> dict[UUID, list[Operation]]:
+        """All operations (by sequence) of in-production orders with an active dated operation."""
+        candidate_orders = select(Operation.order_id).where(
+            Operation.status.in_(_ACTIVE_STATUSES),
+            Operation.planned_end.is_not(None),
+        )
+        stmt = (
+            select(Operation)
+            .join(Operation.order)
+            .options(contains_eager(Operation.order))
+            .where(
+                Order.status == OrderStatus.VYROBA,
+                Operation.order_id.in_(candidate_orders),
+            )
+            .order_by(Operation.order_id, Operation.sequence)
+        )
+        result = await self.db.execute(stmt)
 
-            # Send notification
-            notification_svc = NotificationService(self.db)
-            await notification_svc.create_for_roles(
-                notification_type=NotificationType.DEADLINE_WARNING,
-                title=title,
-                message=message,
-                roles=[UserRole.VEDENI, UserRole.TECHNOLOG],
-                link=f"/zakazky/{order.id}",
+        ops_by_order: dict[UUID, list[Operation]] = {}
+        for op in result.scalars().all():
+            ops_by_order.setdefault(op.order_id, []).append(op)
+        return ops_by_order
+
+    @staticmethod
+    def _severity(days_remaining: int, warning_days: int) -> str | None:
+        """Alert severity for an operation ``days_remaining`` days before its planned end."""
+        if days_remaining < 0:
+            return "critical"
+        if days_remaining <= 1:
+            return "warning"
+        if days_remaining <= warning_days:
+            return "info"
+        return None
+
+    @staticmethod
+    def _build_notification(order: Order, alert: dict, recommendation: str) -> NotificationDraft:
+        """Notification text for one at-risk operation."""
+        op = alert["operation"]
+        severity = alert["severity"]
+        days_remaining = alert["days_remaining"]
+        impact = alert["impact"]
+
+        severity_cz = _SEVERITY_CZECH.get(severity, severity)
+        title = f"{order.number}: {op.name} — {severity_cz}"
+
+        parts = [f"Operace \"{op.name}\" (seq. {op.sequence})"]
+        if days_remaining < 0:
+            parts.append(f"je {abs(days_remaining)} dní po termínu.")
+        elif days_remaining == 0:
+            parts.append("má termín DNES.")
+        else:
+            parts.append(
+                f"má termín za {days_remaining} dní ({op.planned_end.date().isoformat()})."
             )
 
-            alerts.append({
-                "order_number": order.number,
-                "operation_name": op.name,
-                "severity": severity,
-                "days_remaining": days_remaining,
-                "due_date_at_risk": impact["due_date_at_risk"],
-                "recommendation": recommendation,
-            })
+        if impact["due_date_at_risk"]:
+            parts.append(
+                f"Ohrožen termín zakázky! Odhadované zpoždění: {impact['estimated_delay_days']} dní."
+            )
 
-        logger.info("deadline_monitor.completed alerts=%d", len(alerts))
-        return alerts
+        parts.append(f"\nDoporučení: {recommendation}")
+        return NotificationDraft(
+            title=title,
+            message=" ".join(parts),
+            link=f"/zakazky/{order.id}",
+            dedup_key=deadline_dedup_key(order.id, op.id, severity),
+        )
 
     def _calculate_warning_days(self, operation: Operation, order: Order) -> int:
         """Calculate how many days before deadline to start warning.
@@ -217,81 +291,116 @@ class DeadlineMonitorService:
             "estimated_delay_days": estimated_delay_days,
         }
 
+    async def _load_similar_history(
+        self, order_ids: list[UUID]
+    ) -> dict[UUID, list[tuple[SimilarOrderResult, list[Operation]]]]:
+        """Similar historical orders of ``order_ids`` with their operations.
+
+        Two queries for all orders: the vector search and the operations of
+        every similar order. Errors only cost the recommendation its context.
+        """
+        try:
+            similar_by_order = await EmbeddingService(self.db).find_similar_many(
+                order_ids, limit=3
+            )
+            similar_ids = {
+                UUID(s.order_id) for similar in similar_by_order.values() for s in similar
+            }
+            ops_by_order: dict[UUID, list[Operation]] = {}
+            if similar_ids:
+                result = await self.db.execute(
+                    select(Operation)
+                    .where(Operation.order_id.in_(similar_ids))
+                    .order_by(Operation.order_id, Operation.sequence)
+                )
+                for sop in result.scalars().all():
+                    ops_by_order.setdefault(sop.order_id, []).append(sop)
+        except Exception:
+            logger.warning("deadline_monitor.similar_orders_failed")
+            return {}
+
+        return {
+            order_id: [(s, ops_by_order.get(UUID(s.order_id), [])) for s in similar]
+            for order_id, similar in similar_by_order.items()
+        }
+
     async def _generate_recommendation(
         self,
-        operation: Operation,
         order: Order,
-        severity: str,
-        impact: dict,
+        order_alerts: list[dict],
+        history: list[tuple[SimilarOrderResult, list[Operation]]] | None = None,
     ) -> str:
-        """Generate recommendation using Claude AI with historical context, or rule-based fallback."""
-        # Try AI recommendation
-        if self._client:
+        """Generate one recommendation for all alerts of an order.
+
+        Uses Claude AI with historical context (``history``, see
+        _load_similar_history), or a rule-based fallback for the most severe
+        operation.
+        """
+        from app.core.circuit_breaker import anthropic_breaker
+
+        # Try AI recommendation (skipped while the Anthropic breaker is open)
+        if self._client and anthropic_breaker.can_execute():
             try:
-                return await self._generate_with_claude(operation, order, severity, impact)
+                recommendation = await self._generate_with_claude(
+                    order, order_alerts, history or []
+                )
             except Exception:
+                anthropic_breaker.record_failure()
                 logger.exception("deadline_monitor.claude_failed, using fallback")
+            else:
+                anthropic_breaker.record_success()
+                return recommendation
 
-        return self._generate_rule_based(operation, severity)
+        worst = max(order_alerts, key=lambda alert: _SEVERITY_RANK[alert["severity"]])
+        return self._generate_rule_based(worst["operation"], worst["severity"])
 
     async def _generate_with_claude(
         self,
-        operation: Operation,
         order: Order,
-        severity: str,
-        impact: dict,
+        order_alerts: list[dict],
+        history: list[tuple[SimilarOrderResult, list[Operation]]],
     ) -> str:
         """Generate recommendation using Claude with historical similar orders."""
-        # Find similar orders
-        context_parts = [
-            f"Zakázka: {order.number}, priorita: {order.priority.value}",
-            f"Operace: {operation.name} (seq. {operation.sequence}), "
-            f"trvání: {operation.duration_hours}h",
-            f"Závažnost: {severity}",
-        ]
+        context_parts = [f"Zakázka: {order.number}, priorita: {order.priority.value}"]
         if order.due_date:
             context_parts.append(f"Termín zakázky: {order.due_date.isoformat()}")
-        if impact["due_date_at_risk"]:
+        context_parts.append("Ohrožené operace:")
+        for alert in order_alerts:
+            op = alert["operation"]
             context_parts.append(
-                f"Odhadované zpoždění: {impact['estimated_delay_days']} dní"
+                f"- {op.name} (seq. {op.sequence}), trvání: {op.duration_hours}h, "
+                f"závažnost: {alert['severity']}"
             )
+        delay_days = max(
+            (a["impact"]["estimated_delay_days"] for a in order_alerts if a["impact"]["due_date_at_risk"]),
+            default=0,
+        )
+        if delay_days:
+            context_parts.append(f"Odhadované zpoždění: {delay_days} dní")
+
+        if history:
+            context_parts.append("\nPodobné historické zakázky:")
+            for s, similar_ops in history:
+                context_parts.append(
+                    f"- {s.order_number} (stav: {s.status}, "
+                    f"podobnost: {s.similarity:.0%})"
+                )
+                if s.note:
+                    context_parts.append(f"  Poznámka: {s.note[:200]}")
 
-        # Try to get similar orders for context
-        try:
-            embedding_svc = EmbeddingService(self.db)
-            similar = await embedding_svc.find_similar(order.id, limit=3)
-            if similar:
-                context_parts.append("\nPodobné historické zakázky:")
-                for s in similar:
-                    context_parts.append(
-                        f"- {s.order_number} (stav: {s.status}, "
-                        f"podobnost: {s.similarity:.0%})"
-                    )
-                    if s.note:
-                        context_parts.append(f"  Poznámka: {s.note[:200]}")
-
-                    # Load operations of similar order to check historical delays
-                    sim_ops_stmt = (
-                        select(Operation)
-                        .where(Operation.order_id == s.order_id)
-                        .order_by(Operation.sequence)
-                    )
-                    sim_ops_result = await self.db.execute(sim_ops_stmt)
-                    sim_ops = sim_ops_result.scalars().all()
-                    for sop in sim_ops:
-                        if sop.actual_end and sop.planned_end:
-                            delay = (sop.actual_end - sop.planned_end).total_seconds() / 3600
-                            if abs(delay) > 1:
-                                sign = "+" if delay > 0 else ""
-                                context_parts.append(
-                                    f"  Op. {sop.name}: {sign}{delay:.0f}h vs plán"
-                                )
-        except Exception:
-            logger.warning("deadline_monitor.similar_orders_failed")
+                # Historical delays of the similar order's operations
+                for sop in similar_ops:
+                    if sop.actual_end and sop.planned_end:
+                        delay = (sop.actual_end - sop.planned_end).total_seconds() / 3600
+                        if abs(delay) > 1:
+                            sign = "+" if delay > 0 else ""
+                            context_parts.append(f"  Op. {sop.name}: {sign}{delay:.0f}h vs plán")
 
         user_message = "\n".join(context_parts)
 
-        response = await self._client.messages.create(  # type: ignore[union-attr]
+        response, _usage = await create_message(
+            self._client,  # type: ignore[arg-type]
+            agent="deadline_monitor",
             model=_MODEL,
             max_tokens=_MAX_TOKENS,
             system=_SYSTEM_PROMPT,
@@ -339,54 +448,17 @@ class DeadlineMonitorService:
 
         return "Operace se blíží termínu. Sledujte postup a připravte záložní plán."
 
-    async def _should_notify(self, operation_id, severity: str) -> bool:  # type: ignore[no-untyped-def]
-        """Check if notification should be sent (deduplicate within 24h)."""
-        cutoff = datetime.now(UTC) - timedelta(hours=24)
-
-        op_result = await self.db.execute(
-            select(Operation).where(Operation.id == operation_id)
-        )
-        op = op_result.scalar_one_or_none()
-        if not op:
-            return True
-
-        order_result = await self.db.execute(
-            select(Order).where(Order.id == op.order_id)
-        )
-        order = order_result.scalar_one_or_none()
-        if not order:
-            return True
-
-        # Check if notification with same order+operation already sent in 24h
-        title_prefix = f"{order.number}: {op.name}"
-        dedup_stmt = (
-            select(Notification)
+    async def _sent_dedup_keys(self, keys: set[str]) -> set[str]:
+        """Which of ``keys`` were used by deadline notifications within the dedup window."""
+        if not keys:
+            return set()
+        result = await self.db.execute(
+            select(Notification.dedup_key)
             .where(
-                and_(
-                    Notification.type == NotificationType.DEADLINE_WARNING,
-                    Notification.created_at >= cutoff,
-                    Notification.title.startswith(title_prefix),
-                )
+                Notification.type == NotificationType.DEADLINE_WARNING,
+                Notification.created_at >= datetime.now(UTC) - _DEDUP_WINDOW,
+                Notification.dedup_key.in_(keys),
             )
-            .limit(1)
+            .distinct()
         )
-        existing = await self.db.execute(dedup_stmt)
-        existing_notification = existing.scalar_one_or_none()
-
-        if existing_notification:
-            # Allow escalation: if new severity is worse, still send
-            severity_rank = {"info": 0, "warning": 1, "critical": 2}
-            existing_severity = "info"
-            for sev_key, sev_cz in _SEVERITY_CZECH.items():
-                if sev_cz in existing_notification.title:
-                    existing_severity = sev_key
-                    break
-
-            if severity_rank.get(severity, 0) <= severity_rank.get(existing_severity, 0):
-                logger.info(
-                    "deadline_monitor.dedup_skip op=%s severity=%s existing=%s",
-                    op.name, severity, existing_severity,
-                )
-                return False
-
-        return True
+        return set(result.scalars().all())
@@ -4,15 +4,17 @@ import logging
 import shutil
 from datetime import UTC, datetime
 from pathlib import Path
+from typing import Any
 from uuid import UUID, uuid4
 
-from sqlalchemy import select
+from sqlalchemy import Row, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import get_settings
 from app.core.encryption import decrypt_data, encrypt_data
 from app.models import AuditAction, AuditLog, Document, DocumentCategory
 from app.schemas import DocumentUpdate, DocumentUpload
+from app.services.pagination import CountMode, count_rows, fetch_keyset_page
 
 logger = logging.getLogger(__name__)
 
@@ -265,6 +267,45 @@ class DocumentService:
         result = await self.db.execute(query)
         return list(result.scalars().all())
 
+    async def list_page(
+        self,
+        cursor: str | None = None,
+        limit: int = 50,
+        entity_type: str | None = None,
+        category: DocumentCategory | None = None,
+        count: CountMode = CountMode.NONE,
+    ) -> tuple[list[Row[Any]], str | None, int | None]:
+        """Get one keyset page of document rows without OCR text, newest first.
+
+        Raises:
+            ValueError: Invalid cursor
+        """
+        conditions = []
+        if entity_type:
+            conditions.append(Document.entity_type == entity_type)
+        if category:
+            conditions.append(Document.category == category)
+
+        query = select(
+            Document.id,
+            Document.entity_type,
+            Document.entity_id,
+            Document.file_name,
+            Document.mime_type,
+            Document.file_size,
+            Document.version,
+            Document.category,
+            Document.created_at,
+        ).where(*conditions)
+
+        rows, next_cursor = await fetch_keyset_page(
+            self.db, query, Document.created_at, Document.id, cursor, limit
+        )
+        total = await count_rows(
+            self.db, select(Document.id).where(*conditions), Document.__table__, count
+        )
+        return rows, next_cursor, total
+
     async def update(
         self,
         document_id: UUID,
@@ -3,22 +3,19 @@
 import logging
 from datetime import date, timedelta
 from decimal import Decimal
-from pathlib import Path
 from uuid import UUID
 
-from jinja2 import Environment, FileSystemLoader
+from jinja2 import Environment
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 from app.models.calculation import Calculation, CalculationStatus
 from app.models.order import Order
+from app.services.pdf_renderer import PdfRenderer, get_jinja_env, get_pdf_renderer
 
 logger = logging.getLogger(__name__)
 
-# Template directory
-TEMPLATE_DIR = Path(__file__).parent.parent / "templates"
-
 # Company info constant (Infer s.r.o.)
 COMPANY_INFO = {
     "name": "Infer s.r.o.",
@@ -43,10 +40,7 @@ INVOICE_TYPE_LABELS = {
 
 def _get_jinja_env() -> Environment:
     """Get configured Jinja2 environment."""
-    return Environment(
-        loader=FileSystemLoader(str(TEMPLATE_DIR)),
-        autoescape=True,
-    )
+    return get_jinja_env()
 
 
 def _format_price(value: Decimal | float | None) -> str:
@@ -57,10 +51,15 @@ def _format_price(value: Decimal | float | None) -> str:
 
 
 class DocumentGeneratorService:
-    """Service for generating PDF documents from templates."""
+    """Service for generating PDF documents from templates.
+
+    Rendering is delegated to the shared PdfRenderer, which keeps WeasyPrint
+    off the event loop and caches identical documents.
+    """
 
-    def __init__(self, db: AsyncSession):
+    def __init__(self, db: AsyncSession, renderer: PdfRenderer | None = None):
         self.db = db
+        self.renderer = renderer or get_pdf_renderer()
 
     async def generate_offer_pdf(
         self,
@@ -134,15 +133,7 @@ class DocumentGeneratorService:
             },
         }
 
-        # Render HTML template
-        env = _get_jinja_env()
-        template = env.get_template("nabidka.html")
-        html_content = template.render(**context)
-
-        # Generate PDF
-        from weasyprint import HTML  # type: ignore
-
-        pdf_bytes: bytes = HTML(string=html_content).write_pdf()
+        pdf_bytes = await self.renderer.render("nabidka.html", context)
         logger.info("document_generator.offer_generated order_id=%s", order_id)
         return pdf_bytes
 
@@ -178,6 +169,59 @@ class DocumentGeneratorService:
         if not order:
             raise ValueError(f"Zakázka {order_id} nenalezena")
 
+        context = self._production_sheet_context(order, include_controls, note)
+        pdf_bytes = await self.renderer.render("pruvodka.html", context)
+        logger.info("document_generator.production_sheet_generated order_id=%s", order_id)
+        return pdf_bytes
+
+    async def generate_production_sheets_pdf(
+        self,
+        order_ids: list[UUID],
+        include_controls: bool = True,
+        note: str | None = None,
+    ) -> dict[UUID, bytes]:
+        """Generate production sheets (průvodky) for several orders in one call.
+
+        Loads all orders in a single query and renders them concurrently
+        through the shared renderer, e.g. for a whole production week.
+
+        Args:
+            order_ids: Order UUIDs.
+            include_controls: Include quality control checkpoints.
+            note: Optional additional note printed on every sheet.
+
+        Returns:
+            Mapping of order UUID to PDF bytes, in the order of ``order_ids``.
+
+        Raises:
+            ValueError: If any order is not found.
+        """
+        result = await self.db.execute(
+            select(Order)
+            .where(Order.id.in_(order_ids))
+            .options(
+                selectinload(Order.items),
+                selectinload(Order.customer),
+            )
+        )
+        orders = {order.id: order for order in result.scalars().all()}
+        missing = [str(order_id) for order_id in order_ids if order_id not in orders]
+        if missing:
+            raise ValueError(f"Zakázky nenalezeny: {', '.join(missing)}")
+
+        jobs = [
+            ("pruvodka.html", self._production_sheet_context(orders[oid], include_controls, note))
+            for oid in order_ids
+        ]
+        pdfs = await self.renderer.render_batch(jobs)
+        logger.info("document_generator.production_sheets_generated count=%d", len(pdfs))
+        return dict(zip(order_ids, pdfs, strict=True))
+
+    @staticmethod
+    def _production_sheet_context(
+        order: Order, include_controls: bool, note: str | None
+    ) -> dict[str, object]:
+        """Build the pruvodka.html template context for an order."""
         today = date.today()
 
         # Control checkpoints for ISO 9001
@@ -192,7 +236,7 @@ class DocumentGeneratorService:
                 {"name": "Kontrola dokumentace a atestací", "responsible": "Vedoucí výroby"},
             ]
 
-        context = {
+        return {
             "order": order,
             "customer": order.customer,
             "items": order.items,
@@ -206,16 +250,6 @@ class DocumentGeneratorService:
             },
         }
 
-        env = _get_jinja_env()
-        template = env.get_template("pruvodka.html")
-        html_content = template.render(**context)
-
-        from weasyprint import HTML
-
-        pdf_bytes: bytes = HTML(string=html_content).write_pdf()
-        logger.info("document_generator.production_sheet_generated order_id=%s", order_id)
-        return pdf_bytes
-
     async def generate_dimensional_protocol(
         self,
         order_id: UUID,
@@ -264,13 +298,7 @@ class DocumentGeneratorService:
             },
         }
 
-        env = _get_jinja_env()
-        template = env.get_template("protokol_rozmerovy.html")
-        html_content = template.render(**context)
-
-        from weasyprint import HTML
-
-        pdf_bytes: bytes = HTML(string=html_content).write_pdf()
+        pdf_bytes = await self.renderer.render("protokol_rozmerovy.html", context)
         logger.info("document_generator.dimensional_protocol_generated order_id=%s protocol_number=%s", order_id, protocol_number)
         return pdf_bytes
 
@@ -329,13 +357,7 @@ class DocumentGeneratorService:
             },
         }
 
-        env = _get_jinja_env()
-        template = env.get_template("atestace.html")
-        html_content = template.render(**context)
-
-        from weasyprint import HTML
-
-        pdf_bytes: bytes = HTML(string=html_content).write_pdf()
+        pdf_bytes = await self.renderer.render("atestace.html", context)
         logger.info(
             "document_generator.material_certificate_generated order_id=%s certificate_number=%s type=%s",
             order_id,
@@ -447,12 +469,7 @@ class DocumentGeneratorService:
             "company": COMPANY_INFO,
         }
 
-        env = _get_jinja_env()
-        template = env.get_template("faktura.html")
-        html_content = template.render(**context)
-
-        from weasyprint import HTML
-        pdf_bytes: bytes = HTML(string=html_content).write_pdf()
+        pdf_bytes = await self.renderer.render("faktura.html", context)
         logger.info("document_generator.invoice_generated order_id=%s invoice_number=%s", order_id, invoice_number)
         return pdf_bytes
 
@@ -487,12 +504,7 @@ class DocumentGeneratorService:
             "company": COMPANY_INFO,
         }
 
-        env = _get_jinja_env()
-        template = env.get_template("dodaci_list.html")
-        html_content = template.render(**context)
-
-        from weasyprint import HTML
-        pdf_bytes: bytes = HTML(string=html_content).write_pdf()
+        pdf_bytes = await self.renderer.render("dodaci_list.html", context)
         logger.info("document_generator.delivery_note_generated order_id=%s delivery_number=%s", order_id, delivery_number)
         return pdf_bytes
 
@@ -550,11 +562,6 @@ class DocumentGeneratorService:
             "company": COMPANY_INFO,
         }
 
-        env = _get_jinja_env()
-        template = env.get_template("objednavka.html")
-        html_content = template.render(**context)
-
-        from weasyprint import HTML
-        pdf_bytes: bytes = HTML(string=html_content).write_pdf()
+        pdf_bytes = await self.renderer.render("objednavka.html", context)
         logger.info("document_generator.order_confirmation_generated order_id=%s", order_id)
         return pdf_bytes
@@ -0,0 +1,267 @@
+"""Celery tasks for asynchronous document generation.
+
+Heavy PDFs (large orders, many items) are rendered, encrypted and stored by a
+worker instead of inside the API request. The API returns the Celery task id
+as a job id; progress is pushed to the requesting user over the WebSocket
+notification channel and the finished file is downloaded from the document
+store (``GET /dokumenty/{document_id}/download``).
+"""
+
+import json
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, cast
+from uuid import UUID
+
+from redis import Redis
+
+from app.core.celery_app import celery_app
+from app.core.config import get_settings
+from app.core.database import AsyncSessionLocal
+from app.core.websocket import CHANNEL_NAME
+from app.models import DocumentCategory
+from app.orchestration.tasks import _run_async
+
+logger = logging.getLogger(__name__)
+
+DOCUMENT_JOB_MESSAGE_TYPE = "document_job"
+JOB_OWNER_KEY_PREFIX = "document_job:owner:"
+# Intermediate "running" messages closer together than this are dropped;
+# the next message (or the final status) supersedes them
+PROGRESS_PUBLISH_INTERVAL_SECONDS = 0.5
+
+
+@dataclass(frozen=True)
+class DocumentJobKind:
+    """How a generated document kind is rendered and stored.
+
+    ``file_name`` and ``description`` are format strings receiving order_id,
+    order_number, certificate_code and the generator parameters.
+    """
+
+    method: str
+    file_name: str
+    category: DocumentCategory
+    description: str
+
+
+DOCUMENT_JOB_KINDS: dict[str, DocumentJobKind] = {
+    "offer": DocumentJobKind(
+        "generate_offer_pdf", "nabidka_{order_id}.pdf",
+        DocumentCategory.NABIDKA, "Vygenerovaná nabídka",
+    ),
+    "production-sheet": DocumentJobKind(
+        "generate_production_sheet_pdf", "pruvodka_{order_id}.pdf",
+        DocumentCategory.PRUVODKA, "Vygenerovaná výrobní průvodka",
+    ),
+    "dimensional-protocol": DocumentJobKind(
+        "generate_dimensional_protocol", "protokol_rozmerovy_{order_number}.pdf",
+        DocumentCategory.PROTOKOL, "Vygenerovaný rozměrový protokol",
+    ),
+    "material-certificate": DocumentJobKind(
+        "generate_material_certificate", "atestace_{certificate_code}_{order_number}.pdf",
+        DocumentCategory.ATESTACE, "Vygenerovaná atestace EN 10-204 {certificate_type}",
+    ),
+    "invoice": DocumentJobKind(
+        "generate_invoice_pdf", "faktura_{order_id}.pdf",
+        DocumentCategory.FAKTURA, "Vygenerovaná faktura",
+    ),
+    "delivery-note": DocumentJobKind(
+        "generate_delivery_note_pdf", "dodaci_list_{order_id}.pdf",
+        DocumentCategory.OSTATNI, "Vygenerovaný dodací list",
+    ),
+    "order-confirmation": DocumentJobKind(
+        "generate_order_confirmation_pdf", "objednavka_{order_id}.pdf",
+        DocumentCategory.OBJEDNAVKA, "Vygenerované potvrzení objednávky",
+    ),
+}
+
+
+# Module-level client (lazy init); its connection pool is shared by the
+# owner lookups in the API process and the progress messages in a worker
+_redis: Redis | None = None
+
+
+def _redis_client() -> Redis:
+    global _redis  # noqa: PLW0603
+    if _redis is None:
+        _redis = Redis.from_url(str(get_settings().REDIS_URL), decode_responses=True)
+    return _redis
+
+
+def remember_job_owner(job_id: str, user_id: str) -> None:
+    """Record the user who queued a job; kept as long as the Celery result."""
+    _redis_client().set(
+        f"{JOB_OWNER_KEY_PREFIX}{job_id}",
+        user_id,
+        ex=int(celery_app.conf.result_expires or 3600) * 2,
+    )
+
+
+def get_job_owner(job_id: str) -> str | None:
+    """User who queued a job, or None for unknown or expired jobs."""
+    return cast("str | None", _redis_client().get(f"{JOB_OWNER_KEY_PREFIX}{job_id}"))
+
+
+def _publish_job_progress(
+    user_id: str | None,
+    job_id: str,
+    kind: str,
+    order_id: str,
+    status: str,
+    data: dict[str, Any] | None = None,
+) -> None:
+    """Push job progress to the user's WebSocket connections via Redis pub/sub."""
+    if not user_id:
+        return
+    message = {
+        "type": DOCUMENT_JOB_MESSAGE_TYPE,
+        "job_id": job_id,
+        "kind": kind,
+        "order_id": order_id,
+        "status": status,
+        **(data or {}),
+    }
+    try:
+        _redis_client().publish(
+            CHANNEL_NAME, json.dumps({"user_id": user_id, "message": message})
+        )
+    except Exception:
+        logger.warning("document_job.progress_publish_failed job_id=%s", job_id)
+
+
+async def _generate_and_store(
+    kind: str,
+    order_id: UUID,
+    params: dict[str, Any],
+    user_id: UUID | None,
+    on_rendered: Any,
+) -> dict[str, Any]:
+    """Render a document, persist it to the document store and return its info."""
+    from sqlalchemy import select
+
+    from app.models.order import Order
+    from app.schemas import DocumentUpload
+    from app.services.document import DocumentService
+    from app.services.document_generator import DocumentGeneratorService
+
+    job_kind = DOCUMENT_JOB_KINDS[kind]
+    async with AsyncSessionLocal() as session:
+        try:
+            generator = DocumentGeneratorService(session)
+            pdf_bytes: bytes = await getattr(generator, job_kind.method)(
+                order_id=order_id, **params
+            )
+            on_rendered(len(pdf_bytes))
+
+            order_number = (
+                await session.execute(select(Order.number).where(Order.id == order_id))
+            ).scalar_one_or_none() or str(order_id)
+            fields = {
+                "order_id": order_id,
+                "order_number": order_number,
+                "certificate_code": str(params.get("certificate_type", "")).replace(".", ""),
+                **params,
+            }
+            file_name = job_kind.file_name.format(**fields)
+
+            document = await DocumentService(session, user_id=user_id).upload(
+                metadata=DocumentUpload(
+                    entity_type="order",
+                    entity_id=order_id,
+                    category=job_kind.category,
+                    description=job_kind.description.format(**fields),
+                ),
+                file_name=file_name,
+                file_content=pdf_bytes,
+                mime_type="application/pdf",
+            )
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
+
+    return {
+        "document_id": str(document.id),
+        "file_name": file_name,
+        "size_bytes": len(pdf_bytes),
+    }
+
+
+@celery_app.task(
+    bind=True,
+    max_retries=2,
+    queue="documents",
+    name="app.services.document_generator_tasks.generate_document",
+)
+def generate_document(  # type: ignore[no-untyped-def]
+    self,
+    kind: str,
+    order_id: str,
+    params: dict[str, Any] | None = None,
+    user_id: str | None = None,
+) -> dict[str, Any]:
+    """Render, encrypt and store a generated document outside the API request.
+
+    Args:
+        kind: Document kind, a key of DOCUMENT_JOB_KINDS.
+        order_id: Order UUID string.
+        params: Keyword arguments for the DocumentGeneratorService method.
+        user_id: Requesting user; receives WebSocket progress messages.
+
+    Returns:
+        Dict with status and, on success, document_id, file_name and size_bytes.
+    """
+    job_id = self.request.id
+    params = params or {}
+    logger.info("document_job.started job_id=%s kind=%s order_id=%s", job_id, kind, order_id)
+
+    last_published = 0.0
+
+    def progress(stage: str, **data: Any) -> None:
+        nonlocal last_published
+        self.update_state(state="PROGRESS", meta={"stage": stage, **data})
+        now = time.monotonic()
+        if now - last_published >= PROGRESS_PUBLISH_INTERVAL_SECONDS:
+            last_published = now
+            _publish_job_progress(
+                user_id, job_id, kind, order_id, "running", {"stage": stage, **data}
+            )
+
+    if kind not in DOCUMENT_JOB_KINDS:
+        error = f"Neznámý typ dokumentu: {kind}"
+        _publish_job_progress(user_id, job_id, kind, order_id, "failed", {"error": error})
+        return {"status": "failed", "error": error}
+
+    progress("rendering")
+    try:
+        result = _run_async(
+            _generate_and_store(
+                kind,
+                UUID(order_id),
+                params,
+                UUID(user_id) if user_id else None,
+                lambda size: progress("persisting", size_bytes=size),
+            )
+        )
+    except ValueError as exc:
+        # Missing order / invalid parameters: retrying will not help
+        logger.warning("document_job.rejected job_id=%s error=%s", job_id, exc)
+        _publish_job_progress(user_id, job_id, kind, order_id, "failed", {"error": str(exc)})
+        return {"status": "failed", "error": str(exc)}
+    except Exception as exc:
+        logger.exception("document_job.failed job_id=%s", job_id)
+        if self.request.retries >= self.max_retries:
+            _publish_job_progress(user_id, job_id, kind, order_id, "failed", {"error": str(exc)})
+            return {"status": "failed", "error": str(exc)}
+        raise self.retry(countdown=10 * (self.request.retries + 1)) from exc
+
+    _publish_job_progress(user_id, job_id, kind, order_id, "completed", result)
+    logger.info(
+        "document_job.completed job_id=%s document_id=%s size=%d",
+        job_id,
+        result["document_id"],
+        result["size_bytes"],
+    )
+    return {"status": "completed", **result}
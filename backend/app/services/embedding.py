@@ -4,7 +4,7 @@ import hashlib
 import logging
 from uuid import UUID
 
-from sqlalchemy import select, text
+from sqlalchemy import bindparam, select, text
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
@@ -199,6 +199,74 @@ class EmbeddingService:
             for row in rows
         ]
 
+    async def find_similar_many(
+        self,
+        order_ids: list[UUID],
+        limit: int = 5,
+    ) -> dict[UUID, list[SimilarOrderResult]]:
+        """Find similar orders for several reference orders in one query.
+
+        Args:
+            order_ids: Reference order UUIDs.
+            limit: Max results per reference order.
+
+        Returns:
+            Similar order results by reference order UUID; orders without an
+            embedding are missing from the result.
+        """
+        if not order_ids:
+            return {}
+
+        query = text("""
+            SELECT
+                ref.order_id AS reference_id,
+                s.order_id,
+                s.order_number,
+                s.status,
+                s.priority,
+                s.note,
+                s.customer_name,
+                s.similarity
+            FROM order_embeddings ref
+            CROSS JOIN LATERAL (
+                SELECT
+                    oe.order_id,
+                    o.number as order_number,
+                    o.status,
+                    o.priority,
+                    o.note,
+                    c.company_name as customer_name,
+                    1 - (oe.embedding <=> ref.embedding) as similarity
+                FROM order_embeddings oe
+                JOIN orders o ON o.id = oe.order_id
+                LEFT JOIN customers c ON c.id = o.customer_id
+                WHERE oe.order_id != ref.order_id
+                ORDER BY oe.embedding <=> ref.embedding
+                LIMIT :limit
+            ) s
+            WHERE ref.order_id IN :order_ids
+            ORDER BY ref.order_id, s.similarity DESC
+        """).bindparams(bindparam("order_ids", expanding=True))
+
+        result = await self.db.execute(
+            query, {"order_ids": [str(order_id) for order_id in order_ids], "limit": limit}
+        )
+
+        similar: dict[UUID, list[SimilarOrderResult]] = {}
+        for row in result.fetchall():
+            similar.setdefault(UUID(str(row.reference_id)), []).append(
+                SimilarOrderResult(
+                    order_id=str(row.order_id),
+                    order_number=row.order_number,
+                    status=row.status,
+                    priority=row.priority,
+                    customer_name=row.customer_name,
+                    similarity=max(0.0, min(1.0, float(row.similarity))),
+                    note=row.note,
+                )
+            )
+        return similar
+
     async def search_by_text(
         self,
         query_text: str,
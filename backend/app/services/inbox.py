@@ -2,9 +2,10 @@
 
 import re
 from datetime import UTC, datetime
+from typing import Any
 from uuid import UUID
 
-from sqlalchemy import select
+from sqlalchemy import Row, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models import (
@@ -17,6 +18,7 @@ from app.models import (
     Order,
     OrderStatus,
 )
+from app.services.pagination import CountMode, count_rows, fetch_keyset_page
 
 
 class InboxService:
@@ -85,6 +87,56 @@ class InboxService:
         result = await self.db.execute(query)
         return list(result.scalars().all())
 
+    async def list_page(
+        self,
+        cursor: str | None = None,
+        limit: int = 50,
+        status: InboxStatus | None = None,
+        classification: InboxClassification | None = None,
+        count: CountMode = CountMode.NONE,
+    ) -> tuple[list[Row[Any]], str | None, int | None]:
+        """Get one keyset page of inbox rows without bodies, newest first.
+
+        Args:
+            cursor: Cursor returned with the previous page
+            limit: Page size
+            status: Optional status filter
+            classification: Optional classification filter
+            count: How to compute the total
+
+        Returns:
+            Tuple of (rows, next cursor, total)
+
+        Raises:
+            ValueError: Invalid cursor
+        """
+        conditions = []
+        if status:
+            conditions.append(InboxMessage.status == status)
+        if classification:
+            conditions.append(InboxMessage.classification == classification)
+
+        query = select(
+            InboxMessage.id,
+            InboxMessage.from_email,
+            InboxMessage.subject,
+            InboxMessage.received_at,
+            InboxMessage.classification,
+            InboxMessage.confidence,
+            InboxMessage.status,
+            InboxMessage.customer_id,
+            InboxMessage.order_id,
+            InboxMessage.auto_reply_sent,
+        ).where(*conditions)
+
+        rows, next_cursor = await fetch_keyset_page(
+            self.db, query, InboxMessage.received_at, InboxMessage.id, cursor, limit
+        )
+        total = await count_rows(
+            self.db, select(InboxMessage.id).where(*conditions), InboxMessage.__table__, count
+        )
+        return rows, next_cursor, total
+
     async def get_by_id(self, message_id: UUID) -> InboxMessage | None:
         """Get inbox message by ID.
 
@@ -1,10 +1,11 @@
 """Material price business logic service."""
 
 import logging
-from datetime import UTC, date, datetime
+from datetime import UTC, datetime
+from typing import Any
 from uuid import UUID
 
-from sqlalchemy import func, or_, select
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models import AuditAction, AuditLog, MaterialPrice
@@ -13,6 +14,12 @@ from app.schemas import (
     MaterialPriceImportResult,
     MaterialPriceUpdate,
 )
+from app.services.material_price_index import (
+    PriceEntry,
+    get_material_price_index,
+    mark_material_prices_changed,
+)
+from app.services.text_search import fetch_page_with_total, text_search
 
 logger = logging.getLogger(__name__)
 
@@ -55,7 +62,7 @@ class MaterialPriceService:
         Args:
             skip: Number of records to skip.
             limit: Maximum number of records to return.
-            search: Search string for name or specification.
+            search: Search string for name or specification (trigram-ranked).
             material_grade: Filter by material grade.
             form: Filter by material form.
             is_active: Filter by active status.
@@ -64,46 +71,28 @@ class MaterialPriceService:
             Tuple of (list of MaterialPrice, total count).
         """
         query = select(MaterialPrice)
-        count_query = select(func.count()).select_from(MaterialPrice)
+        order_by: list[Any] = [MaterialPrice.name]
 
         # Apply filters
         if search:
-            search_pattern = f"%{search}%"
-            query = query.where(
-                or_(
-                    MaterialPrice.name.ilike(search_pattern),
-                    MaterialPrice.specification.ilike(search_pattern),
-                )
-            )
-            count_query = count_query.where(
-                or_(
-                    MaterialPrice.name.ilike(search_pattern),
-                    MaterialPrice.specification.ilike(search_pattern),
-                )
+            condition, rank = text_search(
+                self.db, [MaterialPrice.name, MaterialPrice.specification], search
             )
+            query = query.where(condition)
+            if rank is not None:
+                order_by.insert(0, rank.desc())
 
         if material_grade:
             query = query.where(MaterialPrice.material_grade == material_grade)
-            count_query = count_query.where(MaterialPrice.material_grade == material_grade)
 
         if form:
             query = query.where(MaterialPrice.form == form)
-            count_query = count_query.where(MaterialPrice.form == form)
 
         if is_active is not None:
             query = query.where(MaterialPrice.is_active == is_active)
-            count_query = count_query.where(MaterialPrice.is_active == is_active)
-
-        # Get total count
-        total_result = await self.db.execute(count_query)
-        total = total_result.scalar_one()
 
-        # Get paginated results
-        query = query.order_by(MaterialPrice.name).offset(skip).limit(limit)
-        result = await self.db.execute(query)
-        items = list(result.scalars().all())
-
-        return items, total
+        # Page and total count in one statement
+        return await fetch_page_with_total(self.db, query.order_by(*order_by), skip, limit)
 
     async def get_by_id(self, price_id: UUID) -> MaterialPrice | None:
         """Get material price by ID."""
@@ -131,6 +120,7 @@ class MaterialPriceService:
         self.db.add(price)
         await self.db.flush()
         await self.db.refresh(price)
+        mark_material_prices_changed(self.db)
 
         # Audit trail
         await self._create_audit_log(
@@ -176,6 +166,7 @@ class MaterialPriceService:
         if changes:
             await self.db.flush()
             await self.db.refresh(price)
+            mark_material_prices_changed(self.db)
 
             await self._create_audit_log(
                 action=AuditAction.UPDATE,
@@ -205,6 +196,7 @@ class MaterialPriceService:
 
         await self.db.delete(price)
         await self.db.flush()
+        mark_material_prices_changed(self.db)
 
         logger.info("material_price_deleted id=%s name=%s", price_id, price.name)
 
@@ -220,9 +212,12 @@ class MaterialPriceService:
 
         Search priority:
         1. Exact material_grade match
-        2. Name LIKE match
+        2. Name token match (all words of the name, any order)
         3. Cheapest valid price among matches
 
+        Lookups are answered by the in-memory price index; only the matched
+        row is loaded from the database.
+
         Args:
             material_name: Material name to search for.
             material_grade: Material grade (e.g., "S235JR").
@@ -231,54 +226,39 @@ class MaterialPriceService:
         Returns:
             MaterialPrice or None if no match found.
         """
-        today = date.today()
-        query = select(MaterialPrice).where(
-            MaterialPrice.is_active == True,  # noqa: E712
-            MaterialPrice.valid_from <= today,
-            or_(
-                MaterialPrice.valid_to.is_(None),
-                MaterialPrice.valid_to >= today,
-            ),
-        )
-
-        # Priority 1: Exact material_grade match
-        if material_grade:
-            grade_query = query.where(MaterialPrice.material_grade == material_grade)
-            result = await self.db.execute(
-                grade_query.order_by(MaterialPrice.unit_price.asc()).limit(1)
-            )
-            match = result.scalar_one_or_none()
-            if match:
-                logger.info(
-                    "best_price_found strategy=exact_grade grade=%s price=%s",
-                    material_grade,
-                    match.unit_price,
-                )
-                return match
-
-        # Priority 2: Name LIKE match
-        if material_name:
-            name_pattern = f"%{material_name}%"
-            name_query = query.where(MaterialPrice.name.ilike(name_pattern))
-            result = await self.db.execute(
-                name_query.order_by(MaterialPrice.unit_price.asc()).limit(1)
+        index = await get_material_price_index(self.db)
+        entry = index.find_best(material_name=material_name, material_grade=material_grade)
+
+        if entry is None:
+            logger.info(
+                "best_price_not_found grade=%s name=%s",
+                material_grade,
+                material_name,
             )
-            match = result.scalar_one_or_none()
-            if match:
-                logger.info(
-                    "best_price_found strategy=name_like name=%s price=%s",
-                    material_name,
-                    match.unit_price,
-                )
-                return match
-
-        # No match found
+            return None
+
         logger.info(
-            "best_price_not_found grade=%s name=%s",
+            "best_price_found grade=%s name=%s price=%s",
             material_grade,
             material_name,
+            entry.unit_price,
         )
-        return None
+        return await self.get_by_id(entry.id)
+
+    async def find_best_prices(
+        self,
+        queries: list[tuple[str | None, str | None]],
+    ) -> list[PriceEntry | None]:
+        """Find best prices for many materials in one call (no per-item queries).
+
+        Args:
+            queries: (material_name, material_grade) pairs.
+
+        Returns:
+            Matching PriceEntry (or None) for each query, in order.
+        """
+        index = await get_material_price_index(self.db)
+        return index.find_best_many(queries)
 
     async def import_from_excel(self, file_content: bytes) -> MaterialPriceImportResult:
         """Import material prices from Excel file.
@@ -286,86 +266,17 @@ class MaterialPriceService:
         Expected columns: name, specification, material_grade, form, dimension,
                          unit, unit_price, supplier, valid_from, valid_to, is_active, notes
 
+        Lines matching an existing price (same name, grade, form, dimension,
+        supplier and valid_from) update it instead of creating a duplicate.
+
         Args:
             file_content: Excel file content as bytes.
 
         Returns:
             MaterialPriceImportResult with success count and errors.
         """
-        from app.integrations.excel.parser import ExcelParser
-
-        parser = ExcelParser()
-        imported_count = 0
-        failed_count = 0
-        errors: list[str] = []
-
-        try:
-            # Save to temporary file
-            import tempfile
-
-            with tempfile.NamedTemporaryFile(suffix=".xlsx", delete=False) as tmp_file:
-                tmp_file.write(file_content)
-                tmp_path = tmp_file.name
-
-            # Parse Excel
-            rows = await parser.parse_generic(tmp_path)
-
-            for idx, row in enumerate(rows, start=2):  # Start at 2 (1 is header)
-                try:
-                    # Map Excel columns to MaterialPriceCreate
-                    price_data = MaterialPriceCreate(
-                        name=str(row.get("name", row.get("název", ""))).strip(),
-                        specification=str(row.get("specification", row.get("specifikace", "")))
-                        .strip()
-                        or None,
-                        material_grade=str(
-                            row.get("material_grade", row.get("třída_materiálu", ""))
-                        ).strip()
-                        or None,
-                        form=str(row.get("form", row.get("forma", ""))).strip() or None,
-                        dimension=str(row.get("dimension", row.get("rozměry", ""))).strip()
-                        or None,
-                        unit=str(row.get("unit", row.get("jednotka", "kg"))).strip(),
-                        unit_price=float(row.get("unit_price", row.get("jednotková_cena", 0))),
-                        supplier=str(row.get("supplier", row.get("dodavatel", ""))).strip()
-                        or None,
-                        valid_from=row.get("valid_from", row.get("platnost_od", date.today())),
-                        valid_to=row.get("valid_to", row.get("platnost_do")),
-                        is_active=bool(row.get("is_active", row.get("aktivní", True))),
-                        notes=str(row.get("notes", row.get("poznámky", ""))).strip() or None,
-                    )
-
-                    await self.create(price_data)
-                    imported_count += 1
-
-                except Exception as e:
-                    failed_count += 1
-                    errors.append(f"Řádek {idx}: {str(e)}")
-                    logger.warning("import_row_failed row=%s error=%s", idx, str(e))
-
-            # Cleanup
-            import os
-
-            os.unlink(tmp_path)
-
-        except Exception as e:
-            logger.exception("import_failed error=%s", str(e))
-            return MaterialPriceImportResult(
-                success=False,
-                imported_count=0,
-                failed_count=0,
-                errors=[f"Import selhal: {str(e)}"],
-            )
-
-        logger.info(
-            "import_completed imported=%s failed=%s",
-            imported_count,
-            failed_count,
-        )
+        from app.services.material_price_import import MaterialPriceImporter
 
-        return MaterialPriceImportResult(
-            success=failed_count == 0,
-            imported_count=imported_count,
-            failed_count=failed_count,
-            errors=errors,
+        return await MaterialPriceImporter(self.db, user_id=self.user_id).import_excel(
+            file_content
         )
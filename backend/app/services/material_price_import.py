@@ -0,0 +1,325 @@
+"""Bulk import of supplier material price lists.
+
+Price lists of tens of thousands of lines are imported in three steps:
+
+1. the XLSX upload is read straight from memory (read-only openpyxl, no temp
+   file) and header aliases are resolved once per file, not per row,
+2. all rows are validated in one pydantic pass; invalid rows are reported by
+   sheet row number and skipped, repeated lines (same natural key) are
+   reported as warnings and the last one wins,
+3. valid rows are written with multi-row ``INSERT ... ON CONFLICT DO UPDATE``
+   statements on the price list natural key (see
+   ``MATERIAL_PRICE_NATURAL_KEY``), chunked by ``MATERIAL_PRICE_IMPORT_CHUNK_SIZE``.
+
+The whole import is recorded as a single audit log entry.
+"""
+
+import asyncio
+import logging
+import uuid
+from collections.abc import Iterator
+from datetime import UTC, date, datetime
+from decimal import ROUND_HALF_UP, Decimal
+from io import BytesIO
+from typing import Any
+from uuid import UUID
+
+from openpyxl import load_workbook
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.models import AuditAction, AuditLog, MaterialPrice
+from app.models.material_price import MATERIAL_PRICE_NATURAL_KEY
+from app.schemas import MaterialPriceImportResult
+from app.schemas.material_price import MaterialPriceImportRow
+from app.services.material_price_index import mark_material_prices_changed
+
+logger = logging.getLogger(__name__)
+
+# Accepted header names per field (English first, then Czech)
+COLUMN_ALIASES: dict[str, tuple[str, ...]] = {
+    "name": ("name", "název"),
+    "specification": ("specification", "specifikace"),
+    "material_grade": ("material_grade", "třída_materiálu"),
+    "form": ("form", "forma"),
+    "dimension": ("dimension", "rozměry"),
+    "unit": ("unit", "jednotka"),
+    "unit_price": ("unit_price", "jednotková_cena"),
+    "supplier": ("supplier", "dodavatel"),
+    "valid_from": ("valid_from", "platnost_od"),
+    "valid_to": ("valid_to", "platnost_do"),
+    "is_active": ("is_active", "aktivní"),
+    "notes": ("notes", "poznámky"),
+}
+
+# Columns overwritten when an imported line matches an existing price
+_UPDATE_COLUMNS = ("specification", "unit", "unit_price", "valid_to", "is_active", "notes")
+
+_FALSE_VALUES = {"0", "false", "ne", "no", "n"}
+
+_rows_adapter = TypeAdapter(list[MaterialPriceImportRow])
+
+# Sample of row errors kept in the audit entry
+_AUDIT_ERROR_SAMPLE = 20
+
+
+def _cell_text(value: Any) -> str | None:
+    if value is None:
+        return None
+    text = str(value).strip()
+    return text or None
+
+
+def _cell_date(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, str):
+        return value.strip() or None
+    return value
+
+
+def _cell_bool(value: Any) -> bool:
+    if value is None or value == "":
+        return True
+    if isinstance(value, str):
+        return value.strip().lower() not in _FALSE_VALUES
+    return bool(value)
+
+
+def _cell_decimal(value: Any) -> Any:
+    # floats from Excel go through str() so 32.1 does not become 32.0999...
+    if isinstance(value, float):
+        return str(value)
+    if isinstance(value, str):
+        return value.strip().replace(" ", "").replace(",", ".")
+    return value
+
+
+def _read_sheet(file_content: bytes) -> Iterator[tuple[int, dict[str, Any]]]:
+    """Yield (sheet row number, raw field dict) for every non-empty data row."""
+    wb = load_workbook(BytesIO(file_content), read_only=True, data_only=True)
+    try:
+        ws = wb.active
+        if ws is None:
+            raise ValueError("No worksheet found")
+
+        rows = ws.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        headers = [str(cell).strip().lower() if cell is not None else "" for cell in header]
+
+        # Resolve each field to a column index once per file
+        columns: dict[str, int] = {}
+        for field, aliases in COLUMN_ALIASES.items():
+            for alias in aliases:
+                if alias in headers:
+                    columns[field] = headers.index(alias)
+                    break
+
+        for row_number, row in enumerate(rows, start=2):
+            if not any(cell is not None and cell != "" for cell in row):
+                continue
+            yield row_number, {
+                field: row[idx] if idx < len(row) else None for field, idx in columns.items()
+            }
+    finally:
+        wb.close()
+
+
+def _to_record(raw: dict[str, Any], today: date) -> dict[str, Any]:
+    """Normalize raw cell values into MaterialPriceImportRow input."""
+    return {
+        "name": _cell_text(raw.get("name")) or "",
+        "specification": _cell_text(raw.get("specification")),
+        "material_grade": _cell_text(raw.get("material_grade")),
+        "form": _cell_text(raw.get("form")),
+        "dimension": _cell_text(raw.get("dimension")),
+        "unit": _cell_text(raw.get("unit")) or "kg",
+        "unit_price": _cell_decimal(raw.get("unit_price")),
+        "supplier": _cell_text(raw.get("supplier")),
+        "valid_from": _cell_date(raw.get("valid_from")) or today,
+        "valid_to": _cell_date(raw.get("valid_to")),
+        "is_active": _cell_bool(raw.get("is_active")),
+        "notes": _cell_text(raw.get("notes")),
+    }
+
+
+def _natural_key(row: MaterialPriceImportRow) -> tuple[Any, ...]:
+    return (
+        row.name,
+        row.material_grade or "",
+        row.form or "",
+        row.dimension or "",
+        row.supplier or "",
+        row.valid_from,
+    )
+
+
+def _format_error(error: dict[str, Any]) -> str:
+    field = ".".join(str(part) for part in error["loc"][1:])
+    return f"{field}: {error['msg']}" if field else str(error["msg"])
+
+
+class MaterialPriceImporter:
+    """Validates and upserts a material price list in bulk."""
+
+    def __init__(
+        self,
+        db: AsyncSession,
+        user_id: UUID | None = None,
+        chunk_size: int | None = None,
+    ) -> None:
+        self.db = db
+        self.user_id = user_id
+        self.chunk_size = chunk_size or get_settings().MATERIAL_PRICE_IMPORT_CHUNK_SIZE
+
+    async def import_excel(self, file_content: bytes) -> MaterialPriceImportResult:
+        """Import an XLSX price list.
+
+        Args:
+            file_content: Excel file content as bytes.
+
+        Returns:
+            MaterialPriceImportResult with imported/failed counts and row errors.
+        """
+        try:
+            parsed = await asyncio.to_thread(self._parse_and_validate, file_content)
+        except Exception as e:
+            logger.exception("import_failed error=%s", str(e))
+            return MaterialPriceImportResult(
+                success=False,
+                imported_count=0,
+                failed_count=0,
+                errors=[f"Import selhal: {str(e)}"],
+            )
+
+        valid_rows, errors, duplicates = parsed
+        failed_count = len(errors)
+        await self._upsert(valid_rows)
+        await self._audit(len(valid_rows), failed_count, errors, len(duplicates))
+
+        logger.info(
+            "import_completed imported=%s failed=%s duplicates=%s",
+            len(valid_rows),
+            failed_count,
+            len(duplicates),
+        )
+
+        return MaterialPriceImportResult(
+            success=failed_count == 0,
+            imported_count=len(valid_rows),
+            failed_count=failed_count,
+            duplicate_count=len(duplicates),
+            errors=[message for _, message in sorted(errors)],
+            warnings=[message for _, message in sorted(duplicates)],
+        )
+
+    def _parse_and_validate(
+        self, file_content: bytes
+    ) -> tuple[list[MaterialPriceImportRow], list[tuple[int, str]], list[tuple[int, str]]]:
+        """Read and validate all rows.
+
+        Returns:
+            Valid rows (one per natural key), (row, message) errors of invalid
+            rows and (row, message) warnings of superseded duplicate rows.
+        """
+        today = date.today()
+        row_numbers: list[int] = []
+        records: list[dict[str, Any]] = []
+        for row_number, raw in _read_sheet(file_content):
+            row_numbers.append(row_number)
+            records.append(_to_record(raw, today))
+
+        errors: list[tuple[int, str]] = []
+        try:
+            rows = _rows_adapter.validate_python(records)
+            valid = list(zip(row_numbers, rows, strict=True))
+        except ValidationError as exc:
+            messages: dict[int, list[str]] = {}
+            for error in exc.errors():
+                messages.setdefault(error["loc"][0], []).append(_format_error(error))
+            for idx, row_messages in messages.items():
+                errors.append((row_numbers[idx], f"Řádek {row_numbers[idx]}: {'; '.join(row_messages)}"))
+
+            ok = [i for i in range(len(records)) if i not in messages]
+            rows = _rows_adapter.validate_python([records[i] for i in ok])
+            valid = [(row_numbers[i], row) for i, row in zip(ok, rows, strict=True)]
+
+        # A single upsert statement cannot touch the same key twice: later lines win
+        by_key: dict[tuple[Any, ...], tuple[int, MaterialPriceImportRow]] = {}
+        duplicates: list[tuple[int, str]] = []
+        for row_number, row in valid:
+            key = _natural_key(row)
+            previous = by_key.get(key)
+            if previous is not None:
+                duplicates.append(
+                    (
+                        previous[0],
+                        f"Řádek {previous[0]}: duplicitní položka, nahrazena řádkem {row_number}",
+                    )
+                )
+            by_key[key] = (row_number, row)
+
+        return [row for _, row in by_key.values()], errors, duplicates
+
+    async def _upsert(self, rows: list[MaterialPriceImportRow]) -> None:
+        """Write rows with chunked multi-row INSERT ... ON CONFLICT DO UPDATE."""
+        if not rows:
+            return
+
+        dialect = self.db.get_bind().dialect.name
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        cent = Decimal("0.01")
+
+        for start in range(0, len(rows), self.chunk_size):
+            chunk = rows[start : start + self.chunk_size]
+            values = [
+                {
+                    "id": uuid.uuid4(),
+                    **row.model_dump(),
+                    "unit_price": row.unit_price.quantize(cent, rounding=ROUND_HALF_UP),
+                }
+                for row in chunk
+            ]
+            stmt = insert(MaterialPrice).values(values)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=list(MATERIAL_PRICE_NATURAL_KEY),
+                set_={
+                    **{column: stmt.excluded[column] for column in _UPDATE_COLUMNS},
+                    "updated_at": func.now(),
+                },
+            )
+            await self.db.execute(stmt)
+
+        # Rows written through Core are not tracked by the identity map
+        self.db.expire_all()
+        mark_material_prices_changed(self.db)
+
+    async def _audit(
+        self,
+        imported_count: int,
+        failed_count: int,
+        errors: list[tuple[int, str]],
+        duplicate_count: int = 0,
+    ) -> None:
+        """Record one audit entry summarizing the import."""
+        self.db.add(
+            AuditLog(
+                user_id=self.user_id,
+                action=AuditAction.CREATE,
+                entity_type="material_price_import",
+                entity_id=uuid.uuid4(),
+                changes={
+                    "imported_count": imported_count,
+                    "failed_count": failed_count,
+                    "duplicate_count": duplicate_count,
+                    "errors": [message for _, message in sorted(errors)[:_AUDIT_ERROR_SAMPLE]],
+                },
+                timestamp=datetime.now(UTC),
+            )
+        )
+        await self.db.flush()
@@ -0,0 +1,421 @@
+"""In-memory material price lookup index.
+
+Price enrichment used to run up to two queries per BOM line (exact grade, then
+``ILIKE '%name%'``, which cannot use the btree index on ``name``). This module
+keeps a per-process snapshot of all active prices and answers lookups from
+dictionaries:
+
+- grade lookup: normalized grade -> prices sorted by unit price,
+- name lookup: every query token must prefix-match a token of the price name
+  (diacritics and case are ignored, word order is not significant),
+- name matching for reports (``match_name``): exact normalized name, then the
+  token lookup above, then the most specific price name contained in the query,
+- validity: ``valid_from <= day <= valid_to`` is checked on the candidates.
+
+The snapshot is rebuilt lazily after invalidation. Invalidation happens when a
+session that changed material prices commits (see
+``mark_material_prices_changed``); the version bump is published from the
+event loop after the commit, never from the commit hook itself. Other
+processes (API workers, Celery workers) notice through a version counter in
+Redis, checked at most every
+``MATERIAL_PRICE_INDEX_CHECK_SECONDS``, and rebuild at least every
+``MATERIAL_PRICE_INDEX_TTL_SECONDS`` if Redis is unavailable.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import bisect
+import re
+import time
+import unicodedata
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal
+from functools import lru_cache
+from typing import Any
+from uuid import UUID
+
+import structlog
+from redis.asyncio import Redis
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.models import MaterialPrice
+
+logger = structlog.get_logger(__name__)
+
+INDEX_VERSION_KEY = "material_prices:index_version"
+
+# Session.info flag set by writers of material prices
+_CHANGED_FLAG = "material_prices_changed"
+
+_TOKEN_RE = re.compile(r"[0-9a-z]+")
+
+
+def normalize_text(value: str | None) -> str:
+    """Casefold and strip diacritics ("Nerezová" -> "nerezova")."""
+    if not value:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", value.casefold())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch)).strip()
+
+
+def tokenize(value: str | None) -> list[str]:
+    """Split a normalized string into alphanumeric tokens."""
+    return _TOKEN_RE.findall(normalize_text(value))
+
+
+def _normalize_grade(value: str | None) -> str:
+    return normalize_text(value).replace(" ", "")
+
+
+@dataclass(frozen=True, slots=True)
+class PriceEntry:
+    """Immutable snapshot of an active MaterialPrice row."""
+
+    id: UUID
+    name: str
+    material_grade: str | None
+    form: str | None
+    dimension: str | None
+    unit: str
+    unit_price: Decimal
+    supplier: str | None
+    valid_from: date
+    valid_to: date | None
+
+    @classmethod
+    def from_row(cls, row: Any) -> PriceEntry:
+        return cls(
+            id=row.id,
+            name=row.name,
+            material_grade=row.material_grade,
+            form=row.form,
+            dimension=row.dimension,
+            unit=row.unit,
+            unit_price=row.unit_price,
+            supplier=row.supplier,
+            valid_from=row.valid_from,
+            valid_to=row.valid_to,
+        )
+
+    def is_valid_on(self, day: date) -> bool:
+        return self.valid_from <= day and (self.valid_to is None or self.valid_to >= day)
+
+
+class MaterialPriceIndex:
+    """Lookup structures over a snapshot of active material prices.
+
+    Args:
+        entries: Active price entries (inactive rows must be filtered out).
+    """
+
+    def __init__(self, entries: Iterable[PriceEntry]) -> None:
+        # Sorted by price so the first valid candidate is the cheapest
+        self.entries = sorted(entries, key=lambda e: e.unit_price)
+        self._by_grade: dict[str, list[int]] = {}
+        self._by_name: dict[str, list[int]] = {}
+        self._name_tokens: list[frozenset[str]] = []
+        postings: dict[str, set[int]] = {}
+
+        for idx, entry in enumerate(self.entries):
+            grade = _normalize_grade(entry.material_grade)
+            if grade:
+                self._by_grade.setdefault(grade, []).append(idx)
+            tokens = tokenize(entry.name)
+            self._by_name.setdefault(" ".join(tokens), []).append(idx)
+            self._name_tokens.append(frozenset(tokens))
+            for token in tokens:
+                postings.setdefault(token, set()).add(idx)
+
+        self._tokens = sorted(postings)
+        self._postings = postings
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _prefix_matches(self, token: str) -> set[int]:
+        """Entries with a name token starting with ``token``."""
+        matches: set[int] = set()
+        start = bisect.bisect_left(self._tokens, token)
+        for name_token in self._tokens[start:]:
+            if not name_token.startswith(token):
+                break
+            matches |= self._postings[name_token]
+        return matches
+
+    def _cheapest_valid(self, candidates: Iterable[int], day: date) -> PriceEntry | None:
+        for idx in sorted(candidates):
+            entry = self.entries[idx]
+            if entry.is_valid_on(day):
+                return entry
+        return None
+
+    def find_best(
+        self,
+        material_name: str | None = None,
+        material_grade: str | None = None,
+        on: date | None = None,
+    ) -> PriceEntry | None:
+        """Find the cheapest valid price, by grade first and then by name.
+
+        Args:
+            material_name: Material name; all its tokens must match the price name.
+            material_grade: Material grade (e.g., "S235JR"), matched exactly.
+            on: Day the price must be valid on (default: today).
+
+        Returns:
+            Cheapest matching PriceEntry or None.
+        """
+        day = on or date.today()
+
+        grade = _normalize_grade(material_grade)
+        if grade and grade in self._by_grade:
+            match = self._cheapest_valid(self._by_grade[grade], day)
+            if match:
+                return match
+
+        tokens = tokenize(material_name)
+        if tokens:
+            # Most selective token first; stop as soon as nothing is left
+            candidate_sets = sorted((self._prefix_matches(t) for t in set(tokens)), key=len)
+            candidates = candidate_sets[0]
+            for other in candidate_sets[1:]:
+                if not candidates:
+                    break
+                candidates = candidates & other
+            return self._cheapest_valid(candidates, day)
+
+        return None
+
+    def match_name(self, material_name: str | None, on: date | None = None) -> PriceEntry | None:
+        """Match a free-form material name (e.g., an aggregated BOM line) to a price.
+
+        Tries, in order: the exact normalized name, prices whose name contains
+        all query tokens (``find_best``), and prices whose whole name is
+        contained in the query ("Ocel S235JR" for "Ocel S235JR plech 10mm"),
+        preferring the one with the most tokens.
+
+        Args:
+            material_name: Material name as written in the calculation.
+            on: Day the price must be valid on (default: today).
+
+        Returns:
+            Cheapest matching PriceEntry or None.
+        """
+        day = on or date.today()
+        tokens = tokenize(material_name)
+        if not tokens:
+            return None
+
+        exact = self._by_name.get(" ".join(tokens))
+        if exact:
+            match = self._cheapest_valid(exact, day)
+            if match:
+                return match
+
+        match = self.find_best(material_name=material_name, on=day)
+        if match:
+            return match
+
+        query = set(tokens)
+        candidates: set[int] = set()
+        for token in query:
+            candidates |= self._postings.get(token, set())
+        contained = [idx for idx in candidates if self._name_tokens[idx] <= query]
+        # Most specific name first, then cheapest
+        for idx in sorted(contained, key=lambda i: (-len(self._name_tokens[i]), i)):
+            entry = self.entries[idx]
+            if entry.is_valid_on(day):
+                return entry
+        return None
+
+    def find_best_many(
+        self,
+        queries: Sequence[tuple[str | None, str | None]],
+        on: date | None = None,
+    ) -> list[PriceEntry | None]:
+        """Resolve a list of (material_name, material_grade) queries in one call."""
+        day = on or date.today()
+        return [self.find_best(name, grade, on=day) for name, grade in queries]
+
+
+class MaterialPriceIndexCache:
+    """Per-process holder of the current MaterialPriceIndex.
+
+    The Redis client and the rebuild lock belong to the event loop they were
+    created on; Celery workers run every task in a fresh loop, so both are
+    recreated when the cache is used from a new one.
+
+    Args:
+        ttl_seconds: Maximum age of a snapshot before it is rebuilt.
+        check_seconds: Minimum interval between Redis version checks.
+    """
+
+    def __init__(self, ttl_seconds: float, check_seconds: float) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.check_seconds = check_seconds
+        self._index: MaterialPriceIndex | None = None
+        self._version: int | None = None
+        self._built_at = 0.0
+        self._checked_at = 0.0
+        # Bumped by reset(); a build that started before a reset is discarded
+        self._generation = 0
+        self._publish_pending = False
+        self._publish_tasks: set[asyncio.Task[None]] = set()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._redis: Redis | None = None
+        self._build_lock = asyncio.Lock()
+
+    def reset(self) -> None:
+        """Drop the local snapshot; the next lookup reloads it."""
+        self._index = None
+        self._generation += 1
+
+    async def get(self, db: AsyncSession) -> MaterialPriceIndex:
+        """Return the current index, rebuilding it if stale.
+
+        Concurrent callers that find no snapshot wait for a single rebuild.
+        """
+        self._bind_loop()
+        if self._publish_pending:
+            await self.publish_invalidation()
+
+        now = time.monotonic()
+        if self._index is not None and now - self._built_at > self.ttl_seconds:
+            self.reset()
+
+        if self._index is not None and now - self._checked_at >= self.check_seconds:
+            self._checked_at = now
+            remote = await self._fetch_remote_version()
+            if remote is not None and remote != self._version:
+                self.reset()
+
+        index = self._index
+        if index is None:
+            async with self._build_lock:
+                index = self._index
+                if index is None:
+                    index = await self._build(db)
+        return index
+
+    async def _build(self, db: AsyncSession) -> MaterialPriceIndex:
+        generation = self._generation
+        version = await self._fetch_remote_version()
+        result = await db.execute(
+            select(
+                MaterialPrice.id,
+                MaterialPrice.name,
+                MaterialPrice.material_grade,
+                MaterialPrice.form,
+                MaterialPrice.dimension,
+                MaterialPrice.unit,
+                MaterialPrice.unit_price,
+                MaterialPrice.supplier,
+                MaterialPrice.valid_from,
+                MaterialPrice.valid_to,
+            ).where(MaterialPrice.is_active == True)  # noqa: E712
+        )
+        index = MaterialPriceIndex(PriceEntry.from_row(row) for row in result)
+        if generation == self._generation:
+            self._index = index
+            self._version = version
+            self._built_at = self._checked_at = time.monotonic()
+        logger.info("material_price_index.built", entries=len(index), version=version)
+        return index
+
+    def mark_dirty(self) -> None:
+        """Drop the local snapshot and schedule a fleet-wide invalidation.
+
+        Called from the ``after_commit`` hook, so it does no I/O itself: the
+        version bump runs as a task on the current event loop, or on the next
+        lookup when no loop is running.
+        """
+        self.reset()
+        self._publish_pending = True
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        task = loop.create_task(self.publish_invalidation())
+        self._publish_tasks.add(task)
+        task.add_done_callback(self._publish_tasks.discard)
+
+    async def publish_invalidation(self) -> None:
+        """Publish a pending invalidation to other processes."""
+        if not self._publish_pending:
+            return
+        self._publish_pending = False
+        try:
+            await self._publish_invalidation()
+        except asyncio.CancelledError:
+            self._publish_pending = True
+            raise
+
+    def _bind_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # The old pool's connections belong to a closed loop; drop them
+            self._loop = loop
+            self._redis = None
+            self._build_lock = asyncio.Lock()
+
+    def _client(self) -> Redis:
+        """Shared Redis client for version checks and invalidations."""
+        self._bind_loop()
+        if self._redis is None:
+            self._redis = Redis.from_url(
+                str(get_settings().REDIS_URL), socket_connect_timeout=0.5, socket_timeout=0.5
+            )
+        return self._redis
+
+    async def _fetch_remote_version(self) -> int | None:
+        """Read the fleet-wide index version; None when Redis is unavailable."""
+        try:
+            value = await self._client().get(INDEX_VERSION_KEY)
+        except Exception:
+            logger.debug("material_price_index.version_check_failed")
+            return None
+        return int(value) if value is not None else 0
+
+    async def _publish_invalidation(self) -> None:
+        """Bump the fleet-wide index version (best effort)."""
+        try:
+            await self._client().incr(INDEX_VERSION_KEY)
+        except Exception:
+            logger.warning("material_price_index.invalidation_publish_failed")
+
+
+@lru_cache
+def get_price_index_cache() -> MaterialPriceIndexCache:
+    """Get the process-wide material price index cache."""
+    settings = get_settings()
+    return MaterialPriceIndexCache(
+        ttl_seconds=settings.MATERIAL_PRICE_INDEX_TTL_SECONDS,
+        check_seconds=settings.MATERIAL_PRICE_INDEX_CHECK_SECONDS,
+    )
+
+
+async def get_material_price_index(db: AsyncSession) -> MaterialPriceIndex:
+    """Get the current material price index, loading it if needed."""
+    return await get_price_index_cache().get(db)
+
+
+def mark_material_prices_changed(db: AsyncSession) -> None:
+    """Invalidate the price index once this session's transaction commits."""
+    db.sync_session.info[_CHANGED_FLAG] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    if session.info.pop(_CHANGED_FLAG, False):
+        get_price_index_cache().mark_dirty()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session: Session) -> None:
+    session.info.pop(_CHANGED_FLAG, None)
@@ -1,5 +1,7 @@
 """Notification service for CRUD operations and WebSocket broadcasting."""
 
+from collections.abc import Sequence
+from dataclasses import dataclass
 from uuid import UUID
 
 import structlog
@@ -13,6 +15,16 @@ from app.models.user import User, UserRole
 logger = structlog.get_logger(__name__)
 
 
+@dataclass(frozen=True)
+class NotificationDraft:
+    """Content of a notification to be created for several users."""
+
+    title: str
+    message: str
+    link: str | None = None
+    dedup_key: str | None = None
+
+
 class NotificationService:
     """Service for managing notifications with WebSocket broadcast."""
 
@@ -149,6 +161,71 @@ class NotificationService:
 
         return notifications
 
+    async def create_bulk_for_roles(
+        self,
+        notification_type: NotificationType,
+        drafts: Sequence[NotificationDraft],
+        roles: list[UserRole],
+    ) -> list[Notification]:
+        """Create several notifications for all active users with specified roles.
+
+        Recipients are loaded once and all rows are inserted in one flush
+        (instead of a flush and refresh per notification and user).
+
+        Args:
+            notification_type: Notification type.
+            drafts: Notification contents.
+            roles: Target user roles.
+
+        Returns:
+            List of created notifications.
+        """
+        if not drafts:
+            return []
+
+        result = await self.db.execute(
+            select(User.id).where(User.is_active.is_(True), User.role.in_(roles))
+        )
+        user_ids = [row[0] for row in result.all()]
+
+        notifications = [
+            Notification(
+                user_id=uid,
+                type=notification_type,
+                title=draft.title,
+                message=draft.message,
+                link=draft.link,
+                dedup_key=draft.dedup_key,
+            )
+            for draft in drafts
+            for uid in user_ids
+        ]
+        self.db.add_all(notifications)
+        await self.db.flush()
+
+        for notification in notifications:
+            await manager.publish_notification(
+                str(notification.user_id),
+                {
+                    "id": str(notification.id),
+                    "user_id": str(notification.user_id),
+                    "type": notification_type.value,
+                    "title": notification.title,
+                    "message": notification.message,
+                    "link": notification.link,
+                    "read": False,
+                    "created_at": notification.created_at.isoformat(),
+                },
+            )
+
+        await logger.ainfo(
+            "notifications_created",
+            type=notification_type.value,
+            count=len(notifications),
+            recipients=len(user_ids),
+        )
+        return notifications
+
     async def get_user_notifications(
         self,
         user_id: UUID,
@@ -2,9 +2,10 @@
 
 import logging
 from datetime import UTC, datetime
+from typing import Any
 from uuid import UUID
 
-from sqlalchemy import select
+from sqlalchemy import Row, func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
@@ -12,14 +13,17 @@ from app.core.metrics import orders_created_total
 from app.models import (
     AuditAction,
     AuditLog,
+    Customer,
     Offer,
     OfferStatus,
     Order,
     OrderItem,
     OrderStatus,
     PointsAction,
+    User,
 )
 from app.schemas import OrderCreate, OrderUpdate
+from app.services.pagination import CountMode, count_rows, fetch_keyset_page
 
 logger = logging.getLogger(__name__)
 
@@ -195,6 +199,65 @@ class OrderService:
         result = await self.db.execute(query)
         return list(result.scalars().all())
 
+    async def list_page(
+        self,
+        cursor: str | None = None,
+        limit: int = 50,
+        status: OrderStatus | None = None,
+        count: CountMode = CountMode.NONE,
+    ) -> tuple[list[Row[Any]], str | None, int | None]:
+        """Get one keyset page of lean order rows, newest first.
+
+        Selects only the list columns plus customer/assignee names and the
+        item count, without loading items, customers or users.
+
+        Args:
+            cursor: Cursor returned with the previous page
+            limit: Page size
+            status: Optional status filter
+            count: How to compute the total
+
+        Returns:
+            Tuple of (rows, next cursor, total)
+
+        Raises:
+            ValueError: Invalid cursor
+        """
+        conditions = [Order.status == status] if status else []
+        items_count = (
+            select(func.count(OrderItem.id))
+            .where(OrderItem.order_id == Order.id)
+            .correlate(Order)
+            .scalar_subquery()
+        )
+        query = (
+            select(
+                Order.id,
+                Order.number,
+                Order.status,
+                Order.priority,
+                Order.due_date,
+                Order.customer_id,
+                Customer.company_name.label("customer_name"),
+                Order.assigned_to,
+                User.full_name.label("assigned_to_name"),
+                items_count.label("items_count"),
+                Order.created_at,
+                Order.updated_at,
+            )
+            .outerjoin(Customer, Customer.id == Order.customer_id)
+            .outerjoin(User, User.id == Order.assigned_to)
+            .where(*conditions)
+        )
+
+        rows, next_cursor = await fetch_keyset_page(
+            self.db, query, Order.created_at, Order.id, cursor, limit
+        )
+        total = await count_rows(
+            self.db, select(Order.id).where(*conditions), Order.__table__, count
+        )
+        return rows, next_cursor, total
+
     async def update(
         self,
         order_id: UUID,
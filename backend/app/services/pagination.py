@@ -0,0 +1,145 @@
+"""Keyset (cursor) pagination for list endpoints.
+
+With ``OFFSET`` the database produces and discards every row before the page,
+so deep pages get slower as the table grows. Keyset pagination continues
+after the last row of the previous page instead: the cursor encodes that
+row's sort key ``(created_at, id)`` and the next page is::
+
+    WHERE (created_at, id) < (:created_at, :id)
+    ORDER BY created_at DESC, id DESC
+    LIMIT :limit
+
+which an index on ``(created_at, id)`` answers with a seek, at the same cost
+on page 1 and page 500. ``id`` breaks ties between rows with equal
+timestamps, so no row is skipped or repeated between pages.
+
+Totals are optional (``CountMode``): ``exact`` counts the filtered rows,
+``estimate`` reads the planner statistics of an unfiltered PostgreSQL table
+instead of scanning it (filtered lists and SQLite count exactly).
+"""
+
+import base64
+import enum
+from datetime import datetime
+from typing import Any
+from uuid import UUID
+
+from sqlalchemy import FromClause, Row, Select, TableClause, func, literal, select, text, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import QueryableAttribute
+
+from app.services.text_search import is_postgres
+
+
+class CountMode(str, enum.Enum):
+    """How list endpoints compute the total row count."""
+
+    NONE = "none"
+    EXACT = "exact"
+    ESTIMATE = "estimate"
+
+
+def encode_cursor(sort_value: datetime, row_id: UUID) -> str:
+    """Opaque cursor pointing after the row with this sort key."""
+    raw = f"{sort_value.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, UUID]:
+    """Sort key encoded in a cursor.
+
+    Raises:
+        ValueError: The cursor is malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        sort_value, row_id = raw.split("|")
+        return datetime.fromisoformat(sort_value), UUID(row_id)
+    except ValueError as exc:  # also binascii.Error and UnicodeDecodeError
+        raise ValueError("Invalid cursor") from exc
+
+
+async def fetch_keyset_page(
+    db: AsyncSession,
+    query: Select[Any],
+    sort_column: QueryableAttribute[datetime],
+    id_column: QueryableAttribute[UUID],
+    cursor: str | None,
+    limit: int,
+) -> tuple[list[Row[Any]], str | None]:
+    """Fetch the page of ``query`` after ``cursor``, newest first.
+
+    Args:
+        db: Database session.
+        query: Filtered select; must include ``sort_column`` and ``id_column``.
+        sort_column: Timestamp the list is ordered by.
+        id_column: Primary key, the tie-breaker.
+        cursor: ``next_cursor`` of the previous page, None for the first page.
+        limit: Page size.
+
+    Returns:
+        Tuple of (rows, cursor of the next page or None on the last page).
+
+    Raises:
+        ValueError: The cursor is malformed.
+    """
+    if cursor:
+        sort_value, row_id = decode_cursor(cursor)
+        query = query.where(
+            tuple_(sort_column, id_column) < tuple_(literal(sort_value), literal(row_id))
+        )
+    query = query.order_by(sort_column.desc(), id_column.desc()).limit(limit + 1)
+
+    rows = list((await db.execute(query)).all())
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]._mapping
+    return rows, encode_cursor(last[sort_column.key], last[id_column.key])
+
+
+async def count_rows(
+    db: AsyncSession,
+    query: Select[Any],
+    table: FromClause,
+    mode: CountMode,
+) -> int | None:
+    """Total row count of a list query according to ``mode``.
+
+    Args:
+        db: Database session.
+        query: Filtered select, before keyset conditions.
+        table: Table the list is read from (for ``estimate``).
+        mode: Counting mode.
+
+    Returns:
+        Row count, or None for ``CountMode.NONE``.
+    """
+    if mode is CountMode.NONE:
+        return None
+    if (
+        mode is CountMode.ESTIMATE
+        and query.whereclause is None
+        and isinstance(table, TableClause)
+        and is_postgres(db)
+    ):
+        estimate = await _estimate_table_rows(db, table.name)
+        if estimate is not None:
+            return estimate
+    result = await db.execute(select(func.count()).select_from(query.order_by(None).subquery()))
+    return result.scalar_one()
+
+
+async def _estimate_table_rows(db: AsyncSession, table_name: str) -> int | None:
+    """Planner row estimate of a table and its partitions; None if never analyzed."""
+    result = await db.execute(
+        text(
+            "SELECT c.reltuples FROM pg_class c "
+            "WHERE c.oid = CAST(:table AS regclass) "
+            "OR c.oid IN (SELECT inhrelid FROM pg_inherits WHERE inhparent = CAST(:table AS regclass))"
+        ),
+        {"table": table_name},
+    )
+    # reltuples is -1 for tables never vacuumed/analyzed and for partitioned parents
+    estimates = [value for value in result.scalars() if value >= 0]
+    return int(sum(estimates)) if estimates else None
@@ -0,0 +1,187 @@
+"""Shared PDF rendering engine for generated documents.
+
+Renders Jinja2 templates to PDF with WeasyPrint. The expensive parts of a
+WeasyPrint run are set up once per process instead of once per document:
+
+- the shared document stylesheet (``templates/document.css``) is parsed into a
+  ``CSS`` object and passed to every render instead of being re-parsed from
+  the inline ``<style>`` block,
+- a single ``FontConfiguration`` is reused so fonts are discovered once,
+- templates are compiled once by a cached Jinja2 environment.
+
+Layout runs off the event loop, in a process pool (``PDF_RENDER_PROCESSES``)
+or, when that is 0, in a worker thread. Daemonic processes (prefork Celery
+worker children) cannot start a pool and always render in a thread. Finished
+PDFs are kept in an LRU cache keyed by a hash of the template name and the
+rendered HTML, which covers both the template and its data.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import multiprocessing
+from collections import OrderedDict
+from collections.abc import Sequence
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+import structlog
+from jinja2 import Environment, FileSystemLoader
+
+from app.core.config import get_settings
+
+logger = structlog.get_logger(__name__)
+
+# Template directory
+TEMPLATE_DIR = Path(__file__).parent.parent / "templates"
+
+# Stylesheet shared by all templates extending base.html
+DOCUMENT_STYLESHEET = TEMPLATE_DIR / "document.css"
+
+# Per-process WeasyPrint state (stylesheet + font configuration)
+_engine: tuple[Any, Any] | None = None
+
+
+@lru_cache
+def get_jinja_env() -> Environment:
+    """Get the process-wide Jinja2 environment for document templates."""
+    return Environment(
+        loader=FileSystemLoader(str(TEMPLATE_DIR)),
+        autoescape=True,
+    )
+
+
+def _init_engine() -> None:
+    """Parse the shared stylesheet and set up fonts for this process.
+
+    Used as the process pool initializer; in thread mode it runs lazily on the
+    first render.
+    """
+    global _engine
+    import weasyprint  # type: ignore
+
+    # weasyprint.text.fonts is loaded by the package itself
+    font_config = weasyprint.text.fonts.FontConfiguration()
+    stylesheet = weasyprint.CSS(filename=str(DOCUMENT_STYLESHEET), font_config=font_config)
+    _engine = (stylesheet, font_config)
+
+
+def _render_html(html: str) -> bytes:
+    """Render an HTML string to PDF bytes using the per-process engine."""
+    if _engine is None:
+        _init_engine()
+    assert _engine is not None
+    stylesheet, font_config = _engine
+
+    from weasyprint import HTML
+
+    pdf_bytes: bytes = HTML(string=html, base_url=str(TEMPLATE_DIR)).write_pdf(
+        stylesheets=[stylesheet],
+        font_config=font_config,
+    )
+    return pdf_bytes
+
+
+class PdfRenderer:
+    """Renders document templates to PDF off the event loop, with caching.
+
+    Args:
+        processes: Size of the rendering process pool; 0 renders in a thread
+            (forced inside daemonic processes).
+        cache_size: Maximum number of rendered PDFs kept in the LRU cache.
+    """
+
+    def __init__(self, processes: int = 0, cache_size: int = 64) -> None:
+        if processes > 0 and multiprocessing.current_process().daemon:
+            # "daemonic processes are not allowed to have children"
+            logger.info("pdf_renderer.thread_mode_in_daemon", processes=processes)
+            processes = 0
+        self._processes = processes
+        self._cache_size = cache_size
+        self._cache: OrderedDict[str, bytes] = OrderedDict()
+        self._executor: Executor | None = None
+
+    def render_html(self, template_name: str, context: dict[str, Any]) -> str:
+        """Render a template to HTML that relies on the precompiled stylesheet."""
+        template = get_jinja_env().get_template(template_name)
+        return template.render(**context, external_styles=True)
+
+    async def render(self, template_name: str, context: dict[str, Any]) -> bytes:
+        """Render a template to PDF.
+
+        Args:
+            template_name: Template file name in the templates directory.
+            context: Template context.
+
+        Returns:
+            PDF file bytes.
+        """
+        html = self.render_html(template_name, context)
+        cache_key = hashlib.sha256(f"{template_name}\0{html}".encode()).hexdigest()
+
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            self._cache.move_to_end(cache_key)
+            logger.debug("pdf_renderer.cache_hit", template=template_name)
+            return cached
+
+        if self._processes > 0:
+            loop = asyncio.get_running_loop()
+            pdf_bytes = await loop.run_in_executor(self._get_executor(), _render_html, html)
+        else:
+            pdf_bytes = await asyncio.to_thread(_render_html, html)
+
+        self._cache[cache_key] = pdf_bytes
+        while len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+        return pdf_bytes
+
+    async def render_batch(
+        self, jobs: Sequence[tuple[str, dict[str, Any]]]
+    ) -> list[bytes]:
+        """Render several documents concurrently across the pool.
+
+        Args:
+            jobs: Sequence of (template_name, context) pairs.
+
+        Returns:
+            PDF bytes in the same order as ``jobs``.
+        """
+        return list(
+            await asyncio.gather(*(self.render(name, context) for name, context in jobs))
+        )
+
+    def clear_cache(self) -> None:
+        """Drop all cached PDFs."""
+        self._cache.clear()
+
+    def shutdown(self) -> None:
+        """Stop the rendering process pool, if started."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _get_executor(self) -> Executor:
+        """Start the process pool on first use."""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self._processes,
+                # spawn: never fork a process that runs an event loop and DB pools
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_engine,
+            )
+            logger.info("pdf_renderer.pool_started", processes=self._processes)
+        return self._executor
+
+
+@lru_cache
+def get_pdf_renderer() -> PdfRenderer:
+    """Get the process-wide PDF renderer singleton."""
+    settings = get_settings()
+    return PdfRenderer(
+        processes=settings.PDF_RENDER_PROCESSES,
+        cache_size=settings.PDF_CACHE_MAX_ENTRIES,
+    )
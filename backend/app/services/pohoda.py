@@ -615,6 +615,7 @@ class PohodaService:
         from app.integrations.pohoda.stock_parser import PohodaStockParser
         from app.integrations.pohoda.xml_builder import PohodaXMLBuilder
         from app.models.material_price import MaterialPrice
+        from app.services.material_price_index import mark_material_prices_changed
 
         builder = PohodaXMLBuilder()
         request_xml = builder.build_stock_list_request()
@@ -667,5 +668,7 @@ class PohodaService:
                 logger.error("Failed to sync item %s: %s", item.code, str(e))
                 results["errors"] += 1
 
+        if results["synced"]:
+            mark_material_prices_changed(self.db)
         await self.db.commit()
         return results
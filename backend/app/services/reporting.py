@@ -1,14 +1,16 @@
 """Reporting service for analytics and dashboards."""
 
 import logging
+from collections.abc import AsyncIterator
 from datetime import UTC, date, datetime, timedelta
 from decimal import Decimal
 from typing import Any
 from uuid import UUID
 
-from sqlalchemy import func, select
+from sqlalchemy import case, func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.integrations.excel.streaming import iter_query_rows
 from app.models import (
     Calculation,
     CalculationItem,
@@ -18,7 +20,6 @@ from app.models import (
     Document,
     InboxMessage,
     InboxStatus,
-    MaterialPrice,
     Offer,
     OfferStatus,
     Order,
@@ -37,6 +38,7 @@ from app.schemas.reporting import (
     RevenueReport,
     StatusCount,
 )
+from app.services.material_price_index import get_material_price_index
 
 logger = logging.getLogger(__name__)
 
@@ -362,43 +364,38 @@ class ReportingService:
         )
         active_customers = active_result.scalar() or 0
 
-        # Top customers by calculation value
+        # Top customers by calculation value, with active orders counted by a
+        # FILTER aggregate in the same grouped query
+        total_value = func.coalesce(func.sum(Calculation.total_price), Decimal("0"))
         top_result = await self.db.execute(
             select(
                 Customer.id,
                 Customer.company_name,
                 Customer.ico,
                 func.count(func.distinct(Order.id)).label("orders_count"),
-                func.coalesce(func.sum(Calculation.total_price), Decimal("0")).label("total_value"),
+                total_value.label("total_value"),
+                func.count(func.distinct(Order.id))
+                .filter(Order.status.in_(list(ACTIVE_STATUSES)))
+                .label("active_orders"),
             )
             .outerjoin(Order, Order.customer_id == Customer.id)
             .outerjoin(Calculation, Calculation.order_id == Order.id)
             .group_by(Customer.id, Customer.company_name, Customer.ico)
-            .order_by(func.coalesce(func.sum(Calculation.total_price), Decimal("0")).desc())
+            .order_by(total_value.desc())
             .limit(limit)
         )
 
-        top_customers = []
-        for row in top_result.all():
-            # Count active orders
-            active_orders_result = await self.db.execute(
-                select(func.count(Order.id)).where(
-                    Order.customer_id == row[0],
-                    Order.status.in_(list(ACTIVE_STATUSES)),
-                )
-            )
-            active_count = active_orders_result.scalar() or 0
-
-            top_customers.append(
-                CustomerStats(
-                    customer_id=str(row[0]),
-                    company_name=row[1],
-                    ico=row[2],
-                    orders_count=row[3],
-                    total_value=row[4] or Decimal("0"),
-                    active_orders=active_count,
-                )
+        top_customers = [
+            CustomerStats(
+                customer_id=str(row.id),
+                company_name=row.company_name,
+                ico=row.ico,
+                orders_count=row.orders_count,
+                total_value=row.total_value or Decimal("0"),
+                active_orders=row.active_orders or 0,
             )
+            for row in top_result.all()
+        ]
 
         return CustomerReport(
             total_customers=total_customers,
@@ -406,6 +403,120 @@ class ReportingService:
             top_customers=top_customers,
         )
 
+    @staticmethod
+    def _material_order_filter(
+        order_ids: list[UUID] | None,
+        status_filter: list[str] | None,
+    ) -> Any:
+        """Orders included in the material requirements (default: OBJEDNAVKA, VYROBA)."""
+        if order_ids:
+            return Order.id.in_(order_ids)
+        if status_filter:
+            filter_enums = [OrderStatus(s) for s in status_filter if s in OrderStatus.__members__.values()]  # noqa: E501
+            return Order.status.in_(filter_enums)
+        return Order.status.in_([OrderStatus.OBJEDNAVKA, OrderStatus.VYROBA])
+
+    @staticmethod
+    def _material_groups_query(order_filter: Any) -> Any:
+        """One grouped row per (material, order): quantities and calculation prices.
+
+        Columns: material_key, name, unit, order_number, total_quantity,
+        price_sum, price_count.
+        """
+        material_key = func.lower(func.trim(CalculationItem.name))
+        priced = CalculationItem.unit_price > 0
+        return (
+            select(
+                material_key.label("material_key"),
+                func.min(func.trim(CalculationItem.name)).label("name"),
+                func.min(CalculationItem.unit).label("unit"),
+                Order.number.label("order_number"),
+                func.sum(CalculationItem.quantity).label("total_quantity"),
+                func.sum(case((priced, CalculationItem.unit_price))).label("price_sum"),
+                func.count(case((priced, 1))).label("price_count"),
+            )
+            .join(Calculation, Calculation.id == CalculationItem.calculation_id)
+            .join(Order, Order.id == Calculation.order_id)
+            .where(order_filter, CalculationItem.cost_type == CostType.MATERIAL)
+            .group_by(material_key, Order.number)
+        )
+
+    @staticmethod
+    def _new_material_group(name: str, unit: str) -> dict[str, Any]:
+        return {
+            "name": name,
+            "unit": unit,
+            "total_quantity": Decimal("0"),
+            "order_numbers": set(),
+            "price_sum": Decimal("0"),
+            "price_count": 0,
+        }
+
+    @staticmethod
+    def _add_to_material_group(
+        agg: dict[str, Any],
+        order_number: str | None,
+        total_quantity: Decimal | None,
+        price_sum: Decimal | None,
+        price_count: int,
+    ) -> None:
+        agg["total_quantity"] += total_quantity or Decimal("0")
+        if order_number:
+            agg["order_numbers"].add(order_number)
+        if price_count:
+            agg["price_sum"] += price_sum
+            agg["price_count"] += price_count
+
+    @staticmethod
+    def _material_requirement_item(
+        agg_data: dict[str, Any],
+        price_index: Any,
+        today: date,
+    ) -> MaterialRequirementItem:
+        """Price one aggregated material from the price index or its calculation prices."""
+        material_name = agg_data["name"]
+        total_quantity = agg_data["total_quantity"]
+        best_price = price_index.match_name(material_name, on=today)
+
+        # Determine estimated unit price
+        estimated_unit_price: Decimal | None = None
+        material_grade: str | None = None
+        supplier: str | None = None
+
+        if best_price:
+            estimated_unit_price = best_price.unit_price
+            material_grade = best_price.material_grade
+            supplier = best_price.supplier
+        elif agg_data["price_count"]:
+            # Use average of calculation item prices
+            estimated_unit_price = agg_data["price_sum"] / agg_data["price_count"]
+
+        total_price: Decimal | None = None
+        if estimated_unit_price:
+            total_price = total_quantity * estimated_unit_price
+
+        return MaterialRequirementItem(
+            material_name=material_name,
+            material_grade=material_grade,
+            total_quantity=total_quantity,
+            unit=agg_data["unit"],
+            estimated_unit_price=estimated_unit_price,
+            total_price=total_price,
+            order_numbers=sorted(agg_data["order_numbers"]),
+            supplier=supplier,
+        )
+
+    async def count_material_requirement_orders(
+        self,
+        order_ids: list[UUID] | None = None,
+        status_filter: list[str] | None = None,
+    ) -> int:
+        """Number of orders included in the material requirements."""
+        order_filter = self._material_order_filter(order_ids, status_filter)
+        return (
+            await self.db.execute(select(func.count(Order.id)).where(order_filter))
+        ).scalar_one()
+
     async def get_material_requirements(
         self,
         order_ids: list[UUID] | None = None,
@@ -420,139 +531,42 @@ class ReportingService:
         Returns:
             Aggregated material requirements with pricing from MaterialPrice database.
         """
-        # Determine which orders to query
-        if order_ids:
-            orders_query = select(Order).where(Order.id.in_(order_ids))
-        else:
-            # Default: active orders (OBJEDNAVKA, VYROBA)
-            default_statuses = [OrderStatus.OBJEDNAVKA, OrderStatus.VYROBA]
-            if status_filter:
-                filter_enums = [OrderStatus(s) for s in status_filter if s in OrderStatus.__members__.values()]  # noqa: E501
-                orders_query = select(Order).where(Order.status.in_(filter_enums))
-            else:
-                orders_query = select(Order).where(Order.status.in_(default_statuses))
-
-        orders_result = await self.db.execute(orders_query)
-        orders = list(orders_result.scalars().all())
+        order_count = await self.count_material_requirement_orders(order_ids, status_filter)
 
-        if not orders:
+        if not order_count:
             return MaterialRequirementsResponse(items=[], total_estimated_cost=Decimal("0"), order_count=0)  # noqa: E501
 
-        order_id_list = [o.id for o in orders]
-
-        # Get all calculations for these orders
-        calcs_result = await self.db.execute(
-            select(Calculation).where(Calculation.order_id.in_(order_id_list))
+        # Quantities and calculation prices are summed in the database, only the
+        # grouped rows are transferred
+        grouped = await self.db.execute(
+            self._material_groups_query(self._material_order_filter(order_ids, status_filter))
         )
-        calculations = list(calcs_result.scalars().all())
-
-        if not calculations:
-            return MaterialRequirementsResponse(items=[], total_estimated_cost=Decimal("0"), order_count=len(orders))  # noqa: E501
 
-        calc_ids = [c.id for c in calculations]
-
-        # Get all material items from these calculations
-        items_result = await self.db.execute(
-            select(CalculationItem)
-            .where(
-                CalculationItem.calculation_id.in_(calc_ids),
-                CalculationItem.cost_type == CostType.MATERIAL,
+        # Fold the per-order groups into one entry per material (the Python key also
+        # merges names the database lower() does not, e.g. non-ASCII case on SQLite)
+        aggregated: dict[str, dict[str, Any]] = {}
+        for row in grouped:
+            key = row.name.lower()
+            agg = aggregated.get(key)
+            if agg is None:
+                agg = aggregated[key] = self._new_material_group(row.name, row.unit)
+            self._add_to_material_group(
+                agg, row.order_number, row.total_quantity, row.price_sum, row.price_count
             )
-        )
-        material_items = list(items_result.scalars().all())
-
-        # Build map of order_id -> order_number for labeling
-        order_map = {o.id: o.number for o in orders}
-
-        # Build map of calculation_id -> order_number
-        calc_to_order = {c.id: order_map.get(c.order_id, "") for c in calculations}
 
-        # Aggregate by material name (normalize to lowercase for case-insensitive matching)
-        aggregated: dict[str, dict[str, Any]] = {}
+        if not aggregated:
+            return MaterialRequirementsResponse(items=[], total_estimated_cost=Decimal("0"), order_count=order_count)  # noqa: E501
 
-        for item in material_items:
-            material_key = item.name.strip().lower()
-            order_number = calc_to_order.get(item.calculation_id, "")
-
-            if material_key not in aggregated:
-                aggregated[material_key] = {
-                    "name": item.name.strip(),  # Use original casing for display
-                    "unit": item.unit,
-                    "total_quantity": Decimal("0"),
-                    "order_numbers": set(),
-                    "prices": [],  # Store all unit prices for averaging
-                }
-
-            aggregated[material_key]["total_quantity"] += item.quantity
-            if order_number:
-                aggregated[material_key]["order_numbers"].add(order_number)
-            if item.unit_price and item.unit_price > 0:
-                aggregated[material_key]["prices"].append(item.unit_price)
-
-        # Get material prices from database for matching
+        # Match against the in-memory price index instead of scanning all prices
+        # per material
+        price_index = await get_material_price_index(self.db)
         today = date.today()
-        prices_result = await self.db.execute(
-            select(MaterialPrice).where(
-                MaterialPrice.is_active == True,  # noqa: E712
-                MaterialPrice.valid_from <= today,
-                (MaterialPrice.valid_to.is_(None)) | (MaterialPrice.valid_to >= today),
-            )
-        )
-        material_prices = list(prices_result.scalars().all())
-
-        # Build result items
-        result_items: list[MaterialRequirementItem] = []
-        total_cost = Decimal("0")
-
-        for material_key, agg_data in aggregated.items():
-            material_name = agg_data["name"]
-            total_quantity = agg_data["total_quantity"]
-            unit = agg_data["unit"]
-            order_numbers = sorted(agg_data["order_numbers"])
-            prices = agg_data["prices"]
-
-            # Find best matching MaterialPrice by name similarity
-            best_price: MaterialPrice | None = None
-            for mp in material_prices:
-                if mp.name.strip().lower() == material_key:
-                    best_price = mp
-                    break
-                # Fallback: partial match
-                if material_key in mp.name.strip().lower() or mp.name.strip().lower() in material_key:  # noqa: E501
-                    if best_price is None:
-                        best_price = mp
-
-            # Determine estimated unit price
-            estimated_unit_price: Decimal | None = None
-            material_grade: str | None = None
-            supplier: str | None = None
-
-            if best_price:
-                estimated_unit_price = best_price.unit_price
-                material_grade = best_price.material_grade
-                supplier = best_price.supplier
-            elif prices:
-                # Use average of calculation item prices
-                estimated_unit_price = sum(prices, Decimal("0")) / len(prices)
-
-            total_price: Decimal | None = None
-            if estimated_unit_price:
-                total_price = total_quantity * estimated_unit_price
-                if total_price:
-                    total_cost += total_price
-
-            result_items.append(
-                MaterialRequirementItem(
-                    material_name=material_name,
-                    material_grade=material_grade,
-                    total_quantity=total_quantity,
-                    unit=unit,
-                    estimated_unit_price=estimated_unit_price,
-                    total_price=total_price,
-                    order_numbers=order_numbers,
-                    supplier=supplier,
-                )
-            )
+
+        result_items = [
+            self._material_requirement_item(agg_data, price_index, today)
+            for agg_data in aggregated.values()
+        ]
+        total_cost = sum((item.total_price or Decimal("0") for item in result_items), Decimal("0"))
 
         # Sort by total price descending (most expensive first)
         result_items.sort(key=lambda x: x.total_price or Decimal("0"), reverse=True)
@@ -560,5 +574,39 @@ class ReportingService:
         return MaterialRequirementsResponse(
             items=result_items,
             total_estimated_cost=total_cost if total_cost > 0 else None,
-            order_count=len(orders),
+            order_count=order_count,
         )
+
+    async def iter_material_requirements(
+        self,
+        order_ids: list[UUID] | None = None,
+        status_filter: list[str] | None = None,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[MaterialRequirementItem]:
+        """Yield material requirements one material at a time, for exports.
+
+        The grouped rows are read from a server-side cursor ordered by
+        material, so only one material is held in memory at a time. Unlike
+        ``get_material_requirements`` the items come in material order (not by
+        price) and materials are merged by the database ``lower()`` only.
+        """
+        query = self._material_groups_query(
+            self._material_order_filter(order_ids, status_filter)
+        ).order_by("material_key", "order_number")
+
+        price_index = await get_material_price_index(self.db)
+        today = date.today()
+
+        current_key: str | None = None
+        agg: dict[str, Any] | None = None
+        async for key, name, unit, order_number, quantity, price_sum, price_count in iter_query_rows(
+            self.db, query, batch_size=batch_size
+        ):
+            if key != current_key:
+                if agg is not None:
+                    yield self._material_requirement_item(agg, price_index, today)
+                current_key = key
+                agg = self._new_material_group(name, unit)
+            self._add_to_material_group(agg, order_number, quantity, price_sum, price_count)  # type: ignore[arg-type]
+        if agg is not None:
+            yield self._material_requirement_item(agg, price_index, today)
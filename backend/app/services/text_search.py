@@ -0,0 +1,94 @@
+"""Free-text search backed by pg_trgm.
+
+On PostgreSQL, ``ILIKE '%term%'`` and the ``<%`` (word similarity) operator
+on columns with a ``gin_trgm_ops`` index are answered from the index instead
+of scanning the table, and ``word_similarity`` provides a relevance rank.
+Other dialects (SQLite in tests) fall back to plain ``ILIKE`` without ranking.
+
+List endpoints fetch a page and the total match count in one statement with
+``count(*) OVER ()`` instead of running the filter twice.
+"""
+
+from collections.abc import Sequence
+from typing import Any
+
+from sqlalchemy import ColumnElement, Select, func, literal, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import QueryableAttribute
+
+
+def is_postgres(db: AsyncSession) -> bool:
+    """Whether the session is bound to PostgreSQL (pg_trgm available)."""
+    return db.get_bind().dialect.name == "postgresql"
+
+
+def _like_pattern(term: str) -> str:
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def text_search(
+    db: AsyncSession,
+    columns: Sequence[QueryableAttribute[str] | QueryableAttribute[str | None]],
+    term: str,
+    *,
+    fuzzy: bool = True,
+) -> tuple[ColumnElement[bool], ColumnElement[Any] | None]:
+    """Build a trigram search filter and relevance rank over ``columns``.
+
+    Args:
+        db: Session (used to detect the dialect).
+        columns: Text columns to search; each should have a trigram index.
+        term: Search term.
+        fuzzy: Also match by word similarity (typos, missing diacritics-free
+            letters), not only by substring.
+
+    Returns:
+        (where clause, rank expression or None when ranking is unavailable).
+    """
+    term = term.strip()
+    pattern = _like_pattern(term)
+    conditions: list[ColumnElement[bool]] = [
+        column.ilike(pattern, escape="\\") for column in columns
+    ]
+
+    if not is_postgres(db):
+        return or_(*conditions), None
+
+    if fuzzy:
+        conditions.extend(literal(term).op("<%")(column) for column in columns)
+    rank = (
+        func.word_similarity(term, columns[0])
+        if len(columns) == 1
+        else func.greatest(*(func.word_similarity(term, column) for column in columns))
+    )
+    return or_(*conditions), rank
+
+
+async def fetch_page_with_total(
+    db: AsyncSession,
+    query: Select[Any],
+    skip: int,
+    limit: int,
+) -> tuple[list[Any], int]:
+    """Fetch one page of ``query`` (single-entity select) and the total count.
+
+    The count comes from a ``count(*) OVER ()`` column on the same statement;
+    a separate count query runs only when the page is past the last row.
+
+    Returns:
+        Tuple of (page of entities, total count).
+    """
+    result = await db.execute(
+        query.add_columns(func.count().over().label("total_count")).offset(skip).limit(limit)
+    )
+    rows = result.all()
+    if rows:
+        return [row[0] for row in rows], rows[0].total_count
+    if skip == 0:
+        return [], 0
+
+    total = await db.execute(
+        select(func.count()).select_from(query.order_by(None).subquery())
+    )
+    return [], total.scalar_one()
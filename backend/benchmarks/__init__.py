@@ -0,0 +1 @@
+"""End-to-end benchmarks of the orchestration pipeline (see README.md)."""
@@ -0,0 +1,133 @@
+"""Email corpus for pipeline benchmarks.
+
+The corpus is a directory of ``.eml`` files: anonymized real emails, or
+synthetic ones written by ``generate_corpus``. ``load_corpus`` turns them into
+the ``run_pipeline`` payload exactly as IMAP polling does, with Message-IDs
+made unique per run so the ingest stage does not skip them as duplicates.
+"""
+
+import email
+import random
+from datetime import UTC, datetime
+from email.message import EmailMessage
+from email.utils import format_datetime, make_msgid
+from pathlib import Path
+
+from app.integrations.email.imap_client import IMAPClient
+from app.integrations.email.tasks import _serialize_raw_email
+
+_CUSTOMERS = [
+    ("Strojírny Brno a.s.", "nakup@strojirny-brno.example"),
+    ("Teplárna Sever s.r.o.", "udrzba@teplarna-sever.example"),
+    ("Chemoprojekt CZ", "projekce@chemoprojekt.example"),
+    ("Pivovar Hradec", "technik@pivovar-hradec.example"),
+]
+_ITEMS = [
+    ("Koleno 90°", "P235GH", "DN{dn} PN16"),
+    ("T-kus", "1.4571", "DN{dn}"),
+    ("Redukce", "S235JR", "DN{dn}/DN{dn2}"),
+    ("Příruba přivařovací", "P250GH", "DN{dn} PN40"),
+]
+_TEMPLATES = {
+    "poptavka": (
+        "Poptávka - {item} {dim}",
+        "Dobrý den,\n\nprosíme o cenovou nabídku na následující položky:\n\n{lines}\n\n"
+        "Požadovaný termín dodání: {deadline}\nAtest 3.1 dle EN 10204.\n\n"
+        "S pozdravem\n{contact}\n{company}\nTel: +420 601 {phone}",
+    ),
+    "objednavka": (
+        "Objednávka č. {number}",
+        "Dobrý den,\n\nna základě Vaší nabídky objednáváme:\n\n{lines}\n\n"
+        "Fakturační adresa dle smlouvy.\n\n{contact}\n{company}",
+    ),
+    "reklamace": (
+        "Reklamace dodávky {number}",
+        "Dobrý den,\n\nu dodávky {number} jsme zjistili netěsnost svaru u položky {item} {dim}. "
+        "Prosíme o posouzení a návrh řešení.\n\n{contact}\n{company}",
+    ),
+    "dotaz": (
+        "Dotaz k materiálu {material}",
+        "Dobrý den,\n\nmůžete nám sdělit, zda dodáváte {item} z materiálu {material} "
+        "v provedení {dim}? Případně v jakých termínech?\n\nDěkuji\n{contact}",
+    ),
+}
+# Minimal one-page PDF: exercises the attachment branch without large files
+_PDF = (
+    b"%PDF-1.4\n1 0 obj<</Type/Catalog/Pages 2 0 R>>endobj\n"
+    b"2 0 obj<</Type/Pages/Kids[3 0 R]/Count 1>>endobj\n"
+    b"3 0 obj<</Type/Page/Parent 2 0 R/MediaBox[0 0 595 842]>>endobj\n"
+    b"trailer<</Root 1 0 R>>\n%%EOF\n"
+)
+
+
+def generate_corpus(directory: Path, count: int, seed: int = 0, attachment_ratio: float = 0.3) -> list[Path]:
+    """Write ``count`` synthetic Czech business emails as ``.eml`` files.
+
+    Args:
+        directory: Target directory (created if missing).
+        count: Number of emails.
+        seed: Random seed; the same seed gives the same corpus.
+        attachment_ratio: Share of emails with a PDF drawing attached.
+
+    Returns:
+        Paths of the written files.
+    """
+    rng = random.Random(seed)
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for index in range(count):
+        kind = rng.choice(list(_TEMPLATES))
+        company, address = rng.choice(_CUSTOMERS)
+        items = [rng.choice(_ITEMS) for _ in range(rng.randint(1, 8))]
+        dims = [dim.format(dn=rng.choice((50, 80, 100, 150, 200)), dn2=rng.choice((25, 40))) for _, _, dim in items]
+        lines = "\n".join(
+            f"{n}. {name} {dim}, materiál {material}, {rng.randint(1, 60)} ks"
+            for n, ((name, material, _), dim) in enumerate(zip(items, dims, strict=True), start=1)
+        )
+        subject, body = _TEMPLATES[kind]
+        fields = {
+            "item": items[0][0],
+            "material": items[0][1],
+            "dim": dims[0],
+            "lines": lines,
+            "number": f"OBJ-{rng.randint(1000, 9999)}",
+            "deadline": f"{rng.randint(1, 28)}.{rng.randint(1, 12)}.2026",
+            "contact": "Ing. Jan Novák",
+            "company": company,
+            "phone": f"{rng.randint(100, 999)} {rng.randint(100, 999)}",
+        }
+
+        msg = EmailMessage()
+        msg["From"] = f"{fields['contact']} <{address}>"
+        msg["To"] = "obchod@infer.example"
+        msg["Subject"] = subject.format(**fields)
+        msg["Date"] = format_datetime(datetime.now(UTC))
+        msg["Message-ID"] = make_msgid(idstring=f"bench{index}", domain="bench.example")
+        msg.set_content(body.format(**fields))
+        if rng.random() < attachment_ratio:
+            msg.add_attachment(_PDF, maintype="application", subtype="pdf", filename=f"vykres_{index}.pdf")
+
+        path = directory / f"{index:05d}_{kind}.eml"
+        path.write_bytes(msg.as_bytes())
+        paths.append(path)
+    return paths
+
+
+def load_corpus(directory: Path, run_id: str) -> list[dict]:
+    """Read all ``.eml`` files of ``directory`` as ``run_pipeline`` payloads.
+
+    Args:
+        directory: Corpus directory.
+        run_id: Suffix making the Message-IDs unique for this run.
+
+    Returns:
+        Serialized emails, in file name order.
+    """
+    parser = IMAPClient(host="", port=0, user="", password="")
+    payloads = []
+    for path in sorted(directory.glob("*.eml")):
+        msg = email.message_from_bytes(path.read_bytes())
+        raw_email = parser._parse_email_message(msg)
+        raw_email.message_id = f"<{path.stem}.{run_id}@bench.example>"
+        payloads.append(_serialize_raw_email(raw_email))
+    return payloads
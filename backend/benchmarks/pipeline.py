@@ -0,0 +1,322 @@
+"""End-to-end benchmark of the orchestration pipeline.
+
+Replays an ``.eml`` corpus through ``run_pipeline`` against real Redis and
+PostgreSQL (``REDIS_URL``, ``DATABASE_URL``), the local mock-pohoda and the
+Anthropic stub, with Celery workers started by the runner, and reports:
+
+- throughput (emails per minute until the queues are drained),
+- end-to-end latency per email (dispatch to last recorded stage),
+- p50/p95/p99 per stage from the ``pipeline_stage_duration_seconds``
+  histogram of the workers,
+- SQL statements per email executed by the workers,
+- Redis network bytes per email (broker, result backend, rate limiter).
+
+Usage:
+    docker compose up -d db redis mock-pohoda
+    uv run alembic upgrade head
+    uv run python -m benchmarks.pipeline --generate 200 --corpus /tmp/bench-corpus \\
+        --stub-latency-ms 1500 --concurrency 8 --json report.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from dataclasses import asdict, dataclass, field
+from datetime import UTC, datetime
+from pathlib import Path
+from statistics import quantiles
+from uuid import uuid4
+
+from redis import Redis
+
+from benchmarks.corpus import generate_corpus, load_corpus
+
+_QUEUES = ("celery", "orchestration", "ai_agents", "ocr", "documents")
+# Order of the stages in the report
+_STAGES = ("ingest", "classify", "ocr", "parse", "analyze", "orchestrate", "calculate", "offer")
+_QUANTILES = (0.5, 0.95, 0.99)
+
+
+@dataclass
+class StageStats:
+    """Duration quantiles of one pipeline stage, in seconds."""
+
+    stage: str
+    count: int
+    p50: float | None
+    p95: float | None
+    p99: float | None
+
+
+@dataclass
+class BenchmarkReport:
+    """Result of one benchmark run."""
+
+    emails: int
+    duration_seconds: float
+    throughput_per_minute: float
+    latency_p50: float | None
+    latency_p95: float | None
+    latency_p99: float | None
+    db_queries_per_email: float
+    redis_bytes_per_email: float
+    stages: list[StageStats] = field(default_factory=list)
+    drained: bool = True
+
+
+def histogram_quantile(q: float, buckets: list[tuple[float, float]]) -> float | None:
+    """Quantile from cumulative histogram buckets, like PromQL ``histogram_quantile``.
+
+    Args:
+        q: Quantile (0-1).
+        buckets: (upper bound, cumulative count) pairs, ``+Inf`` included.
+
+    Returns:
+        Linearly interpolated value within the bucket holding the rank, the
+        highest finite bound if it falls into ``+Inf``, or None without data.
+    """
+    buckets = sorted(buckets)
+    if not buckets or buckets[-1][1] == 0:
+        return None
+    rank = q * buckets[-1][1]
+    lower_bound, lower_count = 0.0, 0.0
+    for upper_bound, count in buckets:
+        if count >= rank:
+            if upper_bound == float("inf"):
+                return lower_bound
+            if count == lower_count:
+                return upper_bound
+            return lower_bound + (upper_bound - lower_bound) * (rank - lower_count) / (count - lower_count)
+        lower_bound, lower_count = upper_bound, count
+    return lower_bound
+
+
+def read_worker_metrics(multiproc_dir: str) -> tuple[list[StageStats], float]:
+    """Stage quantiles and the SQL statement count from the workers' metric files."""
+    from prometheus_client import CollectorRegistry
+    from prometheus_client.multiprocess import MultiProcessCollector
+
+    registry = CollectorRegistry()
+    MultiProcessCollector(registry, path=multiproc_dir)
+
+    buckets: dict[str, list[tuple[float, float]]] = defaultdict(list)
+    counts: dict[str, int] = {}
+    queries = 0.0
+    for metric in registry.collect():
+        for sample in metric.samples:
+            if sample.name == "pipeline_stage_duration_seconds_bucket":
+                buckets[sample.labels["stage"]].append((float(sample.labels["le"]), sample.value))
+            elif sample.name == "pipeline_stage_duration_seconds_count":
+                counts[sample.labels["stage"]] = int(sample.value)
+            elif sample.name == "benchmark_db_queries_total":
+                queries += sample.value
+
+    stages = [
+        StageStats(stage, counts.get(stage, 0), *(histogram_quantile(q, buckets[stage]) for q in _QUANTILES))
+        for stage in sorted(buckets, key=lambda s: _STAGES.index(s) if s in _STAGES else len(_STAGES))
+    ]
+    return stages, queries
+
+
+def _percentiles(values: list[float]) -> tuple[float | None, float | None, float | None]:
+    """p50, p95 and p99 of ``values``."""
+    if len(values) < 2:
+        return (values[0],) * 3 if values else (None, None, None)
+    cuts = quantiles(values, n=100, method="inclusive")
+    return cuts[49], cuts[94], cuts[98]
+
+
+def _redis_net_bytes(redis: Redis) -> int:
+    stats = redis.info("stats")
+    return int(stats["total_net_input_bytes"]) + int(stats["total_net_output_bytes"])
+
+
+def _wait_for_workers(timeout: float) -> None:
+    from app.core.celery_app import celery_app
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if celery_app.control.ping(timeout=1.0):
+            return
+    raise RuntimeError("Benchmark workers did not start")
+
+
+def _wait_until_drained(redis: Redis, timeout: float, poll: float = 1.0) -> bool:
+    """Wait until the queues are empty and no worker has active or scheduled tasks."""
+    from app.core.celery_app import celery_app
+
+    inspect = celery_app.control.inspect(timeout=1.0)
+    deadline = time.monotonic() + timeout
+    idle_polls = 0
+    while time.monotonic() < deadline:
+        queued = sum(redis.llen(queue) for queue in _QUEUES)
+        busy = queued > 0 or any(
+            tasks
+            for reply in (inspect.active(), inspect.reserved(), inspect.scheduled())
+            for tasks in (reply or {}).values()
+        )
+        # Chord callbacks are published after the header finishes: require two idle polls
+        idle_polls = 0 if busy else idle_polls + 1
+        if idle_polls >= 2:
+            return True
+        time.sleep(poll)
+    return False
+
+
+async def _email_latencies(dispatched: dict[str, float]) -> list[float]:
+    """Seconds from dispatch to the last recorded stage, per email of the run."""
+    from sqlalchemy import func, select
+
+    from app.core.database import AsyncSessionLocal
+    from app.models.inbox import InboxMessage
+    from app.models.processing_task import ProcessingTask
+
+    async with AsyncSessionLocal() as session:
+        rows = await session.execute(
+            select(InboxMessage.message_id, func.max(ProcessingTask.created_at))
+            .join(ProcessingTask, ProcessingTask.inbox_message_id == InboxMessage.id)
+            .where(InboxMessage.message_id.in_(list(dispatched)))
+            .group_by(InboxMessage.message_id)
+        )
+        return [
+            (finished.replace(tzinfo=finished.tzinfo or UTC).timestamp() - dispatched[message_id])
+            for message_id, finished in rows
+        ]
+
+
+def run_benchmark(args: argparse.Namespace) -> BenchmarkReport:
+    """Start stub and workers, replay the corpus and collect the report."""
+    from app.core.config import get_settings
+    from app.orchestration.tasks import run_pipeline
+
+    corpus = Path(args.corpus)
+    if args.generate:
+        generate_corpus(corpus, args.generate, seed=args.seed, attachment_ratio=args.attachment_ratio)
+    payloads = load_corpus(corpus, run_id=uuid4().hex[:8])
+    if not payloads:
+        raise SystemExit(f"No .eml files in {corpus}")
+
+    multiproc_dir = tempfile.mkdtemp(prefix="bench-metrics-")
+    processes: list[subprocess.Popen] = []
+    try:
+        anthropic_url = args.anthropic_url
+        if anthropic_url is None:
+            processes.append(subprocess.Popen([
+                sys.executable, "-m", "benchmarks.stub_anthropic",
+                "--port", str(args.stub_port),
+                "--latency-ms", str(args.stub_latency_ms),
+                "--jitter-ms", str(args.stub_jitter_ms),
+            ]))
+            anthropic_url = f"http://127.0.0.1:{args.stub_port}"
+
+        worker_env = {
+            **os.environ,
+            "PROMETHEUS_MULTIPROC_DIR": multiproc_dir,
+            "ANTHROPIC_BASE_URL": anthropic_url,
+            "ANTHROPIC_API_KEY": os.environ.get("ANTHROPIC_API_KEY") or "bench-stub-key",
+            "POHODA_MSERVER_URL": args.pohoda_url,
+            "ORCHESTRATION_ENABLED": "true",
+            "ORCHESTRATION_AUTO_CREATE_ORDERS": "true",
+            "ORCHESTRATION_AUTO_CALCULATE": "true",
+            "ORCHESTRATION_AUTO_OFFER": "true",
+        }
+        processes.append(subprocess.Popen(
+            [
+                sys.executable, "-m", "celery", "-A", "benchmarks.worker", "worker",
+                "-Q", ",".join(_QUEUES), "-c", str(args.concurrency), "-l", "warning",
+            ],
+            env=worker_env,
+        ))
+        _wait_for_workers(timeout=60)
+
+        redis = Redis.from_url(str(get_settings().REDIS_URL))
+        bytes_before = _redis_net_bytes(redis)
+        dispatched: dict[str, float] = {}
+        start = time.monotonic()
+        for payload in payloads:
+            dispatched[payload["message_id"]] = datetime.now(UTC).timestamp()
+            run_pipeline.delay(payload)
+        drained = _wait_until_drained(redis, timeout=args.timeout)
+        duration = time.monotonic() - start
+        redis_bytes = _redis_net_bytes(redis) - bytes_before
+
+        stages, queries = read_worker_metrics(multiproc_dir)
+        latencies = asyncio.run(_email_latencies(dispatched))
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=30)
+        shutil.rmtree(multiproc_dir, ignore_errors=True)
+
+    latency_p50, latency_p95, latency_p99 = _percentiles(latencies)
+    return BenchmarkReport(
+        emails=len(payloads),
+        duration_seconds=round(duration, 2),
+        throughput_per_minute=round(len(payloads) / duration * 60, 2),
+        latency_p50=latency_p50,
+        latency_p95=latency_p95,
+        latency_p99=latency_p99,
+        db_queries_per_email=round(queries / len(payloads), 1),
+        redis_bytes_per_email=round(redis_bytes / len(payloads)),
+        stages=stages,
+        drained=drained,
+    )
+
+
+def format_report(report: BenchmarkReport) -> str:
+    """Human-readable summary of a report."""
+
+    def _s(value: float | None) -> str:
+        return "-" if value is None else f"{value:.2f}s"
+
+    lines = [
+        f"Emails:            {report.emails}" + ("" if report.drained else "  (timeout: queues not drained)"),
+        f"Duration:          {report.duration_seconds:.1f}s",
+        f"Throughput:        {report.throughput_per_minute:.1f} emails/min",
+        f"Latency per email: p50 {_s(report.latency_p50)}  p95 {_s(report.latency_p95)}  "
+        f"p99 {_s(report.latency_p99)}",
+        f"SQL per email:     {report.db_queries_per_email}",
+        f"Redis per email:   {report.redis_bytes_per_email / 1024:.1f} KiB",
+        "",
+        f"{'stage':<12}{'count':>7}{'p50':>9}{'p95':>9}{'p99':>9}",
+    ]
+    lines += [
+        f"{s.stage:<12}{s.count:>7}{_s(s.p50):>9}{_s(s.p95):>9}{_s(s.p99):>9}" for s in report.stages
+    ]
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", required=True, help="Directory with .eml files")
+    parser.add_argument("--generate", type=int, default=0, help="Write this many synthetic emails first")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--attachment-ratio", type=float, default=0.3)
+    parser.add_argument("--concurrency", type=int, default=4, help="Celery worker processes")
+    parser.add_argument("--anthropic-url", help="Use this API instead of starting the stub")
+    parser.add_argument("--stub-port", type=int, default=8090)
+    parser.add_argument("--stub-latency-ms", type=float, default=1000.0)
+    parser.add_argument("--stub-jitter-ms", type=float, default=250.0)
+    parser.add_argument("--pohoda-url", default="http://localhost:8082")
+    parser.add_argument("--timeout", type=float, default=1800.0, help="Max seconds to drain the queues")
+    parser.add_argument("--json", help="Also write the report as JSON to this file")
+    args = parser.parse_args()
+
+    report = run_benchmark(args)
+    print(format_report(report))
+    if args.json:
+        Path(args.json).write_text(json.dumps(asdict(report), indent=2))
+
+
+if __name__ == "__main__":
+    main()
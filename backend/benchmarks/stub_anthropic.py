@@ -0,0 +1,125 @@
+"""Stub of the Anthropic Messages API for pipeline benchmarks.
+
+Answers ``POST /v1/messages`` after a configurable latency with a
+``tool_use`` block for the forced tool, built from the tool's input schema
+(first enum value, ``1.0`` for numbers, one array item, ...), and with token
+usage estimated from the request size. Workers use it through
+``ANTHROPIC_BASE_URL``.
+
+Usage:
+    uv run python -m benchmarks.stub_anthropic --port 8090 --latency-ms 1500 --jitter-ms 500
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+from typing import Any
+from uuid import uuid4
+
+from fastapi import FastAPI, Request
+
+app = FastAPI(title="Anthropic API stub")
+app.state.latency_ms = 1000.0
+app.state.jitter_ms = 0.0
+
+_EMAIL_INDEX = re.compile(r'<email index="(\d+)">')
+
+
+def example_from_schema(schema: dict[str, Any], name: str = "") -> Any:
+    """Smallest plausible value satisfying a tool input JSON schema."""
+    if "enum" in schema:
+        return schema["enum"][0]
+    kind = schema.get("type")
+    if isinstance(kind, list):
+        kind = next((k for k in kind if k != "null"), "null")
+    if kind == "object":
+        properties = schema.get("properties", {})
+        return {key: example_from_schema(sub, key) for key, sub in properties.items()}
+    if kind == "array":
+        return [example_from_schema(schema.get("items", {}), name)]
+    if kind == "number":
+        return 0.95 if "confidence" in name else 1.0
+    if kind == "integer":
+        return 1
+    if kind == "boolean":
+        return False
+    if kind == "null":
+        return None
+    return f"stub {name}".strip()
+
+
+def tool_input(tool: dict[str, Any], body: dict[str, Any]) -> Any:
+    """Tool input for the response; a batch classification covers every email."""
+    value = example_from_schema(tool.get("input_schema", {}))
+    if tool.get("name") == "classify_emails":
+        text = "\n".join(
+            message["content"] if isinstance(message.get("content"), str)
+            else "\n".join(block.get("text", "") for block in message.get("content", []))
+            for message in body.get("messages", [])
+        )
+        item = value["classifications"][0]
+        value["classifications"] = [
+            {**item, "index": int(index)} for index in _EMAIL_INDEX.findall(text)
+        ]
+    return value
+
+
+@app.post("/v1/messages")
+async def create_message(request: Request) -> dict[str, Any]:
+    body = await request.json()
+    latency = max(0.0, random.gauss(app.state.latency_ms, app.state.jitter_ms)) / 1000
+    await asyncio.sleep(latency)
+
+    tools = body.get("tools") or []
+    forced = (body.get("tool_choice") or {}).get("name")
+    tool = next((t for t in tools if t.get("name") == forced), tools[0] if tools else None)
+    if tool is not None:
+        content = [{
+            "type": "tool_use",
+            "id": f"toolu_{uuid4().hex[:24]}",
+            "name": tool["name"],
+            "input": tool_input(tool, body),
+        }]
+        stop_reason = "tool_use"
+    else:
+        content = [{"type": "text", "text": "stub"}]
+        stop_reason = "end_turn"
+
+    # ~4 characters per token, like the rate limiter estimates
+    prompt_chars = len(json.dumps(body.get("messages", []))) + len(json.dumps(body.get("system", "")))
+    return {
+        "id": f"msg_{uuid4().hex[:24]}",
+        "type": "message",
+        "role": "assistant",
+        "model": body.get("model", "stub"),
+        "content": content,
+        "stop_reason": stop_reason,
+        "stop_sequence": None,
+        "usage": {
+            "input_tokens": prompt_chars // 4,
+            "output_tokens": len(json.dumps(content)) // 4,
+            "cache_read_input_tokens": 0,
+            "cache_creation_input_tokens": 0,
+        },
+    }
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency-ms", type=float, default=1000.0, help="Mean response latency")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Standard deviation of the latency")
+    args = parser.parse_args()
+
+    app.state.latency_ms = args.latency_ms
+    app.state.jitter_ms = args.jitter_ms
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
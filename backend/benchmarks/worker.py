@@ -0,0 +1,27 @@
+"""Celery app for benchmark workers: the regular app plus a DB query counter.
+
+Start workers with ``PROMETHEUS_MULTIPROC_DIR`` set, so the pipeline metrics
+of every worker process (and the query counter) end up in files the
+benchmark runner can read::
+
+    celery -A benchmarks.worker worker -Q celery,orchestration,ai_agents,ocr,documents
+"""
+
+from prometheus_client import Counter
+from sqlalchemy import event
+
+from app.core.celery_app import celery_app
+from app.core.database import engine
+
+benchmark_db_queries_total = Counter(
+    "benchmark_db_queries_total",
+    "SQL statements executed by benchmark workers",
+)
+
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _count_query(*_: object) -> None:
+    benchmark_db_queries_total.inc()
+
+
+__all__ = ["celery_app"]
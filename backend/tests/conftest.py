@@ -3,11 +3,13 @@
 Provides test database, async client, and mock settings.
 """
 
-from collections.abc import AsyncGenerator, Generator
-from unittest.mock import MagicMock, patch
+from collections.abc import AsyncGenerator, Callable, Generator, Iterator
+from contextlib import AbstractContextManager, contextmanager
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 from httpx import ASGITransport, AsyncClient
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
@@ -92,21 +94,114 @@ async def test_client(test_db: AsyncSession) -> AsyncGenerator[AsyncClient, None
     app.dependency_overrides.clear()
 
 
+@pytest.fixture(scope="function")
+def assert_num_queries(
+    test_db: AsyncSession,
+) -> Callable[[int], AbstractContextManager[list[str]]]:
+    """Assert the number of SQL statements executed inside a block.
+
+    Pins the query count of reports and other hot paths so that N+1 patterns
+    (one query per row of a previous result) fail the test suite::
+
+        with assert_num_queries(3):
+            await service.get_customer_report()
+
+    Args:
+        test_db: Test database session whose engine is observed.
+
+    Returns:
+        Context manager factory taking the expected statement count; the
+        context yields the list of captured statements.
+    """
+    engine = test_db.get_bind()
+
+    @contextmanager
+    def _assert_num_queries(expected: int) -> Iterator[list[str]]:
+        statements: list[str] = []
+
+        def _record(conn, cursor, statement, parameters, context, executemany):  # type: ignore[no-untyped-def]
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", _record)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, "before_cursor_execute", _record)
+
+        assert len(statements) == expected, (
+            f"Expected {expected} queries, got {len(statements)}:\n" + "\n\n".join(statements)
+        )
+
+    return _assert_num_queries
+
+
 @pytest.fixture(autouse=True)
 def _mock_rate_limiter_and_circuit_breaker() -> Generator[None, None, None]:
     """Mock rate limiter and circuit breaker so tests don't need Redis."""
     mock_limiter = MagicMock()
     mock_limiter.acquire.return_value = True
+    mock_limiter.acquire_wait = AsyncMock(return_value=True)
     mock_limiter.release.return_value = None
     mock_limiter.record_usage.return_value = None
 
     with (
         patch("app.core.rate_limiter.get_rate_limiter", return_value=mock_limiter),
         patch("app.core.circuit_breaker.anthropic_breaker") as mock_breaker,
+        patch("app.core.circuit_breaker.pohoda_breaker") as mock_pohoda_breaker,
+    ):
+        for breaker in (mock_breaker, mock_pohoda_breaker):
+            breaker.can_execute.return_value = True
+            breaker.record_success.return_value = None
+            breaker.record_failure.return_value = None
+        yield
+
+
+@pytest.fixture(autouse=True)
+def _claude_ledger_writes() -> Generator[AsyncMock, None, None]:
+    """Capture Claude usage ledger entries instead of writing them to the database."""
+    with patch("app.core.claude_usage._write_ledger", new=AsyncMock()) as write:
+        yield write
+
+
+@pytest.fixture(autouse=True)
+def _inline_pdf_renderer() -> Generator[None, None, None]:
+    """Render PDFs in a thread with an empty cache so tests can mock weasyprint."""
+    from app.services import pdf_renderer
+
+    with (
+        patch.object(pdf_renderer, "_engine", None),
+        patch(
+            "app.services.document_generator.get_pdf_renderer",
+            return_value=pdf_renderer.PdfRenderer(processes=0),
+        ),
+    ):
+        yield
+
+
+@pytest.fixture(autouse=True)
+def _local_price_index() -> Generator[None, None, None]:
+    """Start each test with an empty price index and no Redis version checks."""
+    from app.services.material_price_index import MaterialPriceIndexCache
+
+    cache = MaterialPriceIndexCache(ttl_seconds=600, check_seconds=600)
+    with (
+        patch("app.services.material_price_index.get_price_index_cache", return_value=cache),
+        patch.object(MaterialPriceIndexCache, "_fetch_remote_version", return_value=None),
+        patch.object(MaterialPriceIndexCache, "_publish_invalidation"),
+    ):
+        yield
+
+
+@pytest.fixture(autouse=True)
+def _local_feature_flags() -> Generator[None, None, None]:
+    """Read feature flags from the settings defaults, without Redis."""
+    from app.core.feature_flags import FeatureFlags
+
+    flags = FeatureFlags(ttl_seconds=5.0)
+    with (
+        patch("app.core.feature_flags.get_feature_flags", return_value=flags),
+        patch.object(flags, "_client", return_value=None),
     ):
-        mock_breaker.can_execute.return_value = True
-        mock_breaker.record_success.return_value = None
-        mock_breaker.record_failure.return_value = None
         yield
 
 
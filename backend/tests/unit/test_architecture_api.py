@@ -0,0 +1,204 @@
+"""Tests for the architecture graph endpoint and the incremental analyzer."""
+
+import asyncio
+import importlib.util
+import os
+import sys
+import time
+from collections.abc import Iterator
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from starlette.requests import Request
+
+from app.api.v1 import architecture
+
+_ANALYZER_SOURCE = architecture._LOCAL_PREZENTACE / "analyze_codebase.py"
+
+
+def _request(if_none_match: str | None = None) -> Request:
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "method": "GET", "headers": headers})
+
+
+@pytest.fixture
+def graph_dir(tmp_path: Path) -> Iterator[Path]:
+    """Point the endpoint at a temporary graph file and analyzer script."""
+    with (
+        patch.object(architecture, "GRAPH_JSON", tmp_path / "graph_data.json"),
+        patch.object(architecture, "ANALYZER", tmp_path / "analyze.py"),
+        patch.object(architecture, "_refresh_task", None),
+        patch.object(architecture, "_refresh_error", None),
+        patch.object(architecture, "_graph", None),
+    ):
+        yield tmp_path
+
+
+def _write_analyzer(directory: Path, body: str) -> None:
+    (directory / "analyze.py").write_text(
+        f"import pathlib, sys, time\nout = pathlib.Path({str(directory / 'graph_data.json')!r})\n{body}\n",
+        encoding="utf-8",
+    )
+
+
+class TestArchitectureGraph:
+    async def test_serves_cached_graph_with_etag(self, graph_dir: Path) -> None:
+        (graph_dir / "graph_data.json").write_text('{"nodes": []}', encoding="utf-8")
+
+        response = await architecture.get_architecture_graph(_request())
+        cached = await architecture.get_architecture_graph(_request(response.headers["etag"]))
+
+        assert response.status_code == 200
+        assert response.body == b'{"nodes": []}'
+        assert cached.status_code == 304
+
+    async def test_refresh_runs_in_background(self, graph_dir: Path) -> None:
+        (graph_dir / "graph_data.json").write_text('{"nodes": []}', encoding="utf-8")
+        _write_analyzer(graph_dir, 'time.sleep(0.5)\nout.write_text(\'{"nodes": [1]}\')')
+
+        start = time.monotonic()
+        response = await architecture.get_architecture_graph(_request(), refresh=True)
+
+        assert time.monotonic() - start < 0.5
+        assert response.body == b'{"nodes": []}'
+        assert response.headers["x-graph-refresh"] == "running"
+
+        await architecture._refresh_task  # type: ignore[misc]
+        refreshed = await architecture.get_architecture_graph(_request(response.headers["etag"]))
+        assert refreshed.status_code == 200
+        assert refreshed.body == b'{"nodes": [1]}'
+        assert "x-graph-refresh" not in refreshed.headers
+
+    async def test_concurrent_refreshes_share_one_run(self, graph_dir: Path) -> None:
+        (graph_dir / "graph_data.json").write_text("{}", encoding="utf-8")
+        _write_analyzer(graph_dir, "time.sleep(0.2)")
+
+        await architecture.get_architecture_graph(_request(), refresh=True)
+        task = architecture._refresh_task
+        await architecture.get_architecture_graph(_request(), refresh=True)
+
+        assert architecture._refresh_task is task
+        await task  # type: ignore[misc]
+
+    async def test_first_request_waits_for_analysis(self, graph_dir: Path) -> None:
+        _write_analyzer(graph_dir, "out.write_text('{\"nodes\": [2]}')")
+
+        response = await architecture.get_architecture_graph(_request())
+
+        assert response.body == b'{"nodes": [2]}'
+
+    async def test_failed_refresh_keeps_serving_cached_graph(self, graph_dir: Path) -> None:
+        (graph_dir / "graph_data.json").write_text("{}", encoding="utf-8")
+        _write_analyzer(graph_dir, "sys.exit('boom')")
+
+        await architecture.get_architecture_graph(_request(), refresh=True)
+        await architecture._refresh_task  # type: ignore[misc]
+        response = await architecture.get_architecture_graph(_request())
+
+        assert response.body == b"{}"
+        assert response.headers["x-graph-refresh"] == "failed"
+
+    async def test_analyzer_timeout_is_reported(self, graph_dir: Path) -> None:
+        (graph_dir / "graph_data.json").write_text("{}", encoding="utf-8")
+        _write_analyzer(graph_dir, "time.sleep(10)")
+
+        with patch.object(architecture, "_ANALYZER_TIMEOUT_SECONDS", 0.2):
+            await architecture.get_architecture_graph(_request(), refresh=True)
+            await asyncio.wait_for(architecture._refresh_task, 5)  # type: ignore[arg-type]
+
+        assert "timed out" in architecture._refresh_error  # type: ignore[operator]
+
+    async def test_failed_launch_is_reported(self, graph_dir: Path) -> None:
+        """A subprocess that cannot start is recorded instead of lost in the task."""
+        (graph_dir / "graph_data.json").write_text("{}", encoding="utf-8")
+        _write_analyzer(graph_dir, "")
+
+        with patch.object(
+            architecture.asyncio,
+            "create_subprocess_exec",
+            side_effect=OSError("No such file or directory: 'python'"),
+        ):
+            await architecture.get_architecture_graph(_request(), refresh=True)
+            await architecture._refresh_task  # type: ignore[misc]
+        response = await architecture.get_architecture_graph(_request())
+
+        assert "No such file or directory" in architecture._refresh_error  # type: ignore[operator]
+        assert response.body == b"{}"
+        assert response.headers["x-graph-refresh"] == "failed"
+
+    async def test_failed_first_launch_returns_error(self, graph_dir: Path) -> None:
+        _write_analyzer(graph_dir, "")
+
+        with patch.object(
+            architecture.asyncio, "create_subprocess_exec", side_effect=OSError("exec failed")
+        ):
+            response = await architecture.get_architecture_graph(_request())
+
+        assert response == {"error": "Analyzer failed: Analyzer could not run: exec failed"}
+
+
+@pytest.fixture
+def analyzer(tmp_path: Path) -> Iterator[object]:
+    """Fresh copy of prezentace/analyze_codebase.py rooted at tmp_path."""
+    if not _ANALYZER_SOURCE.exists():
+        pytest.skip("prezentace/ is not available")
+    spec = importlib.util.spec_from_file_location("analyze_codebase_under_test", _ANALYZER_SOURCE)
+    module = importlib.util.module_from_spec(spec)  # type: ignore[arg-type]
+    sys.modules[spec.name] = module  # type: ignore[union-attr]
+    try:
+        spec.loader.exec_module(module)  # type: ignore[union-attr]
+        module.ROOT = tmp_path
+        module.CACHE = module.FileCache(tmp_path / "cache.json")
+        yield module
+    finally:
+        sys.modules.pop(spec.name, None)  # type: ignore[union-attr]
+
+
+class TestAnalyzerCache:
+    def test_unchanged_file_is_not_parsed_again(self, analyzer, tmp_path: Path) -> None:  # type: ignore[no-untyped-def]
+        source = tmp_path / "orders.py"
+        source.write_text('"""Orders."""\n\ndef list_orders():\n    pass\n', encoding="utf-8")
+
+        first = analyzer.analyze_python_file(source)
+        with patch.object(analyzer.ast, "parse", side_effect=AssertionError("re-parsed")):
+            second = analyzer.analyze_python_file(source)
+
+        assert first == second
+        assert first["functions"][0]["name"] == "list_orders"
+        assert (analyzer.CACHE.analyzed, analyzer.CACHE.reused) == (1, 1)
+
+    def test_touched_file_is_matched_by_hash(self, analyzer, tmp_path: Path) -> None:  # type: ignore[no-untyped-def]
+        source = tmp_path / "orders.py"
+        source.write_text("x = 1\n", encoding="utf-8")
+        analyzer.analyze_python_file(source)
+
+        stat = source.stat()
+        os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        analyzer.analyze_python_file(source)
+
+        assert (analyzer.CACHE.analyzed, analyzer.CACHE.reused) == (1, 1)
+
+    def test_changed_file_is_reanalyzed(self, analyzer, tmp_path: Path) -> None:  # type: ignore[no-untyped-def]
+        source = tmp_path / "orders.py"
+        source.write_text("def a():\n    pass\n", encoding="utf-8")
+        analyzer.analyze_python_file(source)
+
+        source.write_text("def a():\n    pass\n\ndef b():\n    pass\n", encoding="utf-8")
+        result = analyzer.analyze_python_file(source)
+
+        assert [f["name"] for f in result["functions"]] == ["a", "b"]
+        assert analyzer.CACHE.analyzed == 2
+
+    def test_cache_survives_between_runs(self, analyzer, tmp_path: Path) -> None:  # type: ignore[no-untyped-def]
+        source = tmp_path / "page.tsx"
+        source.write_text("export default function OrdersPage() {}\n", encoding="utf-8")
+        analyzer.analyze_tsx_file(source)
+        analyzer.CACHE.save()
+
+        analyzer.CACHE = analyzer.FileCache(tmp_path / "cache.json")
+        analyzer.CACHE.load()
+        result = analyzer.analyze_tsx_file(source)
+
+        assert result["component"] == "OrdersPage"
+        assert (analyzer.CACHE.analyzed, analyzer.CACHE.reused) == (0, 1)
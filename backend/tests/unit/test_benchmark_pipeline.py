@@ -0,0 +1,73 @@
+"""Unit tests for the pipeline benchmark harness (no services needed)."""
+
+import base64
+from pathlib import Path
+
+import pytest
+
+from app.agents.email_classifier import _CLASSIFY_BATCH_TOOL, _CLASSIFY_TOOL
+from benchmarks.corpus import generate_corpus, load_corpus
+from benchmarks.pipeline import histogram_quantile
+from benchmarks.stub_anthropic import example_from_schema, tool_input
+
+INF = float("inf")
+
+
+class TestHistogramQuantile:
+    def test_interpolates_within_bucket(self) -> None:
+        buckets = [(1.0, 0), (2.0, 10), (5.0, 20), (INF, 20)]
+
+        assert histogram_quantile(0.5, buckets) == pytest.approx(2.0)
+        assert histogram_quantile(0.75, buckets) == pytest.approx(3.5)
+
+    def test_inf_bucket_returns_highest_bound(self) -> None:
+        buckets = [(1.0, 1), (5.0, 2), (INF, 10)]
+
+        assert histogram_quantile(0.99, buckets) == 5.0
+
+    def test_no_observations(self) -> None:
+        assert histogram_quantile(0.5, [(1.0, 0), (INF, 0)]) is None
+        assert histogram_quantile(0.5, []) is None
+
+
+class TestStubAnthropic:
+    def test_example_satisfies_classify_tool(self) -> None:
+        value = example_from_schema(_CLASSIFY_TOOL["input_schema"])  # type: ignore[arg-type]
+
+        assert value["category"] == "poptavka"
+        assert value["confidence"] == 0.95
+        assert isinstance(value["reasoning"], str)
+
+    def test_batch_classification_covers_every_email(self) -> None:
+        body = {
+            "messages": [
+                {"role": "user", "content": '<email index="0">a</email>\n<email index="1">b</email>'}
+            ]
+        }
+
+        value = tool_input(_CLASSIFY_BATCH_TOOL, body)  # type: ignore[arg-type]
+
+        assert [item["index"] for item in value["classifications"]] == [0, 1]
+
+
+class TestCorpus:
+    def test_generated_corpus_loads_as_pipeline_payloads(self, tmp_path: Path) -> None:
+        """Synthetic emails replay like IMAP polling, attachments included."""
+        generate_corpus(tmp_path, 12, seed=3, attachment_ratio=1.0)
+
+        payloads = load_corpus(tmp_path, run_id="r1")
+
+        assert len(payloads) == 12
+        assert len({p["message_id"] for p in payloads}) == 12
+        assert all(p["message_id"].endswith(".r1@bench.example>") for p in payloads)
+        assert all(p["body_text"].startswith("Dobrý den") for p in payloads)
+        attachment = payloads[0]["attachments"][0]
+        assert attachment["content_type"] == "application/pdf"
+        assert base64.b64decode(attachment["data_b64"]).startswith(b"%PDF")
+
+    def test_same_seed_same_corpus(self, tmp_path: Path) -> None:
+        first = generate_corpus(tmp_path / "a", 5, seed=7)
+        second = generate_corpus(tmp_path / "b", 5, seed=7)
+
+        assert [p.name for p in first] == [p.name for p in second]
+        assert [p.read_bytes().split(b"\n\n", 1)[1] for p in first][0] != b""
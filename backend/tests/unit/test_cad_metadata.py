@@ -6,7 +6,11 @@ from unittest.mock import MagicMock, patch
 
 import pytest
 
-from app.integrations.ocr.cad_metadata import CADMetadata, CADMetadataExtractor
+from app.integrations.ocr.cad_metadata import (
+    CADMetadata,
+    CADMetadataExtractor,
+    DXFStreamLimits,
+)
 from app.integrations.ocr.processor import OCRProcessor
 
 
@@ -208,6 +212,48 @@ ENDSEC;
         finally:
             Path(tmp_path).unlink(missing_ok=True)
 
+    def test_extract_step_stops_once_fields_found(
+        self, extractor: CADMetadataExtractor, tmp_path: Path
+    ) -> None:
+        """Scanning stops after product, material and protocol are known."""
+        geometry = "".join(
+            f"#{i}=CARTESIAN_POINT('',(0.,0.,{i}.));\n" for i in range(100, 5000)
+        )
+        step_path = tmp_path / "assembly.step"
+        step_path.write_text(
+            "ISO-10303-21;\nHEADER;\n"
+            "FILE_SCHEMA(('AUTOMOTIVE_DESIGN { 1 0 10303 214 1 1 1 1 }'));\n"
+            "ENDSEC;\nDATA;\n"
+            "#1=APPLICATION_PROTOCOL_DEFINITION('international standard','automotive_design',2000,#2);\n"
+            "#3=PRODUCT('A-1','Assembly','',(#4));\n"
+            "#5=MATERIAL_DESIGNATION(#6,'1.4301');\n"
+            f"{geometry}"
+            "#9999=PRODUCT('A-2','Late part','Never reached',(#4));\n"
+            "ENDSEC;\nEND-ISO-10303-21;\n"
+        )
+
+        metadata = extractor.extract_step_metadata(str(step_path))
+
+        assert metadata.product_name == "Assembly"
+        assert metadata.material == "1.4301"
+        assert metadata.protocol_version == "automotive_design"
+        assert metadata.description is None
+        assert metadata.raw_metadata["product_entities"] == 1
+        assert metadata.raw_metadata["scan_complete"] is False
+
+    def test_extract_step_empty_file(
+        self, extractor: CADMetadataExtractor, tmp_path: Path
+    ) -> None:
+        """An empty STEP file yields empty metadata instead of an mmap error."""
+        step_path = tmp_path / "empty.stp"
+        step_path.write_bytes(b"")
+
+        metadata = extractor.extract_step_metadata(str(step_path))
+
+        assert "error" not in metadata.raw_metadata
+        assert metadata.product_name is None
+        assert metadata.raw_metadata["product_entities"] == 0
+
     def test_unsupported_format(self, extractor: CADMetadataExtractor) -> None:
         """Test that unsupported format raises ValueError."""
         with tempfile.NamedTemporaryFile(suffix=".xyz", delete=False) as tmp_file:
@@ -229,6 +275,84 @@ ENDSEC;
         assert metadata.raw_metadata.get("error") == "File not found"
 
 
+class TestStreamingDXFExtraction:
+    """Tests for single-pass streaming DXF extraction."""
+
+    @staticmethod
+    def _write_dxf(path: Path, text_count: int = 3) -> None:
+        """Write a real DXF drawing with layers, a block, texts and a dimension."""
+        import ezdxf
+
+        doc = ezdxf.new("R2010")
+        doc.layers.add("Konstrukce")
+        doc.blocks.new(name="Priruba")
+        msp = doc.modelspace()
+        for i in range(text_count):
+            msp.add_text(f"Pozice {i}", dxfattribs={"layer": "Konstrukce"})
+        msp.add_mtext("Material: S235JR")
+        dim = msp.add_linear_dim(base=(0, 5), p1=(0, 0), p2=(150, 0), text="150.00")
+        dim.render()
+        doc.paperspace().add_text("Paperspace only")
+        doc.saveas(path)
+
+    def test_streaming_matches_full_extraction(self, tmp_path: Path) -> None:
+        """Streaming mode gathers the same layers, blocks, texts and dimensions."""
+        dxf_path = tmp_path / "drawing.dxf"
+        self._write_dxf(dxf_path)
+        extractor = CADMetadataExtractor()
+
+        full = extractor.extract_dxf_metadata(str(dxf_path), streaming=False)
+        streamed = extractor.extract_dxf_metadata(str(dxf_path), streaming=True)
+
+        assert streamed.raw_metadata["mode"] == "streaming"
+        assert streamed.raw_metadata["truncated"] is False
+        assert streamed.raw_metadata["dxf_version"] == "AC1024"
+        assert streamed.layers == full.layers
+        assert streamed.blocks == full.blocks
+        assert streamed.text_entities == full.text_entities
+        assert streamed.dimensions == full.dimensions == ["150.00"]
+        assert "Paperspace only" not in streamed.text_entities
+
+    def test_streaming_selected_by_file_size(self, tmp_path: Path) -> None:
+        """Files above the threshold are streamed without ezdxf.readfile."""
+        dxf_path = tmp_path / "layout.dxf"
+        self._write_dxf(dxf_path)
+        extractor = CADMetadataExtractor(stream_threshold_bytes=0)
+
+        with patch("app.integrations.ocr.cad_metadata.ezdxf.readfile") as mock_readfile:
+            metadata = extractor.extract_metadata(str(dxf_path))
+
+        mock_readfile.assert_not_called()
+        assert metadata.raw_metadata["mode"] == "streaming"
+        assert "Material: S235JR" in metadata.text_entities
+
+    def test_streaming_entity_cap_returns_partial(self, tmp_path: Path) -> None:
+        """Hitting the entity cap stops reading and flags partial metadata."""
+        dxf_path = tmp_path / "big.dxf"
+        self._write_dxf(dxf_path, text_count=50)
+        extractor = CADMetadataExtractor(stream_limits=DXFStreamLimits(max_entities=5))
+
+        metadata = extractor.extract_dxf_metadata(str(dxf_path), streaming=True)
+
+        assert len(metadata.text_entities) == 5
+        assert metadata.raw_metadata["truncated"] is True
+        assert metadata.raw_metadata["truncated_reason"] == "entity_cap"
+
+    def test_streaming_time_budget_returns_partial(self, tmp_path: Path) -> None:
+        """An exhausted time budget returns whatever was gathered so far."""
+        dxf_path = tmp_path / "slow.dxf"
+        self._write_dxf(dxf_path)
+        extractor = CADMetadataExtractor(
+            stream_limits=DXFStreamLimits(time_budget_seconds=-1.0)
+        )
+
+        metadata = extractor.extract_dxf_metadata(str(dxf_path), streaming=True)
+
+        assert metadata.raw_metadata["truncated"] is True
+        assert metadata.raw_metadata["truncated_reason"] == "time_budget"
+        assert metadata.text_entities == []
+
+
 class TestOCRProcessorCAD:
     """Tests for OCRProcessor CAD integration."""
 
@@ -0,0 +1,203 @@
+"""Tests for the in-memory and Redis-backed circuit breakers."""
+
+import contextvars
+from collections.abc import Generator
+from unittest.mock import MagicMock, patch
+
+import fakeredis
+import pytest
+from redis import RedisError
+
+from app.core.circuit_breaker import CircuitBreaker, CircuitState, RedisCircuitBreaker
+
+
+class TestCircuitBreaker:
+    """Tests for the per-process breaker (also the Redis fallback)."""
+
+    def test_opens_on_failure_rate(self) -> None:
+        breaker = CircuitBreaker("test", failure_threshold=3, recovery_timeout=60)
+
+        for _ in range(3):
+            breaker.record_failure()
+
+        assert breaker.state == CircuitState.OPEN
+        assert breaker.can_execute() is False
+
+    def test_sporadic_failures_keep_it_closed(self) -> None:
+        breaker = CircuitBreaker("test", failure_threshold=3, failure_rate=0.5)
+
+        for _ in range(4):
+            breaker.record_success()
+            breaker.record_success()
+            breaker.record_failure()
+
+        assert breaker.state == CircuitState.CLOSED
+        assert breaker.get_status()["failure_count"] == 4
+
+    def test_failures_leave_the_window(self) -> None:
+        breaker = CircuitBreaker("test", failure_threshold=3, window_seconds=60)
+
+        with patch("app.core.circuit_breaker.time.time", side_effect=[0, 0, 100]):
+            breaker.record_failure()
+            breaker.record_failure()
+            breaker.record_failure()
+
+        assert breaker.state == CircuitState.CLOSED
+
+    def test_half_open_allows_single_probe(self) -> None:
+        breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout=60)
+        breaker.record_failure()
+        breaker._last_failure_time -= 60
+
+        assert breaker.can_execute() is True
+        assert breaker.state == CircuitState.HALF_OPEN
+        assert breaker.can_execute() is False
+
+        breaker.record_success()
+        assert breaker.state == CircuitState.CLOSED
+
+
+@pytest.fixture
+def redis() -> Generator[MagicMock, None, None]:
+    client = MagicMock()
+    client.register_script.side_effect = lambda source: MagicMock(name="script")
+    with patch("app.core.circuit_breaker.Redis.from_url", return_value=client):
+        yield client
+
+
+class TestRedisCircuitBreaker:
+    """Tests for the shared breaker (scripts mocked)."""
+
+    def test_open_state_is_shared(self, redis: MagicMock) -> None:
+        breaker = RedisCircuitBreaker("anthropic", redis_url="redis://test")
+        breaker._client()
+        breaker._allow_script.return_value = ["open", 0]
+
+        assert breaker.can_execute() is False
+        assert breaker._state == CircuitState.OPEN
+
+    def test_probe_outcome_is_reported_with_probe_id(self, redis: MagicMock) -> None:
+        breaker = RedisCircuitBreaker("pohoda", redis_url="redis://test")
+        breaker._client()
+        breaker._allow_script.return_value = ["half_open", 1]
+        breaker._record_script.return_value = ["closed", 0]
+
+        assert breaker.can_execute() is True
+        probe_id = breaker._allow_script.call_args.kwargs["args"][2]
+        breaker.record_success()
+
+        call = breaker._record_script.call_args.kwargs
+        assert call["keys"] == [
+            "circuit:pohoda",
+            "circuit:pohoda:calls",
+            "circuit:pohoda:failures",
+            "circuit:pohoda:probe",
+        ]
+        assert call["args"][0] == 1
+        assert call["args"][5] == probe_id
+        assert breaker._state == CircuitState.CLOSED
+        assert breaker._probe_id.get() == ""
+
+    def test_falls_back_to_local_state_without_redis(self, redis: MagicMock) -> None:
+        breaker = RedisCircuitBreaker("imap", failure_threshold=2, redis_url="redis://test")
+        breaker._client()
+        breaker._record_script.side_effect = RedisError("connection refused")
+
+        breaker.record_failure()
+        breaker.record_failure()
+
+        assert breaker._record_script.call_count == 1
+        assert breaker.can_execute() is False
+        assert breaker.get_status()["state"] == CircuitState.OPEN.value
+
+
+class TestRedisCircuitBreakerScripts:
+    """The allow and record scripts executed by a Lua-capable fake Redis."""
+
+    @pytest.fixture
+    def server(self) -> Generator[fakeredis.FakeRedis, None, None]:
+        server = fakeredis.FakeRedis(decode_responses=True)
+        with patch("app.core.circuit_breaker.Redis.from_url", return_value=server):
+            yield server
+
+    @staticmethod
+    def _breaker(name: str = "anthropic") -> RedisCircuitBreaker:
+        """A breaker as seen by one process of the fleet."""
+        return RedisCircuitBreaker(
+            name, failure_threshold=3, recovery_timeout=60, redis_url="redis://test"
+        )
+
+    @staticmethod
+    def _expire_open_state(server: fakeredis.FakeRedis, name: str = "anthropic") -> None:
+        server.hset(f"circuit:{name}", "opened_at", "0")
+
+    def test_failures_open_breaker_for_every_process(
+        self, server: fakeredis.FakeRedis
+    ) -> None:
+        api, worker = self._breaker(), self._breaker()
+
+        api.record_failure()
+        worker.record_failure()
+        assert api.can_execute() is True
+        worker.record_failure()
+
+        assert api.can_execute() is False
+        assert api.get_status()["state"] == CircuitState.OPEN.value
+        assert worker.state == CircuitState.OPEN
+
+    def test_sporadic_failures_keep_it_closed(self, server: fakeredis.FakeRedis) -> None:
+        breaker = self._breaker()
+
+        for _ in range(4):
+            breaker.record_success()
+            breaker.record_success()
+            breaker.record_failure()
+
+        assert breaker.can_execute() is True
+        assert breaker.get_status()["failure_count"] == 4
+
+    def test_single_probe_across_the_fleet(self, server: fakeredis.FakeRedis) -> None:
+        api, worker = self._breaker(), self._breaker()
+        for _ in range(3):
+            api.record_failure()
+        self._expire_open_state(server)
+
+        assert api.can_execute() is True
+        assert worker.can_execute() is False
+        assert server.hget("circuit:anthropic", "state") == "half_open"
+
+        api.record_success()
+
+        assert worker.can_execute() is True
+        assert worker.state == CircuitState.CLOSED
+
+    def test_failed_probe_reopens(self, server: fakeredis.FakeRedis) -> None:
+        breaker = self._breaker()
+        for _ in range(3):
+            breaker.record_failure()
+        self._expire_open_state(server)
+
+        assert breaker.can_execute() is True
+        breaker.record_failure()
+
+        assert breaker.can_execute() is False
+        assert not server.exists("circuit:anthropic:probe")
+
+    def test_probe_is_owned_by_the_claiming_caller(
+        self, server: fakeredis.FakeRedis
+    ) -> None:
+        """A late result of another caller of the same global breaker is ignored."""
+        breaker = self._breaker()
+        for _ in range(3):
+            breaker.record_failure()
+        self._expire_open_state(server)
+        probe_task = contextvars.Context()
+        late_task = contextvars.Context()
+
+        assert probe_task.run(breaker.can_execute) is True
+        late_task.run(breaker.record_failure)
+        assert server.hget("circuit:anthropic", "state") == "half_open"
+
+        probe_task.run(breaker.record_success)
+
+        assert server.hget("circuit:anthropic", "state") == "closed"
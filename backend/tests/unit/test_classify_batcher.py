@@ -0,0 +1,165 @@
+"""Unit tests for micro-batched email classification."""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from redis import RedisError
+
+from app.agents.email_classifier import CALL_TIMEOUT_SECONDS, ClassificationResult
+from app.core.config import get_settings
+from app.orchestration import classify_batcher
+from app.orchestration.classify_batcher import ClassificationBatcher
+
+
+class _FakeRedis:
+    """The subset of redis-py used by the batcher, kept in memory."""
+
+    def __init__(self) -> None:
+        self.values: dict[str, str] = {}
+        self.lists: dict[str, list[str]] = {}
+
+    def rpush(self, key: str, value: str) -> None:
+        self.lists.setdefault(key, []).append(value)
+
+    def expire(self, key: str, seconds: int) -> None:
+        pass
+
+    def llen(self, key: str) -> int:
+        return len(self.lists.get(key, []))
+
+    def lpop(self, key: str, count: int) -> list[str] | None:
+        items = self.lists.get(key, [])
+        popped, self.lists[key] = items[:count], items[count:]
+        return popped or None
+
+    def lrem(self, key: str, count: int, value: str) -> None:
+        if value in self.lists.get(key, []):
+            self.lists[key].remove(value)
+
+    def set(self, key: str, value: str, nx: bool = False, **_: object) -> bool:
+        if nx and key in self.values:
+            return False
+        self.values[key] = value
+        return True
+
+    def get(self, key: str) -> str | None:
+        return self.values.get(key)
+
+    def getdel(self, key: str) -> str | None:
+        return self.values.pop(key, None)
+
+    def delete(self, key: str) -> None:
+        self.values.pop(key, None)
+
+    def pipeline(self) -> "_FakeRedis":
+        return self
+
+    def execute(self) -> None:
+        pass
+
+
+def _result(category: str) -> ClassificationResult:
+    return ClassificationResult(category=category, confidence=0.9, reasoning="r", tokens_used=50)
+
+
+@pytest.fixture(autouse=True)
+def _fast_polling(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(classify_batcher, "_POLL_SECONDS", 0.001)
+
+
+@pytest.fixture
+def classifier() -> MagicMock:
+    classifier = MagicMock()
+    classifier.classify = AsyncMock(return_value=_result("dotaz"))
+    classifier.classify_batch = AsyncMock(
+        side_effect=lambda emails: [_result("poptavka") for _ in emails]
+    )
+    return classifier
+
+
+def _batcher(classifier: MagicMock, redis: object, window: float = 0.0) -> ClassificationBatcher:
+    batcher = ClassificationBatcher(classifier, redis=redis)  # type: ignore[arg-type]
+    batcher._window = window
+    return batcher
+
+
+class TestClassificationBatcher:
+    async def test_concurrent_emails_share_one_call(self, classifier: MagicMock) -> None:
+        """Emails waiting at the same time are classified by a single batch call."""
+        redis = _FakeRedis()
+        batcher = _batcher(classifier, redis, window=0.05)
+
+        results = await asyncio.gather(
+            *(batcher.classify(f"Poptavka {i}", "telo") for i in range(3))
+        )
+
+        assert [r.category for r in results] == ["poptavka"] * 3
+        classifier.classify_batch.assert_awaited_once()
+        assert len(classifier.classify_batch.await_args.args[0]) == 3
+        classifier.classify.assert_not_awaited()
+        assert redis.values == {}  # results consumed, leadership released
+
+    async def test_single_email_uses_regular_call(self, classifier: MagicMock) -> None:
+        """A batch of one goes through the regular single-email classification."""
+        result = await _batcher(classifier, _FakeRedis()).classify("Dotaz", "telo")
+
+        assert result.category == "dotaz"
+        classifier.classify.assert_awaited_once_with(subject="Dotaz", body="telo")
+        classifier.classify_batch.assert_not_awaited()
+
+    async def test_email_without_batch_result_is_classified_alone(
+        self, classifier: MagicMock
+    ) -> None:
+        """A None from the batch falls back to a single call for that email only."""
+        classifier.classify_batch = AsyncMock(return_value=[_result("poptavka"), None])
+        batcher = _batcher(classifier, _FakeRedis(), window=0.05)
+
+        results = await asyncio.gather(batcher.classify("a", "a"), batcher.classify("b", "b"))
+
+        assert sorted(r.category for r in results) == ["dotaz", "poptavka"]
+        classifier.classify.assert_awaited_once()
+
+    async def test_wait_timeout_removes_pending_request(self, classifier: MagicMock) -> None:
+        """Without a result in time, the request leaves the queue and is classified alone."""
+        redis = _FakeRedis()
+        redis.values["classify:batch:leader"] = "someone-else"
+        batcher = _batcher(classifier, redis)
+        batcher._max_wait = 0.01
+
+        result = await batcher.classify("Dotaz", "telo")
+
+        assert result.category == "dotaz"
+        assert redis.llen("classify:batch:pending") == 0
+
+    def test_default_wait_covers_two_leader_rounds(self, classifier: MagicMock) -> None:
+        """Followers outwait a leader stuck on the rate limiter and a slow call."""
+        settings = get_settings().model_copy(
+            update={
+                "CLASSIFY_BATCH_WINDOW_SECONDS": 1.0,
+                "CLAUDE_RATE_LIMIT_WAIT_SECONDS": 30.0,
+                "CLASSIFY_BATCH_MAX_WAIT_SECONDS": None,
+            }
+        )
+        with patch.object(classify_batcher, "get_settings", return_value=settings):
+            batcher = ClassificationBatcher(classifier, redis=_FakeRedis())  # type: ignore[arg-type]
+
+        leader_round = 1.0 + 30.0 + CALL_TIMEOUT_SECONDS
+        assert batcher._max_wait > 2 * leader_round
+        assert batcher._leader_ms > leader_round * 1000
+
+    def test_configured_wait_wins(self, classifier: MagicMock) -> None:
+        settings = get_settings().model_copy(update={"CLASSIFY_BATCH_MAX_WAIT_SECONDS": 200.0})
+        with patch.object(classify_batcher, "get_settings", return_value=settings):
+            batcher = ClassificationBatcher(classifier, redis=_FakeRedis())  # type: ignore[arg-type]
+
+        assert batcher._max_wait == 200.0
+
+    async def test_redis_unavailable_classifies_directly(self, classifier: MagicMock) -> None:
+        redis = MagicMock()
+        redis.rpush.side_effect = RedisError("down")
+
+        result = await _batcher(classifier, redis).classify("Dotaz", "telo")
+
+        assert result.category == "dotaz"
+        classifier.classify.assert_awaited_once()
@@ -0,0 +1,131 @@
+"""Tests for the Claude usage ledger (instrumented calls and usage report)."""
+
+from datetime import UTC, datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.v1.settings import _ledger_usage
+from app.core import rate_limiter
+from app.core.claude_usage import ClaudeUsage, create_message
+from app.models.claude_usage import ClaudeUsageEntry
+
+
+def _client(response: object = None, error: Exception | None = None) -> MagicMock:
+    client = MagicMock()
+    client.messages.create = AsyncMock(return_value=response, side_effect=error)
+    return client
+
+
+class TestCreateMessage:
+    """Tests for the instrumented messages.create."""
+
+    async def test_records_actual_usage(self, _claude_ledger_writes: AsyncMock) -> None:
+        response = SimpleNamespace(
+            content=[],
+            usage=SimpleNamespace(
+                input_tokens=1200,
+                output_tokens=300,
+                cache_read_input_tokens=4000,
+                cache_creation_input_tokens=0,
+            ),
+        )
+
+        result, usage = await create_message(
+            _client(response), agent="email_classifier", model="claude-test", max_tokens=512
+        )
+
+        assert result is response
+        assert usage == ClaudeUsage(1200, 300, 4000, 0)
+        rate_limiter.get_rate_limiter().record_usage.assert_called_once_with(5500)
+        entry: ClaudeUsageEntry = _claude_ledger_writes.await_args.args[0]
+        assert (entry.agent, entry.model, entry.success) == ("email_classifier", "claude-test", True)
+        assert (entry.input_tokens, entry.output_tokens, entry.cache_read_tokens) == (1200, 300, 4000)
+
+    async def test_failed_call_is_recorded_and_reraised(
+        self, _claude_ledger_writes: AsyncMock
+    ) -> None:
+        with pytest.raises(TimeoutError):
+            await create_message(
+                _client(error=TimeoutError()), agent="calculation_agent", model="claude-test"
+            )
+
+        entry: ClaudeUsageEntry = _claude_ledger_writes.await_args.args[0]
+        assert entry.success is False
+        assert entry.error == "TimeoutError"
+        assert entry.total_tokens == 0
+        rate_limiter.get_rate_limiter().record_usage.assert_not_called()
+
+    async def test_marks_static_prefix_for_prompt_caching(self) -> None:
+        tools = [{"name": "a", "input_schema": {}}, {"name": "b", "input_schema": {}}]
+        client = _client(SimpleNamespace(content=[]))
+
+        await create_message(client, agent="email_parser", system="Prompt", tools=tools)
+        await create_message(client, agent="email_parser", tools=tools)
+        await create_message(client, agent="email_parser", tools=tools, cache_prompt=False)
+
+        with_system, tools_only, uncached = (
+            call.kwargs for call in client.messages.create.await_args_list
+        )
+        assert with_system["system"] == [
+            {"type": "text", "text": "Prompt", "cache_control": {"type": "ephemeral"}}
+        ]
+        assert with_system["tools"] is tools
+        assert tools_only["tools"][-1]["cache_control"] == {"type": "ephemeral"}
+        assert "cache_control" not in tools[-1]
+        assert uncached["tools"] is tools
+
+    def test_missing_usage_counts_as_zero(self) -> None:
+        assert ClaudeUsage.from_response(MagicMock()) == ClaudeUsage()
+        assert ClaudeUsage.from_response(SimpleNamespace()).total_tokens == 0
+
+
+class TestLedgerUsage:
+    """Tests for the usage report computed from the ledger."""
+
+    async def test_aggregates_by_category_and_hour(
+        self, test_db: AsyncSession, assert_num_queries
+    ) -> None:
+        now = datetime.now(UTC)
+        test_db.add_all([
+            ClaudeUsageEntry(
+                agent="email_classifier", model="m", input_tokens=1000, output_tokens=200,
+                latency_ms=800, created_at=now,
+            ),
+            ClaudeUsageEntry(
+                agent="email_classifier", model="m", input_tokens=500, output_tokens=100,
+                cache_read_tokens=2000, latency_ms=400, created_at=now,
+            ),
+            ClaudeUsageEntry(
+                agent="process_advisor", model="m", input_tokens=3000, output_tokens=1000,
+                latency_ms=5000, created_at=now,
+            ),
+            ClaudeUsageEntry(
+                agent="email_parser", model="m", input_tokens=9999, output_tokens=9999,
+                created_at=now - timedelta(days=2),
+            ),
+        ])
+        await test_db.flush()
+
+        with assert_num_queries(1):
+            report = await _ledger_usage(test_db, "day")
+
+        categories = {c.category: c for c in report.categories}
+        classification = categories["Email klasifikace"]
+        assert (classification.calls, classification.tokens_input) == (2, 1500)
+        assert (classification.tokens_output, classification.tokens_cached) == (300, 2000)
+        assert classification.avg_latency_ms == 600
+        assert categories["Doporučení"].calls == 1
+        assert categories["Parsování dokumentů"].calls == 0
+
+        assert report.total_calls == 3
+        assert report.total_tokens == 7800
+        assert report.total_tokens_cached == 2000
+        assert report.cache_read_ratio == round(2000 / 6500, 3)
+        assert len(report.timeline) == 24
+        current_hour = report.timeline[now.hour]
+        assert current_hour.label == f"{now.hour}:00"
+        assert current_hour.calls == 3
+        assert current_hour.cost_czk == report.total_cost_czk > 0
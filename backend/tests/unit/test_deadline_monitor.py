@@ -1,16 +1,22 @@
 """Unit tests for DeadlineMonitorService."""
 
 import uuid
+from collections.abc import Iterator
 from datetime import UTC, datetime, timedelta
 from decimal import Decimal
 from unittest.mock import AsyncMock, MagicMock, patch
 
+import pytest
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models.notification import NotificationType
+from app.models.customer import Customer
+from app.models.notification import Notification, NotificationType
 from app.models.operation import Operation, OperationStatus
 from app.models.order import Order, OrderPriority, OrderStatus
-from app.services.deadline_monitor import DeadlineMonitorService
+from app.models.user import User, UserRole
+from app.schemas.embedding import SimilarOrderResult
+from app.services.deadline_monitor import DeadlineMonitorService, deadline_dedup_key
 
 
 def _make_order(
@@ -290,280 +296,308 @@ class TestGenerateRuleBased:
         assert "blíží" in result or "sledujte" in result.lower()
 
 
-class TestShouldNotify:
-    """Tests for _should_notify deduplication."""
-
-    async def test_first_notification_allowed(self) -> None:
-        """First notification for an operation should be sent."""
-        order = _make_order()
-        op = _make_operation(order=order)
-
-        mock_db = AsyncMock(spec=AsyncSession)
-        # First query returns the operation
-        mock_op_result = MagicMock()
-        mock_op_result.scalar_one_or_none.return_value = op
-        # Second query returns the order
-        mock_order_result = MagicMock()
-        mock_order_result.scalar_one_or_none.return_value = order
-        # Third query returns no existing notification (dedup)
-        mock_dedup_result = MagicMock()
-        mock_dedup_result.scalar_one_or_none.return_value = None
-
-        mock_db.execute = AsyncMock(
-            side_effect=[mock_op_result, mock_order_result, mock_dedup_result]
-        )
-
-        service = DeadlineMonitorService(mock_db)
-        result = await service._should_notify(op.id, "warning")
-
-        assert result is True
-
-    async def test_duplicate_notification_blocked(self) -> None:
-        """Same severity notification within 24h should be blocked."""
-        from app.models.notification import Notification
-
-        order = _make_order()
-        op = _make_operation(order=order)
-
-        existing = MagicMock(spec=Notification)
-        existing.title = f"{order.number}: {op.name} — varování"
-        existing.created_at = datetime.now(UTC) - timedelta(hours=2)
-
-        mock_db = AsyncMock(spec=AsyncSession)
-        mock_op_result = MagicMock()
-        mock_op_result.scalar_one_or_none.return_value = op
-        mock_order_result = MagicMock()
-        mock_order_result.scalar_one_or_none.return_value = order
-        mock_dedup_result = MagicMock()
-        mock_dedup_result.scalar_one_or_none.return_value = existing
-
-        mock_db.execute = AsyncMock(
-            side_effect=[mock_op_result, mock_order_result, mock_dedup_result]
+async def _seed_order(
+    db: AsyncSession,
+    *,
+    number: str,
+    operations: list[tuple[str, int, int | None, str]],
+    status: OrderStatus = OrderStatus.VYROBA,
+) -> tuple[Order, list[Operation]]:
+    """Persist an order with operations given as (name, sequence, days to planned end, status)."""
+    customer = Customer(
+        company_name=f"Zákazník {number}",
+        ico=number[-8:].rjust(8, "0"),
+        contact_name="Jan Novák",
+        email=f"{number.lower()}@zakaznik.cz",
+    )
+    db.add(customer)
+    await db.flush()
+
+    order = Order(
+        customer_id=customer.id,
+        number=number,
+        status=status,
+        priority=OrderPriority.NORMAL,
+        due_date=datetime.now(UTC).date() + timedelta(days=2),
+    )
+    db.add(order)
+    await db.flush()
+
+    now = datetime.now(UTC)
+    ops = [
+        Operation(
+            order_id=order.id,
+            name=name,
+            sequence=sequence,
+            duration_hours=Decimal("24"),
+            planned_end=now + timedelta(days=days) if days is not None else None,
+            status=op_status,
         )
+        for name, sequence, days, op_status in operations
+    ]
+    db.add_all(ops)
+    await db.flush()
+    return order, ops
 
-        service = DeadlineMonitorService(mock_db)
-        result = await service._should_notify(op.id, "warning")
-
-        assert result is False
-
-    async def test_escalation_allowed(self) -> None:
-        """Higher severity notification should be allowed even within 24h."""
-        from app.models.notification import Notification
-
-        order = _make_order()
-        op = _make_operation(order=order)
 
-        # Existing is "info" level
-        existing = MagicMock(spec=Notification)
-        existing.title = f"{order.number}: {op.name} — informace"
-        existing.created_at = datetime.now(UTC) - timedelta(hours=2)
+@pytest.fixture
+async def recipients(test_db: AsyncSession) -> list[User]:
+    """Active users who receive deadline warnings, plus one who does not."""
+    users = [
+        User(email="vedeni@infer.cz", hashed_password="x", full_name="Vedení", role=UserRole.VEDENI),
+        User(email="tech@infer.cz", hashed_password="x", full_name="Technolog", role=UserRole.TECHNOLOG),
+        User(email="ucetni@infer.cz", hashed_password="x", full_name="Účetní", role=UserRole.UCETNI),
+    ]
+    test_db.add_all(users)
+    await test_db.flush()
+    return users[:2]
 
-        mock_db = AsyncMock(spec=AsyncSession)
-        mock_op_result = MagicMock()
-        mock_op_result.scalar_one_or_none.return_value = op
-        mock_order_result = MagicMock()
-        mock_order_result.scalar_one_or_none.return_value = order
-        mock_dedup_result = MagicMock()
-        mock_dedup_result.scalar_one_or_none.return_value = existing
-
-        mock_db.execute = AsyncMock(
-            side_effect=[mock_op_result, mock_order_result, mock_dedup_result]
-        )
 
-        service = DeadlineMonitorService(mock_db)
-        # Escalating from info to critical
-        result = await service._should_notify(op.id, "critical")
+@pytest.fixture(autouse=True)
+def _ws_manager() -> Iterator[MagicMock]:
+    with patch("app.services.notification.manager") as mock:
+        mock.publish_notification = AsyncMock()
+        yield mock
 
-        assert result is True
-
-    async def test_operation_not_found(self) -> None:
-        """If operation not found, allow notification (safety)."""
-        mock_db = AsyncMock(spec=AsyncSession)
-        mock_result = MagicMock()
-        mock_result.scalar_one_or_none.return_value = None
-        mock_db.execute = AsyncMock(return_value=mock_result)
 
-        service = DeadlineMonitorService(mock_db)
-        result = await service._should_notify(uuid.uuid4(), "critical")
+class TestSeverity:
+    """Tests for _severity thresholds."""
 
-        assert result is True
+    def test_thresholds(self) -> None:
+        assert DeadlineMonitorService._severity(-1, 3) == "critical"
+        assert DeadlineMonitorService._severity(0, 3) == "warning"
+        assert DeadlineMonitorService._severity(1, 3) == "warning"
+        assert DeadlineMonitorService._severity(3, 3) == "info"
+        assert DeadlineMonitorService._severity(4, 3) is None
 
 
 class TestCheckDeadlines:
     """Tests for check_deadlines main method."""
 
-    async def test_no_operations_returns_empty(self) -> None:
+    async def test_no_operations_returns_empty(self, test_db: AsyncSession) -> None:
         """No operations in VYROBA returns empty alerts."""
-        mock_db = AsyncMock(spec=AsyncSession)
-        mock_result = MagicMock()
-        mock_result.scalars.return_value.all.return_value = []
-        mock_db.execute = AsyncMock(return_value=mock_result)
+        await _seed_order(
+            test_db,
+            number="ORD-2026-001",
+            operations=[("Řezání", 1, -2, OperationStatus.PLANNED.value)],
+            status=OrderStatus.POPTAVKA,
+        )
 
-        service = DeadlineMonitorService(mock_db)
+        service = DeadlineMonitorService(test_db)
         alerts = await service.check_deadlines()
 
         assert alerts == []
 
-    @patch("app.services.deadline_monitor.NotificationService")
-    async def test_critical_operation_detected(self, mock_notif_cls: MagicMock) -> None:
-        """Operation past deadline triggers critical alert."""
-        today = datetime.now(UTC).date()
-        order = _make_order(
-            due_date=today + timedelta(days=5),
-            number="ORD-2026-010",
-        )
-        op = _make_operation(
-            order=order,
-            name="Svařování",
-            sequence=1,
-            duration_hours=Decimal("24"),
-            planned_end=datetime.now(UTC) - timedelta(days=2),  # 2 days late
-            status=OperationStatus.IN_PROGRESS.value,
-        )
-
-        mock_db = AsyncMock(spec=AsyncSession)
+    async def test_alerts_sent_in_bulk(
+        self, test_db: AsyncSession, recipients: list[User], assert_num_queries
+    ) -> None:
+        """At-risk operations of several orders cost a constant number of queries."""
+        for i in range(3):
+            await _seed_order(
+                test_db,
+                number=f"ORD-2026-01{i}",
+                operations=[
+                    ("Svařování", 1, -2, OperationStatus.IN_PROGRESS.value),
+                    ("NDT", 2, 1, OperationStatus.PLANNED.value),
+                    ("Řezání", 3, 30, OperationStatus.PLANNED.value),
+                    ("Příprava", 0, -10, OperationStatus.COMPLETED.value),
+                ],
+            )
 
-        # 1st call: main query returning operations
-        mock_ops_result = MagicMock()
-        mock_ops_result.scalars.return_value.all.return_value = [op]
-
-        # 2nd call: _should_notify - op lookup
-        mock_op_result = MagicMock()
-        mock_op_result.scalar_one_or_none.return_value = op
-
-        # 3rd call: _should_notify - order lookup
-        mock_order_result = MagicMock()
-        mock_order_result.scalar_one_or_none.return_value = order
-
-        # 4th call: _should_notify - dedup check (no existing)
-        mock_dedup_result = MagicMock()
-        mock_dedup_result.scalar_one_or_none.return_value = None
-
-        # 5th call: downstream ops query
-        mock_all_ops_result = MagicMock()
-        mock_all_ops_result.scalars.return_value.all.return_value = [op]
-
-        mock_db.execute = AsyncMock(
-            side_effect=[
-                mock_ops_result,
-                mock_op_result,
-                mock_order_result,
-                mock_dedup_result,
-                mock_all_ops_result,
-            ]
+        service = DeadlineMonitorService(test_db)
+        # operations, dedup keys, recipients, one insert
+        with assert_num_queries(4):
+            alerts = await service.check_deadlines()
+
+        assert len(alerts) == 6
+        assert {a["severity"] for a in alerts if a["operation_name"] == "Svařování"} == {
+            "critical"
+        }
+        assert {a["severity"] for a in alerts if a["operation_name"] == "NDT"} == {"warning"}
+
+        result = await test_db.execute(select(Notification))
+        notifications = result.scalars().all()
+        assert len(notifications) == 6 * len(recipients)
+        assert {n.user_id for n in notifications} == {u.id for u in recipients}
+        assert all(n.type == NotificationType.DEADLINE_WARNING for n in notifications)
+        assert all(n.dedup_key and n.dedup_key.startswith("deadline:") for n in notifications)
+
+    async def test_claude_context_is_batched(
+        self, test_db: AsyncSession, recipients: list[User], assert_num_queries
+    ) -> None:
+        """With an API key, similar-order context costs two statements for all orders."""
+        history_order, _ = await _seed_order(
+            test_db,
+            number="ORD-2025-900",
+            operations=[("Svařování", 1, None, OperationStatus.COMPLETED.value)],
+            status=OrderStatus.POPTAVKA,
+        )
+        orders = [
+            (
+                await _seed_order(
+                    test_db,
+                    number=f"ORD-2026-04{i}",
+                    operations=[("Svařování", 1, -1, OperationStatus.IN_PROGRESS.value)],
+                )
+            )[0]
+            for i in range(3)
+        ]
+        similar = SimilarOrderResult(
+            order_id=str(history_order.id),
+            order_number=history_order.number,
+            status="dokonceno",
+            priority="normal",
+            similarity=0.9,
         )
 
-        # Mock NotificationService
-        mock_notif_instance = AsyncMock()
-        mock_notif_instance.create_for_roles = AsyncMock(return_value=[])
-        mock_notif_cls.return_value = mock_notif_instance
-
-        service = DeadlineMonitorService(mock_db)
-        alerts = await service.check_deadlines()
-
-        assert len(alerts) == 1
-        assert alerts[0]["severity"] == "critical"
-        assert alerts[0]["order_number"] == "ORD-2026-010"
-        assert alerts[0]["operation_name"] == "Svařování"
-        assert alerts[0]["days_remaining"] < 0
-
-        # Verify notification was sent
-        mock_notif_instance.create_for_roles.assert_awaited_once()
-        call_kwargs = mock_notif_instance.create_for_roles.call_args
-        assert call_kwargs.kwargs["notification_type"] == NotificationType.DEADLINE_WARNING
+        service = DeadlineMonitorService(test_db, api_key="test-key")
+        service._client = AsyncMock()
+        text_block = MagicMock(type="text", text="Přidat směnu.")
+        service._client.messages.create = AsyncMock(return_value=MagicMock(content=[text_block]))
 
-    @patch("app.services.deadline_monitor.NotificationService")
-    async def test_operations_with_enough_time_no_alerts(
-        self, mock_notif_cls: MagicMock
+        with patch("app.services.deadline_monitor.EmbeddingService") as mock_emb:
+            find_similar_many = mock_emb.return_value.find_similar_many = AsyncMock(
+                return_value={order.id: [similar] for order in orders}
+            )
+            # operations, dedup keys, similar orders' operations, recipients, one
+            # insert (the mocked vector search is one more statement in production)
+            with assert_num_queries(5):
+                alerts = await service.check_deadlines()
+
+        assert len(alerts) == 3
+        find_similar_many.assert_awaited_once()
+        assert set(find_similar_many.await_args.args[0]) == {order.id for order in orders}
+        assert service._client.messages.create.await_count == 3
+        prompt = service._client.messages.create.await_args.kwargs["messages"][0]["content"]
+        assert "ORD-2025-900" in prompt
+
+    async def test_dedup_skips_same_or_lower_severity(
+        self, test_db: AsyncSession, recipients: list[User]
     ) -> None:
-        """Operations with plenty of time remaining produce no alerts."""
-        order = _make_order(priority=OrderPriority.LOW)
-        op = _make_operation(
-            order=order,
-            name="Řezání",
-            duration_hours=Decimal("4"),
-            planned_end=datetime.now(UTC) + timedelta(days=30),  # Far future
+        """A second run within 24h sends nothing; an escalation is sent again."""
+        order, (welding, ndt) = await _seed_order(
+            test_db,
+            number="ORD-2026-020",
+            operations=[
+                ("Svařování", 1, -1, OperationStatus.IN_PROGRESS.value),
+                ("NDT", 2, 1, OperationStatus.PLANNED.value),
+            ],
         )
+        service = DeadlineMonitorService(test_db)
+        assert len(await service.check_deadlines()) == 2
+        assert await service.check_deadlines() == []
 
-        mock_db = AsyncMock(spec=AsyncSession)
-        mock_ops_result = MagicMock()
-        mock_ops_result.scalars.return_value.all.return_value = [op]
-        mock_db.execute = AsyncMock(return_value=mock_ops_result)
-
-        service = DeadlineMonitorService(mock_db)
+        # NDT slips past its deadline: warning -> critical
+        ndt.planned_end = datetime.now(UTC) - timedelta(days=1)
+        await test_db.flush()
         alerts = await service.check_deadlines()
 
-        assert len(alerts) == 0
-
-    @patch("app.services.deadline_monitor.NotificationService")
-    async def test_dedup_skips_duplicate(self, mock_notif_cls: MagicMock) -> None:
-        """Duplicate notification within 24h is skipped."""
-        from app.models.notification import Notification
-
-        order = _make_order(number="ORD-2026-020")
-        op = _make_operation(
-            order=order,
-            name="NDT",
-            planned_end=datetime.now(UTC) - timedelta(days=1),
+        assert [(a["operation_name"], a["severity"]) for a in alerts] == [("NDT", "critical")]
+        result = await test_db.execute(
+            select(Notification.dedup_key).where(Notification.dedup_key.is_not(None)).distinct()
         )
-
-        # Existing notification from 1h ago
-        existing = MagicMock(spec=Notification)
-        existing.title = f"{order.number}: {op.name} — KRITICKÉ zpoždění"
-        existing.created_at = datetime.now(UTC) - timedelta(hours=1)
-
-        mock_db = AsyncMock(spec=AsyncSession)
-
-        mock_ops_result = MagicMock()
-        mock_ops_result.scalars.return_value.all.return_value = [op]
-
-        mock_op_result = MagicMock()
-        mock_op_result.scalar_one_or_none.return_value = op
-
-        mock_order_result = MagicMock()
-        mock_order_result.scalar_one_or_none.return_value = order
-
-        mock_dedup_result = MagicMock()
-        mock_dedup_result.scalar_one_or_none.return_value = existing
-
-        mock_db.execute = AsyncMock(
-            side_effect=[
-                mock_ops_result,
-                mock_op_result,
-                mock_order_result,
-                mock_dedup_result,
-            ]
+        assert set(result.scalars().all()) == {
+            deadline_dedup_key(order.id, welding.id, "critical"),
+            deadline_dedup_key(order.id, ndt.id, "warning"),
+            deadline_dedup_key(order.id, ndt.id, "critical"),
+        }
+
+    async def test_one_recommendation_per_order(
+        self, test_db: AsyncSession, recipients: list[User]
+    ) -> None:
+        """All alerts of an order share one recommendation call."""
+        await _seed_order(
+            test_db,
+            number="ORD-2026-030",
+            operations=[
+                ("Svařování", 1, -1, OperationStatus.IN_PROGRESS.value),
+                ("NDT", 2, 0, OperationStatus.PLANNED.value),
+            ],
         )
+        service = DeadlineMonitorService(test_db)
 
-        service = DeadlineMonitorService(mock_db)
-        alerts = await service.check_deadlines()
+        with patch.object(
+            service, "_generate_recommendation", AsyncMock(return_value="Přidat směnu.")
+        ) as generate:
+            alerts = await service.check_deadlines()
 
-        assert len(alerts) == 0
-        mock_notif_cls.return_value.create_for_roles.assert_not_called()
+        generate.assert_awaited_once()
+        order_alerts = generate.await_args.args[1]
+        assert [a["operation"].name for a in order_alerts] == ["Svařování", "NDT"]
+        assert all(a["recommendation"] == "Přidat směnu." for a in alerts)
 
 
 class TestGenerateRecommendation:
     """Tests for _generate_recommendation with Claude and fallback."""
 
-    async def test_fallback_without_api_key(self) -> None:
-        """Without API key, uses rule-based fallback."""
+    @staticmethod
+    def _alerts(order: Order) -> list[dict]:
+        impact = {"due_date_at_risk": True, "estimated_delay_days": 3, "downstream_hours": 0.0}
+        return [
+            {
+                "operation": _make_operation(order=order, name="Řezání"),
+                "severity": "info",
+                "days_remaining": 2,
+                "impact": impact,
+            },
+            {
+                "operation": _make_operation(order=order, name="Svařování", sequence=2),
+                "severity": "critical",
+                "days_remaining": -1,
+                "impact": impact,
+            },
+        ]
+
+    async def test_fallback_uses_most_severe_operation(self) -> None:
+        """Without API key, uses rule-based fallback for the worst alert."""
         order = _make_order()
-        op = _make_operation(order=order, name="Svařování")
         mock_db = AsyncMock(spec=AsyncSession)
 
         service = DeadlineMonitorService(mock_db, api_key=None)
+        result = await service._generate_recommendation(order, self._alerts(order))
+
+        assert "směn" in result or "subdodávku" in result
+
+    async def test_claude_gets_all_operations_of_order(self) -> None:
+        """One prompt lists every at-risk operation of the order."""
+        order = _make_order()
+        mock_db = AsyncMock(spec=AsyncSession)
+
+        service = DeadlineMonitorService(mock_db, api_key="test-key")
+        service._client = AsyncMock()
+        text_block = MagicMock(type="text", text="Převést NDT na subdodavatele.")
+        service._client.messages.create = AsyncMock(return_value=MagicMock(content=[text_block]))
+
+        history_order = _make_order(number="ORD-2025-100")
+        planned_end = datetime(2025, 3, 1, tzinfo=UTC)
+        history_op = _make_operation(
+            order=history_order,
+            planned_end=planned_end,
+            actual_end=planned_end + timedelta(hours=48),
+        )
+        similar = SimilarOrderResult(
+            order_id=str(history_order.id),
+            order_number=history_order.number,
+            status="dokonceno",
+            priority="normal",
+            similarity=0.8,
+        )
+
         result = await service._generate_recommendation(
-            op, order, "critical", {"due_date_at_risk": True, "estimated_delay_days": 3}
+            order, self._alerts(order), [(similar, [history_op])]
         )
 
-        assert isinstance(result, str)
-        assert len(result) > 0
-        assert "směn" in result or "subdodávku" in result
+        assert result == "Převést NDT na subdodavatele."
+        service._client.messages.create.assert_awaited_once()
+        prompt = service._client.messages.create.await_args.kwargs["messages"][0]["content"]
+        assert "Řezání" in prompt and "Svařování" in prompt
+        assert "Odhadované zpoždění: 3 dní" in prompt
+        assert "ORD-2025-100" in prompt
+        assert "Op. Svařování: +48h vs plán" in prompt
 
     async def test_claude_error_falls_back_to_rules(self) -> None:
         """Claude API error falls back to rule-based."""
         order = _make_order()
-        op = _make_operation(order=order, name="Svařování")
         mock_db = AsyncMock(spec=AsyncSession)
 
         service = DeadlineMonitorService(mock_db, api_key="test-key")
@@ -571,16 +605,7 @@ class TestGenerateRecommendation:
         service._client = AsyncMock()
         service._client.messages.create = AsyncMock(side_effect=Exception("API error"))
 
-        # Mock embedding service for similar orders
-        with patch("app.services.deadline_monitor.EmbeddingService") as mock_emb:
-            mock_emb_instance = AsyncMock()
-            mock_emb_instance.find_similar = AsyncMock(return_value=[])
-            mock_emb.return_value = mock_emb_instance
-
-            result = await service._generate_recommendation(
-                op, order, "critical",
-                {"due_date_at_risk": True, "estimated_delay_days": 3},
-            )
+        result = await service._generate_recommendation(order, self._alerts(order))
 
         assert isinstance(result, str)
         assert len(result) > 0
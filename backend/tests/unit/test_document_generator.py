@@ -1,5 +1,6 @@
 """Unit tests for document generator service."""
 
+import multiprocessing
 import sys
 import uuid
 from decimal import Decimal
@@ -16,11 +17,13 @@ from app.models.calculation import (
 )
 from app.models.customer import Customer
 from app.models.order import Order, OrderItem, OrderPriority, OrderStatus
+from app.services import pdf_renderer
 from app.services.document_generator import (
     DocumentGeneratorService,
     _format_price,
     _get_jinja_env,
 )
+from app.services.pdf_renderer import PdfRenderer
 
 # Mock weasyprint module so tests don't need system-level libpango
 _mock_weasyprint = MagicMock()
@@ -271,3 +274,133 @@ class TestDocumentGeneratorService:
         )
 
         assert pdf_bytes is not None
+
+
+def _sheet_context(number: str) -> dict[str, object]:
+    """Minimal pruvodka.html context."""
+    order = Order(number=number, status=OrderStatus.VYROBA, priority=OrderPriority.NORMAL)
+    return {"order": order, "items": [], "company": {"name": "Infer s.r.o."}}
+
+
+def _renderer_processes_in_child(queue: multiprocessing.Queue) -> None:
+    """Report the worker count the shared renderer picks in this process."""
+    pdf_renderer.get_pdf_renderer.cache_clear()
+    queue.put(pdf_renderer.get_pdf_renderer()._processes)
+
+
+class TestGetPdfRenderer:
+    """Tests for the real process-wide renderer (no inline override)."""
+
+    @pytest.fixture(autouse=True)
+    def _inline_pdf_renderer(self) -> None:
+        """Replace the conftest fixture so the real getter is exercised."""
+        pdf_renderer.get_pdf_renderer.cache_clear()
+        yield
+        pdf_renderer.get_pdf_renderer.cache_clear()
+
+    def test_uses_configured_processes(self) -> None:
+        """Outside a daemonic process the configured pool size is kept."""
+        expected = pdf_renderer.get_settings().PDF_RENDER_PROCESSES
+        assert expected > 0
+        assert pdf_renderer.get_pdf_renderer()._processes == expected
+
+    def test_daemonic_process_renders_in_thread(self) -> None:
+        """Prefork worker children are daemonic and must not start a pool."""
+        ctx = multiprocessing.get_context("fork")
+        queue = ctx.Queue()
+        child = ctx.Process(target=_renderer_processes_in_child, args=(queue,), daemon=True)
+        child.start()
+        processes = queue.get(timeout=30)
+        child.join(timeout=30)
+
+        assert processes == 0
+
+
+class TestPdfRenderer:
+    """Tests for the shared PdfRenderer used by DocumentGeneratorService."""
+
+    @pytest.fixture(autouse=True)
+    def _mock_weasyprint(self) -> None:
+        """Mock weasyprint module to avoid needing system-level libpango."""
+        self.mock_module = MagicMock()
+        self.mock_module.HTML.return_value.write_pdf.side_effect = (
+            lambda **_: f"%PDF-{self.mock_module.HTML.call_count}".encode()
+        )
+        original = sys.modules.get("weasyprint")
+        sys.modules["weasyprint"] = self.mock_module
+        yield
+        if original is not None:
+            sys.modules["weasyprint"] = original
+        else:
+            sys.modules.pop("weasyprint", None)
+
+    def test_html_uses_precompiled_stylesheet(self) -> None:
+        """Base CSS is left out of the HTML and passed as a shared stylesheet."""
+        renderer = PdfRenderer()
+        html = renderer.render_html("pruvodka.html", _sheet_context("ZK-1"))
+
+        assert ".info-grid" not in html
+        assert ".checkpoint" in html  # template-specific styles stay inline
+
+    async def test_stylesheet_and_fonts_built_once(self) -> None:
+        """Stylesheet and font configuration are created once per process."""
+        renderer = PdfRenderer()
+        await renderer.render("pruvodka.html", _sheet_context("ZK-1"))
+        await renderer.render("pruvodka.html", _sheet_context("ZK-2"))
+
+        self.mock_module.CSS.assert_called_once()
+        self.mock_module.text.fonts.FontConfiguration.assert_called_once()
+        write_kwargs = self.mock_module.HTML.return_value.write_pdf.call_args.kwargs
+        assert write_kwargs["stylesheets"] == [self.mock_module.CSS.return_value]
+
+    async def test_identical_documents_are_cached(self) -> None:
+        """Same template and data render once; different data renders again."""
+        renderer = PdfRenderer()
+        context = _sheet_context("ZK-1")
+
+        first = await renderer.render("pruvodka.html", context)
+        second = await renderer.render("pruvodka.html", dict(context))
+        other = await renderer.render("pruvodka.html", _sheet_context("ZK-2"))
+
+        assert first == second
+        assert other != first
+        assert self.mock_module.HTML.call_count == 2
+
+    async def test_cache_is_bounded(self) -> None:
+        """Least recently used PDFs are evicted beyond cache_size."""
+        renderer = PdfRenderer(cache_size=1)
+        ctx_a = _sheet_context("A")
+        ctx_b = _sheet_context("B")
+
+        await renderer.render("pruvodka.html", ctx_a)
+        await renderer.render("pruvodka.html", ctx_b)
+        await renderer.render("pruvodka.html", ctx_a)
+
+        assert self.mock_module.HTML.call_count == 3
+
+    async def test_generate_production_sheets_batch(
+        self,
+        test_db: AsyncSession,
+        order_with_calculation: tuple[Order, Calculation],
+    ) -> None:
+        """Batch generation returns one PDF per requested order."""
+        order, _ = order_with_calculation
+        second = Order(customer_id=order.customer_id, number="ZK-2024-BATCH", status=OrderStatus.VYROBA)
+        test_db.add(second)
+        await test_db.flush()
+
+        service = DocumentGeneratorService(test_db, renderer=PdfRenderer())
+        pdfs = await service.generate_production_sheets_pdf([order.id, second.id])
+
+        assert list(pdfs) == [order.id, second.id]
+        assert self.mock_module.HTML.call_count == 2
+        rendered = [c.kwargs["string"] for c in self.mock_module.HTML.call_args_list]
+        assert any("ZK-2024-BATCH" in html for html in rendered)
+
+    async def test_generate_production_sheets_missing_order(
+        self, test_db: AsyncSession
+    ) -> None:
+        """Batch generation fails when an order does not exist."""
+        service = DocumentGeneratorService(test_db, renderer=PdfRenderer())
+        with pytest.raises(ValueError, match="nenalezeny"):
+            await service.generate_production_sheets_pdf([uuid.uuid4()])
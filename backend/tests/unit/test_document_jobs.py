@@ -0,0 +1,334 @@
+"""Tests for asynchronous document generation jobs."""
+
+import json
+import sys
+import uuid
+from collections.abc import AsyncGenerator, Generator
+from contextlib import asynccontextmanager
+from decimal import Decimal
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.v1.documents import _enqueue_document_job, get_document_job
+from app.core.config import Settings
+from app.models import Document, DocumentCategory
+from app.models.customer import Customer
+from app.models.order import Order, OrderItem, OrderStatus
+from app.services import document_generator_tasks, pdf_renderer
+from app.services.document_generator_tasks import (
+    DOCUMENT_JOB_KINDS,
+    _generate_and_store,
+    _publish_job_progress,
+    generate_document,
+)
+
+
+@pytest.fixture(autouse=True)
+def _mock_weasyprint() -> Generator[None, None, None]:
+    """Mock weasyprint module to avoid needing system-level libpango."""
+    mock_module = MagicMock()
+    mock_module.HTML.return_value.write_pdf.return_value = b"%PDF-1.4 job pdf"
+    original = sys.modules.get("weasyprint")
+    sys.modules["weasyprint"] = mock_module
+    yield
+    if original is not None:
+        sys.modules["weasyprint"] = original
+    else:
+        sys.modules.pop("weasyprint", None)
+
+
+@pytest.fixture
+async def order(test_db: AsyncSession) -> Order:
+    """Create an order with a customer and one item."""
+    customer = Customer(
+        company_name="Job Steel s.r.o.",
+        ico="87654321",
+        contact_name="Petr Dvořák",
+        email="petr@job-steel.cz",
+    )
+    test_db.add(customer)
+    await test_db.flush()
+
+    order = Order(customer_id=customer.id, number="ZK-2024-JOB", status=OrderStatus.VYROBA)
+    test_db.add(order)
+    await test_db.flush()
+    test_db.add(
+        OrderItem(order_id=order.id, name="Příruba DN100", quantity=Decimal("4"), unit="ks")
+    )
+    await test_db.flush()
+    return order
+
+
+class TestGenerateAndStore:
+    """Tests for rendering + persisting a document inside the worker."""
+
+    async def test_persists_generated_pdf(
+        self, test_db: AsyncSession, order: Order, tmp_path: Path
+    ) -> None:
+        """The rendered PDF is stored as an order document."""
+        settings = Settings(SECRET_KEY="test_secret_key_not_for_production")
+        settings.UPLOAD_DIR = str(tmp_path)
+
+        @asynccontextmanager
+        async def session_factory() -> AsyncGenerator[AsyncSession, None]:
+            yield test_db
+
+        rendered_sizes: list[int] = []
+        with (
+            patch.object(document_generator_tasks, "AsyncSessionLocal", session_factory),
+            patch("app.services.document.get_settings", return_value=settings),
+        ):
+            result = await _generate_and_store(
+                "material-certificate",
+                order.id,
+                {"certificate_type": "3.2"},
+                None,
+                rendered_sizes.append,
+            )
+
+        assert result["file_name"] == "atestace_32_ZK-2024-JOB.pdf"
+        assert rendered_sizes == [len(b"%PDF-1.4 job pdf")]
+
+        document = (
+            await test_db.execute(select(Document).where(Document.id == uuid.UUID(result["document_id"])))
+        ).scalar_one()
+        assert document.entity_id == order.id
+        assert document.category == DocumentCategory.ATESTACE
+        assert document.description == "Vygenerovaná atestace EN 10-204 3.2"
+
+    def test_every_kind_maps_to_generator_method(self) -> None:
+        """Each job kind points at an existing DocumentGeneratorService method."""
+        from app.services.document_generator import DocumentGeneratorService
+
+        for kind in DOCUMENT_JOB_KINDS.values():
+            assert callable(getattr(DocumentGeneratorService, kind.method))
+
+
+class TestGenerateAndStoreInWorker:
+    """The worker path with the real shared renderer (no inline override)."""
+
+    @pytest.fixture(autouse=True)
+    def _inline_pdf_renderer(self) -> Generator[None, None, None]:
+        """Replace the conftest fixture; pretend to be a prefork worker child."""
+        pdf_renderer.get_pdf_renderer.cache_clear()
+        with (
+            patch.object(pdf_renderer, "_engine", None),
+            patch.object(
+                pdf_renderer.multiprocessing,
+                "current_process",
+                return_value=MagicMock(daemon=True),
+            ),
+        ):
+            yield
+        pdf_renderer.get_pdf_renderer.cache_clear()
+
+    async def test_renders_in_thread_inside_daemonic_worker(
+        self, test_db: AsyncSession, order: Order, tmp_path: Path
+    ) -> None:
+        """Prefork children cannot start a pool, so the job renders in a thread."""
+        settings = Settings(SECRET_KEY="test_secret_key_not_for_production")
+        settings.UPLOAD_DIR = str(tmp_path)
+
+        @asynccontextmanager
+        async def session_factory() -> AsyncGenerator[AsyncSession, None]:
+            yield test_db
+
+        with (
+            patch.object(document_generator_tasks, "AsyncSessionLocal", session_factory),
+            patch("app.services.document.get_settings", return_value=settings),
+        ):
+            result = await _generate_and_store("offer", order.id, {}, None, lambda _: None)
+
+        renderer = pdf_renderer.get_pdf_renderer()
+        assert renderer._processes == 0
+        assert renderer._executor is None
+        assert result["file_name"] == f"nabidka_{order.id}.pdf"
+
+
+class TestGenerateDocumentTask:
+    """Tests for the generate_document Celery task."""
+
+    @pytest.fixture(autouse=True)
+    def _patch_task(self) -> Generator[None, None, None]:
+        with (
+            patch.object(generate_document, "update_state") as self.update_state,
+            patch.object(document_generator_tasks, "_publish_job_progress") as self.publish,
+        ):
+            yield
+
+    def test_completed_job(self) -> None:
+        """A successful job returns the stored document and notifies the user."""
+        order_id, user_id = str(uuid.uuid4()), str(uuid.uuid4())
+        stored = {"document_id": str(uuid.uuid4()), "file_name": "nabidka.pdf", "size_bytes": 10}
+
+        async def fake_store(*args: object) -> dict[str, object]:
+            return stored
+
+        with patch.object(document_generator_tasks, "_generate_and_store", fake_store):
+            result = generate_document.apply(args=("offer", order_id, {}, user_id)).get()
+
+        assert result == {"status": "completed", **stored}
+        self.update_state.assert_called_with(state="PROGRESS", meta={"stage": "rendering"})
+        statuses = [c.args[4] for c in self.publish.call_args_list]
+        assert statuses == ["running", "completed"]
+        assert self.publish.call_args.args[0] == user_id
+
+    def test_missing_order_fails_without_retry(self) -> None:
+        """ValueError from the generator fails the job immediately."""
+
+        async def fake_store(*args: object) -> dict[str, object]:
+            raise ValueError("Zakázka nenalezena")
+
+        with patch.object(document_generator_tasks, "_generate_and_store", fake_store):
+            result = generate_document.apply(args=("invoice", str(uuid.uuid4()))).get()
+
+        assert result == {"status": "failed", "error": "Zakázka nenalezena"}
+        assert self.publish.call_args.args[4] == "failed"
+
+    def test_unknown_kind(self) -> None:
+        """Unknown document kinds are rejected."""
+        result = generate_document.apply(args=("brochure", str(uuid.uuid4()))).get()
+
+        assert result["status"] == "failed"
+
+    def test_progress_messages_are_throttled(self) -> None:
+        """Progress steps in quick succession publish one running message."""
+
+        async def fake_store(*args: object) -> dict[str, object]:
+            args[-1](10)  # type: ignore[operator]
+            return {"document_id": str(uuid.uuid4()), "file_name": "a.pdf", "size_bytes": 10}
+
+        with patch.object(document_generator_tasks, "_generate_and_store", fake_store):
+            generate_document.apply(args=("offer", str(uuid.uuid4()), {}, str(uuid.uuid4())))
+
+        assert self.update_state.call_count == 2
+        statuses = [c.args[4] for c in self.publish.call_args_list]
+        assert statuses == ["running", "completed"]
+
+    def test_runs_with_engine_pool_reset(self) -> None:
+        """The job runs through the worker helper that disposes the engine pool."""
+        with patch.object(
+            document_generator_tasks, "_run_async", return_value={
+                "document_id": str(uuid.uuid4()), "file_name": "a.pdf", "size_bytes": 1,
+            },
+        ) as run_async:
+            result = generate_document.apply(args=("offer", str(uuid.uuid4()))).get()
+
+        run_async.assert_called_once()
+        run_async.call_args.args[0].close()
+        assert result["status"] == "completed"
+
+
+class TestPublishJobProgress:
+    """Tests for WebSocket progress messages."""
+
+    def test_publishes_to_notification_channel(self) -> None:
+        """Progress is published for the requesting user on the notifications channel."""
+        mock_redis = MagicMock()
+        with patch.object(document_generator_tasks, "_redis", mock_redis):
+            _publish_job_progress("user-1", "job-1", "offer", "order-1", "running", {"stage": "rendering"})
+
+        channel, payload = mock_redis.publish.call_args.args
+        assert channel == "notifications"
+        data = json.loads(payload)
+        assert data["user_id"] == "user-1"
+        assert data["message"] == {
+            "type": "document_job",
+            "job_id": "job-1",
+            "kind": "offer",
+            "order_id": "order-1",
+            "status": "running",
+            "stage": "rendering",
+        }
+
+    def test_skips_without_user(self) -> None:
+        """Jobs without a requesting user publish nothing."""
+        with patch.object(document_generator_tasks, "_redis", MagicMock()) as mock_redis:
+            _publish_job_progress(None, "job-1", "offer", "order-1", "running")
+
+        mock_redis.publish.assert_not_called()
+
+
+class TestDocumentJobEndpoints:
+    """Tests for the async-mode API helpers."""
+
+    @pytest.fixture
+    def owners(self) -> Generator[dict[str, str], None, None]:
+        """Job owners kept in memory instead of Redis."""
+        owners: dict[str, str] = {}
+        with (
+            patch.object(document_generator_tasks, "remember_job_owner", owners.__setitem__),
+            patch.object(document_generator_tasks, "get_job_owner", owners.get),
+        ):
+            yield owners
+
+    async def test_enqueue_returns_202_with_job_id(self, owners: dict[str, str]) -> None:
+        """Async mode records the owner, queues the task and returns the job id."""
+        user = MagicMock(id=uuid.uuid4())
+        order_id = uuid.uuid4()
+        with patch.object(generate_document, "apply_async") as apply_async:
+            response = await _enqueue_document_job("offer", order_id, {"valid_days": 30}, user)
+
+        job_id = json.loads(response.body)["job_id"]
+        apply_async.assert_called_once_with(
+            args=("offer", str(order_id), {"valid_days": 30}, str(user.id)), task_id=job_id
+        )
+        assert owners == {job_id: str(user.id)}
+        assert response.status_code == 202
+        assert response.headers["Location"].endswith(f"/generate/jobs/{job_id}")
+
+    @pytest.mark.parametrize(
+        ("state", "info", "expected_status"),
+        [
+            ("PENDING", None, "queued"),
+            ("PROGRESS", {"stage": "persisting"}, "running"),
+            ("SUCCESS", {"status": "failed", "error": "x"}, "failed"),
+            ("FAILURE", RuntimeError("boom"), "failed"),
+        ],
+    )
+    async def test_job_status(
+        self, owners: dict[str, str], state: str, info: object, expected_status: str
+    ) -> None:
+        """Celery task states map to job statuses."""
+        user = MagicMock(id=uuid.uuid4())
+        owners["job-1"] = str(user.id)
+        with patch("celery.result.AsyncResult", return_value=MagicMock(state=state, info=info)):
+            job = await get_document_job("job-1", user=user)
+
+        assert job.status == expected_status
+
+    async def test_completed_job_links_download(self, owners: dict[str, str]) -> None:
+        """Completed jobs point to the stored document download."""
+        user = MagicMock(id=uuid.uuid4())
+        owners["job-1"] = str(user.id)
+        document_id = uuid.uuid4()
+        info = {
+            "status": "completed",
+            "document_id": str(document_id),
+            "file_name": "nabidka.pdf",
+            "size_bytes": 123,
+        }
+        with patch("celery.result.AsyncResult", return_value=MagicMock(state="SUCCESS", info=info)):
+            job = await get_document_job("job-1", user=user)
+
+        assert job.document_id == document_id
+        assert job.download_url == f"/api/v1/dokumenty/{document_id}/download"
+
+    @pytest.mark.parametrize("owner", [None, "someone-else"])
+    async def test_other_users_job_is_not_found(
+        self, owners: dict[str, str], owner: str | None
+    ) -> None:
+        """Jobs of other users (or unknown jobs) are reported as missing."""
+        if owner:
+            owners["job-1"] = owner
+        with patch("celery.result.AsyncResult") as async_result:
+            with pytest.raises(HTTPException) as exc:
+                await get_document_job("job-1", user=MagicMock(id=uuid.uuid4()))
+
+        assert exc.value.status_code == 404
+        async_result.assert_not_called()
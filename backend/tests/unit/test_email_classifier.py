@@ -254,3 +254,77 @@ class TestEmailClassifier:
         long_body = "x" * 5000
         msg = EmailClassifier._build_user_message("Test", long_body)
         assert "[... text zkracen ...]" in msg
+
+
+class TestClassifyBatch:
+    """Tests for classifying several emails with one API call."""
+
+    @pytest.fixture
+    def classifier(self) -> EmailClassifier:
+        """Create classifier with test API key."""
+        return EmailClassifier(api_key="test-key")
+
+    @staticmethod
+    def _batch_block(items: list[dict]) -> MagicMock:
+        block = MagicMock()
+        block.type = "tool_use"
+        block.name = "classify_emails"
+        block.input = {"classifications": items}
+        return block
+
+    async def test_results_follow_input_order(self, classifier: EmailClassifier) -> None:
+        """Each email gets the item with its index; one call for the whole batch."""
+        response = _make_response(
+            [
+                self._batch_block(
+                    [
+                        {"index": 1, "category": "reklamace", "confidence": 0.9, "reasoning": "b"},
+                        {"index": 0, "category": "poptavka", "confidence": 0.95, "reasoning": "a"},
+                    ]
+                )
+            ]
+        )
+
+        with patch.object(
+            classifier._client.messages, "create", new_callable=AsyncMock, return_value=response
+        ) as create:
+            results = await classifier.classify_batch(
+                [("Poptavka kolena", "Prosim o nabidku"), ("Reklamace", "Vadne koleno")]
+            )
+
+        assert create.await_count == 1
+        assert "index=\"1\"" in create.await_args.kwargs["messages"][0]["content"]
+        assert [r.category for r in results] == ["poptavka", "reklamace"]
+
+    async def test_missing_and_invalid_items_are_none(self, classifier: EmailClassifier) -> None:
+        """Emails without a valid item in the response are left for single classification."""
+        response = _make_response(
+            [
+                self._batch_block(
+                    [
+                        {"index": 0, "category": "dotaz", "confidence": 0.9, "reasoning": "a"},
+                        {"index": 7, "category": "dotaz", "confidence": 0.9, "reasoning": "x"},
+                    ]
+                )
+            ]
+        )
+
+        with patch.object(
+            classifier._client.messages, "create", new_callable=AsyncMock, return_value=response
+        ):
+            results = await classifier.classify_batch([("a", "a"), ("b", "b")])
+
+        assert results[0] is not None and results[0].category == "dotaz"
+        assert results[1] is None
+
+    async def test_api_error_returns_none_for_all(self, classifier: EmailClassifier) -> None:
+        """A failed batch call yields no results instead of raising."""
+        with patch.object(
+            classifier._client.messages,
+            "create",
+            new_callable=AsyncMock,
+            side_effect=RuntimeError("API error"),
+        ):
+            results = await classifier.classify_batch([("a", "a"), ("b", "b")])
+
+        assert results == [None, None]
@@ -1,12 +1,23 @@
 """Unit tests for Excel parser and exporter."""
 
+import threading
+from collections.abc import AsyncIterator
+from datetime import date
+from decimal import Decimal
+from io import BytesIO
 from pathlib import Path
+from typing import Any
+from unittest.mock import patch
 
 import pytest
 from openpyxl import Workbook, load_workbook
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.integrations.excel.exporter import ExcelExporter
 from app.integrations.excel.parser import ExcelParser
+from app.integrations.excel.streaming import StreamingXlsxWriter, XlsxColumn, iter_query_rows
+from app.models.customer import Customer
 
 
 class TestExcelParser:
@@ -423,6 +434,26 @@ class TestExcelExporter:
 
         wb.close()
 
+    async def test_export_writes_off_the_event_loop(
+        self, exporter: ExcelExporter, tmp_path: Path
+    ) -> None:
+        """Compression and file writes of in-memory rows run in a worker thread."""
+        loop_thread = threading.get_ident()
+        write_threads: list[int] = []
+        original = StreamingXlsxWriter.write_file
+
+        def recording_write_file(self: StreamingXlsxWriter, *args: Any, **kwargs: Any) -> int:
+            write_threads.append(threading.get_ident())
+            return original(self, *args, **kwargs)
+
+        with patch.object(StreamingXlsxWriter, "write_file", recording_write_file):
+            await exporter.export_generic([{"a": 1}], str(tmp_path / "generic.xlsx"))
+            await exporter.export_orders([{"cislo": "Z-1"}], str(tmp_path / "orders.xlsx"))
+            await exporter.export_calculations([{"id": "K-1"}], str(tmp_path / "calc.xlsx"))
+
+        assert len(write_threads) == 3
+        assert loop_thread not in write_threads
+
     @pytest.mark.asyncio
     async def test_export_orders_empty_list_raises_error(
         self,
@@ -649,3 +680,170 @@ class TestExcelExporter:
         assert 'Kč' in price_cell.number_format
 
         wb.close()
+
+
+class TestStreamingXlsxWriter:
+    """Tests for the write-only streaming XLSX writer."""
+
+    @pytest.fixture
+    def columns(self) -> list[XlsxColumn]:
+        """Sheet columns with one currency column."""
+        return [XlsxColumn("Číslo"), XlsxColumn("Datum"), XlsxColumn("Částka", currency=True)]
+
+    async def test_streams_multiple_chunks(self, columns: list[XlsxColumn]) -> None:
+        """Large exports are produced as several chunks, not one final blob."""
+
+        async def rows() -> AsyncIterator[list[object]]:
+            for i in range(5000):
+                yield [f"Z-{i:05d}", date(2024, 1, 1), Decimal(i) / 3]
+
+        writer = StreamingXlsxWriter(columns, "Zakázky", rows_per_chunk=500)
+        chunks = [chunk async for chunk in writer.stream(rows())]
+
+        assert len(chunks) > 2
+        assert writer.row_count == 5000
+
+        wb = load_workbook(BytesIO(b"".join(chunks)))
+        ws = wb.active
+        assert ws is not None
+        assert ws.title == "Zakázky"
+        assert ws.max_row == 5001
+        assert ws.cell(row=5001, column=1).value == "Z-04999"
+        assert ws.cell(row=2, column=2).number_format == "mm-dd-yy"
+        wb.close()
+
+    async def test_header_widths_and_column_styles(self, columns: list[XlsxColumn]) -> None:
+        """Header is styled and frozen, widths come from the sample, currency is per column."""
+        rows = [["Z-1", None, 1500.5], ["x" * 80, None, "n/a"]]
+
+        content = await StreamingXlsxWriter(columns).to_bytes(rows)
+
+        wb = load_workbook(BytesIO(content))
+        ws = wb.active
+        assert ws is not None
+        assert ws.freeze_panes == "A2"
+        assert ws.cell(row=1, column=1).font.bold
+        assert ws.cell(row=1, column=1).fill.fgColor.rgb == "FF366092"
+        assert ws.column_dimensions["A"].width == 50
+        assert ws.column_dimensions["B"].width == 10
+        assert "Kč" in ws.cell(row=2, column=3).number_format
+        assert ws.cell(row=3, column=3).value == "n/a"
+        assert ws.cell(row=2, column=2).value is None
+        assert wb.properties.creator == "inferbox"
+        wb.close()
+
+    async def test_footer_rows_are_bold(self, columns: list[XlsxColumn]) -> None:
+        """Footer rows follow a blank separator row and are bold."""
+        content = await StreamingXlsxWriter(columns).to_bytes(
+            [["Z-1", "", 10]], footer_rows=[["Celkem", "", 10]]
+        )
+
+        wb = load_workbook(BytesIO(content))
+        ws = wb.active
+        assert ws is not None
+        assert ws.cell(row=3, column=1).value is None
+        assert ws.cell(row=4, column=1).value == "Celkem"
+        assert ws.cell(row=4, column=1).font.bold
+        assert "Kč" in ws.cell(row=4, column=3).number_format
+        wb.close()
+
+    async def test_escapes_and_strips_illegal_characters(self) -> None:
+        """XML special characters survive and control characters are dropped."""
+        content = await StreamingXlsxWriter([XlsxColumn("Text")], "A&B <test>").to_bytes(
+            [['<b>"Ocel" & spol.</b>\x01']]
+        )
+
+        wb = load_workbook(BytesIO(content))
+        ws = wb.active
+        assert ws is not None
+        assert ws.title == "A&B <test>"
+        assert ws.cell(row=2, column=1).value == '<b>"Ocel" & spol.</b>'
+        wb.close()
+
+    async def test_non_finite_numbers_are_written_as_empty_cells(self) -> None:
+        """NaN and infinity produce a valid workbook with empty cells."""
+        content = await StreamingXlsxWriter(
+            [XlsxColumn("Text"), XlsxColumn("Cena", currency=True)]
+        ).to_bytes(
+            [
+                ["nan", float("nan")],
+                ["inf", float("inf")],
+                ["-inf", Decimal("-Infinity")],
+                ["ok", 1.5],
+            ]
+        )
+
+        wb = load_workbook(BytesIO(content))
+        ws = wb.active
+        assert ws is not None
+        assert [ws.cell(row=r, column=2).value for r in range(2, 6)] == [None, None, None, 1.5]
+        wb.close()
+
+    async def test_footer_computed_after_rows(self) -> None:
+        """A callable footer sees totals accumulated while the rows streamed."""
+        total = 0
+
+        def rows():  # type: ignore[no-untyped-def]
+            nonlocal total
+            for value in (1, 2, 3):
+                total += value
+                yield ["x", value]
+
+        content = await StreamingXlsxWriter([XlsxColumn("A"), XlsxColumn("B")]).to_bytes(
+            rows(), footer_rows=lambda: [["Celkem", total]]
+        )
+
+        ws = load_workbook(BytesIO(content)).active
+        assert ws is not None
+        assert [ws.cell(row=6, column=c).value for c in (1, 2)] == ["Celkem", 6]
+
+    def test_write_file_without_event_loop(
+        self, columns: list[XlsxColumn], tmp_path: Path
+    ) -> None:
+        """The blocking writer streams chunks the same way as the async one."""
+        rows = [[f"Z-{i}", date(2024, 1, 1), Decimal(i)] for i in range(1200)]
+        writer = StreamingXlsxWriter(columns, width_sample_rows=10, rows_per_chunk=500)
+        output = tmp_path / "sync" / "export.xlsx"
+
+        size = writer.write_file(output, rows, footer_rows=[["Celkem", "", 1]])
+
+        assert size == output.stat().st_size
+        assert writer.row_count == 1200
+        assert len(list(writer.iter_chunks(rows))) > 2
+        ws = load_workbook(output).active
+        assert ws is not None
+        assert ws.cell(row=1201, column=1).value == "Z-1199"
+        assert ws.cell(row=1203, column=1).value == "Celkem"
+
+    def test_requires_columns(self) -> None:
+        """A sheet without columns is rejected."""
+        with pytest.raises(ValueError, match="At least one column"):
+            StreamingXlsxWriter([])
+
+    async def test_rows_from_server_side_cursor(self, test_db: AsyncSession) -> None:
+        """Rows can be streamed straight from a column-projected query."""
+        for i in range(3):
+            test_db.add(
+                Customer(
+                    company_name=f"Firma {i}",
+                    ico=f"1000000{i}",
+                    contact_name="Jan Novák",
+                    email=f"firma{i}@example.cz",
+                )
+            )
+        await test_db.flush()
+
+        rows = iter_query_rows(
+            test_db,
+            select(Customer.company_name, Customer.ico).order_by(Customer.ico),
+            batch_size=2,
+        )
+        content = await StreamingXlsxWriter(
+            [XlsxColumn("Firma"), XlsxColumn("IČO")]
+        ).to_bytes(rows)
+
+        wb = load_workbook(BytesIO(content))
+        ws = wb.active
+        assert ws is not None
+        assert [c.value for c in ws["A"]] == ["Firma", "Firma 0", "Firma 1", "Firma 2"]
+        wb.close()
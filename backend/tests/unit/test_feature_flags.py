@@ -0,0 +1,202 @@
+"""Unit tests for the fleet-wide feature flag snapshot."""
+
+import queue
+import time
+from collections.abc import Iterator
+from unittest.mock import patch
+
+import pytest
+from redis import RedisError
+
+from app.core.config import get_settings
+from app.core.feature_flags import CHANGED_CHANNEL, FLAG_NAMES, FeatureFlags
+
+
+class _FakePubSub:
+    def __init__(self, redis: "_FakeRedis") -> None:
+        self.redis = redis
+        self.messages: queue.Queue[dict[str, str]] = queue.Queue()
+
+    def subscribe(self, channel: str) -> None:
+        self.redis.subscribers.setdefault(channel, []).append(self)
+        self.messages.put({"type": "subscribe", "channel": channel})
+
+    def get_message(self, timeout: float) -> dict[str, str] | None:
+        try:
+            return self.messages.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self) -> None:
+        for subscribers in self.redis.subscribers.values():
+            if self in subscribers:
+                subscribers.remove(self)
+
+
+class _FakeRedis:
+    """The subset of redis-py used by the flags, kept in memory."""
+
+    def __init__(self) -> None:
+        self.values: dict[str, str] = {}
+        self.subscribers: dict[str, list[_FakePubSub]] = {}
+        self.mget_calls = 0
+        self.fail = False
+
+    def mget(self, keys: list[str]) -> list[str | None]:
+        if self.fail:
+            raise RedisError("connection refused")
+        self.mget_calls += 1
+        return [self.values.get(key) for key in keys]
+
+    def mset(self, mapping: dict[str, str]) -> None:
+        self.values.update(mapping)
+
+    def publish(self, channel: str, message: str) -> None:
+        for pubsub in self.subscribers.get(channel, []):
+            pubsub.messages.put({"type": "message", "channel": channel, "data": message})
+
+    def pipeline(self) -> "_FakeRedis":
+        if self.fail:
+            raise RedisError("connection refused")
+        return self
+
+    def execute(self) -> None:
+        pass
+
+    def pubsub(self) -> _FakePubSub:
+        return _FakePubSub(self)
+
+
+@pytest.fixture
+def redis() -> _FakeRedis:
+    return _FakeRedis()
+
+
+@pytest.fixture
+def flags(redis: _FakeRedis) -> Iterator[FeatureFlags]:
+    """Flags without the invalidation listener (tested separately)."""
+    with patch.object(FeatureFlags, "_ensure_listener"):
+        yield FeatureFlags(ttl_seconds=60, redis=redis)  # type: ignore[arg-type]
+
+
+def _defaults() -> dict[str, bool]:
+    settings = get_settings()
+    return {name: getattr(settings, name) for name in FLAG_NAMES}
+
+
+def test_defaults_come_from_settings(flags: FeatureFlags) -> None:
+    assert flags.snapshot() == _defaults()
+
+
+def test_redis_overrides_settings(flags: FeatureFlags, redis: _FakeRedis) -> None:
+    redis.values["feature_flag:ORCHESTRATION_ENABLED"] = "true"
+    redis.values["feature_flag:ORCHESTRATION_AUTO_OFFER"] = "1"
+    redis.values["feature_flag:POHODA_AUTO_SYNC"] = "0"
+
+    snapshot = flags.snapshot()
+
+    assert snapshot["ORCHESTRATION_ENABLED"] is True
+    assert snapshot["ORCHESTRATION_AUTO_OFFER"] is True
+    assert snapshot["POHODA_AUTO_SYNC"] is False
+
+
+def test_reads_are_served_from_the_snapshot(flags: FeatureFlags, redis: _FakeRedis) -> None:
+    for _ in range(100):
+        flags.is_enabled("ORCHESTRATION_ENABLED")
+
+    assert redis.mget_calls == 1
+
+
+def test_snapshot_expires_after_ttl(redis: _FakeRedis) -> None:
+    with patch.object(FeatureFlags, "_ensure_listener"):
+        flags = FeatureFlags(ttl_seconds=0.01, redis=redis)  # type: ignore[arg-type]
+        flags.snapshot()
+        redis.values["feature_flag:ORCHESTRATION_ENABLED"] = "1"
+        time.sleep(0.02)
+
+        assert flags.is_enabled("ORCHESTRATION_ENABLED") is True
+    assert redis.mget_calls == 2
+
+
+def test_update_writes_overrides_and_publishes(flags: FeatureFlags, redis: _FakeRedis) -> None:
+    subscriber = redis.pubsub()
+    subscriber.subscribe(CHANGED_CHANNEL)
+    flags.snapshot()
+
+    result = flags.update({"ORCHESTRATION_AUTO_CALCULATE": True, "POHODA_AUTO_SYNC": False})
+
+    assert redis.values["feature_flag:ORCHESTRATION_AUTO_CALCULATE"] == "1"
+    assert redis.values["feature_flag:POHODA_AUTO_SYNC"] == "0"
+    assert result["ORCHESTRATION_AUTO_CALCULATE"] is True
+    subscriber.get_message(timeout=0)  # subscribe confirmation
+    assert subscriber.get_message(timeout=0)["type"] == "message"  # type: ignore[index]
+
+
+def test_update_rejects_unknown_flags(flags: FeatureFlags, redis: _FakeRedis) -> None:
+    with pytest.raises(ValueError, match="NOT_A_FLAG"):
+        flags.update({"NOT_A_FLAG": True})
+
+    assert redis.values == {}
+
+
+def test_update_raises_when_redis_is_down(flags: FeatureFlags, redis: _FakeRedis) -> None:
+    redis.fail = True
+
+    with pytest.raises(RedisError):
+        flags.update({"ORCHESTRATION_ENABLED": True})
+
+
+def test_redis_outage_keeps_last_snapshot(redis: _FakeRedis) -> None:
+    redis.values["feature_flag:ORCHESTRATION_ENABLED"] = "1"
+    with patch.object(FeatureFlags, "_ensure_listener"):
+        flags = FeatureFlags(ttl_seconds=0.01, redis=redis)  # type: ignore[arg-type]
+        assert flags.is_enabled("ORCHESTRATION_ENABLED") is True
+
+        redis.fail = True
+        time.sleep(0.02)
+        assert flags.is_enabled("ORCHESTRATION_ENABLED") is True
+        # Redis is not retried on every read during the outage
+        assert flags._client() is None
+
+
+def test_redis_outage_without_snapshot_uses_defaults(flags: FeatureFlags, redis: _FakeRedis) -> None:
+    redis.fail = True
+
+    assert flags.snapshot() == _defaults()
+
+
+def test_refresh_racing_an_invalidation_is_not_kept(flags: FeatureFlags, redis: _FakeRedis) -> None:
+    original_mget = redis.mget
+
+    def mget_then_invalidate(keys: list[str]) -> list[str | None]:
+        values = original_mget(keys)
+        flags.invalidate()  # a change published while MGET was in flight
+        return values
+
+    with patch.object(redis, "mget", side_effect=mget_then_invalidate):
+        flags.snapshot()
+
+    assert flags._snapshot is None
+
+
+def test_published_change_invalidates_other_processes(redis: _FakeRedis) -> None:
+    reader = FeatureFlags(ttl_seconds=60, redis=redis)  # type: ignore[arg-type]
+    reader._LISTENER_RETRY_SECONDS = 0.01
+    writer = FeatureFlags(ttl_seconds=60, redis=redis)  # type: ignore[arg-type]
+    try:
+        assert reader.is_enabled("ORCHESTRATION_AUTO_OFFER") is False
+        _wait_until(lambda: redis.subscribers.get(CHANGED_CHANNEL))
+
+        with patch.object(writer, "_ensure_listener"):
+            writer.update({"ORCHESTRATION_AUTO_OFFER": True})
+
+        _wait_until(lambda: reader.is_enabled("ORCHESTRATION_AUTO_OFFER"))
+    finally:
+        reader.close()
+
+
+def _wait_until(condition, timeout: float = 2.0) -> None:  # type: ignore[no-untyped-def]
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not met in time"
+        time.sleep(0.005)
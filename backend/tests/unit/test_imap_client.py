@@ -0,0 +1,67 @@
+"""Unit tests for IMAP message parsing."""
+
+from email.message import EmailMessage
+
+import pytest
+
+from app.integrations.email.imap_client import IMAPClient
+
+
+@pytest.fixture
+def client() -> IMAPClient:
+    return IMAPClient(host="imap.example.com", port=993, user="u", password="p")
+
+
+def _message(*, plain: str | None, html: str | None, attachment: bytes | None) -> EmailMessage:
+    msg = EmailMessage()
+    msg["Message-ID"] = "<poptavka-1@zakaznik.cz>"
+    msg["From"] = "zakaznik@example.com"
+    msg["Subject"] = "Poptávka přírub"
+    msg["Date"] = "Sun, 18 Oct 2026 09:30:00 +0200"
+    if plain is not None:
+        msg.set_content(plain)
+    if html is not None:
+        if plain is None:
+            msg.set_content(html, subtype="html")
+        else:
+            msg.add_alternative(html, subtype="html")
+    if attachment is not None:
+        msg.add_attachment(
+            attachment, maintype="application", subtype="pdf", filename="vykres.pdf"
+        )
+    return msg
+
+
+class TestParseEmailMessage:
+    """Tests for body and attachment extraction."""
+
+    def test_plain_body_preferred_and_attachment_kept(self, client: IMAPClient) -> None:
+        """text/plain wins over text/html; an attachment after the body is kept."""
+        msg = _message(
+            plain="Dobrý den, poptáváme příruby DN50.",
+            html="<p>Dobrý den, <b>poptáváme</b> příruby DN50.</p>",
+            attachment=b"%PDF-1.4 vykres",
+        )
+
+        raw = client._parse_email_message(msg)
+
+        assert raw.body_text.strip() == "Dobrý den, poptáváme příruby DN50."
+        assert [(a.filename, a.data) for a in raw.attachments] == [
+            ("vykres.pdf", b"%PDF-1.4 vykres")
+        ]
+
+    def test_plain_and_html_without_attachment(self, client: IMAPClient) -> None:
+        msg = _message(plain="Text verze", html="<p>HTML verze</p>", attachment=None)
+
+        raw = client._parse_email_message(msg)
+
+        assert raw.body_text.strip() == "Text verze"
+        assert raw.attachments == []
+
+    def test_html_only_body_is_used(self, client: IMAPClient) -> None:
+        msg = _message(plain=None, html="<p>Jen HTML</p>", attachment=b"data")
+
+        raw = client._parse_email_message(msg)
+
+        assert "Jen HTML" in raw.body_text
+        assert len(raw.attachments) == 1
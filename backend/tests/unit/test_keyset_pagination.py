@@ -0,0 +1,237 @@
+"""Tests for keyset pagination of list endpoints."""
+
+from collections.abc import Callable
+from contextlib import AbstractContextManager, asynccontextmanager
+from datetime import UTC, datetime, timedelta
+from unittest.mock import patch
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.v1 import orchestration
+from app.models import (
+    Customer,
+    InboxMessage,
+    InboxStatus,
+    Order,
+    OrderItem,
+    OrderStatus,
+)
+from app.models.dead_letter import DeadLetterEntry
+from app.models.processing_task import ProcessingStage, ProcessingStatus, ProcessingTask
+from app.schemas import InboxMessageListItem, OrderListItem
+from app.services import InboxService, OrderService
+from app.services.pagination import CountMode, decode_cursor, encode_cursor
+
+NOW = datetime(2026, 10, 18, 12, 0)
+
+
+@pytest.fixture
+async def orders(test_db: AsyncSession) -> list[Order]:
+    """25 orders, several sharing a created_at timestamp."""
+    customer = Customer(
+        company_name="Strojírny Brno s.r.o.",
+        ico="12345678",
+        contact_name="Jan Novák",
+        email="info@strojirny.cz",
+    )
+    test_db.add(customer)
+    await test_db.flush()
+
+    created = []
+    for i in range(25):
+        order = Order(
+            customer_id=customer.id,
+            number=f"ZAK-{i:03d}",
+            status=OrderStatus.VYROBA if i % 2 else OrderStatus.POPTAVKA,
+            created_at=NOW - timedelta(minutes=i // 3),
+        )
+        test_db.add(order)
+        created.append(order)
+    await test_db.flush()
+    test_db.add_all(
+        OrderItem(order_id=created[0].id, name=f"Díl {n}", quantity=1) for n in range(3)
+    )
+    await test_db.flush()
+    return created
+
+
+async def _collect_pages(service: OrderService, limit: int, **filters) -> list[list]:  # type: ignore[no-untyped-def]
+    pages, cursor = [], None
+    while True:
+        rows, cursor, _ = await service.list_page(cursor=cursor, limit=limit, **filters)
+        pages.append(rows)
+        if cursor is None:
+            return pages
+
+
+class TestCursor:
+    def test_round_trip(self) -> None:
+        row_id = uuid4()
+        created_at = datetime(2026, 10, 18, 12, 30, 15, 123456, tzinfo=UTC)
+
+        assert decode_cursor(encode_cursor(created_at, row_id)) == (created_at, row_id)
+
+    @pytest.mark.parametrize("cursor", ["", "not-a-cursor", "bm90fGE"])
+    def test_invalid_cursor(self, cursor: str) -> None:
+        with pytest.raises(ValueError, match="Invalid cursor"):
+            decode_cursor(cursor)
+
+
+class TestOrderListPage:
+    async def test_pages_cover_every_order_once(self, test_db: AsyncSession, orders: list[Order]) -> None:
+        pages = await _collect_pages(OrderService(test_db), limit=4)
+
+        ids = [row.id for page in pages for row in page]
+        assert len(ids) == len(set(ids)) == 25
+        assert [len(page) for page in pages] == [4] * 6 + [1]
+        keys = [(row.created_at, row.id) for page in pages for row in page]
+        assert keys == sorted(keys, reverse=True)
+
+    async def test_filtered_pages(self, test_db: AsyncSession, orders: list[Order]) -> None:
+        pages = await _collect_pages(OrderService(test_db), limit=5, status=OrderStatus.VYROBA)
+
+        rows = [row for page in pages for row in page]
+        assert len(rows) == 12
+        assert {row.status for row in rows} == {OrderStatus.VYROBA}
+
+    async def test_lean_row_includes_names_and_item_count(
+        self, test_db: AsyncSession, orders: list[Order]
+    ) -> None:
+        rows, _, _ = await OrderService(test_db).list_page(limit=25)
+
+        items = {row.number: OrderListItem.model_validate(row) for row in rows}
+        item = items["ZAK-000"]
+        assert items["ZAK-001"].items_count == 0
+        assert item.customer_name == "Strojírny Brno s.r.o."
+        assert item.items_count == 3
+
+    async def test_deep_page_costs_the_same_as_the_first(
+        self,
+        test_db: AsyncSession,
+        orders: list[Order],
+        assert_num_queries: Callable[[int], AbstractContextManager[list[str]]],
+    ) -> None:
+        service = OrderService(test_db)
+        _, cursor, _ = await service.list_page(limit=20)
+
+        with assert_num_queries(1) as statements:
+            rows, next_cursor, total = await service.list_page(cursor=cursor, limit=20)
+
+        assert len(rows) == 5
+        assert next_cursor is None
+        assert total is None
+        assert "(orders.created_at, orders.id) <" in statements[0]
+
+    @pytest.mark.parametrize("mode", [CountMode.EXACT, CountMode.ESTIMATE])
+    async def test_total_on_request(
+        self, test_db: AsyncSession, orders: list[Order], mode: CountMode
+    ) -> None:
+        # SQLite has no planner statistics: estimate falls back to an exact count
+        _, _, total = await OrderService(test_db).list_page(limit=5, count=mode)
+
+        assert total == 25
+
+
+async def test_inbox_list_page_omits_body(test_db: AsyncSession) -> None:
+    for i in range(3):
+        test_db.add(
+            InboxMessage(
+                message_id=f"<{i}@example.com>",
+                from_email="zakaznik@example.com",
+                subject=f"Poptávka {i}",
+                body_text="x" * 10_000,
+                received_at=NOW - timedelta(hours=i),
+                status=InboxStatus.NEW,
+            )
+        )
+    await test_db.flush()
+
+    rows, cursor, _ = await InboxService(test_db).list_page(limit=2)
+    rest, last_cursor, _ = await InboxService(test_db).list_page(cursor=cursor, limit=2)
+
+    assert [InboxMessageListItem.model_validate(r).subject for r in rows + rest] == [
+        "Poptávka 0",
+        "Poptávka 1",
+        "Poptávka 2",
+    ]
+    assert "body_text" not in rows[0]._mapping
+    assert last_cursor is None
+
+
+@pytest.fixture
+def orchestration_session(test_db: AsyncSession):  # type: ignore[no-untyped-def]
+    @asynccontextmanager
+    async def session_factory():  # type: ignore[no-untyped-def]
+        yield test_db
+
+    with patch.object(orchestration, "AsyncSessionLocal", session_factory):
+        yield test_db
+
+
+async def test_dlq_cursor_pages(orchestration_session: AsyncSession) -> None:
+    for i in range(5):
+        orchestration_session.add(
+            DeadLetterEntry(
+                original_task="app.orchestration.tasks.parse",
+                stage="parse",
+                payload={"blob": "x" * 1000},
+                resolved=i == 0,
+                created_at=NOW - timedelta(minutes=i),
+            )
+        )
+    await orchestration_session.flush()
+
+    first = await orchestration.list_dlq_entries(
+        resolved=None, stage=None, limit=3, offset=0, cursor=None, count=CountMode.EXACT
+    )
+    second = await orchestration.list_dlq_entries(
+        resolved=None, stage=None, limit=3, offset=0, cursor=first.next_cursor, count=CountMode.NONE
+    )
+
+    assert (first.total, first.unresolved) == (5, 4)
+    assert len(first.items) == 3 and len(second.items) == 2
+    assert second.total is None and second.next_cursor is None
+    assert not {e.id for e in first.items} & {e.id for e in second.items}
+
+    with pytest.raises(HTTPException) as exc:
+        await orchestration.list_dlq_entries(
+            resolved=None, stage=None, limit=3, offset=0, cursor="garbage", count=CountMode.NONE
+        )
+    assert exc.value.status_code == 400
+
+
+async def test_processing_tasks_next_cursor_header(orchestration_session: AsyncSession) -> None:
+    for i in range(3):
+        orchestration_session.add(
+            ProcessingTask(
+                stage=ProcessingStage.PARSE,
+                status=ProcessingStatus.SUCCESS,
+                input_data={"body": "x" * 1000},
+                created_at=NOW - timedelta(minutes=i),
+            )
+        )
+    await orchestration_session.flush()
+    params = {
+        "stage": None,
+        "status": None,
+        "inbox_message_id": None,
+        "date_from": None,
+        "date_to": None,
+        "limit": 2,
+        "offset": 0,
+        "include_data": False,
+    }
+
+    response = Response()
+    first = await orchestration.list_processing_tasks(response, cursor=None, **params)
+    last_response = Response()
+    rest = await orchestration.list_processing_tasks(
+        last_response, cursor=response.headers["x-next-cursor"], **params
+    )
+
+    assert len(first) == 2 and len(rest) == 1
+    assert first[0].input_data is None
+    assert "x-next-cursor" not in last_response.headers
@@ -0,0 +1,232 @@
+"""Tests for the in-memory material price index."""
+
+import asyncio
+import uuid
+from collections.abc import Callable
+from contextlib import AbstractContextManager
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.schemas import MaterialPriceCreate
+from app.services.material_price import MaterialPriceService
+from app.services.material_price_index import (
+    MaterialPriceIndex,
+    MaterialPriceIndexCache,
+    PriceEntry,
+    get_price_index_cache,
+    tokenize,
+)
+
+TODAY = date(2024, 6, 1)
+
+
+def _entry(
+    name: str,
+    price: str,
+    grade: str | None = None,
+    valid_from: date = date(2024, 1, 1),
+    valid_to: date | None = None,
+) -> PriceEntry:
+    return PriceEntry(
+        id=uuid.uuid4(),
+        name=name,
+        material_grade=grade,
+        form=None,
+        dimension=None,
+        unit="kg",
+        unit_price=Decimal(price),
+        supplier=None,
+        valid_from=valid_from,
+        valid_to=valid_to,
+    )
+
+
+class TestMaterialPriceIndex:
+    """Tests for index lookups."""
+
+    @pytest.fixture
+    def index(self) -> MaterialPriceIndex:
+        return MaterialPriceIndex(
+            [
+                _entry("Plech S235JR 10mm", "32.00", "S235JR"),
+                _entry("Plech S235JR 12mm", "30.50", "s235jr"),
+                _entry("Nerezová trubka DN50", "250.00", "1.4301"),
+                _entry("Trubka DN50 P235GH", "120.00", "P235GH"),
+                _entry("Trubka DN50 levná", "90.00", valid_to=date(2024, 3, 1)),
+                _entry("Tyč kruhová 20", "15.00", valid_from=date(2024, 7, 1)),
+            ]
+        )
+
+    def test_tokenize_strips_case_and_diacritics(self) -> None:
+        assert tokenize("Nerezová TRUBKA DN-50") == ["nerezova", "trubka", "dn", "50"]
+
+    def test_grade_match_is_cheapest_and_case_insensitive(self, index: MaterialPriceIndex) -> None:
+        entry = index.find_best(material_grade="S235JR", on=TODAY)
+
+        assert entry is not None
+        assert entry.unit_price == Decimal("30.50")
+
+    def test_name_tokens_in_any_order(self, index: MaterialPriceIndex) -> None:
+        entry = index.find_best(material_name="dn50 trubka", on=TODAY)
+
+        assert entry is not None
+        assert entry.name == "Trubka DN50 P235GH"
+
+    def test_name_prefix_and_diacritics(self, index: MaterialPriceIndex) -> None:
+        entry = index.find_best(material_name="nerez", on=TODAY)
+
+        assert entry is not None
+        assert entry.name == "Nerezová trubka DN50"
+
+    def test_unknown_grade_falls_back_to_name(self, index: MaterialPriceIndex) -> None:
+        entry = index.find_best(material_name="Tyč", material_grade="X", on=date(2024, 8, 1))
+
+        assert entry is not None
+        assert entry.name == "Tyč kruhová 20"
+
+    def test_validity_dates(self, index: MaterialPriceIndex) -> None:
+        assert index.find_best(material_name="kruhová", on=TODAY) is None
+        cheap = index.find_best(material_name="trubka", on=date(2024, 2, 1))
+        assert cheap is not None
+        assert cheap.unit_price == Decimal("90.00")
+
+    def test_find_best_many(self, index: MaterialPriceIndex) -> None:
+        results = index.find_best_many(
+            [("Plech", None), ("neexistuje", "FAKE"), (None, "P235GH")], on=TODAY
+        )
+
+        assert [r.unit_price if r else None for r in results] == [
+            Decimal("30.50"),
+            None,
+            Decimal("120.00"),
+        ]
+
+    def test_match_name_exact_first(self, index: MaterialPriceIndex) -> None:
+        """An exact normalized name wins over cheaper token matches."""
+        entry = index.match_name("plech s235jr 10MM", on=TODAY)
+
+        assert entry is not None
+        assert entry.unit_price == Decimal("32.00")
+
+    def test_match_name_contained_price_name(self, index: MaterialPriceIndex) -> None:
+        """A longer BOM description matches the most specific contained price name."""
+        entry = index.match_name("Trubka DN50 P235GH svařovaná 6m", on=TODAY)
+
+        assert entry is not None
+        assert entry.name == "Trubka DN50 P235GH"
+        assert index.match_name("Hliník AW6060", on=TODAY) is None
+
+
+class TestMaterialPriceIndexCache:
+    """Tests for snapshot loading and invalidation."""
+
+    async def _create(self, db: AsyncSession, name: str, price: str) -> None:
+        await MaterialPriceService(db).create(
+            MaterialPriceCreate(
+                name=name,
+                unit="kg",
+                unit_price=Decimal(price),
+                valid_from=date.today() - timedelta(days=1),
+            )
+        )
+
+    async def test_commit_invalidates_snapshot(self, test_db: AsyncSession) -> None:
+        """Prices committed after the index was built are visible to the next lookup."""
+        service = MaterialPriceService(test_db)
+        await self._create(test_db, "Plech 10mm", "40.00")
+        await test_db.commit()
+
+        assert (await service.find_best_prices([("plech", None)]))[0] is not None
+        assert (await service.find_best_prices([("profil", None)]))[0] is None
+
+        await self._create(test_db, "Profil IPE 100", "55.00")
+        await test_db.commit()
+
+        entry = (await service.find_best_prices([("profil", None)]))[0]
+        assert entry is not None
+        assert entry.unit_price == Decimal("55.00")
+
+    async def test_rollback_keeps_snapshot(self, test_db: AsyncSession) -> None:
+        """Rolled back changes do not invalidate the index."""
+        cache = get_price_index_cache()
+        index = await cache.get(test_db)
+
+        await self._create(test_db, "Plech 10mm", "40.00")
+        await test_db.rollback()
+
+        assert await cache.get(test_db) is index
+
+    async def test_remote_version_change_triggers_reload(self, test_db: AsyncSession) -> None:
+        """A bumped fleet-wide version makes other processes reload."""
+        cache = MaterialPriceIndexCache(ttl_seconds=600, check_seconds=0)
+        with patch.object(
+            MaterialPriceIndexCache, "_fetch_remote_version", AsyncMock(return_value=1)
+        ):
+            first = await cache.get(test_db)
+            assert await cache.get(test_db) is first
+
+        with patch.object(
+            MaterialPriceIndexCache, "_fetch_remote_version", AsyncMock(return_value=2)
+        ):
+            assert await cache.get(test_db) is not first
+
+    async def test_commit_publishes_from_the_event_loop(self, test_db: AsyncSession) -> None:
+        """The commit hook only marks the index dirty; the bump runs as a task."""
+        publish = MaterialPriceIndexCache._publish_invalidation
+        await self._create(test_db, "Plech 10mm", "40.00")
+        await test_db.commit()
+
+        await asyncio.sleep(0)
+
+        publish.assert_awaited_once()
+
+    async def test_pending_invalidation_published_on_next_lookup(
+        self, test_db: AsyncSession
+    ) -> None:
+        """A commit made outside a running loop is published by the next lookup."""
+        cache = MaterialPriceIndexCache(ttl_seconds=600, check_seconds=600)
+        cache._publish_pending = True
+
+        await cache.get(test_db)
+
+        MaterialPriceIndexCache._publish_invalidation.assert_awaited_once()
+
+    async def test_concurrent_cold_lookups_build_once(
+        self,
+        test_db: AsyncSession,
+        assert_num_queries: Callable[[int], AbstractContextManager[list[str]]],
+    ) -> None:
+        """Requests arriving before the first snapshot share one rebuild."""
+        cache = MaterialPriceIndexCache(ttl_seconds=600, check_seconds=600)
+
+        with assert_num_queries(1):
+            indexes = await asyncio.gather(*(cache.get(test_db) for _ in range(5)))
+
+        assert all(index is indexes[0] for index in indexes)
+
+    async def test_build_discarded_after_concurrent_reset(self, test_db: AsyncSession) -> None:
+        """A snapshot loaded before an invalidation is not kept as current."""
+        cache = MaterialPriceIndexCache(ttl_seconds=600, check_seconds=600)
+
+        async def reset_during_build(_: MaterialPriceIndexCache) -> None:
+            cache.reset()
+
+        with patch.object(MaterialPriceIndexCache, "_fetch_remote_version", reset_during_build):
+            await cache.get(test_db)
+
+        assert cache._index is None
+
+    async def test_redis_client_is_shared(self) -> None:
+        """Version checks and invalidations reuse one pooled client."""
+        cache = MaterialPriceIndexCache(ttl_seconds=600, check_seconds=0)
+        client = MagicMock(get=AsyncMock(return_value=b"3"), incr=AsyncMock())
+        with patch(
+            "app.services.material_price_index.Redis.from_url", return_value=client
+        ) as from_url:
+            assert cache._client() is cache._client()
+
+        from_url.assert_called_once()
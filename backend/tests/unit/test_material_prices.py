@@ -3,13 +3,33 @@
 import uuid
 from datetime import date, timedelta
 from decimal import Decimal
+from io import BytesIO
+from unittest.mock import MagicMock
 
 import pytest
+from fastapi import HTTPException
+from openpyxl import Workbook
+from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models import MaterialPrice
+from app.api.v1.material_prices import update_material_price
+from app.models import AuditLog, MaterialPrice
 from app.schemas import MaterialPriceCreate, MaterialPriceUpdate
 from app.services.material_price import MaterialPriceService
+from app.services.material_price_import import MaterialPriceImporter
+
+
+def _price_list(header: list[str], *rows: list[object]) -> bytes:
+    """Build an XLSX price list in memory."""
+    wb = Workbook()
+    ws = wb.active
+    assert ws is not None
+    ws.append(header)
+    for row in rows:
+        ws.append(row)
+    buffer = BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
 
 
 @pytest.fixture
@@ -232,6 +252,37 @@ class TestMaterialPriceService:
 
         assert updated is None
 
+    async def test_update_endpoint_natural_key_conflict(
+        self,
+        test_db: AsyncSession,
+        material_price_service: MaterialPriceService,
+        sample_material_price: MaterialPrice,
+    ) -> None:
+        """Updating a line onto an existing natural key returns 409, not 500."""
+        other = await material_price_service.create(
+            MaterialPriceCreate(
+                name=sample_material_price.name,
+                material_grade=sample_material_price.material_grade,
+                form=sample_material_price.form,
+                dimension=sample_material_price.dimension,
+                unit="kg",
+                unit_price=Decimal("31.00"),
+                supplier="Jiný dodavatel",
+                valid_from=sample_material_price.valid_from,
+            )
+        )
+        await test_db.commit()
+
+        with pytest.raises(HTTPException) as exc:
+            await update_material_price(
+                other.id,
+                MaterialPriceUpdate(supplier=sample_material_price.supplier),
+                db=test_db,
+                current_user=MagicMock(id=None),
+            )
+
+        assert exc.value.status_code == 409
+
     async def test_delete(
         self,
         test_db: AsyncSession,
@@ -476,3 +527,113 @@ class TestMaterialPriceService:
         assert result.imported_count >= 1
         assert result.failed_count >= 1
         assert len(result.errors) >= 1
+
+
+class TestMaterialPriceBulkImport:
+    """Tests for the bulk price list importer."""
+
+    async def test_reimport_updates_existing_prices(self, test_db: AsyncSession) -> None:
+        """Lines matching an existing price on the natural key update it in place."""
+        header = ["name", "material_grade", "supplier", "unit_price", "valid_from"]
+        valid_from = date(2024, 1, 1)
+        importer = MaterialPriceImporter(test_db, chunk_size=2)
+
+        first = _price_list(
+            header,
+            ["Plech P10", "S235JR", "Ferona", 30.0, valid_from],
+            ["Trubka DN50", "P235GH", None, 120.0, valid_from],
+            ["Tyč 20", None, "Ferona", 15.5, valid_from],
+        )
+        result = await importer.import_excel(first)
+        assert result.imported_count == 3
+
+        second = _price_list(
+            header,
+            ["Plech P10", "S235JR", "Ferona", 31.25, valid_from],
+            ["Tyč 20", None, "Ferona", 16.0, valid_from],
+        )
+        result = await importer.import_excel(second)
+        await test_db.commit()
+
+        assert result.success is True
+        assert result.imported_count == 2
+        total = (await test_db.execute(select(func.count()).select_from(MaterialPrice))).scalar_one()
+        assert total == 3
+        prices = dict(
+            (await test_db.execute(select(MaterialPrice.name, MaterialPrice.unit_price))).all()
+        )
+        assert prices["Plech P10"] == Decimal("31.25")
+        assert prices["Tyč 20"] == Decimal("16.00")
+        assert prices["Trubka DN50"] == Decimal("120.00")
+
+    async def test_single_audit_entry_per_import(self, test_db: AsyncSession) -> None:
+        """The import is audited once, not once per row."""
+        content = _price_list(
+            ["name", "unit_price"],
+            *[[f"Materiál {i}", i + 1] for i in range(25)],
+        )
+
+        result = await MaterialPriceImporter(test_db, chunk_size=10).import_excel(content)
+        await test_db.commit()
+
+        assert result.imported_count == 25
+        audits = (await test_db.execute(select(AuditLog))).scalars().all()
+        assert len(audits) == 1
+        assert audits[0].entity_type == "material_price_import"
+        assert audits[0].changes == {
+            "imported_count": 25,
+            "failed_count": 0,
+            "duplicate_count": 0,
+            "errors": [],
+        }
+
+    async def test_czech_headers_and_row_report(self, test_db: AsyncSession) -> None:
+        """Czech headers are accepted and errors name the sheet row."""
+        content = _price_list(
+            ["název", "jednotka", "jednotková_cena", "aktivní"],
+            ["Ocel S355", "kg", "42,50", "ne"],
+            [None, None, None, None],
+            [None, "kg", 10, None],
+            ["Záporná", "kg", -1, None],
+            ["Ocel S355", "kg", 43, None],
+        )
+
+        result = await MaterialPriceImporter(test_db).import_excel(content)
+        await test_db.commit()
+
+        assert result.success is False
+        assert result.imported_count == 1
+        assert result.failed_count == 2
+        assert result.errors[0].startswith("Řádek 4: name:")
+        assert result.errors[1].startswith("Řádek 5: unit_price:")
+        assert result.duplicate_count == 1
+        assert result.warnings == ["Řádek 2: duplicitní položka, nahrazena řádkem 6"]
+
+        price = (await test_db.execute(select(MaterialPrice))).scalar_one()
+        assert price.name == "Ocel S355"
+        assert price.unit_price == Decimal("43.00")
+        assert price.is_active is True
+
+    async def test_duplicates_alone_do_not_fail_the_import(self, test_db: AsyncSession) -> None:
+        """Repeated lines are warnings: every distinct line is imported successfully."""
+        content = _price_list(
+            ["name", "unit_price"],
+            ["Plech P5", 30],
+            ["Tyč 10", 12],
+            ["Plech P5", 31],
+        )
+
+        result = await MaterialPriceImporter(test_db).import_excel(content)
+        await test_db.commit()
+
+        assert result.success is True
+        assert (result.imported_count, result.failed_count, result.duplicate_count) == (2, 0, 1)
+        assert result.errors == []
+        assert result.warnings == ["Řádek 2: duplicitní položka, nahrazena řádkem 4"]
+
+    async def test_invalid_file(self, test_db: AsyncSession) -> None:
+        """Unreadable uploads are reported instead of raised."""
+        result = await MaterialPriceImporter(test_db).import_excel(b"not an xlsx")
+
+        assert result.success is False
+        assert result.errors[0].startswith("Import selhal:")
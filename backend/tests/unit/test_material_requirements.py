@@ -1,5 +1,7 @@
 """Tests for material requirements reporting and export."""
 
+from collections.abc import Callable
+from contextlib import AbstractContextManager
 from datetime import date, timedelta
 from decimal import Decimal
 from io import BytesIO
@@ -7,6 +9,7 @@ from uuid import uuid4
 
 import pytest
 from openpyxl import load_workbook
+from sqlalchemy import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.integrations.excel.exporter import ExcelExporter
@@ -464,6 +467,71 @@ async def test_material_requirements_excel_export(
     assert any("Celkem" in str(val) for val in last_row_values if val is not None)
 
 
+@pytest.mark.asyncio
+async def test_material_requirements_stream_matches_report(
+    test_db: AsyncSession,
+    test_order: Order,
+    test_calculation: Calculation,
+    test_material_items: list[CalculationItem],
+) -> None:
+    """The export stream yields the same materials as the report, one at a time."""
+    service = ReportingService(test_db)
+    report = await service.get_material_requirements(order_ids=[test_order.id])
+
+    streamed = [
+        item async for item in service.iter_material_requirements(
+            order_ids=[test_order.id], batch_size=1
+        )
+    ]
+
+    assert sorted(streamed, key=lambda i: i.material_name) == sorted(
+        report.items, key=lambda i: i.material_name
+    )
+
+
+@pytest.mark.asyncio
+async def test_material_requirements_excel_endpoint_streams_from_cursor(
+    test_db: AsyncSession,
+    test_order: Order,
+    test_calculation: Calculation,
+    test_material_items: list[CalculationItem],
+) -> None:
+    """The Excel endpoint streams rows on its own session with a computed total."""
+    from contextlib import asynccontextmanager
+    from unittest.mock import MagicMock, patch
+
+    from app.api.v1 import reporting as reporting_api
+
+    report = await ReportingService(test_db).get_material_requirements(order_ids=[test_order.id])
+
+    @asynccontextmanager
+    async def session_factory():  # type: ignore[no-untyped-def]
+        yield test_db
+
+    with (
+        patch.object(reporting_api, "AsyncSessionLocal", session_factory),
+        patch.object(
+            ReportingService, "get_material_requirements", side_effect=AssertionError("loaded")
+        ),
+    ):
+        response = await reporting_api.get_material_requirements(
+            order_ids=[test_order.id],
+            status_filter=None,
+            response_format="excel",
+            user=MagicMock(),
+            db=test_db,
+        )
+        content = b"".join([chunk async for chunk in response.body_iterator])
+
+    ws = load_workbook(BytesIO(content)).active
+    assert ws is not None
+    assert ws.max_row == len(report.items) + 3  # header, items, blank, total
+    assert ws.cell(row=ws.max_row, column=1).value == "Celkem (1 zakázek)"
+    assert ws.cell(row=ws.max_row, column=6).value == pytest.approx(
+        float(report.total_estimated_cost)
+    )
+
+
 @pytest.mark.asyncio
 async def test_material_requirements_no_orders(test_db: AsyncSession) -> None:
     """Test material requirements when no orders match filter."""
@@ -570,3 +638,75 @@ async def test_material_requirements_default_active_orders(
     assert "Material OBJ" in material_names
     assert "Material VYR" in material_names
     assert "Material DOK" not in material_names
+
+
+@pytest.mark.asyncio
+async def test_material_requirements_plant_scale(
+    test_db: AsyncSession,
+    test_customer: Customer,
+    assert_num_queries: Callable[[int], AbstractContextManager[list[str]]],
+) -> None:
+    """5k price rows and 2k BOM lines cost a fixed number of queries.
+
+    Aggregation happens in SQL and prices come from the in-memory index, so the
+    statement count does not grow with the number of lines or materials.
+    """
+    today = date.today()
+    await test_db.execute(
+        insert(MaterialPrice),
+        [
+            {
+                "id": uuid4(),
+                "name": f"Profil {i} S235JR",
+                "material_grade": "S235JR",
+                "unit": "kg",
+                "unit_price": Decimal(10 + i % 50),
+                "supplier": f"Dodavatel {i % 7}",
+                "valid_from": today - timedelta(days=1),
+                "is_active": True,
+            }
+            for i in range(5000)
+        ],
+    )
+
+    calc_ids = []
+    for n in range(20):
+        order = Order(number=f"BULK-{n:03d}", customer_id=test_customer.id, status=OrderStatus.VYROBA)  # noqa: E501
+        test_db.add(order)
+        await test_db.flush()
+        calc = Calculation(order_id=order.id, name=f"Calc {n}", status=CalculationStatus.APPROVED)
+        test_db.add(calc)
+        await test_db.flush()
+        calc_ids.append(calc.id)
+
+    # 2000 lines over 500 materials; every 5th material has no price list entry
+    await test_db.execute(
+        insert(CalculationItem),
+        [
+            {
+                "id": uuid4(),
+                "calculation_id": calc_ids[i % 20],
+                "cost_type": CostType.MATERIAL,
+                "name": f"Profil {i % 500} S235JR" if i % 5 else f"Výpalek {i % 500}",
+                "quantity": Decimal("2.0"),
+                "unit": "kg",
+                "unit_price": Decimal("20.00"),
+                "total_price": Decimal("40.00"),
+            }
+            for i in range(2000)
+        ],
+    )
+    await test_db.commit()
+
+    service = ReportingService(test_db)
+    # order count, grouped BOM lines, price index snapshot
+    with assert_num_queries(3):
+        result = await service.get_material_requirements()
+
+    assert result.order_count == 20
+    assert len(result.items) == 500
+    assert sum(item.total_quantity for item in result.items) == Decimal("4000.0")
+    profile = next(item for item in result.items if item.material_name == "Profil 123 S235JR")
+    assert profile.estimated_unit_price == Decimal(10 + 123 % 50)
+    cut = next(item for item in result.items if item.material_name == "Výpalek 5")
+    assert cut.estimated_unit_price == Decimal("20.00")
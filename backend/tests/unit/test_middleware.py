@@ -0,0 +1,73 @@
+"""Tests for the request instrumentation middleware."""
+
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
+from httpx import ASGITransport, AsyncClient
+from prometheus_client import REGISTRY
+
+from app.core.middleware import UNMATCHED_ENDPOINT, RequestInstrumentationMiddleware
+
+
+def _app() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(RequestInstrumentationMiddleware)
+
+    @app.get("/test-mw/orders/{order_number}")
+    async def get_order(order_number: str, request: Request) -> dict[str, str]:
+        return {"order": order_number, "cid": request.state.correlation_id}
+
+    @app.get("/test-mw/framed")
+    async def framed() -> PlainTextResponse:
+        return PlainTextResponse("ok", headers={"X-Frame-Options": "SAMEORIGIN"})
+
+    return app
+
+
+def _count(endpoint: str, status: str = "200") -> float:
+    value = REGISTRY.get_sample_value(
+        "http_requests_total", {"method": "GET", "endpoint": endpoint, "status": status}
+    )
+    return value or 0.0
+
+
+class TestRequestInstrumentationMiddleware:
+    """Tests for the single-pass ASGI middleware."""
+
+    async def test_labels_by_route_template(self) -> None:
+        endpoint = "/test-mw/orders/{order_number}"
+        before = _count(endpoint)
+
+        async with AsyncClient(transport=ASGITransport(app=_app()), base_url="http://t") as ac:
+            for number in ("ZK-2026-001", "ZK-2026-002", "ZK-2026-003"):
+                response = await ac.get(f"/test-mw/orders/{number}")
+                assert response.status_code == 200
+
+        assert _count(endpoint) - before == 3
+        assert REGISTRY.get_sample_value(
+            "http_response_size_bytes_count", {"method": "GET", "endpoint": endpoint}
+        ) >= 3
+        assert REGISTRY.get_sample_value(
+            "http_requests_in_progress", {"method": "GET"}
+        ) == 0
+
+    async def test_unmatched_paths_share_one_label(self) -> None:
+        before = _count(UNMATCHED_ENDPOINT, "404")
+
+        async with AsyncClient(transport=ASGITransport(app=_app()), base_url="http://t") as ac:
+            await ac.get("/test-mw/nope/a1b2c3")
+            await ac.get("/test-mw/nope/report.pdf")
+
+        assert _count(UNMATCHED_ENDPOINT, "404") - before == 2
+
+    async def test_correlation_id_and_security_headers(self) -> None:
+        async with AsyncClient(transport=ASGITransport(app=_app()), base_url="http://t") as ac:
+            echoed = await ac.get(
+                "/test-mw/orders/ZK-1", headers={"X-Correlation-ID": "cid-123"}
+            )
+            framed = await ac.get("/test-mw/framed")
+
+        assert echoed.headers["x-correlation-id"] == "cid-123"
+        assert echoed.json()["cid"] == "cid-123"
+        assert echoed.headers["x-content-type-options"] == "nosniff"
+        assert framed.headers.get_list("x-frame-options") == ["DENY"]
+        assert len(framed.headers["x-correlation-id"]) == 36
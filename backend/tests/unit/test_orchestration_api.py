@@ -1,7 +1,19 @@
 """Tests for orchestration API endpoints."""
 
+import threading
+from collections.abc import Iterator
+from contextlib import asynccontextmanager
+from unittest.mock import patch
 
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.v1 import orchestration
 from app.api.v1.orchestration import router
+from app.core.feature_flags import FeatureFlags
+from app.models import Calculation, Customer, Order, OrderStatus
+from app.models.calculation import CalculationStatus
 
 
 class TestOrchestrationRouter:
@@ -10,3 +22,126 @@ class TestOrchestrationRouter:
 
     def test_router_tags(self):
         assert "orchestrace" in router.tags
+
+
+class _FlagStore:
+    """In-memory stand-in for the Redis keys behind the feature flags."""
+
+    def __init__(self) -> None:
+        self.values: dict[str, str] = {}
+        self.threads: set[int] = set()
+
+    def mget(self, keys: list[str]) -> list[str | None]:
+        self.threads.add(threading.get_ident())
+        return [self.values.get(key) for key in keys]
+
+    def mset(self, mapping: dict[str, str]) -> None:
+        self.values.update(mapping)
+
+    def publish(self, channel: str, message: str) -> None:
+        pass
+
+    def pipeline(self) -> "_FlagStore":
+        return self
+
+    def execute(self) -> None:
+        self.threads.add(threading.get_ident())
+
+
+@pytest.fixture
+def flags() -> Iterator[FeatureFlags]:
+    """Feature flags the config endpoint can change."""
+    flags = FeatureFlags(ttl_seconds=60, redis=_FlagStore())  # type: ignore[arg-type]
+    with (
+        patch("app.core.feature_flags.get_feature_flags", return_value=flags),
+        patch.object(FeatureFlags, "_ensure_listener"),
+    ):
+        yield flags
+
+
+@pytest.fixture
+def orchestration_session(test_db: AsyncSession) -> Iterator[AsyncSession]:
+    @asynccontextmanager
+    async def session_factory():  # type: ignore[no-untyped-def]
+        yield test_db
+
+    with patch.object(orchestration, "AsyncSessionLocal", session_factory):
+        yield test_db
+
+
+async def _pending_calculation(db: AsyncSession, number: str) -> Calculation:
+    customer = Customer(
+        company_name=f"Zákazník {number}",
+        ico=number[-8:].rjust(8, "0"),
+        contact_name="Jan Novák",
+        email=f"{number.lower()}@zakaznik.cz",
+    )
+    db.add(customer)
+    await db.flush()
+    order = Order(customer_id=customer.id, number=number, status=OrderStatus.POPTAVKA)
+    db.add(order)
+    await db.flush()
+    calc = Calculation(
+        order_id=order.id, name="Kalkulace", status=CalculationStatus.PENDING_APPROVAL
+    )
+    db.add(calc)
+    await db.flush()
+    return calc
+
+
+class TestPipelineConfig:
+    async def test_flags_are_read_and_written_off_the_event_loop(
+        self, test_client: AsyncClient, flags: FeatureFlags
+    ) -> None:
+        """Redis calls behind the config endpoints run in a worker thread."""
+        store = flags._redis
+        assert isinstance(store, _FlagStore)
+
+        response = await test_client.put(
+            "/api/v1/orchestrace/config", json={"auto_calculate": True}
+        )
+        assert response.json()["auto_calculate"] is True
+        flags.invalidate()
+        response = await test_client.get("/api/v1/orchestrace/config")
+
+        assert response.json()["auto_calculate"] is True
+        assert store.threads
+        assert threading.get_ident() not in store.threads
+
+
+class TestApproveCalculation:
+    """The auto-offer switch is read from the fleet-wide feature flags."""
+
+    async def test_auto_offer_follows_config_endpoint(
+        self,
+        test_client: AsyncClient,
+        orchestration_session: AsyncSession,
+        flags: FeatureFlags,
+    ) -> None:
+        first = await _pending_calculation(orchestration_session, "ZAK-2026-001")
+        second = await _pending_calculation(orchestration_session, "ZAK-2026-002")
+
+        with patch("app.orchestration.tasks.generate_offer") as generate_offer:
+            response = await test_client.put(
+                "/api/v1/orchestrace/config", json={"auto_offer": True}
+            )
+            assert response.json()["auto_offer"] is True
+            response = await test_client.post(
+                f"/api/v1/orchestrace/approve-calculation/{first.id}"
+            )
+            assert response.status_code == 200
+            generate_offer.delay.assert_called_once_with(str(first.order_id))
+
+            generate_offer.reset_mock()
+            response = await test_client.put(
+                "/api/v1/orchestrace/config", json={"auto_offer": False}
+            )
+            assert response.json()["auto_offer"] is False
+            response = await test_client.post(
+                f"/api/v1/orchestrace/approve-calculation/{second.id}"
+            )
+
+        assert response.status_code == 200
+        assert response.json()["status"] == "approved"
+        generate_offer.delay.assert_not_called()
+        assert second.status == CalculationStatus.APPROVED
@@ -0,0 +1,133 @@
+"""Tests for processing_tasks payload compaction, partitions and retention."""
+
+from datetime import UTC, date, datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.processing_task import ProcessingStage, ProcessingStatus, ProcessingTask
+from app.orchestration.audit import compact_stage_output, ensure_partitions, purge_expired
+
+INGEST_RESULT = {
+    "inbox_message_id": "7f1c2a44-0000-0000-0000-000000000001",
+    "attachment_ids": ["a1", "a2"],
+    "from_email": "nakup@example.cz",
+    "subject": "Poptávka přírub",
+    "body_text": "Dobrý den, poptáváme ..." * 200,
+    "duplicate": False,
+}
+
+
+def _postgres_session(*results: MagicMock) -> MagicMock:
+    db = MagicMock()
+    db.get_bind.return_value.dialect.name = "postgresql"
+    partitioned = MagicMock()
+    partitioned.scalar_one_or_none.return_value = "p"
+    db.execute = AsyncMock(side_effect=[partitioned, *results])
+    return db
+
+
+def _executed_sql(db: MagicMock) -> list[str]:
+    return [str(call.args[0]) for call in db.execute.await_args_list]
+
+
+class TestCompactStageOutput:
+    """Tests for stage payload compaction."""
+
+    def test_stores_only_stage_delta(self) -> None:
+        classify_result = {
+            **INGEST_RESULT,
+            "classification": "poptavka",
+            "confidence": 0.92,
+            "method": "heuristic",
+            "stages": ["parse", "orchestrate", "calculate"],
+        }
+
+        compact = compact_stage_output(classify_result, INGEST_RESULT)
+
+        assert compact == {
+            "classification": "poptavka",
+            "confidence": 0.92,
+            "method": "heuristic",
+            "stages": ["parse", "orchestrate", "calculate"],
+        }
+
+    def test_bulky_fields_become_references(self) -> None:
+        compact = compact_stage_output(INGEST_RESULT)
+
+        assert compact is not None
+        assert compact["body_text"] == {
+            "$ref": "inbox_messages.body_text",
+            "size": len(INGEST_RESULT["body_text"]),
+        }
+        assert compact["subject"] == "Poptávka přírub"
+
+    def test_none_output(self) -> None:
+        assert compact_stage_output(None, INGEST_RESULT) is None
+
+
+class TestPartitions:
+    """Tests for monthly partition maintenance on PostgreSQL."""
+
+    async def test_ensure_partitions_across_year_end(self) -> None:
+        db = _postgres_session(*(MagicMock() for _ in range(4)))
+
+        names = await ensure_partitions(db, months_ahead=3, today=date(2026, 11, 15))
+
+        assert names == [
+            "processing_tasks_p202611",
+            "processing_tasks_p202612",
+            "processing_tasks_p202701",
+            "processing_tasks_p202702",
+        ]
+        assert "FROM ('2026-12-01') TO ('2027-01-01')" in _executed_sql(db)[2]
+
+    async def test_unpartitioned_table_is_left_alone(self, test_db: AsyncSession) -> None:
+        assert await ensure_partitions(test_db, months_ahead=3) == []
+
+    async def test_purge_drops_expired_partitions(self) -> None:
+        children = MagicMock()
+        children.scalars.return_value.all.return_value = [
+            "processing_tasks_p202606",
+            "processing_tasks_p202607",
+            "processing_tasks_p202608",
+            "processing_tasks_default",
+        ]
+        deleted = MagicMock(rowcount=3)
+        db = _postgres_session(children, MagicMock(), MagicMock(), deleted)
+
+        result = await purge_expired(
+            db, retention_days=30, now=datetime(2026, 9, 10, tzinfo=UTC)
+        )
+
+        assert result["dropped_partitions"] == [
+            "processing_tasks_p202606",
+            "processing_tasks_p202607",
+        ]
+        assert result["deleted"] == 3
+        assert "DROP TABLE IF EXISTS processing_tasks_p202607" in _executed_sql(db)[3]
+
+
+class TestRetention:
+    """Tests for the row-level fallback used without partitioning."""
+
+    async def test_purge_deletes_expired_rows(self, test_db: AsyncSession) -> None:
+        now = datetime.now(UTC)
+        for age_days in (200, 95, 10, 0):
+            test_db.add(
+                ProcessingTask(
+                    stage=ProcessingStage.CLASSIFY,
+                    status=ProcessingStatus.SUCCESS,
+                    created_at=now - timedelta(days=age_days),
+                )
+            )
+        await test_db.commit()
+
+        result = await purge_expired(test_db, retention_days=90, now=now)
+        await test_db.commit()
+
+        remaining = (await test_db.execute(select(func.count(ProcessingTask.id)))).scalar()
+        assert result["deleted"] == 2
+        assert result["dropped_partitions"] == []
+        assert remaining == 2
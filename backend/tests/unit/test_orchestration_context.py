@@ -0,0 +1,105 @@
+"""Unit tests for the compact pipeline envelope and lazy context loading."""
+
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
+from datetime import UTC, datetime
+from unittest.mock import patch
+from uuid import uuid4
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.email_attachment import EmailAttachment
+from app.models.inbox import InboxMessage, InboxStatus
+from app.orchestration import context
+from app.orchestration.context import to_attachment_summary, to_envelope
+
+
+@pytest.fixture
+def _context_session(test_db: AsyncSession):
+    @asynccontextmanager
+    async def session_factory() -> AsyncGenerator[AsyncSession, None]:
+        yield test_db
+
+    with patch.object(context, "AsyncSessionLocal", session_factory):
+        yield
+
+
+@pytest.fixture
+async def message(test_db: AsyncSession) -> InboxMessage:
+    msg = InboxMessage(
+        message_id=f"<{uuid4()}@example.cz>",
+        from_email="nakup@example.cz",
+        subject="Poptávka kolen",
+        body_text="Dobrý den,\n" * 500,
+        received_at=datetime.now(UTC),
+        status=InboxStatus.NEW,
+        parsed_data={"items": [{"name": "Koleno"}]},
+    )
+    test_db.add(msg)
+    await test_db.flush()
+    return msg
+
+
+class TestToEnvelope:
+    def test_drops_large_and_unknown_fields(self) -> None:
+        """Body, parsed data, stages and attachment paths do not travel between tasks."""
+        order_id = uuid4()
+        data = {
+            "inbox_message_id": "m1",
+            "subject": "Poptávka",
+            "body_text": "x" * 10_000,
+            "parsed_data": {"items": []},
+            "attachment_data": {"a1": {"file_path": "/tmp/a1.pdf"}},
+            "stages": ["parse_email"],
+            "classification": "poptavka",
+            "order_id": order_id,
+        }
+
+        envelope = to_envelope(data)
+
+        assert envelope == {
+            "inbox_message_id": "m1",
+            "subject": "Poptávka",
+            "classification": "poptavka",
+            "order_id": str(order_id),
+        }
+
+    def test_attachment_summary_keeps_small_fields(self) -> None:
+        document_id = uuid4()
+
+        summary = to_attachment_summary(
+            "a1", {"document_id": document_id, "detected_category": "vykres", "ocr_text": "x" * 5000}
+        )
+
+        assert summary == {"attachment_id": "a1", "document_id": str(document_id), "detected_category": "vykres"}
+
+
+@pytest.mark.usefixtures("_context_session")
+class TestLoadContext:
+    async def test_load_email_content(self, message: InboxMessage) -> None:
+        content = await context.load_email_content(str(message.id))
+
+        assert content.subject == "Poptávka kolen"
+        assert content.body_text == message.body_text
+        assert content.parsed_data == {"items": [{"name": "Koleno"}]}
+
+    async def test_load_email_content_missing(self) -> None:
+        with pytest.raises(ValueError, match="Inbox message not found"):
+            await context.load_email_content(str(uuid4()))
+
+    async def test_load_attachment(self, test_db: AsyncSession, message: InboxMessage) -> None:
+        attachment = EmailAttachment(
+            inbox_message_id=message.id,
+            filename="vykres.pdf",
+            content_type="application/pdf",
+            file_path="/data/attachments/vykres.pdf",
+        )
+        test_db.add(attachment)
+        await test_db.flush()
+
+        assert await context.load_attachment(str(attachment.id)) == (
+            "/data/attachments/vykres.pdf",
+            "application/pdf",
+            "vykres.pdf",
+        )
@@ -0,0 +1,109 @@
+"""Unit tests for the orchestration pipeline workflow (no broker needed)."""
+
+from celery.canvas import chord, group
+
+from app.orchestration import tasks
+
+
+def _classify_result(attachment_ids: list[str] | None = None) -> dict:
+    attachment_ids = attachment_ids or []
+    return {
+        "inbox_message_id": "00000000-0000-0000-0000-000000000001",
+        "classification": "poptavka",
+        "attachment_ids": attachment_ids,
+    }
+
+
+def _task_names(signature) -> list[str]:
+    return [task.task for task in signature.tasks]
+
+
+_FULL_STAGES = ["parse_email", "process_attachments", "orchestrate_order", "auto_calculate", "generate_offer"]
+
+
+class TestBuildStagePipeline:
+    def test_attachments_run_concurrently_with_parse(self) -> None:
+        """Parse and every attachment branch form the chord header; dependent stages follow the join."""
+        workflow = tasks._build_stage_pipeline(_classify_result(["a1", "a2"]), _FULL_STAGES)
+
+        assert isinstance(workflow, chord)
+        header = list(workflow.tasks)
+        assert header[0].task == "orchestration.parse_email"
+        for branch in header[1:]:
+            assert _task_names(branch) == [
+                "orchestration.process_attachment",
+                "orchestration.analyze_attachment_drawing",
+            ]
+            assert len(branch.tasks[0].args) == 1  # attachment fields are loaded by the task
+            assert branch.tasks[0].kwargs == {"analyze_drawings": False}
+        assert len(header) == 3
+        assert _task_names(workflow.body) == [
+            "orchestration.join_pipeline_branches",
+            "orchestration.orchestrate_order",
+            "orchestration.auto_calculate",
+            "orchestration.generate_offer",
+        ]
+
+    def test_parse_only_is_plain_chain(self) -> None:
+        stages = ["parse_email", "orchestrate_order", "auto_calculate", "generate_offer"]
+
+        workflow = tasks._build_stage_pipeline(_classify_result(), stages)
+
+        assert not isinstance(workflow, chord)
+        assert _task_names(workflow)[0] == "orchestration.parse_email"
+        assert len(workflow.tasks) == 4
+
+    def test_without_dependent_stages_runs_branches_as_group(self) -> None:
+        workflow = tasks._build_stage_pipeline(_classify_result(["a1"]), ["process_attachments"])
+
+        assert isinstance(workflow, group)
+        assert len(workflow.tasks) == 1
+
+    def test_nothing_to_run(self) -> None:
+        assert tasks._build_stage_pipeline(_classify_result(), ["process_attachments"]) is None
+
+
+class TestJoinPipelineBranches:
+    def test_merges_parse_result_and_attachments(self) -> None:
+        classify_result = _classify_result(["a1", "a2"])
+        parse_result = {**classify_result, "parse_tokens_used": 120}
+        drawing = {
+            "document_id": "d1",
+            "filename": "a1.pdf",
+            "detected_category": "vykres",
+            "drawing_analysis": {"materials": ["S235"], "dimensions": ["length 120 mm"], "tokens_used": 10},
+        }
+
+        joined = tasks.join_pipeline_branches.run(
+            [parse_result, drawing, {"document_id": "d2", "detected_category": "faktura"}],
+            classify_result,
+            True,
+        )
+
+        assert joined["parse_tokens_used"] == 120
+        assert [a["attachment_id"] for a in joined["attachments"]] == ["a1", "a2"]
+        assert joined["attachments"][0]["filename"] == "a1.pdf"
+        assert "S235" in tasks._drawing_context(joined["attachments"])
+        assert "a2" not in tasks._drawing_context(joined["attachments"])
+
+    def test_without_parse_keeps_classify_result(self) -> None:
+        classify_result = _classify_result(["a1"])
+
+        joined = tasks.join_pipeline_branches.run([{"document_id": "d1"}], classify_result, False)
+
+        assert joined["classification"] == "poptavka"
+        assert joined["attachments"][0]["document_id"] == "d1"
+
+
+class TestAnalyzeAttachmentDrawing:
+    def test_non_drawing_passes_through(self) -> None:
+        result = {"document_id": "d1", "detected_category": "faktura", "ocr_confidence": 0.9}
+
+        assert tasks.analyze_attachment_drawing.run(result) == result
+
+    def test_low_confidence_drawing_is_skipped(self) -> None:
+        result = {"document_id": "d1", "detected_category": "vykres", "ocr_confidence": 0.2}
+
+        analyzed = tasks.analyze_attachment_drawing.run(result)
+
+        assert analyzed["drawing_analysis"]["reason"] == "low_ocr_confidence"
@@ -0,0 +1,228 @@
+"""Tests for the hourly orchestration metrics rollup and material mentions."""
+
+from collections.abc import AsyncGenerator, Callable
+from contextlib import AbstractContextManager, asynccontextmanager
+from datetime import UTC, datetime, timedelta
+from unittest.mock import patch
+from uuid import uuid4
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.v1 import orchestration as orchestration_api
+from app.models.inbox import InboxClassification, InboxMessage, InboxStatus
+from app.models.pipeline_metrics import InboxMaterialMention, PipelineMetricsHourly
+from app.orchestration.rollup import (
+    aggregate_metrics,
+    average,
+    extract_materials,
+    hour_bucket,
+    record_stage_metrics,
+    replace_material_mentions,
+)
+
+NOW = datetime(2026, 10, 18, 14, 25, 13, tzinfo=UTC)
+
+
+def _message(**kwargs: object) -> InboxMessage:
+    return InboxMessage(
+        message_id=f"<{uuid4()}@example.cz>",
+        from_email="nakup@example.cz",
+        subject="Poptávka",
+        body_text="Dobrý den",
+        received_at=NOW,
+        status=InboxStatus.NEW,
+        **kwargs,
+    )
+
+
+class TestRecordStageMetrics:
+    """Tests for incremental bucket maintenance."""
+
+    async def test_same_bucket_is_incremented(self, test_db: AsyncSession) -> None:
+        for minutes, confidence in ((0, 0.9), (20, 0.7)):
+            await record_stage_metrics(
+                test_db,
+                stage="classify",
+                status="success",
+                at=NOW + timedelta(minutes=minutes),
+                classification="poptavka",
+                method="heuristic",
+                tokens_used=100,
+                processing_time_ms=40,
+                confidence=confidence,
+            )
+        await record_stage_metrics(test_db, stage="parse", status="failed", at=NOW)
+        await test_db.commit()
+
+        rows = (await test_db.execute(
+            select(PipelineMetricsHourly).order_by(PipelineMetricsHourly.stage)
+        )).scalars().all()
+
+        assert len(rows) == 2
+        classify, parse = rows
+        assert classify.task_count == 2
+        assert classify.tokens_used == 200
+        assert classify.processing_time_count == 2
+        assert classify.confidence_total == 1.6
+        assert parse.task_count == 1
+        assert parse.classification == ""
+        assert parse.processing_time_count == 0
+        assert parse.confidence_count == 0
+
+    async def test_next_hour_starts_new_bucket(self, test_db: AsyncSession) -> None:
+        await record_stage_metrics(test_db, stage="parse", status="success", at=NOW)
+        await record_stage_metrics(
+            test_db, stage="parse", status="success", at=NOW + timedelta(hours=1)
+        )
+        await test_db.commit()
+
+        count = (await test_db.execute(select(func.count(PipelineMetricsHourly.id)))).scalar()
+        assert count == 2
+
+    def test_hour_bucket(self) -> None:
+        assert hour_bucket(NOW) == datetime(2026, 10, 18, 14, tzinfo=UTC)
+
+
+class TestAggregateMetrics:
+    """Tests for reading the rollup."""
+
+    async def test_groups_filters_and_cutoff(self, test_db: AsyncSession) -> None:
+        await record_stage_metrics(
+            test_db, stage="classify", status="success", at=NOW,
+            method="heuristic", processing_time_ms=10, confidence=0.8,
+        )
+        await record_stage_metrics(
+            test_db, stage="classify", status="success", at=NOW,
+            method="llm", processing_time_ms=900, tokens_used=350, confidence=0.95,
+        )
+        await record_stage_metrics(
+            test_db, stage="classify", status="success", at=NOW - timedelta(days=2),
+            method="heuristic", processing_time_ms=30, confidence=0.6,
+        )
+        await record_stage_metrics(test_db, stage="parse", status="failed", at=NOW)
+        await test_db.commit()
+
+        by_method = await aggregate_metrics(
+            test_db, ("method",), stage="classify", status="success"
+        )
+        assert [(row.method, row.task_count) for row in by_method] == [
+            ("heuristic", 2),
+            ("llm", 1),
+        ]
+        heuristic = by_method[0]
+        assert average(heuristic.confidence_total, heuristic.confidence_count) == 0.7
+        assert average(heuristic.processing_time_ms_total, heuristic.processing_time_count) == 20
+
+        recent = await aggregate_metrics(
+            test_db, ("stage", "status"), NOW - timedelta(minutes=10)
+        )
+        assert [(row.stage, row.status, row.task_count, row.tokens_used) for row in recent] == [
+            ("classify", "success", 2, 350),
+            ("parse", "failed", 1, 0),
+        ]
+
+    def test_average_of_empty_bucket(self) -> None:
+        assert average(None, 0) == 0.0
+
+
+class TestMaterialMentions:
+    """Tests for materials extracted from parsed emails."""
+
+    def test_extract_materials(self) -> None:
+        parsed = {
+            "items": [
+                {"name": "Příruba", "material": " 1.4301 "},
+                {"name": "Hřídel", "material": ""},
+                {"name": "Čep"},
+                "garbage",
+                {"name": "Pouzdro", "material": "S235"},
+            ]
+        }
+
+        assert extract_materials(parsed) == ["1.4301", "S235"]
+        assert extract_materials({"items": None}) == []
+        assert extract_materials(None) == []
+
+    async def test_reparse_replaces_mentions(self, test_db: AsyncSession) -> None:
+        message = _message()
+        test_db.add(message)
+        await test_db.flush()
+
+        await replace_material_mentions(
+            test_db, message.id, {"items": [{"material": "S235"}, {"material": "1.4301"}]}, NOW
+        )
+        await test_db.flush()
+        await replace_material_mentions(
+            test_db, message.id, {"items": [{"material": "S355"}]}, NOW
+        )
+        await test_db.commit()
+
+        materials = (await test_db.execute(
+            select(InboxMaterialMention.material).where(
+                InboxMaterialMention.inbox_message_id == message.id
+            )
+        )).scalars().all()
+        assert materials == ["S355"]
+
+
+class TestDashboardEndpoints:
+    """Tests for the orchestration dashboards served from the rollup."""
+
+    async def test_stats_and_nlp_analytics(
+        self,
+        test_db: AsyncSession,
+        assert_num_queries: Callable[[int], AbstractContextManager[list[str]]],
+    ) -> None:
+        now = datetime.now(UTC)
+        for method, confidence in (("heuristic", 0.95), ("heuristic", 0.85), ("llm", 0.55)):
+            await record_stage_metrics(
+                test_db, stage="classify", status="success", at=now, method=method,
+                tokens_used=50 if method == "llm" else 0, processing_time_ms=20,
+                confidence=confidence,
+            )
+        await record_stage_metrics(test_db, stage="parse", status="failed", at=now)
+        for confidence, items in ((0.95, ["S235", "1.4301"]), (0.55, ["S235"])):
+            message = _message(
+                classification=InboxClassification.POPTAVKA,
+                confidence=confidence,
+                needs_review=confidence < 0.6,
+                parsed_data={"company_name": "Strojírny a.s.", "items": [
+                    {"material": material} for material in items
+                ]},
+            )
+            test_db.add(message)
+            await test_db.flush()
+            await replace_material_mentions(test_db, message.id, message.parsed_data, now)
+        # Sent replies are not part of the inbound analytics
+        reply = _message(direction="outbound", parsed_data={"items": [{"material": "S355"}] * 3})
+        test_db.add(reply)
+        await test_db.flush()
+        await replace_material_mentions(test_db, reply.id, reply.parsed_data, now)
+        await test_db.commit()
+
+        @asynccontextmanager
+        async def session_factory() -> AsyncGenerator[AsyncSession, None]:
+            yield test_db
+
+        with patch.object(orchestration_api, "AsyncSessionLocal", session_factory):
+            stats = await orchestration_api.get_pipeline_stats(period="today")
+            with assert_num_queries(8):
+                nlp = await orchestration_api.get_nlp_analytics(period="all")
+
+        assert stats.total_tasks == 4
+        assert stats.by_stage == {"classify": 3, "parse": 1}
+        assert stats.error_rate == 0.25
+        assert stats.total_tokens_used == 50
+
+        assert nlp.total_emails == 2
+        assert nlp.escalation_rate == 0.5
+        assert {b.range: b.count for b in nlp.confidence_buckets}["90-100%"] == 1
+        assert [(m.method, m.count, m.avg_confidence) for m in nlp.classification_methods] == [
+            ("heuristic", 2, 0.9),
+            ("llm", 1, 0.55),
+        ]
+        assert nlp.tokens_by_stage == {"classify": 50, "parse": 0}
+        assert [(m.value, m.count) for m in nlp.top_materials] == [("S235", 2), ("1.4301", 1)]
+        items = next(e for e in nlp.entity_extraction if e.field == "items")
+        assert (items.extracted_count, items.total_count) == (2, 2)
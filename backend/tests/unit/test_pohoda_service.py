@@ -7,6 +7,7 @@ import pytest
 
 from app.integrations.pohoda.client import PohodaClient
 from app.integrations.pohoda.exceptions import (
+    PohodaConnectionError,
     PohodaResponseError,
 )
 from app.integrations.pohoda.xml_parser import (
@@ -67,6 +68,42 @@ class TestPohodaClient:
 
             assert exc_info.value.status_code == 500
 
+    @pytest.mark.asyncio
+    async def test_send_xml_circuit_open(self, client: PohodaClient) -> None:
+        """An open breaker should fail fast without contacting mServer."""
+        with (
+            patch("app.core.circuit_breaker.pohoda_breaker") as breaker,
+            patch.object(client, "_get_client") as mock_get,
+        ):
+            breaker.can_execute.return_value = False
+
+            with pytest.raises(PohodaConnectionError, match="circuit breaker open"):
+                await client.send_xml(b"<test/>")
+
+        mock_get.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_send_xml_server_error_trips_breaker(self, client: PohodaClient) -> None:
+        """5xx responses count as breaker failures, 4xx do not."""
+        with (
+            patch("app.core.circuit_breaker.pohoda_breaker") as breaker,
+            patch.object(client, "_get_client") as mock_get,
+        ):
+            breaker.can_execute.return_value = True
+            mock_http = AsyncMock()
+            mock_http.post.side_effect = [
+                MagicMock(status_code=503, text="Unavailable"),
+                MagicMock(status_code=400, text="Bad Request"),
+            ]
+            mock_get.return_value = mock_http
+
+            for _ in range(2):
+                with pytest.raises(PohodaResponseError):
+                    await client.send_xml(b"<test/>")
+
+        breaker.record_failure.assert_called_once()
+        breaker.record_success.assert_called_once()
+
     @pytest.mark.asyncio
     async def test_send_xml_correct_headers(self, client: PohodaClient) -> None:
         """Request should use Windows-1250 content type."""
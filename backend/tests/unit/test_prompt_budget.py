@@ -0,0 +1,41 @@
+"""Tests for deterministic prompt input truncation."""
+
+from app.core.prompt_budget import TRUNCATION_MARKER, fit_text
+
+
+class TestFitText:
+    """Tests for fit_text."""
+
+    def test_short_text_unchanged(self) -> None:
+        text = "Dobry den,\n\n\n\nposilame poptavku.\n> puvodni zprava"
+        assert fit_text(text, 1000) == text
+
+    def test_compaction_drops_quotes_and_repeats(self) -> None:
+        body = "Poptavame 10 ks prirub DN100.\n" + "> drive: " + "x" * 200 + "\n" * 6
+        body += "Diky\nDiky\n"
+
+        result = fit_text(body, 100)
+
+        assert result == "Poptavame 10 ks prirub DN100.\n\nDiky"
+
+    def test_keeps_data_lines_from_the_middle_and_the_end(self) -> None:
+        filler = [f"Obecny text bez udaju, odstavec {chr(97 + i % 26) * (40 + i)}" for i in range(40)]
+        filler[20] = "Material: P265GH"
+        filler[25] = "Mnozstvi 24 ks, DN 150"
+        body = "\n".join(["Dobry den,", *filler, "S pozdravem Jan Novak, tel. 777 123 456"])
+
+        result = fit_text(body, 1200)
+
+        assert len(result) <= 1200
+        assert result.startswith("Dobry den,")
+        assert "Material: P265GH" in result
+        assert "Mnozstvi 24 ks, DN 150" in result
+        assert "tel. 777 123 456" in result
+        assert result.endswith(TRUNCATION_MARKER)
+        assert fit_text(body, 1200) == result
+
+    def test_single_long_line_is_cut(self) -> None:
+        result = fit_text("A" * 10000, 8000, marker="[... text zkrácen ...]")
+
+        assert len(result) <= 8000
+        assert result.endswith("[... text zkrácen ...]")
@@ -0,0 +1,251 @@
+"""Tests for the Lua-scripted Claude rate limiter.
+
+Most tests mock the scripts; ``TestScriptsOnRedis`` runs them on fakeredis.
+"""
+
+import contextvars
+import threading
+from collections.abc import Generator
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import fakeredis
+import pytest
+
+from app.core.rate_limiter import ClaudeRateLimiter, RateLimitExceeded, RateLimitLease
+
+
+@pytest.fixture
+def redis() -> Generator[MagicMock, None, None]:
+    client = MagicMock()
+    client.register_script.side_effect = lambda source: MagicMock(name="script")
+    with patch("app.core.rate_limiter.Redis.from_url", return_value=client):
+        yield client
+
+
+@pytest.fixture
+def limiter(redis: MagicMock) -> ClaudeRateLimiter:
+    return ClaudeRateLimiter()
+
+
+class TestAcquire:
+    """Tests for the atomic check-and-reserve."""
+
+    def test_reserves_tokens_and_leases_slot(
+        self, limiter: ClaudeRateLimiter, redis: MagicMock
+    ) -> None:
+        limiter._acquire_script.return_value = [1, "48000.0"]
+
+        lease = limiter.acquire(estimated_tokens=2000)
+        try:
+            limiter._acquire_script.assert_called_once()
+            call = limiter._acquire_script.call_args.kwargs
+            assert call["keys"] == ["claude:tokens", "claude:leases"]
+            assert call["args"][2] == 2000
+            assert call["args"][4] == lease.id
+            assert lease.reserved_tokens == 2000
+        finally:
+            limiter.release(lease)
+
+        redis.zrem.assert_called_once_with("claude:leases", lease.id)
+
+    def test_nested_acquire_reuses_held_lease(
+        self, limiter: ClaudeRateLimiter, redis: MagicMock
+    ) -> None:
+        limiter._acquire_script.return_value = [1, "48000.0"]
+
+        outer = limiter.acquire(estimated_tokens=900)
+        inner = limiter.acquire(estimated_tokens=1024)
+        limiter.release(inner)
+        redis.zrem.assert_not_called()
+        limiter.release(outer)
+
+        assert inner.nested and inner.id == outer.id
+        assert limiter._acquire_script.call_count == 1
+        redis.zrem.assert_called_once_with("claude:leases", outer.id)
+
+    def test_concurrent_limit(self, limiter: ClaudeRateLimiter) -> None:
+        limiter._acquire_script.return_value = [0, "concurrent", "30000", "240.5"]
+
+        with pytest.raises(RateLimitExceeded) as exc_info:
+            limiter.acquire(estimated_tokens=1000)
+
+        assert exc_info.value.retry_after == 10
+
+    def test_token_limit_reports_refill_time(self, limiter: ClaudeRateLimiter) -> None:
+        limiter._acquire_script.return_value = [0, "tokens", "500", "108.2"]
+
+        with pytest.raises(RateLimitExceeded) as exc_info:
+            limiter.acquire(estimated_tokens=2000)
+
+        assert exc_info.value.retry_after == 109
+        assert "500/50000" in exc_info.value.reason
+
+
+class TestRecordUsage:
+    """Tests for settling reservations."""
+
+    def test_settles_reservation_then_consumes_further_calls(
+        self, limiter: ClaudeRateLimiter
+    ) -> None:
+        limiter._acquire_script.return_value = [1, "48000.0"]
+        lease = limiter.acquire(estimated_tokens=2000)
+
+        limiter.record_usage(1500, lease)
+        limiter.record_usage(700, lease)
+        limiter.release(lease)
+
+        deltas = [call.kwargs["args"][2] for call in limiter._settle_script.call_args_list]
+        assert deltas == [-500, 700]
+
+    def test_nested_usage_settles_outer_lease(self, limiter: ClaudeRateLimiter) -> None:
+        limiter._acquire_script.return_value = [1, "48000.0"]
+        outer = limiter.acquire(estimated_tokens=900)
+        inner = limiter.acquire(estimated_tokens=1024)
+
+        limiter.record_usage(700, inner)
+        limiter.release(inner)
+        limiter.release(outer)
+
+        limiter._settle_script.assert_called_once()
+        assert limiter._settle_script.call_args.kwargs["args"][2] == -200
+        assert outer.settled
+
+    def test_release_refunds_unused_reservation(self, limiter: ClaudeRateLimiter) -> None:
+        limiter._acquire_script.return_value = [1, "48000.0"]
+        lease = limiter.acquire(estimated_tokens=2000)
+
+        limiter.release(lease)
+        limiter.release(lease)
+
+        limiter._settle_script.assert_called_once()
+        assert limiter._settle_script.call_args.kwargs["args"][2] == -2000
+
+    def test_without_lease_consumes_tokens(self, limiter: ClaudeRateLimiter) -> None:
+        limiter.record_usage(1200)
+
+        assert limiter._settle_script.call_args.kwargs["args"][2] == 1200
+
+
+class TestAcquireWait:
+    """Tests for awaiting capacity."""
+
+    async def test_waits_for_slot(self, limiter: ClaudeRateLimiter) -> None:
+        limiter._acquire_script.side_effect = [
+            [0, "concurrent", "30000", "200"],
+            [0, "tokens", "100", "3.2"],
+            [1, "28000"],
+        ]
+
+        with patch("app.core.rate_limiter.asyncio.sleep", new=AsyncMock()) as sleep:
+            lease = await limiter.acquire_wait(estimated_tokens=2000, timeout=30)
+        limiter.release(lease)
+
+        assert [call.args[0] for call in sleep.await_args_list] == [0.25, 4]
+
+    async def test_gives_up_after_timeout(self, limiter: ClaudeRateLimiter) -> None:
+        limiter._acquire_script.return_value = [0, "tokens", "0", "3600"]
+
+        with pytest.raises(RateLimitExceeded):
+            await limiter.acquire_wait(estimated_tokens=2000, timeout=0)
+
+
+class TestScriptsOnRedis:
+    """The acquire and settle scripts executed by a Lua-capable fake Redis."""
+
+    @pytest.fixture
+    def server(self) -> fakeredis.FakeRedis:
+        return fakeredis.FakeRedis(decode_responses=True)
+
+    @pytest.fixture
+    def limiter(self, server: fakeredis.FakeRedis) -> ClaudeRateLimiter:
+        with patch("app.core.rate_limiter.Redis.from_url", return_value=server):
+            return ClaudeRateLimiter()
+
+    @staticmethod
+    def _acquire(limiter: ClaudeRateLimiter, tokens: int) -> RateLimitLease:
+        """Acquire as a separate task (no lease held by the caller)."""
+        return contextvars.Context().run(limiter.acquire, tokens)
+
+    @staticmethod
+    def _redis_now(server: fakeredis.FakeRedis) -> float:
+        seconds, microseconds = server.time()
+        return seconds + microseconds / 1_000_000
+
+    def test_contention_grants_only_the_concurrent_limit(
+        self, limiter: ClaudeRateLimiter
+    ) -> None:
+        """Workers racing for slots never overshoot CLAUDE_MAX_CONCURRENT_CALLS."""
+        start = threading.Barrier(10)
+
+        def worker() -> bool:
+            start.wait()
+            try:
+                limiter.acquire(estimated_tokens=1000)
+            except RateLimitExceeded:
+                return False
+            return True
+
+        with ThreadPoolExecutor(max_workers=10) as pool:
+            granted = [f.result() for f in [pool.submit(worker) for _ in range(10)]]
+
+        assert sum(granted) == 3
+        assert limiter.get_usage()["concurrent"] == 3
+        assert limiter.get_usage()["tokens_used"] == 3000
+
+    def test_release_frees_slot_and_refunds(self, limiter: ClaudeRateLimiter) -> None:
+        leases = [self._acquire(limiter, 1000) for _ in range(3)]
+        with pytest.raises(RateLimitExceeded) as exc_info:
+            self._acquire(limiter, 1000)
+        assert exc_info.value.retry_after == 10
+
+        limiter.release(leases[0])
+        self._acquire(limiter, 1000)
+
+        assert limiter.get_usage()["tokens_used"] == 3000
+
+    def test_token_bucket_limit_and_settle(self, limiter: ClaudeRateLimiter) -> None:
+        lease = self._acquire(limiter, 30000)
+        limiter.record_usage(35000, lease)
+        limiter.release(lease)
+
+        with pytest.raises(RateLimitExceeded) as exc_info:
+            self._acquire(limiter, 20000)
+
+        # 15000 available, 5000 missing at 50000 tokens/hour
+        assert "15000/50000" in exc_info.value.reason
+        assert 355 <= exc_info.value.retry_after <= 361
+
+    def test_bucket_refills_with_elapsed_time(
+        self, limiter: ClaudeRateLimiter, server: fakeredis.FakeRedis
+    ) -> None:
+        """An empty bucket regains tokens continuously (sliding hour)."""
+        six_minutes_ago = self._redis_now(server) - 360
+        server.hset("claude:tokens", mapping={"tokens": "0", "ts": str(six_minutes_ago)})
+
+        self._acquire(limiter, 4000)
+        with pytest.raises(RateLimitExceeded, match="Token limit"):
+            self._acquire(limiter, 2000)
+
+    def test_expired_leases_are_reclaimed(
+        self, limiter: ClaudeRateLimiter, server: fakeredis.FakeRedis
+    ) -> None:
+        """Slots of workers that died without release expire with their lease."""
+        expired = self._redis_now(server) - 1
+        server.zadd("claude:leases", {f"crashed-{i}": expired for i in range(3)})
+        assert limiter.get_usage()["concurrent"] == 0
+
+        lease = self._acquire(limiter, 1000)
+
+        assert server.zrange("claude:leases", 0, -1) == [lease.id]
+
+    def test_zero_concurrency_is_limited_not_an_error(
+        self, limiter: ClaudeRateLimiter
+    ) -> None:
+        """CLAUDE_MAX_CONCURRENT_CALLS=0 rejects calls; the script must not fail."""
+        limiter._max_concurrent = 0
+
+        with pytest.raises(RateLimitExceeded, match="Concurrent limit") as exc_info:
+            self._acquire(limiter, 1000)
+
+        assert exc_info.value.retry_after == 10
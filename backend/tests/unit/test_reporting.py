@@ -733,6 +733,45 @@ class TestReportingService:
         assert customer_stats.active_orders == 1  # only active
 
 
+class TestReportingQueryCounts:
+    """Pin the number of SQL statements per report (guards against N+1)."""
+
+    async def test_dashboard_queries(
+        self, test_db: AsyncSession, sample_data: dict, assert_num_queries
+    ) -> None:
+        with assert_num_queries(6):
+            await ReportingService(test_db).get_dashboard_stats()
+
+    async def test_revenue_queries(
+        self, test_db: AsyncSession, sample_data: dict, assert_num_queries
+    ) -> None:
+        with assert_num_queries(7):
+            await ReportingService(test_db).get_revenue_report()
+
+    async def test_production_queries(
+        self, test_db: AsyncSession, sample_data: dict, assert_num_queries
+    ) -> None:
+        with assert_num_queries(1):
+            await ReportingService(test_db).get_production_report()
+
+    async def test_customer_report_queries(
+        self, test_db: AsyncSession, sample_data: dict, assert_num_queries
+    ) -> None:
+        """Active orders are aggregated with the top customers, not per customer."""
+        with assert_num_queries(3):
+            report = await ReportingService(test_db).get_customer_report()
+
+        customer_a = next(c for c in report.top_customers if "Zákazník A" in c.company_name)
+        assert customer_a.active_orders == 3
+
+    async def test_material_requirements_queries(
+        self, test_db: AsyncSession, sample_data: dict, assert_num_queries
+    ) -> None:
+        # order count, grouped items (no material lines in sample data)
+        with assert_num_queries(2):
+            await ReportingService(test_db).get_material_requirements()
+
+
 class TestReportingSchemas:
     """Tests for Reporting Pydantic schemas."""
 
@@ -8,11 +8,14 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models import (
     Customer,
+    Order,
     OrderPriority,
     OrderStatus,
 )
+from app.models.user import User, UserRole
 from app.schemas import CustomerCreate, CustomerUpdate, OrderCreate, OrderItemCreate
 from app.services import CustomerService, OrderService
+from app.services.assignment import AssignmentService
 
 
 class TestCustomerService:
@@ -190,3 +193,62 @@ class TestOrderService:
         service = OrderService.__new__(OrderService)
         for status in OrderStatus:
             assert status in service.STATUS_TRANSITIONS
+
+
+class TestAssignmentService:
+    """Tests for AssignmentService."""
+
+    async def test_suggest_assignee_single_query(
+        self, test_db: AsyncSession, assert_num_queries
+    ) -> None:
+        """Workload of all candidates is counted in one grouped query."""
+        customer = Customer(
+            company_name="Assign s.r.o.",
+            ico="99999999",
+            contact_name="Test",
+            email="assign@test.cz",
+        )
+        busy = User(
+            email="busy@infer.cz",
+            hashed_password="x",
+            full_name="Busy Technolog",
+            role=UserRole.TECHNOLOG,
+        )
+        free = User(
+            email="free@infer.cz",
+            hashed_password="x",
+            full_name="Free Obchodnik",
+            role=UserRole.OBCHODNIK,
+        )
+        test_db.add_all([customer, busy, free])
+        await test_db.flush()
+        test_db.add_all(
+            [
+                Order(
+                    customer_id=customer.id,
+                    number="A-1",
+                    assigned_to=busy.id,
+                    status=OrderStatus.VYROBA,
+                ),
+                Order(
+                    customer_id=customer.id,
+                    number="A-2",
+                    assigned_to=busy.id,
+                    status=OrderStatus.VYROBA,
+                ),
+                Order(
+                    customer_id=customer.id,
+                    number="A-3",
+                    assigned_to=free.id,
+                    status=OrderStatus.DOKONCENO,
+                ),
+            ]
+        )
+        await test_db.flush()
+
+        with assert_num_queries(1):
+            result = await AssignmentService(test_db).suggest_assignee(uuid.uuid4())
+
+        assert result["suggestion"]["user_id"] == str(free.id)
+        assert result["suggestion"]["active_orders"] == 0
+        assert result["alternatives"][0]["active_orders"] == 2
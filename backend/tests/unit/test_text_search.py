@@ -0,0 +1,220 @@
+"""Tests for trigram-backed free-text search."""
+
+from contextlib import asynccontextmanager
+from datetime import UTC, date, datetime
+from decimal import Decimal
+from unittest.mock import MagicMock, patch
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import MaterialPrice
+from app.models.customer import Customer
+from app.models.inbox import InboxMessage, InboxStatus
+from app.orchestration.agents import order_orchestrator
+from app.orchestration.agents.order_orchestrator import OrderOrchestrator, normalize_company_name
+from app.services.customer import CustomerService
+from app.services.material_price import MaterialPriceService
+from app.services.text_search import fetch_page_with_total, text_search
+
+
+def _postgres_session() -> MagicMock:
+    db = MagicMock()
+    db.get_bind.return_value.dialect.name = "postgresql"
+    return db
+
+
+async def _add_prices(db: AsyncSession, *names: str) -> None:
+    for i, name in enumerate(names):
+        db.add(
+            MaterialPrice(
+                name=name,
+                specification=f"spec {i}",
+                unit="kg",
+                unit_price=Decimal("10.00"),
+                valid_from=date(2024, 1, 1),
+            )
+        )
+    await db.flush()
+
+
+async def _add_customer(db: AsyncSession, company_name: str, ico: str) -> Customer:
+    customer = Customer(
+        company_name=company_name,
+        ico=ico,
+        contact_name="Jan Novák",
+        email=f"{ico}@example.cz",
+    )
+    db.add(customer)
+    await db.flush()
+    return customer
+
+
+class TestTextSearch:
+    """Tests for the search filter builder."""
+
+    def test_postgres_uses_trigram_operators_and_rank(self) -> None:
+        """On PostgreSQL the filter adds word similarity and returns a rank."""
+        condition, rank = text_search(
+            _postgres_session(), [MaterialPrice.name, MaterialPrice.specification], "50%_ocel"
+        )
+
+        assert rank is not None
+        sql = str(
+            select(MaterialPrice.id)
+            .where(condition)
+            .order_by(rank.desc())
+            .compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})
+        )
+        assert "<%" in sql
+        assert "greatest(word_similarity(" in sql
+        assert "ILIKE" in sql
+        assert "ESCAPE" in sql
+
+    async def test_sqlite_falls_back_to_ilike(self, test_db: AsyncSession) -> None:
+        """Without pg_trgm the search is a plain substring match without rank."""
+        await _add_prices(test_db, "Plech S235", "Trubka DN50", "Plech 100%")
+
+        condition, rank = text_search(test_db, [MaterialPrice.name], "100%")
+        names = (await test_db.execute(select(MaterialPrice.name).where(condition))).scalars()
+
+        assert rank is None
+        assert list(names) == ["Plech 100%"]
+
+
+class TestFetchPageWithTotal:
+    """Tests for windowed pagination."""
+
+    async def test_page_and_total_in_one_query(self, test_db: AsyncSession) -> None:
+        await _add_prices(test_db, *(f"Plech {i:02d}" for i in range(7)), "Trubka")
+        service = MaterialPriceService(test_db)
+
+        items, total = await service.get_all(search="plech", skip=5, limit=5)
+
+        assert total == 7
+        assert [item.name for item in items] == ["Plech 05", "Plech 06"]
+
+    async def test_page_past_end_still_counts(self, test_db: AsyncSession) -> None:
+        await _add_prices(test_db, "Plech 1", "Plech 2")
+
+        items, total = await fetch_page_with_total(
+            test_db, select(MaterialPrice).order_by(MaterialPrice.name), skip=10, limit=5
+        )
+
+        assert items == []
+        assert total == 2
+
+
+class TestCustomerSearch:
+    """Tests for customer search and matching."""
+
+    async def test_customer_list_search(self, test_db: AsyncSession) -> None:
+        await _add_customer(test_db, "Strojírny Brno a.s.", "11111111")
+        await _add_customer(test_db, "Ocel Ostrava s.r.o.", "22222222")
+
+        customers = await CustomerService(test_db).get_all(search="brno")
+
+        assert [c.company_name for c in customers] == ["Strojírny Brno a.s."]
+
+    async def test_match_by_name_with_several_candidates(self, test_db: AsyncSession) -> None:
+        """Several substring hits pick the customer with the same name."""
+        first = await _add_customer(test_db, "Novák Steel s.r.o.", "33333333")
+        await _add_customer(test_db, "Novák Steel Services", "44444444")
+
+        customer, suggestion = await OrderOrchestrator()._match_customer_by_name(
+            test_db, "Novák Steel"
+        )
+
+        assert customer is not None
+        assert customer.id == first.id
+        assert suggestion is None
+
+    async def test_exact_match_ignores_case_and_legal_form(self, test_db: AsyncSession) -> None:
+        await _add_customer(test_db, "ABD Steel s.r.o.", "33333333")
+        abc = await _add_customer(test_db, "ABC Steel s.r.o.", "44444444")
+
+        customer, _ = await OrderOrchestrator()._match_customer_by_name(
+            test_db, "abc steel, s.r.o."
+        )
+
+        assert customer is not None
+        assert customer.id == abc.id
+
+    async def test_near_duplicate_name_is_only_suggested(self, test_db: AsyncSession) -> None:
+        """A longer name containing the query is a different company."""
+        novak_brno = await _add_customer(test_db, "Strojírny Novák Brno s.r.o.", "33333333")
+
+        customer, suggestion = await OrderOrchestrator()._match_customer_by_name(
+            test_db, "Strojírny Novák"
+        )
+
+        assert customer is None
+        assert suggestion is not None
+        assert suggestion.id == novak_brno.id
+
+    async def test_no_match(self, test_db: AsyncSession) -> None:
+        await _add_customer(test_db, "Ocel Ostrava s.r.o.", "55555555")
+
+        assert await OrderOrchestrator()._match_customer_by_name(test_db, "Brno") == (None, None)
+
+    async def test_suggested_customer_goes_to_review(self, test_db: AsyncSession) -> None:
+        """A near-duplicate name leaves the message for manual assignment."""
+        novak_brno = await _add_customer(test_db, "Strojírny Novák Brno s.r.o.", "33333333")
+        message = InboxMessage(
+            message_id="<poptavka@novak.cz>",
+            from_email="obchod@novak.cz",
+            subject="Poptávka",
+            body_text="Dobrý den",
+            received_at=datetime(2026, 10, 18, tzinfo=UTC),
+        )
+        test_db.add(message)
+        await test_db.flush()
+
+        @asynccontextmanager
+        async def session_factory():  # type: ignore[no-untyped-def]
+            yield test_db
+
+        with patch.object(order_orchestrator, "AsyncSessionLocal", session_factory):
+            result = await OrderOrchestrator().process(
+                message.id,
+                {"company_name": "Strojírny Novák", "classification": "poptavka"},
+            )
+
+        assert result["customer_id"] is None
+        assert result["order_id"] is None
+        assert result["needs_review"] is True
+        assert message.customer_id is None
+        assert message.needs_review is True
+        assert message.status == InboxStatus.REVIEW
+        assert message.parsed_data["customer_suggestion"]["customer_id"] == str(novak_brno.id)
+        assert (await test_db.execute(select(func.count(Customer.id)))).scalar_one() == 1
+
+
+class TestNormalizeCompanyName:
+    """Tests for the company name comparison key."""
+
+    @pytest.mark.parametrize(
+        ("name", "expected"),
+        [
+            ("Strojírny Novák, s.r.o.", "strojirny novak"),
+            ("STROJIRNY NOVAK spol. s r.o.", "strojirny novak"),
+            ("Hutní Materiál Praha a.s.", "hutni material praha"),
+            ("ABC Steel sro", "abc steel"),
+            ("Green Gas", "green gas"),
+        ],
+    )
+    def test_normalize(self, name: str, expected: str) -> None:
+        assert normalize_company_name(name) == expected
+
+    @pytest.mark.parametrize(
+        ("first", "second"),
+        [
+            ("Hutní Materiál Praha a.s.", "Hutní Materiál Brno a.s."),
+            ("ABC Steel s.r.o.", "ABD Steel s.r.o."),
+            ("Strojírny Novák", "Strojírny Nováček"),
+        ],
+    )
+    def test_near_duplicates_differ(self, first: str, second: str) -> None:
+        assert normalize_company_name(first) != normalize_company_name(second)
@@ -687,8 +687,10 @@ export interface AITokenCategoryUsage {
   category: string;
   tokens_input: number;
   tokens_output: number;
+  tokens_cached: number;
   calls: number;
   cost_czk: number;
+  avg_latency_ms: number;
 }
 
 export interface AITokenTimePoint {
@@ -704,6 +706,8 @@ export interface AITokenUsageResponse {
   total_cost_czk: number;
   total_calls: number;
   total_tokens: number;
+  total_tokens_cached: number;
+  cache_read_ratio: number;
 }
 
 // --- Calculation Feedback ---
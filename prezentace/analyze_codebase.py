@@ -3,9 +3,15 @@
 inferbox — Dynamic Codebase Analyzer
 Analyzes backend + frontend and generates a JSON graph for interactive visualization.
 Re-run to get fresh state from the actual codebase.
+
+Per-file results are cached in .analysis_cache.json next to this script and
+reused while the file's mtime and size (or, after a touch/checkout, its
+SHA-256) are unchanged, so a re-run only parses files that changed.
+Use --full to ignore the cache.
 """
 
 import ast
+import hashlib
 import json
 import os
 import re
@@ -45,23 +51,100 @@ ROOT = Path(__file__).resolve().parent.parent
 BACKEND = ROOT / "backend" / "app"
 FRONTEND = ROOT / "frontend" / "src"
 OUTPUT = Path(__file__).resolve().parent / "graph_data.json"
+CACHE_FILE = Path(__file__).resolve().parent / ".analysis_cache.json"
+
+# Bump when the per-file analysis output changes, to discard old cache entries
+CACHE_VERSION = 1
+
+
+# ── Per-file Cache ───────────────────────────────────────────────────────────
+
+class FileCache:
+    """Per-file analysis results, keyed by path relative to ROOT.
+
+    An entry is reused without reading the file while mtime and size match,
+    and after re-hashing the content when only those changed.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.entries: dict[str, dict] = {}
+        self.used: dict[str, dict] = {}
+        self.reused = 0
+        self.analyzed = 0
+
+    def load(self):
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        if data.get("version") == CACHE_VERSION:
+            self.entries = data.get("files", {})
+
+    def get(self, path: Path, analyze):
+        """Cached ``analyze(path, source)`` result for a file."""
+        key = str(path.relative_to(ROOT))
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+        entry = self.entries.get(key)
+        if entry is None or (entry["mtime_ns"], entry["size"]) != (stat.st_mtime_ns, stat.st_size):
+            content = path.read_bytes()
+            digest = hashlib.sha256(content).hexdigest()
+            if entry is None or entry["sha256"] != digest:
+                try:
+                    result = analyze(path, content.decode("utf-8"))
+                except UnicodeDecodeError:
+                    result = None
+                entry = {"sha256": digest, "result": result}
+                self.analyzed += 1
+            else:
+                self.reused += 1
+            entry.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+            self.entries[key] = entry
+        else:
+            self.reused += 1
+        self.used[key] = entry
+        return entry["result"]
+
+    def save(self):
+        """Write the entries used by this run (deleted files drop out)."""
+        _write_atomic(self.path, json.dumps({"version": CACHE_VERSION, "files": self.used}))
+
+
+CACHE = FileCache(CACHE_FILE)
+
+
+def _write_atomic(path: Path, text: str):
+    """Replace ``path`` in one step, so readers never see a partial file."""
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
 
 
 # ── AST Helpers ──────────────────────────────────────────────────────────────
 
-def count_lines(path: Path) -> int:
-    try:
-        return len(path.read_text(encoding="utf-8").splitlines())
-    except Exception:
-        return 0
+def analyze_python_file(path: Path) -> Optional[dict]:
+    """Everything the graph needs from a Python file (None if it does not parse)."""
+    return CACHE.get(path, _analyze_python_source)
 
 
-def parse_python_file(path: Path) -> Optional[ast.Module]:
+def _analyze_python_source(path: Path, source: str) -> Optional[dict]:
     try:
-        source = path.read_text(encoding="utf-8")
-        return ast.parse(source, filename=str(path))
+        tree = ast.parse(source, filename=str(path))
     except Exception:
         return None
+    return {
+        "doc": get_docstring(tree),
+        "lines": len(source.splitlines()),
+        "functions": get_functions(tree),
+        "classes": get_classes(tree),
+        "imports": get_imports(tree),
+        "endpoints": extract_endpoints(tree),
+        "celery_tasks": extract_celery_tasks(tree),
+        "models": extract_model_fields(tree),
+    }
 
 
 def get_docstring(node) -> str:
@@ -106,7 +189,7 @@ def get_imports(tree: ast.Module) -> list[str]:
         if isinstance(node, ast.ImportFrom) and node.module:
             if node.module.startswith("app."):
                 imports.append(node.module)
-    return list(set(imports))
+    return sorted(set(imports))
 
 
 # ── FastAPI Endpoint Extraction ──────────────────────────────────────────────
@@ -234,11 +317,10 @@ def extract_model_fields(tree: ast.Module) -> list[dict]:
 
 def analyze_tsx_file(path: Path) -> dict:
     """Analyze a TypeScript/TSX file for components and API calls."""
-    try:
-        content = path.read_text(encoding="utf-8")
-    except Exception:
-        return {}
+    return CACHE.get(path, _analyze_tsx_source) or {}
 
+
+def _analyze_tsx_source(path: Path, content: str) -> dict:
     # Extract component name
     component_match = re.search(r"(?:export\s+default\s+function|function)\s+(\w+)", content)
     component_name = component_match.group(1) if component_match else path.stem
@@ -398,16 +480,16 @@ def analyze_backend(nodes: list[Node], edges: list[Edge]):
         for py_file in sorted(api_dir.glob("*.py")):
             if py_file.name == "__init__.py":
                 continue
-            tree = parse_python_file(py_file)
-            if not tree:
+            info = analyze_python_file(py_file)
+            if not info:
                 continue
 
             module_name = py_file.stem
             node_id = f"api_{module_name}"
-            endpoints = extract_endpoints(tree)
-            funcs = get_functions(tree)
-            imports = get_imports(tree)
-            desc = MODULE_DESCRIPTIONS.get(module_name, get_docstring(tree))
+            endpoints = info["endpoints"]
+            funcs = info["functions"]
+            imports = info["imports"]
+            desc = MODULE_DESCRIPTIONS.get(module_name, info["doc"])
 
             node = Node(
                 id=node_id,
@@ -416,7 +498,7 @@ def analyze_backend(nodes: list[Node], edges: list[Edge]):
                 description=desc,
                 detail=f"Endpointy: {len(endpoints)}, Funkce: {len(funcs)}",
                 file_path=str(py_file.relative_to(ROOT)),
-                line_count=count_lines(py_file),
+                line_count=info["lines"],
                 function_count=len(funcs),
                 endpoints=[f"{e['method']} {e['path']}" for e in endpoints],
                 methods=[f.get("name", "") for f in funcs],
@@ -448,17 +530,17 @@ def analyze_backend(nodes: list[Node], edges: list[Edge]):
         for py_file in sorted(svc_dir.glob("*.py")):
             if py_file.name == "__init__.py":
                 continue
-            tree = parse_python_file(py_file)
-            if not tree:
+            info = analyze_python_file(py_file)
+            if not info:
                 continue
 
             module_name = py_file.stem
             node_id = f"svc_{module_name}"
-            funcs = get_functions(tree)
-            classes = get_classes(tree)
-            imports = get_imports(tree)
+            funcs = info["functions"]
+            classes = info["classes"]
+            imports = info["imports"]
             desc_key = f"{module_name}_service" if not module_name.endswith("_service") else module_name
-            desc = MODULE_DESCRIPTIONS.get(desc_key, MODULE_DESCRIPTIONS.get(module_name, get_docstring(tree)))
+            desc = MODULE_DESCRIPTIONS.get(desc_key, MODULE_DESCRIPTIONS.get(module_name, info["doc"]))
 
             node = Node(
                 id=node_id,
@@ -467,7 +549,7 @@ def analyze_backend(nodes: list[Node], edges: list[Edge]):
                 description=desc,
                 detail=f"Třídy: {len(classes)}, Metody: {len(funcs)}",
                 file_path=str(py_file.relative_to(ROOT)),
-                line_count=count_lines(py_file),
+                line_count=info["lines"],
                 function_count=len(funcs),
                 class_count=len(classes),
                 methods=[f.get("name", "") for f in funcs[:20]],
@@ -498,14 +580,14 @@ def analyze_backend(nodes: list[Node], edges: list[Edge]):
         for py_file in sorted(model_dir.glob("*.py")):
             if py_file.name in ("__init__.py", "base.py"):
                 continue
-            tree = parse_python_file(py_file)
-            if not tree:
+            info = analyze_python_file(py_file)
+            if not info:
                 continue
 
             module_name = py_file.stem
             node_id = f"model_{module_name}"
-            models = extract_model_fields(tree)
-            desc = MODULE_DESCRIPTIONS.get(module_name, get_docstring(tree))
+            models = info["models"]
+            desc = MODULE_DESCRIPTIONS.get(module_name, info["doc"])
 
             model_details = []
             for m in models:
@@ -525,14 +607,14 @@ def analyze_backend(nodes: list[Node], edges: list[Edge]):
                 description=desc or f"Databázový model {module_name}",
                 detail=f"Modely: {', '.join(m['name'] for m in models)}" if models else "",
                 file_path=str(py_file.relative_to(ROOT)),
-                line_count=count_lines(py_file),
+                line_count=info["lines"],
                 class_count=len(models),
                 methods=[d for d in model_details],
             )
             nodes.append(node)
 
             # Model relationships via imports
-            imports = get_imports(tree)
+            imports = info["imports"]
             for imp in imports:
                 if "models" in imp:
                     related = imp.split(".")[-1]
@@ -550,17 +632,17 @@ def analyze_backend(nodes: list[Node], edges: list[Edge]):
         for py_file in sorted(agent_dir.glob("*.py")):
             if py_file.name == "__init__.py":
                 continue
-            tree = parse_python_file(py_file)
-            if not tree:
+            info = analyze_python_file(py_file)
+            if not info:
                 continue
 
             module_name = py_file.stem
             node_id = f"agent_{module_name}"
-            funcs = get_functions(tree)
-            classes = get_classes(tree)
-            celery_tasks = extract_celery_tasks(tree)
-            imports = get_imports(tree)
-            desc = MODULE_DESCRIPTIONS.get(module_name, get_docstring(tree))
+            funcs = info["functions"]
+            classes = info["classes"]
+            celery_tasks = info["celery_tasks"]
+            imports = info["imports"]
+            desc = MODULE_DESCRIPTIONS.get(module_name, info["doc"])
 
             node = Node(
                 id=node_id,
@@ -569,7 +651,7 @@ def analyze_backend(nodes: list[Node], edges: list[Edge]):
                 description=desc,
                 detail=f"Třídy: {len(classes)}, Funkce: {len(funcs)}, Celery tasks: {len(celery_tasks)}",
                 file_path=str(py_file.relative_to(ROOT)),
-                line_count=count_lines(py_file),
+                line_count=info["lines"],
                 function_count=len(funcs),
                 class_count=len(classes),
                 methods=[f.get("name", "") for f in funcs[:15]],
@@ -612,15 +694,15 @@ def analyze_backend(nodes: list[Node], edges: list[Edge]):
             for py_file in sorted(sub_dir.glob("*.py")):
                 if py_file.name == "__init__.py":
                     continue
-                tree = parse_python_file(py_file)
-                if not tree:
+                info = analyze_python_file(py_file)
+                if not info:
                     continue
-                total_lines += count_lines(py_file)
-                funcs = get_functions(tree)
+                total_lines += info["lines"]
+                funcs = info["functions"]
                 total_funcs += len(funcs)
-                total_classes += len(get_classes(tree))
+                total_classes += len(info["classes"])
                 all_methods.extend(f.get("name", "") for f in funcs)
-                all_tasks.extend(extract_celery_tasks(tree))
+                all_tasks.extend(info["celery_tasks"])
 
             desc_keys = [
                 f"{int_name}_xml",
@@ -657,15 +739,15 @@ def analyze_backend(nodes: list[Node], edges: list[Edge]):
         for py_file in sorted(core_dir.glob("*.py")):
             if py_file.name == "__init__.py":
                 continue
-            tree = parse_python_file(py_file)
-            if not tree:
+            info = analyze_python_file(py_file)
+            if not info:
                 continue
 
             module_name = py_file.stem
             node_id = f"core_{module_name}"
-            funcs = get_functions(tree)
-            classes = get_classes(tree)
-            desc = MODULE_DESCRIPTIONS.get(module_name, MODULE_DESCRIPTIONS.get(f"logging_config" if module_name == "logging" else module_name, get_docstring(tree)))
+            funcs = info["functions"]
+            classes = info["classes"]
+            desc = MODULE_DESCRIPTIONS.get(module_name, MODULE_DESCRIPTIONS.get(f"logging_config" if module_name == "logging" else module_name, info["doc"]))
 
             node = Node(
                 id=node_id,
@@ -674,7 +756,7 @@ def analyze_backend(nodes: list[Node], edges: list[Edge]):
                 description=desc or f"Core modul: {module_name}",
                 detail=f"Třídy: {len(classes)}, Funkce: {len(funcs)}",
                 file_path=str(py_file.relative_to(ROOT)),
-                line_count=count_lines(py_file),
+                line_count=info["lines"],
                 function_count=len(funcs),
                 class_count=len(classes),
                 methods=[f.get("name", "") for f in funcs[:10]],
@@ -796,6 +878,9 @@ def main():
     nodes: list[Node] = []
     edges: list[Edge] = []
 
+    if "--full" not in sys.argv[1:]:
+        CACHE.load()
+
     print("Analyzing backend...")
     analyze_backend(nodes, edges)
 
@@ -805,10 +890,10 @@ def main():
     # Deduplicate edges
     seen_edges = set()
     unique_edges = []
+    node_ids = {n.id for n in nodes}
     for e in edges:
         key = (e.source, e.target, e.edge_type)
         # Only add edge if both nodes exist
-        node_ids = {n.id for n in nodes}
         if key not in seen_edges and e.source in node_ids and e.target in node_ids:
             seen_edges.add(key)
             unique_edges.append(e)
@@ -831,8 +916,10 @@ def main():
     }
     add_summary_stats(data, nodes)
 
-    OUTPUT.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
+    _write_atomic(OUTPUT, json.dumps(data, indent=2, ensure_ascii=False))
+    CACHE.save()
     print(f"Generated {OUTPUT} with {len(nodes)} nodes and {len(unique_edges)} edges")
+    print(f"Files: {CACHE.analyzed} analyzed, {CACHE.reused} reused from cache")
     print(f"Stats: {data['stats']}")
 
 